@@ -12,6 +12,8 @@ from datetime import datetime, date, timedelta
 import openai
 from dotenv import load_dotenv
 
+from seba.utils.tracing import traced
+
 # إعداد السجل
 logger = logging.getLogger(__name__)
 
@@ -37,6 +39,7 @@ class OpenAIClient:
         self.model = os.getenv("OPENAI_MODEL", "gpt-4")
         logger.info(f"تهيئة عميل OpenAI باستخدام النموذج {self.model}")
     
+    @traced("llm.generate_text")
     def generate_text(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.7) -> str:
         """
         توليد نص باستخدام OpenAI API
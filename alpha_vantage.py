@@ -5,6 +5,7 @@
 """
 
 import os
+import io
 import logging
 from datetime import datetime, timedelta
 import pandas as pd
@@ -21,13 +22,34 @@ logger = logging.getLogger(__name__)
 class AlphaVantageAPI:
     """فئة للتعامل مع واجهة برمجة تطبيقات Alpha Vantage"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    # أسماء أعمدة ردود CSV وأنواع بياناتها في إطار البيانات القياسي
+    CSV_COLUMN_MAPPING = {
+        "timestamp": "date",
+        "adjusted_close": "adj_close",
+        "dividend_amount": "dividend"
+    }
+    CSV_DTYPES = {
+        "date": "str",
+        "open": "float64",
+        "high": "float64",
+        "low": "float64",
+        "close": "float64",
+        "adj_close": "float64",
+        "volume": "int64",
+        "dividend": "float64",
+        "split_coefficient": "float64"
+    }
+    
+    def __init__(self, api_key: Optional[str] = None, raise_errors: bool = False):
         """
         تهيئة الفئة
         
         المعلمات:
             api_key (str, optional): مفتاح API لـ Alpha Vantage. إذا لم يتم تحديده، سيتم استخدام المفتاح من متغيرات البيئة.
+            raise_errors (bool, optional): رفع أخطاء الاتصال والخادم ورسائل الخطأ بدلاً من إعادة نتيجة فارغة،
+                حتى يميزها مدير البيانات عن النتيجة الفارغة الصحيحة
         """
+        self.raise_errors = raise_errors
         self.api_key = api_key or os.getenv("ALPHA_VANTAGE_API_KEY")
         if not self.api_key:
             logger.warning("لم يتم تحديد مفتاح API لـ Alpha Vantage. بعض الوظائف قد لا تعمل.")
@@ -35,11 +57,42 @@ class AlphaVantageAPI:
         self.base_url = "https://www.alphavantage.co/query"
         logger.info("تهيئة واجهة Alpha Vantage API")
     
+    @staticmethod
+    def _raise_for_api_error(response: requests.Response) -> None:
+        """
+        رفع استثناء إذا كان رد Alpha Vantage رسالة خطأ أو تجاوزاً لحد الطلبات
+        
+        ترد Alpha Vantage على هذه الحالات برمز 200 ورسالة JSON (Error Message أو Note أو Information)
+        حتى عند طلب CSV، فلا يكشفها raise_for_status.
+        
+        المعلمات:
+            response (requests.Response): رد الطلب
+        """
+        text = response.text
+        if not isinstance(text, str) or not text.lstrip().startswith("{"):
+            return
+        try:
+            data = response.json()
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+        
+        if "Error Message" in data:
+            raise ValueError(data["Error Message"])
+        message = data.get("Note") or data.get("Information")
+        if message:
+            lowered = message.lower()
+            if "Note" in data or "rate limit" in lowered or "call frequency" in lowered:
+                raise RuntimeError(f"rate limit: {message}")
+            raise ValueError(f"not supported: {message}")
+    
     def get_historical_data(
         self, 
         symbol: str, 
         output_size: str = "compact",
-        interval: str = "daily"
+        interval: str = "daily",
+        datatype: str = "csv"
     ) -> pd.DataFrame:
         """
         الحصول على البيانات التاريخية لسهم معين
@@ -48,6 +101,7 @@ class AlphaVantageAPI:
             symbol (str): رمز السهم
             output_size (str, optional): حجم المخرجات (compact: 100 نقطة بيانات، full: كل البيانات المتاحة)
             interval (str, optional): الفاصل الزمني (daily, weekly, monthly)
+            datatype (str, optional): صيغة الرد (csv: التحليل السريع، json)
             
         العائد:
             pd.DataFrame: إطار بيانات يحتوي على البيانات التاريخية
@@ -68,65 +122,126 @@ class AlphaVantageAPI:
                 "symbol": symbol,
                 "outputsize": output_size,
                 "apikey": self.api_key,
-                "datatype": "json"
+                "datatype": datatype
             }
             
             # إرسال الطلب
             response = requests.get(self.base_url, params=params)
             response.raise_for_status()  # رفع استثناء في حالة فشل الطلب
-            data = response.json()
-            
-            # استخراج البيانات من الاستجابة
-            time_series_key = next((key for key in data.keys() if "Time Series" in key), None)
-            if not time_series_key:
-                logger.error(f"لم يتم العثور على بيانات السلسلة الزمنية للسهم {symbol}")
-                return pd.DataFrame()
-            
-            # تحويل البيانات إلى إطار بيانات
-            time_series = data[time_series_key]
-            df = pd.DataFrame.from_dict(time_series, orient="index")
-            
-            # إعادة تسمية الأعمدة
-            column_mapping = {
-                "1. open": "open",
-                "2. high": "high",
-                "3. low": "low",
-                "4. close": "close",
-                "5. adjusted close": "adj_close",
-                "6. volume": "volume",
-                "7. dividend amount": "dividend",
-                "8. split coefficient": "split_coefficient"
-            }
-            
-            # تطبيق إعادة التسمية على الأعمدة الموجودة فقط
-            existing_columns = {col: column_mapping.get(col, col) for col in df.columns if col in column_mapping}
-            df = df.rename(columns=existing_columns)
-            
-            # تحويل الفهرس إلى عمود التاريخ
-            df = df.reset_index()
-            df = df.rename(columns={"index": "date"})
-            
-            # تحويل الأعمدة الرقمية
-            numeric_columns = ["open", "high", "low", "close", "adj_close", "volume", "dividend", "split_coefficient"]
-            for col in [c for c in numeric_columns if c in df.columns]:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-            
-            # تحويل التاريخ إلى تنسيق موحد
-            df["date"] = pd.to_datetime(df["date"]).dt.date
+            self._raise_for_api_error(response)
             
-            # إضافة عمود رمز السهم
-            df["symbol"] = symbol
+            if datatype == "csv":
+                df = self._parse_time_series_csv(response.text, symbol)
+            else:
+                df = self._parse_time_series_json(response.json(), symbol)
             
-            # ترتيب البيانات حسب التاريخ (من الأقدم إلى الأحدث)
-            df = df.sort_values("date")
+            if df.empty:
+                return df
             
             logger.info(f"تم جلب {len(df)} سجل من البيانات التاريخية للسهم {symbol} من Alpha Vantage")
             return df
             
         except Exception as e:
             logger.error(f"خطأ في جلب البيانات التاريخية للسهم {symbol} من Alpha Vantage: {str(e)}")
+            if self.raise_errors:
+                raise
             return pd.DataFrame()
     
+    def _parse_time_series_csv(self, text: str, symbol: str) -> pd.DataFrame:
+        """
+        تحويل رد CSV لسلسلة زمنية إلى إطار البيانات القياسي في تمريرة واحدة
+        
+        يستخدم قارئ CSV بأنواع بيانات محددة مسبقاً ويحلل التاريخ مرة واحدة بتنسيق ثابت،
+        دون المرور بإطار من النصوص ثم تحويل كل عمود على حدة.
+        
+        المعلمات:
+            text (str): رد Alpha Vantage بصيغة CSV
+            symbol (str): رمز السهم
+        
+        العائد:
+            pd.DataFrame: إطار البيانات القياسي مرتباً حسب التاريخ تصاعدياً
+        """
+        # ترسل Alpha Vantage رسائل الخطأ وتجاوز الحد بصيغة JSON حتى عند طلب CSV
+        if not text or text.lstrip().startswith("{"):
+            logger.error(f"لم يتم العثور على بيانات السلسلة الزمنية للسهم {symbol}: {text[:200] if text else ''}")
+            return pd.DataFrame()
+        
+        # أسماء الأعمدة تختلف بين السلاسل اليومية (adjusted_close) والأسبوعية (adjusted close)
+        header = [name.strip().lower().replace(" ", "_") for name in text.split("\n", 1)[0].split(",")]
+        names = [self.CSV_COLUMN_MAPPING.get(name, name) for name in header]
+        
+        df = pd.read_csv(
+            io.StringIO(text),
+            header=0,
+            names=names,
+            dtype={name: dtype for name, dtype in self.CSV_DTYPES.items() if name in names},
+            engine="c"
+        )
+        
+        # الرد مرتب من الأحدث إلى الأقدم
+        df = df.iloc[::-1].reset_index(drop=True)
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d").dt.date
+        df["symbol"] = symbol
+        
+        return df
+    
+    def _parse_time_series_json(self, data: Dict, symbol: str) -> pd.DataFrame:
+        """
+        تحويل رد JSON لسلسلة زمنية إلى إطار البيانات القياسي
+        
+        المعلمات:
+            data (Dict): رد Alpha Vantage بصيغة JSON
+            symbol (str): رمز السهم
+        
+        العائد:
+            pd.DataFrame: إطار البيانات القياسي مرتباً حسب التاريخ تصاعدياً
+        """
+        # استخراج البيانات من الاستجابة
+        time_series_key = next((key for key in data.keys() if "Time Series" in key), None)
+        if not time_series_key:
+            logger.error(f"لم يتم العثور على بيانات السلسلة الزمنية للسهم {symbol}")
+            return pd.DataFrame()
+        
+        # تحويل البيانات إلى إطار بيانات
+        time_series = data[time_series_key]
+        df = pd.DataFrame.from_dict(time_series, orient="index")
+        
+        # إعادة تسمية الأعمدة
+        column_mapping = {
+            "1. open": "open",
+            "2. high": "high",
+            "3. low": "low",
+            "4. close": "close",
+            "5. adjusted close": "adj_close",
+            "6. volume": "volume",
+            "7. dividend amount": "dividend",
+            "8. split coefficient": "split_coefficient"
+        }
+        
+        # تطبيق إعادة التسمية على الأعمدة الموجودة فقط
+        existing_columns = {col: column_mapping.get(col, col) for col in df.columns if col in column_mapping}
+        df = df.rename(columns=existing_columns)
+        
+        # تحويل الفهرس إلى عمود التاريخ
+        df = df.reset_index()
+        df = df.rename(columns={"index": "date"})
+        
+        # تحويل الأعمدة الرقمية
+        numeric_columns = ["open", "high", "low", "close", "adj_close", "volume", "dividend", "split_coefficient"]
+        for col in [c for c in numeric_columns if c in df.columns]:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        
+        # تحويل التاريخ إلى تنسيق موحد
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+        
+        # إضافة عمود رمز السهم
+        df["symbol"] = symbol
+        
+        # ترتيب البيانات حسب التاريخ (من الأقدم إلى الأحدث)
+        df = df.sort_values("date")
+        
+        return df
+    
     def get_technical_indicators(self, symbol: str, indicator: str, time_period: int = 14, interval: str = "daily") -> pd.DataFrame:
         """
         الحصول على المؤشرات الفنية لسهم معين
@@ -179,6 +294,7 @@ class AlphaVantageAPI:
             # إرسال الطلب
             response = requests.get(self.base_url, params=params)
             response.raise_for_status()  # رفع استثناء في حالة فشل الطلب
+            self._raise_for_api_error(response)
             data = response.json()
             
             # استخراج البيانات من الاستجابة
@@ -215,6 +331,8 @@ class AlphaVantageAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب المؤشر الفني {indicator} للسهم {symbol} من Alpha Vantage: {str(e)}")
+            if self.raise_errors:
+                raise
             return pd.DataFrame()
     
     def get_company_overview(self, symbol: str) -> Dict:
@@ -240,6 +358,7 @@ class AlphaVantageAPI:
             # إرسال الطلب
             response = requests.get(self.base_url, params=params)
             response.raise_for_status()  # رفع استثناء في حالة فشل الطلب
+            self._raise_for_api_error(response)
             data = response.json()
             
             # التحقق من وجود بيانات
@@ -260,6 +379,8 @@ class AlphaVantageAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب نظرة عامة على الشركة للسهم {symbol} من Alpha Vantage: {str(e)}")
+            if self.raise_errors:
+                raise
             return {}
     
     def get_earnings(self, symbol: str) -> Dict:
@@ -285,6 +406,7 @@ class AlphaVantageAPI:
             # إرسال الطلب
             response = requests.get(self.base_url, params=params)
             response.raise_for_status()  # رفع استثناء في حالة فشل الطلب
+            self._raise_for_api_error(response)
             data = response.json()
             
             # التحقق من وجود بيانات
@@ -324,6 +446,8 @@ class AlphaVantageAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب بيانات الأرباح للسهم {symbol} من Alpha Vantage: {str(e)}")
+            if self.raise_errors:
+                raise
             return {}
     
     def search_stocks(self, keywords: str) -> List[Dict]:
@@ -349,6 +473,7 @@ class AlphaVantageAPI:
             # إرسال الطلب
             response = requests.get(self.base_url, params=params)
             response.raise_for_status()  # رفع استثناء في حالة فشل الطلب
+            self._raise_for_api_error(response)
             data = response.json()
             
             # استخراج البيانات من الاستجابة
@@ -377,6 +502,8 @@ class AlphaVantageAPI:
             
         except Exception as e:
             logger.error(f"خطأ في البحث عن الأسهم باستخدام الكلمات المفتاحية {keywords} من Alpha Vantage: {str(e)}")
+            if self.raise_errors:
+                raise
             return []
     
     def get_sector_performance(self) -> Dict:
@@ -398,5 +525,6 @@ class AlphaVantageAPI:
             # إرسال الطلب
             response = requests.get(self.base_url, params=params)
             response.raise_for_status()  # رفع استثناء في حالة فشل الطلب
+            self._raise_for_api_error(response)
             data = response.json(
 (Content truncated due to size limit. Use line ranges to read in chunks)
\ No newline at end of file
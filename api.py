@@ -4,13 +4,15 @@
 """
 
 import os
+import re
+import time
 import logging
 import json
 from typing import Dict, List, Optional, Union, Any
 from datetime import datetime, date, timedelta
-from fastapi import FastAPI, HTTPException, Depends, Query, Path, Body, Header, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Path, Body, Header, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response, PlainTextResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, Field
 import pandas as pd
@@ -19,11 +21,16 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 
 from seba.data_integration.data_manager import DataIntegrationManager
+from seba.data_integration.quote_hub import QuoteHub
+from seba.data_integration.cache_warmer import CacheWarmer
 from seba.database.db_manager import DatabaseManager
 from seba.database.repository import StockRepository, UserRepository, AlertRepository
 from seba.models.technical_analysis import DataProcessor
 from seba.models.sepa_engine import SEPAEngine
 from seba.models.ai_integration import AIIntegrationManager
+from seba.utils.metrics import get_metrics_registry, CONTENT_TYPE
+from seba.utils.tracing import get_tracer
+from seba.utils.profiler import SamplingProfiler
 
 # إعداد السجل
 logger = logging.getLogger(__name__)
@@ -44,17 +51,115 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# مقاييس الطلبات
+metrics_registry = get_metrics_registry()
+http_requests = metrics_registry.counter("seba_http_requests_total", "عدد طلبات واجهة برمجة التطبيقات", ["endpoint", "method", "status"])
+http_latency = metrics_registry.histogram("seba_http_request_duration_seconds", "زمن معالجة طلبات واجهة برمجة التطبيقات", ["endpoint", "method"])
+cache_entries = metrics_registry.gauge("seba_cache_entries", "عدد المدخلات في طبقة التخزين المؤقت", ["tier"])
+cache_bytes = metrics_registry.gauge("seba_cache_bytes", "حجم القيم في طبقة التخزين المؤقت بالبايت", ["tier"])
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """تسجيل عدد الطلبات وزمن معالجتها لكل مسار (بقالب المسار وليس بالقيم لتجنب تسميات غير محدودة)"""
+    start_time = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        http_requests.inc(endpoint=endpoint, method=request.method, status=str(status_code))
+        http_latency.observe(time.perf_counter() - start_time, endpoint=endpoint, method=request.method)
+
+# تتبع الطلبات
+tracer = get_tracer()
+TRACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """بدء تتبع لكل طلب (باستخدام ترويسة X-Trace-Id إن وجدت) وإعادة معرفه في الاستجابة"""
+    trace_id = request.headers.get("X-Trace-Id")
+    if trace_id and not TRACE_ID_PATTERN.match(trace_id):
+        trace_id = None
+    
+    with tracer.trace(f"{request.method} {request.url.path}", trace_id=trace_id, method=request.method, path=request.url.path) as root:
+        response = await call_next(request)
+        if root is not None:
+            route = request.scope.get("route")
+            if route is not None:
+                root.name = f"{request.method} {route.path}"
+            root.set_attribute("status", response.status_code)
+    
+    if root is not None:
+        response.headers["X-Trace-Id"] = root.trace.trace_id
+    return response
+
+# تحليل الأداء عند الطلب
+profiler = SamplingProfiler()
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """تسجيل الطلبات المطابقة لعملية التقاط تحليل الأداء الحالية (إن وجدت)"""
+    tracked = profiler.request_started(request.url.path)
+    try:
+        return await call_next(request)
+    finally:
+        profiler.request_finished(tracked)
+
 # تهيئة OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# رمز وصول اختياري لمسار المقاييس (يُسمح أيضاً لعناوين METRICS_ALLOWED_IPS دون رمز)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 # تهيئة المكونات الرئيسية
 data_manager = DataIntegrationManager()
+quote_hub = QuoteHub(data_manager)
 db_manager = DatabaseManager()
 stock_repository = StockRepository(db_manager)
 user_repository = UserRepository(db_manager)
 alert_repository = AlertRepository(db_manager)
 sepa_engine = SEPAEngine()
 ai_manager = AIIntegrationManager()
+cache_warmer = CacheWarmer(data_manager, sepa_engine=sepa_engine)
+
+def collect_cache_metrics():
+    """تحديث مقاييس حجم طبقات التخزين المؤقت قبل عرض المقاييس"""
+    if data_manager.cache is None:
+        return
+    stats = data_manager.cache.get_stats()
+    tiers = {"memory": stats} if stats["backend"] == "memory" else {"l1": stats.get("l1"), "disk": stats.get("disk")}
+    for tier, tier_stats in tiers.items():
+        if tier_stats:
+            cache_entries.set(tier_stats["entries"], tier=tier)
+            cache_bytes.set(tier_stats["bytes"], tier=tier)
+
+metrics_registry.register_collector(collect_cache_metrics)
+
+@app.on_event("startup")
+async def start_cache_warmer():
+    """تسخين التخزين المؤقت بعد النشر و/أو جدولته قبل افتتاح كل جلسة حسب متغيرات البيئة"""
+    if os.getenv("WARMUP_ON_STARTUP", "false").lower() in ["1", "true", "yes"]:
+        cache_warmer.run_in_background()
+    if os.getenv("WARMUP_SCHEDULE_ENABLED", "false").lower() in ["1", "true", "yes"]:
+        cache_warmer.start_schedule()
+
+@app.on_event("shutdown")
+async def shutdown_cache_warmer():
+    """إيقاف جدولة تسخين التخزين المؤقت عند إيقاف الخادم"""
+    cache_warmer.stop()
+
+@app.on_event("shutdown")
+async def shutdown_quote_hub():
+    """إيقاف مركز الأسعار اللحظية عند إيقاف الخادم"""
+    quote_hub.stop()
+
+@app.on_event("shutdown")
+async def shutdown_cache():
+    """إيقاف الاستماع لرسائل إبطال التخزين المؤقت عند إيقاف الخادم"""
+    if data_manager.cache is not None:
+        data_manager.cache.close()
 
 # تعريف النماذج
 class Token(BaseModel):
@@ -69,6 +174,7 @@ class User(BaseModel):
     email: Optional[str] = None
     full_name: Optional[str] = None
     disabled: Optional[bool] = None
+    is_admin: Optional[bool] = None
 
 class UserInDB(User):
     hashed_password: str
@@ -152,7 +258,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         username=user.username,
         email=user.email,
         full_name=user.full_name,
-        disabled=user.disabled
+        disabled=user.disabled,
+        is_admin=getattr(user, "is_admin", False)
     )
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -169,6 +276,40 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
         raise HTTPException(status_code=400, detail="المستخدم غير نشط")
     return current_user
 
+def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+    """
+    الحصول على المستخدم الحالي إذا كان مديراً
+    
+    المعلمات:
+        current_user (User): المستخدم النشط الحالي
+    
+    العائد:
+        User: المستخدم الحالي
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="هذه العملية متاحة للمديرين فقط")
+    return current_user
+
+def verify_metrics_access(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme)) -> None:
+    """
+    التحقق من صلاحية الوصول إلى المقاييس: عنوان العميل ضمن METRICS_ALLOWED_IPS أو رمز وصول لمدير
+    
+    المعلمات:
+        request (Request): الطلب
+        token (str, optional): رمز الوصول
+    """
+    allowed_ips = {ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()}
+    if request.client is not None and request.client.host in allowed_ips:
+        return
+    
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="يجب تسجيل الدخول كمدير للوصول إلى المقاييس",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    get_current_admin_user(get_current_active_user(get_current_user(token)))
+
 # المسارات
 @app.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
@@ -242,6 +383,248 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
     """
     return current_user
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_metrics_access)])
+async def get_metrics():
+    """
+    عرض مقاييس الأداء بصيغة Prometheus النصية (للمديرين أو لعناوين METRICS_ALLOWED_IPS)
+    
+    العائد:
+        Response: المقاييس
+    """
+    if os.getenv("METRICS_ENABLED", "true").lower() not in ["1", "true", "yes"]:
+        raise HTTPException(status_code=404, detail="المقاييس غير مفعلة")
+    return Response(content=metrics_registry.render(), media_type=CONTENT_TYPE)
+
+@app.get("/admin/traces")
+async def list_traces(
+    limit: int = Query(50, ge=1, le=500),
+    min_duration_ms: float = Query(0, ge=0),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    الحصول على التتبعات البطيئة أو المختارة بالعينة المحتفظ بها في الذاكرة (الأحدث أولاً)
+    
+    المعلمات:
+        limit (int, optional): الحد الأقصى لعدد التتبعات
+        min_duration_ms (float, optional): أقل مدة للتتبع بالمللي ثانية
+        current_user (User): المستخدم الحالي (مدير)
+    
+    العائد:
+        Dict: ملخصات التتبعات وإحصائيات المتتبع
+    """
+    return {
+        "stats": tracer.stats,
+        "slow_threshold_ms": tracer.slow_threshold_ms,
+        "sample_rate": tracer.sample_rate,
+        "traces": tracer.get_traces(limit=limit, min_duration_ms=min_duration_ms)
+    }
+
+@app.get("/admin/traces/{trace_id}")
+async def get_trace_waterfall(
+    trace_id: str,
+    format: str = Query("json", regex="^(json|text)$"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    عرض فترات تتبع كشلال زمني
+    
+    المعلمات:
+        trace_id (str): معرف التتبع
+        format (str, optional): صيغة العرض (json أو text)
+        current_user (User): المستخدم الحالي (مدير)
+    
+    العائد:
+        Dict: التتبع وفتراته مرتبة كشلال، أو نص الشلال
+    """
+    trace = tracer.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"لم يتم العثور على التتبع {trace_id}")
+    if format == "text":
+        return PlainTextResponse(trace.render_waterfall())
+    return trace.to_dict()
+
+@app.post("/admin/profiler")
+async def start_profiler(
+    route: Optional[str] = Query(None, description="قالب المسار مثل /screen أو /stocks/{symbol}"),
+    requests: Optional[int] = Query(None, ge=1, le=10000),
+    seconds: Optional[float] = Query(None, gt=0),
+    interval_ms: Optional[float] = Query(None, ge=1, le=1000),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    بدء التقاط تحليل الأداء بأخذ العينات للطلبات التالية المطابقة لمسار أو لمدة محددة
+    
+    المعلمات:
+        route (str, optional): قالب المسار. إذا لم يتم تحديده، سيتم التقاط جميع الطلبات.
+        requests (int, optional): عدد الطلبات التي ينتهي بعدها الالتقاط
+        seconds (float, optional): مدة الالتقاط بالثواني
+        interval_ms (float, optional): الفاصل بين العينات بالمللي ثانية
+        current_user (User): المستخدم الحالي (مدير)
+    
+    العائد:
+        Dict: ملخص عملية الالتقاط
+    """
+    try:
+        return profiler.start_capture(route=route, requests=requests, seconds=seconds, interval_ms=interval_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.delete("/admin/profiler")
+async def stop_profiler(current_user: User = Depends(get_current_admin_user)):
+    """
+    إيقاف عملية التقاط تحليل الأداء الحالية
+    
+    المعلمات:
+        current_user (User): المستخدم الحالي (مدير)
+    
+    العائد:
+        Dict: ملخص عملية الالتقاط
+    """
+    capture = profiler.stop_capture()
+    if capture is None:
+        raise HTTPException(status_code=404, detail="لا توجد عملية التقاط قيد التشغيل")
+    return capture
+
+@app.get("/admin/profiler")
+async def list_profiles(current_user: User = Depends(get_current_admin_user)):
+    """
+    الحصول على عمليات التقاط تحليل الأداء المحتفظ بها (الأحدث أولاً)
+    
+    المعلمات:
+        current_user (User): المستخدم الحالي (مدير)
+    
+    العائد:
+        Dict: ملخصات عمليات الالتقاط
+    """
+    return {"captures": profiler.list_captures()}
+
+@app.get("/admin/profiler/{capture_id}")
+async def get_profile(
+    capture_id: str,
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    الحصول على ملخص عملية التقاط والدوال الأكثر ظهوراً في العينات
+    
+    المعلمات:
+        capture_id (str): معرف عملية الالتقاط
+        limit (int, optional): الحد الأقصى لعدد الدوال
+        current_user (User): المستخدم الحالي (مدير)
+    
+    العائد:
+        Dict: الملخص والدوال
+    """
+    capture = profiler.get_capture(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail=f"لم يتم العثور على عملية الالتقاط {capture_id}")
+    return {**profiler.summary(capture), "top_functions": profiler.top_functions(capture, limit=limit)}
+
+@app.get("/admin/profiler/{capture_id}/collapsed")
+async def download_profile(capture_id: str, current_user: User = Depends(get_current_admin_user)):
+    """
+    تحميل المكدسات المطوية لعملية التقاط (للاستخدام مع flamegraph.pl أو speedscope)
+    
+    المعلمات:
+        capture_id (str): معرف عملية الالتقاط
+        current_user (User): المستخدم الحالي (مدير)
+    
+    العائد:
+        PlainTextResponse: ملف المكدسات المطوية
+    """
+    capture = profiler.get_capture(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail=f"لم يتم العثور على عملية الالتقاط {capture_id}")
+    return PlainTextResponse(
+        profiler.collapsed(capture),
+        headers={"Content-Disposition": f'attachment; filename="{capture_id}.folded"'}
+    )
+
+# دالة عادية (وليست async) حتى يشغّلها FastAPI في مجمع الخيوط، لأن أول استخدام يحمّل السجل الرئيسي للرموز من الملف أو قاعدة البيانات
+@app.get("/symbols")
+def get_symbols(exchange: Optional[str] = None, sector: Optional[str] = None):
+    """
+    الحصول على قائمة رموز الأسهم من السجل الرئيسي للرموز
+    
+    المعلمات:
+        exchange (str, optional): السوق
+        sector (str, optional): القطاع
+    
+    العائد:
+        Dict: قائمة الرموز
+    """
+    symbols = data_manager.get_symbols_list(exchange=exchange, sector=sector)
+    return {"count": len(symbols), "symbols": symbols}
+
+# دالة عادية للسبب نفسه
+@app.get("/symbols/search")
+def search_symbols(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    """
+    البحث الفوري عن الأسهم بالرمز أو الاسم
+    
+    المعلمات:
+        q (str): استعلام البحث
+        limit (int, optional): الحد الأقصى لعدد النتائج
+    
+    العائد:
+        Dict: الأسهم المطابقة
+    """
+    results = data_manager.search_stocks(q, source="symbol_master", limit=limit)
+    return {"query": q, "results": results}
+
+# دالة عادية (وليست async) حتى يشغّلها FastAPI في مجمع الخيوط، لأن جلب الرموز غير المراقبة يحجب التنفيذ
+@app.get("/quotes")
+def get_quotes(symbols: str = Query(..., description="رموز الأسهم مفصولة بفواصل")):
+    """
+    الحصول على آخر الأسعار اللحظية من مركز الأسعار
+    
+    المعلمات:
+        symbols (str): رموز الأسهم مفصولة بفواصل
+    
+    العائد:
+        Dict: آخر سعر لكل رمز
+    """
+    symbol_list = QuoteHub.normalize(symbols.split(","))
+    quotes = quote_hub.get_snapshot(symbol_list)
+    
+    # الرموز غير المراقبة تُجلب عبر التخزين المؤقت للأسعار
+    for symbol in symbol_list:
+        if symbol not in quotes:
+            quote = data_manager.get_realtime_data(symbol)
+            if quote:
+                quotes[symbol] = quote
+    
+    return {"quotes": quotes}
+
+@app.get("/quotes/stream")
+async def stream_quotes(symbols: str = Query(..., description="رموز الأسهم مفصولة بفواصل")):
+    """
+    بث تحديثات الأسعار اللحظية (Server-Sent Events)
+    
+    يستطلع مركز الأسعار كل رمز مرة واحدة في كل فترة بغض النظر عن عدد العملاء المتصلين.
+    
+    المعلمات:
+        symbols (str): رموز الأسهم مفصولة بفواصل
+    
+    العائد:
+        StreamingResponse: بث الأحداث
+    """
+    symbol_list = QuoteHub.normalize(symbols.split(","))
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="يجب تحديد رمز سهم واحد على الأقل")
+    
+    subscription, queue = quote_hub.subscribe_queue(symbol_list)
+    
+    async def event_stream():
+        try:
+            while True:
+                symbol, quote = await queue.get()
+                yield f"event: quote\ndata: {json.dumps({'symbol': symbol, **quote}, default=str)}\n\n"
+        finally:
+            subscription.unsubscribe()
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/stocks/{symbol}")
 async def get_stock_info(symbol: str):
     """
@@ -413,7 +796,7 @@ async def analyze_stock(symbol: str, report_type: Optional[str] = "detailed"):
             interval="1d"
         )
         
-        # تحليل السهم
+        # تحليل السهم (يعيد مزخرف التخزين المؤقت نسخة مستقلة، فإضافة التقارير إليها لا تعدل النتيجة المخزنة)
         analysis_results = sepa_engine.analyze_stock(historical_data, index_data)
         
         # إضافة رمز السهم إذا لم يكن موجوداً
@@ -0,0 +1,177 @@
+"""
+وحدة تعديل البيانات التاريخية وفقاً لإجراءات الشركات لمشروع SEBA
+توفر هذه الوحدة استخراج أحداث تقسيم الأسهم وتوزيعات الأرباح من البيانات الخام
+وإعادة بناء بيانات OHLCV المعدلة منها بطريقة متجهة
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Union, Tuple
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# أنواع إجراءات الشركات المدعومة
+ACTION_SPLIT = "split"
+ACTION_DIVIDEND = "dividend"
+
+
+class CorporateActionsEngine:
+    """فئة لحساب عوامل التعديل الخلفي وتطبيقها على بيانات الأسعار الخام"""
+    
+    @staticmethod
+    def extract_actions(data: pd.DataFrame) -> pd.DataFrame:
+        """
+        استخراج أحداث التقسيم وتوزيعات الأرباح من إطار بيانات خام
+        
+        يعتمد على عمودي dividend و split_coefficient اللذين تعيدهما Alpha Vantage.
+        
+        المعلمات:
+            data (pd.DataFrame): إطار البيانات الذي يحتوي على أعمدة date و dividend و split_coefficient
+        
+        العائد:
+            pd.DataFrame: إطار بيانات بالأعمدة date و action_type و value
+        """
+        columns = ["date", "action_type", "value"]
+        if data.empty or "date" not in data.columns:
+            return pd.DataFrame(columns=columns)
+        
+        frames = []
+        
+        if "split_coefficient" in data.columns:
+            splits = data.loc[data["split_coefficient"].fillna(1.0) != 1.0, ["date", "split_coefficient"]]
+            frames.append(pd.DataFrame({
+                "date": splits["date"].values,
+                "action_type": ACTION_SPLIT,
+                "value": splits["split_coefficient"].astype(float).values
+            }))
+        
+        if "dividend" in data.columns:
+            dividends = data.loc[data["dividend"].fillna(0.0) > 0, ["date", "dividend"]]
+            frames.append(pd.DataFrame({
+                "date": dividends["date"].values,
+                "action_type": ACTION_DIVIDEND,
+                "value": dividends["dividend"].astype(float).values
+            }))
+        
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        
+        actions = pd.concat(frames, ignore_index=True)
+        return actions.sort_values("date").reset_index(drop=True)
+    
+    @staticmethod
+    def calculate_adjustment_factors(
+        data: pd.DataFrame,
+        actions: pd.DataFrame,
+        include_dividends: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        حساب عوامل التعديل التراكمية للأسعار والحجم لكل شريط
+        
+        يُطبق كل حدث على جميع الأشرطة التي تسبق تاريخ الاستحقاق:
+        التقسيم بنسبة r يقسم الأسعار على r ويضرب الحجم في r،
+        وتوزيع الأرباح d يضرب الأسعار في (1 - d / سعر الإغلاق السابق).
+        
+        المعلمات:
+            data (pd.DataFrame): البيانات الخام مرتبة حسب التاريخ تصاعدياً
+            actions (pd.DataFrame): أحداث الشركة بالأعمدة date و action_type و value
+            include_dividends (bool, optional): تضمين توزيعات الأرباح في التعديل
+        
+        العائد:
+            Tuple[np.ndarray, np.ndarray]: عامل تعديل الأسعار وعامل تعديل الحجم لكل شريط
+        """
+        n = len(data)
+        price_events = np.ones(n)
+        volume_events = np.ones(n)
+        
+        if n == 0 or actions is None or actions.empty:
+            return price_events, volume_events
+        
+        dates = pd.to_datetime(data["date"]).values
+        action_dates = pd.to_datetime(actions["date"]).values
+        action_types = actions["action_type"].values
+        values = actions["value"].astype(float).values
+        
+        # موضع آخر شريط قبل تاريخ استحقاق كل حدث
+        positions = np.searchsorted(dates, action_dates, side="left") - 1
+        valid = positions >= 0
+        
+        # أحداث التقسيم
+        is_split = valid & (action_types == ACTION_SPLIT) & (values > 0)
+        np.multiply.at(price_events, positions[is_split], 1.0 / values[is_split])
+        np.multiply.at(volume_events, positions[is_split], values[is_split])
+        
+        # أحداث توزيعات الأرباح
+        if include_dividends:
+            is_dividend = valid & (action_types == ACTION_DIVIDEND)
+            closes = data["close"].astype(float).values
+            previous_close = closes[positions[is_dividend]]
+            ratios = 1.0 - values[is_dividend] / previous_close
+            ratios = np.where((previous_close > 0) & (ratios > 0), ratios, 1.0)
+            np.multiply.at(price_events, positions[is_dividend], ratios)
+        
+        # العامل التراكمي لكل شريط هو حاصل ضرب عوامل جميع الأحداث اللاحقة له
+        price_factors = np.cumprod(price_events[::-1])[::-1]
+        volume_factors = np.cumprod(volume_events[::-1])[::-1]
+        
+        return price_factors, volume_factors
+    
+    @staticmethod
+    def adjust_ohlcv(
+        data: pd.DataFrame,
+        actions: pd.DataFrame,
+        include_dividends: bool = True
+    ) -> pd.DataFrame:
+        """
+        إعادة بناء بيانات OHLCV المعدلة من الأشرطة الخام وأحداث الشركة
+        
+        المعلمات:
+            data (pd.DataFrame): البيانات الخام (date, open, high, low, close, volume)
+            actions (pd.DataFrame): أحداث الشركة بالأعمدة date و action_type و value
+            include_dividends (bool, optional): تضمين توزيعات الأرباح في التعديل
+        
+        العائد:
+            pd.DataFrame: إطار البيانات بأسعار وحجم معدلين مع عمودي adj_close و adjustment_factor
+        """
+        try:
+            df = data.sort_values("date").reset_index(drop=True)
+            price_factors, volume_factors = CorporateActionsEngine.calculate_adjustment_factors(
+                df, actions, include_dividends
+            )
+            
+            for column in ["open", "high", "low", "close"]:
+                if column in df.columns:
+                    df[column] = df[column].astype(float).values * price_factors
+            
+            if "volume" in df.columns:
+                df["volume"] = df["volume"].astype(float).values * volume_factors
+            
+            df["adj_close"] = df["close"]
+            df["adjustment_factor"] = price_factors
+            
+            return df
+        except Exception as e:
+            logger.error(f"خطأ في تعديل البيانات وفقاً لإجراءات الشركة: {str(e)}")
+            return data
+    
+    @staticmethod
+    def calculate_adjusted_close(
+        data: pd.DataFrame,
+        actions: pd.DataFrame,
+        include_dividends: bool = True
+    ) -> pd.Series:
+        """
+        حساب سعر الإغلاق المعدل فقط دون نسخ باقي الأعمدة
+        
+        المعلمات:
+            data (pd.DataFrame): البيانات الخام مرتبة حسب التاريخ تصاعدياً
+            actions (pd.DataFrame): أحداث الشركة
+            include_dividends (bool, optional): تضمين توزيعات الأرباح في التعديل
+        
+        العائد:
+            pd.Series: سعر الإغلاق المعدل بنفس فهرس البيانات
+        """
+        price_factors, _ = CorporateActionsEngine.calculate_adjustment_factors(data, actions, include_dividends)
+        return pd.Series(data["close"].astype(float).values * price_factors, index=data.index)
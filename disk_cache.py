@@ -0,0 +1,346 @@
+"""
+وحدة التخزين المؤقت على القرص لمشروع SEBA
+توفر هذه الوحدة تخزيناً مؤقتاً دائماً في ملف SQLite (وضع WAL مع mmap) للنشر على خادم واحد بدون Redis،
+مع حد للحجم وعدد المدخلات ومدة صلاحية وإخلاء الأقدم استخداماً، ويمكن مشاركته بأمان بين عدة عمليات uvicorn
+"""
+
+import os
+import math
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+
+import pandas as pd
+
+from seba.utils.serialization import DataFrameCodec
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# أنواع القيم المخزنة
+KIND_PICKLE = 0
+KIND_DATAFRAME = 1
+
+# عدد سجلات الإبطال المحتفظ بها لتطبيقها على الطبقة الأولى في العمليات الأخرى
+INVALIDATION_LOG_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    kind INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at);
+CREATE TABLE IF NOT EXISTS cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL,
+    entries INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_totals (id, bytes, entries) VALUES (1, 0, 0);
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS cache_entries_insert AFTER INSERT ON cache_entries BEGIN
+    UPDATE cache_totals SET bytes = bytes + NEW.size, entries = entries + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_delete AFTER DELETE ON cache_entries BEGIN
+    UPDATE cache_totals SET bytes = bytes - OLD.size, entries = entries - 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_update AFTER UPDATE OF size ON cache_entries BEGIN
+    UPDATE cache_totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 1;
+END;
+"""
+
+
+class DiskCache:
+    """فئة للتخزين المؤقت الدائم في ملف SQLite مع حد للحجم ومدة صلاحية وإخلاء LRU"""
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        codec: Optional[DataFrameCodec] = None,
+        touch_interval: Optional[float] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            path (str, optional): مسار ملف قاعدة البيانات. إذا لم يتم تحديده، سيتم استخدام CACHE_DISK_PATH من متغيرات البيئة.
+            max_bytes (int, optional): الحد الأقصى لحجم القيم بالبايت. إذا لم يتم تحديده، سيتم استخدام CACHE_DISK_MAX_MB من متغيرات البيئة.
+            max_entries (int, optional): الحد الأقصى لعدد المدخلات
+            codec (DataFrameCodec, optional): ترميز إطارات البيانات
+            touch_interval (float, optional): أقل مدة بالثواني بين تحديثين لوقت آخر استخدام للمدخل (لتقليل الكتابة عند القراءة)
+        """
+        self.path = path or os.getenv("CACHE_DISK_PATH", "data/cache.db")
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("CACHE_DISK_MAX_MB", "1024")) * 1024 * 1024)
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("CACHE_DISK_MAX_ENTRIES", "100000"))
+        self.codec = codec or DataFrameCodec()
+        self.touch_interval = touch_interval if touch_interval is not None else float(os.getenv("CACHE_DISK_TOUCH_INTERVAL", "30"))
+        self.mmap_size = int(float(os.getenv("CACHE_DISK_MMAP_MB", "256")) * 1024 * 1024)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "rejected": 0}
+        self._local = threading.local()
+        self._version_lock = threading.Lock()
+        self._version_connection = None
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        logger.info(f"تهيئة التخزين المؤقت على القرص: {self.path} (الحد الأقصى: {self.max_bytes} بايت، {self.max_entries} مدخل)")
+    
+    def _connection(self) -> sqlite3.Connection:
+        """الحصول على اتصال قاعدة البيانات الخاص بالخيط الحالي"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # isolation_level=None لإدارة المعاملات يدوياً (BEGIN IMMEDIATE للكتابة)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={self.mmap_size}")
+            self._local.connection = connection
+        return connection
+    
+    def data_version(self) -> int:
+        """
+        رقم يتغير عند تعديل قاعدة البيانات من أي اتصال آخر (في هذه العملية أو في عملية أخرى)
+        
+        العائد:
+            int: رقم الإصدار
+        """
+        with self._version_lock:
+            if self._version_connection is None:
+                self._version_connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            return self._version_connection.execute("PRAGMA data_version").fetchone()[0]
+    
+    def changes_since(self, sequence: int) -> Tuple[int, Optional[List[str]]]:
+        """
+        الحصول على المفاتيح التي تم تحديثها أو حذفها بعد رقم تسلسلي معين
+        
+        المعلمات:
+            sequence (int): آخر رقم تسلسلي تمت معالجته
+        
+        العائد:
+            Tuple[int, List[str]]: آخر رقم تسلسلي والمفاتيح (["*"] عند المسح)، أو None بدل المفاتيح إذا حُذفت سجلات لم تتم معالجتها
+        """
+        connection = self._connection()
+        rows = connection.execute("SELECT seq, key FROM cache_invalidations WHERE seq > ? ORDER BY seq", (sequence,)).fetchall()
+        if not rows:
+            return sequence, []
+        if rows[0][0] != sequence + 1 and sequence > 0:
+            oldest = connection.execute("SELECT MIN(seq) FROM cache_invalidations").fetchone()[0]
+            if oldest is None or oldest > sequence + 1:
+                return rows[-1][0], None
+        return rows[-1][0], [key for _, key in rows]
+    
+    def _log_invalidation(self, connection: sqlite3.Connection, key: str) -> None:
+        """تسجيل إبطال مفتاح مع حذف السجلات القديمة دورياً"""
+        sequence = connection.execute("INSERT INTO cache_invalidations (key) VALUES (?)", (key,)).lastrowid
+        if sequence % 1000 == 0:
+            connection.execute("DELETE FROM cache_invalidations WHERE seq <= ?", (sequence - INVALIDATION_LOG_SIZE,))
+    
+    def _encode(self, value: Any) -> Tuple[bytes, int]:
+        """ترميز قيمة (إطارات البيانات بالترميز الثنائي، وغيرها بـ pickle)"""
+        if isinstance(value, pd.DataFrame):
+            return self.codec.encode(value), KIND_DATAFRAME
+        return pickle.dumps(value, protocol=5), KIND_PICKLE
+    
+    def _decode(self, payload: bytes, kind: int) -> Any:
+        """فك ترميز قيمة"""
+        if kind == KIND_DATAFRAME:
+            return self.codec.decode(payload)
+        return pickle.loads(payload)
+    
+    def get_entry(self, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """
+        الحصول على قيمة ووقت انتهاء صلاحيتها
+        
+        المعلمات:
+            key (str): المفتاح
+        
+        العائد:
+            Tuple[Any, float]: القيمة ووقت انتهاء الصلاحية (None بدون صلاحية)، أو (None, None) إذا لم يتم العثور على المفتاح
+        """
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, kind, expires_at, accessed_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None, None
+        
+        payload, kind, expires_at, accessed_at = row
+        current_time = time.time()
+        if expires_at is not None and current_time >= expires_at:
+            connection.execute("DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?", (key, current_time))
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None, None
+        
+        # تحديث وقت آخر استخدام بشكل تقريبي لتجنب الكتابة عند كل قراءة
+        if current_time - accessed_at >= self.touch_interval:
+            connection.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (current_time, key))
+        
+        self.stats["hits"] += 1
+        return self._decode(payload, kind), expires_at
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        الحصول على قيمة
+        
+        المعلمات:
+            key (str): المفتاح
+        
+        العائد:
+            Any: القيمة، أو None إذا لم يتم العثور على المفتاح أو انتهت صلاحيته
+        """
+        return self.get_entry(key)[0]
+    
+    def set(self, key: str, value: Any, expiry: Optional[int] = None) -> bool:
+        """
+        تخزين قيمة مع إخلاء المدخلات المنتهية ثم الأقدم استخداماً عند تجاوز الحدود
+        
+        المعلمات:
+            key (str): المفتاح
+            value (Any): القيمة
+            expiry (int, optional): مدة الصلاحية بالثواني
+        
+        العائد:
+            bool: True في حالة النجاح، False إذا كانت القيمة أكبر من الحد المسموح
+        """
+        payload, kind = self._encode(value)
+        if len(payload) > self.max_bytes:
+            self.stats["rejected"] += 1
+            logger.warning(f"القيمة أكبر من الحد المسموح للتخزين المؤقت على القرص: {key} ({len(payload)} بايت)")
+            return False
+        
+        current_time = time.time()
+        expires_at = current_time + expiry if expiry else None
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO cache_entries (key, value, kind, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, kind = excluded.kind, size = excluded.size, "
+                "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (key, sqlite3.Binary(payload), kind, len(payload), expires_at, current_time)
+            )
+            self._log_invalidation(connection, key)
+            self._evict(connection, current_time)
+            connection.execute("COMMIT")
+            return True
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    
+    def _evict(self, connection: sqlite3.Connection, current_time: float) -> None:
+        """إخلاء المدخلات المنتهية ثم الأقدم استخداماً حتى العودة ضمن الحدود (داخل معاملة الكتابة)"""
+        total_bytes, entries = connection.execute("SELECT bytes, entries FROM cache_totals WHERE id = 1").fetchone()
+        if total_bytes <= self.max_bytes and entries <= self.max_entries:
+            return
+        
+        expired = connection.execute(
+            "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (current_time,)
+        ).rowcount
+        self.stats["expirations"] += expired
+        
+        while True:
+            total_bytes, entries = connection.execute("SELECT bytes, entries FROM cache_totals WHERE id = 1").fetchone()
+            if total_bytes <= self.max_bytes and entries <= self.max_entries:
+                return
+            
+            # تقدير عدد المدخلات الواجب إخلاؤها من متوسط حجم المدخل، وتصحح الحلقة أي فرق
+            batch = max(1, entries - self.max_entries)
+            if total_bytes > self.max_bytes:
+                batch = max(batch, math.ceil((total_bytes - self.max_bytes) / (total_bytes / entries)))
+            evicted = connection.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries ORDER BY accessed_at LIMIT ?)",
+                (batch,)
+            ).rowcount
+            if not evicted:
+                return
+            self.stats["evictions"] += evicted
+    
+    def delete(self, key: str) -> None:
+        """
+        حذف قيمة
+        
+        المعلمات:
+            key (str): المفتاح
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._log_invalidation(connection, key)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    
+    def clear(self) -> None:
+        """مسح جميع القيم"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM cache_entries")
+            self._log_invalidation(connection, "*")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    
+    def purge_expired(self) -> int:
+        """
+        حذف جميع المدخلات المنتهية صلاحيتها
+        
+        العائد:
+            int: عدد المدخلات المحذوفة
+        """
+        removed = self._connection().execute(
+            "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+        self.stats["expirations"] += removed
+        return removed
+    
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT entries FROM cache_totals WHERE id = 1").fetchone()[0]
+    
+    def get_stats(self) -> Dict:
+        """
+        الحصول على إحصائيات التخزين المؤقت على القرص
+        
+        العائد:
+            Dict: الإحصائيات (في هذه العملية) والحجم الحالي وعدد المدخلات (لجميع العمليات)
+        """
+        total_bytes, entries = self._connection().execute("SELECT bytes, entries FROM cache_totals WHERE id = 1").fetchone()
+        return {
+            **self.stats,
+            "path": self.path,
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries
+        }
+    
+    def close(self) -> None:
+        """إغلاق اتصال الخيط الحالي واتصال مراقبة الإصدار"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+        with self._version_lock:
+            if self._version_connection is not None:
+                self._version_connection.close()
+                self._version_connection = None
@@ -9,7 +9,7 @@ import logging
 from datetime import datetime, timedelta
 import pandas as pd
 import requests
-from typing import Dict, List, Optional, Union, Tuple
+from typing import Dict, List, Optional, Union, Tuple, Any
 from dotenv import load_dotenv
 
 # تحميل متغيرات البيئة
@@ -21,13 +21,20 @@ logger = logging.getLogger(__name__)
 class IEXCloudAPI:
     """فئة للتعامل مع واجهة برمجة تطبيقات IEX Cloud"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    # الحد الأقصى لعدد الرموز وأنواع البيانات المدعومة في الطلب المجمع
+    BATCH_MAX_SYMBOLS = 100
+    BATCH_TYPES = ("quote", "stats", "company", "news", "earnings")
+    
+    def __init__(self, api_key: Optional[str] = None, raise_errors: bool = False):
         """
         تهيئة الفئة
         
         المعلمات:
             api_key (str, optional): مفتاح API لـ IEX Cloud. إذا لم يتم تحديده، سيتم استخدام المفتاح من متغيرات البيئة.
+            raise_errors (bool, optional): رفع أخطاء الاتصال والخادم بدلاً من إعادة نتيجة فارغة،
+                حتى يميزها مدير البيانات عن النتيجة الفارغة الصحيحة
         """
+        self.raise_errors = raise_errors
         self.api_key = api_key or os.getenv("IEX_CLOUD_API_KEY")
         if not self.api_key:
             logger.warning("لم يتم تحديد مفتاح API لـ IEX Cloud. بعض الوظائف قد لا تعمل.")
@@ -108,7 +115,11 @@ class IEXCloudAPI:
             
             # تحويل التاريخ إلى تنسيق موحد
             if "date" in df.columns:
-                df["date"] = pd.to_datetime(df["date"]).dt.date
+                if "minute" in df.columns:
+                    # الأشرطة داخل اليوم: دمج التاريخ والدقيقة في طابع زمني بتوقيت السوق
+                    df["date"] = pd.to_datetime(df["date"] + " " + df["minute"]).dt.tz_localize("America/New_York")
+                else:
+                    df["date"] = pd.to_datetime(df["date"]).dt.date
             
             # إضافة عمود رمز السهم إذا لم يكن موجوداً
             if "symbol" not in df.columns:
@@ -119,6 +130,8 @@ class IEXCloudAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب البيانات التاريخية للسهم {symbol} من IEX Cloud: {str(e)}")
+            if self.raise_errors:
+                raise
             return pd.DataFrame()
     
     def get_quote(self, symbol: str) -> Dict:
@@ -161,6 +174,8 @@ class IEXCloudAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب اقتباس السهم {symbol} من IEX Cloud: {str(e)}")
+            if self.raise_errors:
+                raise
             return {}
     
     def get_company_info(self, symbol: str) -> Dict:
@@ -200,6 +215,8 @@ class IEXCloudAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب معلومات الشركة للسهم {symbol} من IEX Cloud: {str(e)}")
+            if self.raise_errors:
+                raise
             return {}
     
     def get_financials(self, symbol: str, period: str = "quarter", last: int = 4) -> List[Dict]:
@@ -243,6 +260,8 @@ class IEXCloudAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب البيانات المالية للسهم {symbol} من IEX Cloud: {str(e)}")
+            if self.raise_errors:
+                raise
             return []
     
     def get_earnings(self, symbol: str, last: int = 4) -> List[Dict]:
@@ -284,6 +303,8 @@ class IEXCloudAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب بيانات الأرباح للسهم {symbol} من IEX Cloud: {str(e)}")
+            if self.raise_errors:
+                raise
             return []
     
     def get_stats(self, symbol: str) -> Dict:
@@ -323,6 +344,8 @@ class IEXCloudAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب إحصائيات السهم {symbol} من IEX Cloud: {str(e)}")
+            if self.raise_errors:
+                raise
             return {}
     
     def get_news(self, symbol: str, last: int = 10) -> List[Dict]:
@@ -363,6 +386,8 @@ class IEXCloudAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب أخبار السهم {symbol} من IEX Cloud: {str(e)}")
+            if self.raise_errors:
+                raise
             return []
     
     def get_peers(self, symbol: str) -> List[str]:
@@ -402,8 +427,128 @@ class IEXCloudAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب الأسهم المماثلة للسهم {symbol} من IEX Cloud: {str(e)}")
+            if self.raise_errors:
+                raise
             return []
     
+    def get_batch(
+        self,
+        symbols: List[str],
+        types: List[str],
+        news_last: int = 10,
+        earnings_last: int = 4
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        الحصول على عدة أنواع بيانات لعدة أسهم باستخدام نقطة الطلبات المجمعة
+        
+        يُرسل طلب واحد لكل 100 رمز، ويُقسم الرد إلى نفس أشكال النتائج التي تعيدها
+        get_quote و get_stats و get_company_info و get_news و get_earnings.
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم
+            types (List[str]): أنواع البيانات (quote, stats, company, news, earnings)
+            news_last (int, optional): عدد الأخبار المطلوبة لكل سهم
+            earnings_last (int, optional): عدد فترات الأرباح المطلوبة لكل سهم
+        
+        العائد:
+            Dict[str, Dict[str, Any]]: قاموس لكل سهم يحتوي على نتيجة كل نوع بيانات
+        """
+        unsupported = [data_type for data_type in types if data_type not in self.BATCH_TYPES]
+        if unsupported:
+            logger.error(f"أنواع بيانات غير مدعومة في الطلبات المجمعة لـ IEX Cloud: {unsupported}")
+            return {}
+        
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        result = {}
+        error = None
+        
+        for i in range(0, len(symbols), self.BATCH_MAX_SYMBOLS):
+            chunk = symbols[i:i + self.BATCH_MAX_SYMBOLS]
+            try:
+                logger.info(f"جلب {','.join(types)} لـ {len(chunk)} سهم من IEX Cloud بطلب مجمع")
+                
+                # إعداد المسار
+                endpoint = "/stock/market/batch"
+                
+                # إضافة معلمات الاستعلام
+                params = {
+                    "token": self.api_key,
+                    "symbols": ",".join(chunk),
+                    "types": ",".join(types),
+                    # المعلمة last مشتركة بين الأخبار والأرباح في الطلب المجمع
+                    "last": max(news_last, earnings_last)
+                }
+                
+                # إرسال الطلب
+                url = f"{self.base_url}{endpoint}"
+                response = requests.get(url, params=params)
+                response.raise_for_status()  # رفع استثناء في حالة فشل الطلب
+                data = response.json() or {}
+                
+                timestamp = datetime.now().isoformat()
+                for symbol in chunk:
+                    payload = data.get(symbol) or {}
+                    result[symbol] = {
+                        data_type: self._split_batch_payload(payload, data_type, timestamp, news_last, earnings_last)
+                        for data_type in types
+                    }
+            
+            except Exception as e:
+                logger.error(f"خطأ في جلب البيانات المجمعة لـ {len(chunk)} سهم من IEX Cloud: {str(e)}")
+                error = e
+        
+        # فشل جميع الطلبات المجمعة عطل في المصدر وليس نتيجة فارغة
+        if self.raise_errors and error is not None and not result:
+            raise error
+        
+        logger.info(f"تم جلب البيانات المجمعة لـ {len(result)} سهم من أصل {len(symbols)} من IEX Cloud")
+        return result
+    
+    @staticmethod
+    def _split_batch_payload(payload: Dict, data_type: str, timestamp: str, news_last: int, earnings_last: int) -> Any:
+        """تحويل جزء من رد الطلب المجمع إلى شكل نتيجة الدالة المفردة المقابلة"""
+        value = payload.get(data_type)
+        
+        if data_type == "quote":
+            return {**value, "timestamp": timestamp} if value else {}
+        if data_type == "news":
+            return (value or [])[:news_last]
+        if data_type == "earnings":
+            if not value or "earnings" not in value:
+                return []
+            return value["earnings"][:earnings_last]
+        return value or {}
+    
+    def get_quotes_batch(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        الحصول على اقتباسات عدة أسهم بطلب مجمع لكل 100 رمز
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم
+        
+        العائد:
+            Dict[str, Dict]: قاموس يحتوي على اقتباس كل سهم
+        """
+        batch = self.get_batch(symbols, ["quote"])
+        return {symbol: data["quote"] for symbol, data in batch.items() if data["quote"]}
+    
+    def get_fundamentals_batch(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        الحصول على معلومات الشركة والإحصائيات لعدة أسهم بطلب مجمع لكل 100 رمز
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم
+        
+        العائد:
+            Dict[str, Dict]: قاموس يحتوي على معلومات الشركة والإحصائيات مدمجة لكل سهم
+        """
+        batch = self.get_batch(symbols, ["company", "stats"])
+        return {
+            symbol: {**data["company"], **data["stats"]}
+            for symbol, data in batch.items()
+            if data["company"] or data["stats"]
+        }
+    
     def get_market_gainers_losers(self, list_type: str = "gainers", limit: int = 10) -> List[Dict]:
         """
         الحصول على قائمة الأسهم الرابحة أو الخاسرة
@@ -443,6 +588,8 @@ class IEXCloudAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب قائمة {list_type} من IEX Cloud: {str(e)}")
+            if self.raise_errors:
+                raise
             return []
     
     def get_market_sectors(self) -> List[Dict]:
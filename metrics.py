@@ -0,0 +1,456 @@
+"""
+وحدة المقاييس لمشروع SEBA
+توفر هذه الوحدة سجلاً مشتركاً على مستوى العملية للعدادات والمقاييس اللحظية ومدرجات زمن الاستجابة
+(مع تقدير p50/p95/p99) بتسميات، وعرضها بصيغة Prometheus النصية
+"""
+
+import math
+import bisect
+import logging
+import threading
+from typing import Dict, List, Optional, Any, Callable, Sequence, Tuple
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# حدود مدرج زمن الاستجابة بالثواني
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# حدود مدرج أحجام الذاكرة بالبايت (من 1 كيلوبايت إلى 1 غيغابايت)
+DEFAULT_SIZE_BUCKETS = tuple(1024 * 4 ** power for power in range(11))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# نوع محتوى صيغة Prometheus النصية
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def symbol_class(symbol: Optional[str]) -> str:
+    """
+    تصنيف رمز السهم لاستخدامه كتسمية محدودة القيم بدلاً من الرمز نفسه
+    
+    المعلمات:
+        symbol (str): رمز السهم
+    
+    العائد:
+        str: التصنيف (index, fx, future, crypto, equity, none)
+    """
+    if not symbol or not isinstance(symbol, str):
+        return "none"
+    
+    symbol = symbol.upper()
+    if symbol.startswith("^"):
+        return "index"
+    if symbol.endswith("=X"):
+        return "fx"
+    if symbol.endswith("=F"):
+        return "future"
+    if symbol.endswith("-USD"):
+        return "crypto"
+    return "equity"
+
+
+def _format_value(value: float) -> str:
+    """تنسيق قيمة رقمية بصيغة Prometheus"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """تهريب قيمة تسمية بصيغة Prometheus"""
+    return _escape_help(value).replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    """تهريب وصف المقياس بصيغة Prometheus"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+class _Metric:
+    """الفئة الأساسية للمقاييس ذات التسميات"""
+    
+    type_name = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            name (str): اسم المقياس
+            documentation (str): وصف المقياس
+            labelnames (Sequence[str], optional): أسماء التسميات
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        """تحويل التسميات إلى مفتاح بترتيب أسماء التسميات"""
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(f"تسميات غير متطابقة للمقياس {self.name}: {sorted(labels)} بدلاً من {list(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def _labels(self, key: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        """تنسيق التسميات بصيغة Prometheus"""
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+    
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        """نسخة من القيم الحالية"""
+        with self._lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+    
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        """نسخة من قيمة مقياس (مع القوائم المتداخلة في المدرجات)"""
+        if isinstance(value, list):
+            return [list(item) if isinstance(item, list) else item for item in value]
+        return value
+    
+    def render(self) -> List[str]:
+        """
+        عرض المقياس بصيغة Prometheus
+        
+        العائد:
+            List[str]: أسطر المقياس
+        """
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        for key, value in sorted(self._items()):
+            lines.append(f"{self.name}{self._labels(key)} {_format_value(value)}")
+        return lines
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        الحصول على القيم الحالية
+        
+        العائد:
+            Dict[str, Any]: القيمة لكل مجموعة تسميات (مفصولة بـ ",")
+        """
+        return {",".join(key): value for key, value in self._items()}
+    
+    def clear(self) -> None:
+        """مسح جميع القيم"""
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """عداد تزايدي"""
+    
+    type_name = "counter"
+    
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """
+        زيادة العداد
+        
+        المعلمات:
+            amount (float, optional): مقدار الزيادة
+            **labels: قيم التسميات
+        """
+        if amount < 0:
+            raise ValueError("لا يمكن إنقاص العداد")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def get(self, **labels) -> float:
+        """
+        الحصول على قيمة العداد
+        
+        المعلمات:
+            **labels: قيم التسميات
+        
+        العائد:
+            float: القيمة
+        """
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+
+class Gauge(Counter):
+    """مقياس لحظي يمكن زيادته وإنقاصه وتعيينه"""
+    
+    type_name = "gauge"
+    
+    def set(self, value: float, **labels) -> None:
+        """
+        تعيين القيمة
+        
+        المعلمات:
+            value (float): القيمة
+            **labels: قيم التسميات
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+    
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """
+        زيادة القيمة
+        
+        المعلمات:
+            amount (float, optional): مقدار الزيادة
+            **labels: قيم التسميات
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        """
+        إنقاص القيمة
+        
+        المعلمات:
+            amount (float, optional): مقدار الإنقاص
+            **labels: قيم التسميات
+        """
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """مدرج تكراري لزمن الاستجابة أو الأحجام مع تقدير النسب المئوية من الحدود"""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Optional[Sequence[float]] = None):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            name (str): اسم المقياس
+            documentation (str): وصف المقياس
+            labelnames (Sequence[str], optional): أسماء التسميات
+            buckets (Sequence[float], optional): الحدود العليا للفئات (بدون +Inf)
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or DEFAULT_LATENCY_BUCKETS))
+    
+    def observe(self, value: float, **labels) -> None:
+        """
+        تسجيل قيمة
+        
+        المعلمات:
+            value (float): القيمة
+            **labels: قيم التسميات
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # عدد القيم في كل فئة (غير تراكمي)، ثم المجموع والعدد والقيمة القصوى
+            state = self._values.get(key)
+            if state is None:
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0, value]
+                self._values[key] = state
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+            state[3] = max(state[3], value)
+    
+    def _quantile(self, state: List, quantile: float) -> Optional[float]:
+        """تقدير نسبة مئوية بالاستيفاء الخطي داخل الفئة (مثل histogram_quantile في Prometheus)"""
+        counts, _, total, maximum = state
+        if not total:
+            return None
+        
+        rank = quantile * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else maximum
+                estimate = lower + (upper - lower) * (rank - cumulative) / count
+                return min(estimate, maximum)
+            cumulative += count
+        return maximum
+    
+    def quantile(self, quantile: float, **labels) -> Optional[float]:
+        """
+        تقدير نسبة مئوية
+        
+        المعلمات:
+            quantile (float): النسبة (بين 0 و 1)
+            **labels: قيم التسميات
+        
+        العائد:
+            float: القيمة التقديرية، أو None إذا لم يتم تسجيل أي قيمة
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._copy(self._values.get(key))
+        return self._quantile(state, quantile) if state else None
+    
+    def render(self) -> List[str]:
+        """
+        عرض المدرج بصيغة Prometheus
+        
+        العائد:
+            List[str]: أسطر المقياس
+        """
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for key, (counts, total_sum, total, _) in sorted(self._items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {total}")
+        return lines
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        الحصول على ملخص المدرج
+        
+        العائد:
+            Dict[str, Dict]: العدد والمجموع والمتوسط والقيمة القصوى وp50/p95/p99 لكل مجموعة تسميات
+        """
+        result = {}
+        for key, state in self._items():
+            _, total_sum, total, maximum = state
+            summary = {"count": total, "sum": total_sum, "avg": total_sum / total if total else 0.0, "max": maximum}
+            for quantile in QUANTILES:
+                summary[f"p{int(quantile * 100)}"] = self._quantile(state, quantile)
+            result[",".join(key)] = summary
+        return result
+
+
+class MetricsRegistry:
+    """سجل المقاييس المشترك على مستوى العملية"""
+    
+    def __init__(self):
+        """تهيئة الفئة"""
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+    
+    def _get_or_create(self, metric_class: type, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Any:
+        """الحصول على مقياس مسجل أو إنشاؤه"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not metric_class or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"المقياس {name} مسجل مسبقاً بنوع أو تسميات مختلفة")
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """
+        الحصول على عداد (أو إنشاؤه عند أول استخدام)
+        
+        المعلمات:
+            name (str): اسم المقياس (ينتهي بـ _total حسب اصطلاح Prometheus)
+            documentation (str): وصف المقياس
+            labelnames (Sequence[str], optional): أسماء التسميات
+        
+        العائد:
+            Counter: العداد
+        """
+        return self._get_or_create(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """
+        الحصول على مقياس لحظي (أو إنشاؤه عند أول استخدام)
+        
+        المعلمات:
+            name (str): اسم المقياس
+            documentation (str): وصف المقياس
+            labelnames (Sequence[str], optional): أسماء التسميات
+        
+        العائد:
+            Gauge: المقياس اللحظي
+        """
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Optional[Sequence[float]] = None) -> Histogram:
+        """
+        الحصول على مدرج (أو إنشاؤه عند أول استخدام)
+        
+        المعلمات:
+            name (str): اسم المقياس
+            documentation (str): وصف المقياس
+            labelnames (Sequence[str], optional): أسماء التسميات
+            buckets (Sequence[float], optional): حدود الفئات. إذا لم يتم تحديدها، سيتم استخدام حدود زمن الاستجابة الافتراضية.
+        
+        العائد:
+            Histogram: المدرج
+        """
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        """
+        تسجيل دالة تُستدعى قبل كل عرض لتحديث المقاييس المحسوبة عند الطلب (مثل حجم التخزين المؤقت)
+        
+        المعلمات:
+            collector (Callable): الدالة
+        """
+        with self._lock:
+            self._collectors.append(collector)
+    
+    def _collect(self) -> List[_Metric]:
+        """استدعاء دوال التحديث والحصول على المقاييس المسجلة"""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"خطأ في تحديث المقاييس: {str(e)}")
+        with self._lock:
+            return list(self._metrics.values())
+    
+    def render(self) -> str:
+        """
+        عرض جميع المقاييس بصيغة Prometheus النصية
+        
+        العائد:
+            str: النص
+        """
+        lines = []
+        for metric in sorted(self._collect(), key=lambda metric: metric.name):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        الحصول على جميع المقاييس كقاموس
+        
+        العائد:
+            Dict[str, Dict]: القيم لكل مقياس
+        """
+        return {metric.name: metric.snapshot() for metric in self._collect()}
+    
+    def clear(self) -> None:
+        """مسح قيم جميع المقاييس مع الإبقاء على تعريفاتها"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+# السجل المشترك على مستوى العملية
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    الحصول على سجل المقاييس المشترك على مستوى العملية
+    
+    العائد:
+        MetricsRegistry: سجل المقاييس
+    """
+    return _registry
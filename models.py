@@ -42,6 +42,7 @@ class Stock(Base):
     technical_indicators = relationship("TechnicalIndicator", back_populates="stock")
     earnings = relationship("Earnings", back_populates="stock")
     sepa_analyses = relationship("SEPAAnalysis", back_populates="stock")
+    corporate_actions = relationship("CorporateAction", back_populates="stock")
     lists = relationship("StockList", secondary=stock_list_association, back_populates="stocks")
     
     def __repr__(self):
@@ -74,6 +75,24 @@ class HistoricalData(Base):
     def __repr__(self):
         return f"<HistoricalData(stock='{self.stock.symbol}', date='{self.date}', close='{self.close}')>"
 
+class CorporateAction(Base):
+    """نموذج إجراءات الشركة (تقسيم الأسهم وتوزيعات الأرباح)"""
+    __tablename__ = 'corporate_actions'
+    
+    id = Column(Integer, primary_key=True)
+    stock_id = Column(Integer, ForeignKey('stocks.id'), nullable=False, index=True)
+    date = Column(Date, nullable=False)  # تاريخ الاستحقاق
+    action_type = Column(String(20), nullable=False)  # نوع الإجراء (split, dividend)
+    value = Column(Float, nullable=False)  # معامل التقسيم أو قيمة التوزيع للسهم
+    source = Column(String(50))  # مصدر البيانات
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    # العلاقات
+    stock = relationship("Stock", back_populates="corporate_actions")
+    
+    def __repr__(self):
+        return f"<CorporateAction(stock='{self.stock.symbol}', date='{self.date}', action_type='{self.action_type}', value='{self.value}')>"
+
 class FundamentalData(Base):
     """نموذج البيانات الأساسية"""
     __tablename__ = 'fundamental_data'
@@ -4,34 +4,329 @@
 """
 
 import os
+import sys
+import copy
+import asyncio
+import inspect
+import heapq
 import logging
 import json
 import time
+import random
 import hashlib
-from typing import Dict, List, Optional, Union, Any, Callable
+import tracemalloc
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union, Any, Callable, Tuple
 from datetime import datetime, date, timedelta
+import numpy as np
 import pandas as pd
 import redis
 from functools import wraps
 
+from seba.utils.serialization import DataFrameCodec, is_encoded
+from seba.utils.disk_cache import DiskCache
+from seba.utils.metrics import get_metrics_registry, DEFAULT_SIZE_BUCKETS
+
 # إعداد السجل
 logger = logging.getLogger(__name__)
 
+# مقاييس التخزين المؤقت وزمن التنفيذ
+_metrics = get_metrics_registry()
+_cache_lookups = _metrics.counter("seba_cache_lookups_total", "عدد عمليات القراءة من التخزين المؤقت حسب الطبقة والنتيجة", ["tier", "result"])
+_cache_load_latency = _metrics.histogram("seba_cache_load_duration_seconds", "زمن تحميل البيانات عند عدم وجودها في التخزين المؤقت", ["namespace"])
+_function_latency = _metrics.histogram("seba_function_duration_seconds", "زمن تنفيذ الدوال المقاسة بالمزخرف measure_performance", ["name"])
+_function_cpu = _metrics.histogram("seba_function_cpu_seconds", "زمن المعالج للدوال المقاسة بالمزخرف measure_performance", ["name"])
+_function_calls = _metrics.counter("seba_function_calls_total", "عدد استدعاءات الدوال المقاسة حسب النتيجة", ["name", "outcome"])
+_function_allocations = _metrics.histogram(
+    "seba_function_peak_allocation_bytes", "ذروة الذاكرة المخصصة أثناء الاستدعاءات المختارة بالعينة", ["name"], buckets=DEFAULT_SIZE_BUCKETS
+)
+
+def estimate_size(value: Any) -> int:
+    """
+    تقدير حجم قيمة في الذاكرة بالبايت
+    
+    المعلمات:
+        value (Any): القيمة
+    
+    العائد:
+        int: الحجم التقريبي بالبايت
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(index=True, deep=True)))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def parse_namespace_quotas(quotas: Optional[str]) -> Dict[str, int]:
+    """
+    تحليل حصص مساحات الأسماء من نص بالشكل "daily=128,quote=16" (بالميجابايت)
+    
+    المعلمات:
+        quotas (str): نص الحصص
+    
+    العائد:
+        Dict[str, int]: قاموس بالحد الأقصى بالبايت لكل مساحة أسماء
+    """
+    result = {}
+    for item in (quotas or "").split(","):
+        if "=" not in item:
+            continue
+        namespace, megabytes = item.split("=", 1)
+        result[namespace.strip()] = int(float(megabytes) * 1024 * 1024)
+    return result
+
+
+class MemoryCache:
+    """فئة للتخزين المؤقت في ذاكرة العملية مع إخلاء الأقدم استخداماً (LRU) وصلاحية لكل مدخل وحصص لمساحات الأسماء"""
+    
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        namespace_quotas: Optional[Dict[str, int]] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            max_bytes (int, optional): الحد الأقصى للحجم الكلي بالبايت. إذا لم يتم تحديده، سيتم استخدام CACHE_MEMORY_MAX_MB من متغيرات البيئة.
+            max_entries (int, optional): الحد الأقصى لعدد المدخلات. إذا لم يتم تحديده، سيتم استخدام CACHE_MEMORY_MAX_ENTRIES من متغيرات البيئة.
+            namespace_quotas (Dict[str, int], optional): الحد الأقصى بالبايت لكل مساحة أسماء. إذا لم يتم تحديده، سيتم استخدام CACHE_NAMESPACE_QUOTAS من متغيرات البيئة.
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("CACHE_MEMORY_MAX_MB", "256")) * 1024 * 1024)
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("CACHE_MEMORY_MAX_ENTRIES", "10000"))
+        self.namespace_quotas = namespace_quotas if namespace_quotas is not None else parse_namespace_quotas(os.getenv("CACHE_NAMESPACE_QUOTAS"))
+        
+        # المدخلات بترتيب الاستخدام: key -> (value, size, expires_at, namespace)
+        self._entries = OrderedDict()
+        self._namespaces = {}
+        self._namespace_bytes = {}
+        self._expiry_heap = []
+        self._lock = threading.RLock()
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "rejected": 0}
+    
+    @staticmethod
+    def namespace_of(key: str) -> str:
+        """
+        تحديد مساحة الأسماء من المفتاح (أول جزء بعد البادئة seba:، مثل quote أو daily)
+        
+        المعلمات:
+            key (str): المفتاح
+        
+        العائد:
+            str: مساحة الأسماء
+        """
+        parts = key.split(":")
+        if parts[0] == "seba" and len(parts) > 2:
+            return parts[1]
+        return parts[0] if len(parts) > 1 else "default"
+    
+    def _remove(self, key: str) -> None:
+        """حذف مدخل وتحديث الأحجام"""
+        _, size, _, namespace = self._entries.pop(key)
+        del self._namespaces[namespace][key]
+        self._namespace_bytes[namespace] -= size
+        self.total_bytes -= size
+    
+    def _purge_expired(self, now: float) -> None:
+        """حذف جميع المدخلات المنتهية صلاحيتها"""
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(key)
+            # قد يكون المدخل قد استُبدل بصلاحية مختلفة
+            if entry is not None and entry[2] == expires_at:
+                self._remove(key)
+                self.stats["expirations"] += 1
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        الحصول على قيمة من التخزين المؤقت
+        
+        المعلمات:
+            key (str): المفتاح
+        
+        العائد:
+            Any: القيمة المخزنة، أو None إذا لم يتم العثور على المفتاح أو انتهت صلاحيته
+        """
+        with self._lock:
+            self._purge_expired(time.time())
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self._namespaces[entry[3]].move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+    
+    def set(self, key: str, value: Any, expiry: Optional[int] = None) -> bool:
+        """
+        تخزين قيمة في التخزين المؤقت مع إخلاء المدخلات الأقدم استخداماً عند تجاوز الحدود
+        
+        المعلمات:
+            key (str): المفتاح
+            value (Any): القيمة
+            expiry (int, optional): مدة الصلاحية بالثواني
+        
+        العائد:
+            bool: True إذا تم التخزين، False إذا كانت القيمة أكبر من الحد المسموح
+        """
+        size = estimate_size(value)
+        namespace = self.namespace_of(key)
+        quota = self.namespace_quotas.get(namespace)
+        
+        with self._lock:
+            now = time.time()
+            self._purge_expired(now)
+            if key in self._entries:
+                self._remove(key)
+            
+            if size > self.max_bytes or (quota is not None and size > quota):
+                self.stats["rejected"] += 1
+                logger.warning(f"القيمة أكبر من الحد المسموح للتخزين المؤقت في الذاكرة: {key} ({size} بايت)")
+                return False
+            
+            # الإخلاء من نفس مساحة الأسماء أولاً ثم من التخزين بالكامل
+            if quota is not None:
+                namespace_keys = self._namespaces.get(namespace, {})
+                while namespace_keys and self._namespace_bytes[namespace] + size > quota:
+                    self._remove(next(iter(namespace_keys)))
+                    self.stats["evictions"] += 1
+            
+            while self._entries and (self.total_bytes + size > self.max_bytes or len(self._entries) >= self.max_entries):
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            
+            expires_at = now + expiry if expiry else None
+            self._entries[key] = (value, size, expires_at, namespace)
+            self._namespaces.setdefault(namespace, OrderedDict())[key] = None
+            self._namespace_bytes[namespace] = self._namespace_bytes.get(namespace, 0) + size
+            self.total_bytes += size
+            if expires_at is not None:
+                heapq.heappush(self._expiry_heap, (expires_at, key))
+            return True
+    
+    def delete(self, key: str) -> bool:
+        """
+        حذف قيمة من التخزين المؤقت
+        
+        المعلمات:
+            key (str): المفتاح
+        
+        العائد:
+            bool: True إذا كان المفتاح موجوداً
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+    
+    def clear(self) -> None:
+        """مسح جميع القيم من التخزين المؤقت"""
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+            self._namespace_bytes.clear()
+            self._expiry_heap = []
+            self.total_bytes = 0
+    
+    def __len__(self) -> int:
+        """عدد المدخلات في التخزين المؤقت"""
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict:
+        """
+        الحصول على إحصائيات التخزين المؤقت
+        
+        العائد:
+            Dict: الإحصائيات (المدخلات، الحجم، الحجم لكل مساحة أسماء، الإصابات، الإخفاقات، الإخلاءات)
+        """
+        with self._lock:
+            self._purge_expired(time.time())
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "namespaces": {
+                    namespace: {"entries": len(keys), "bytes": self._namespace_bytes[namespace], "quota": self.namespace_quotas.get(namespace)}
+                    for namespace, keys in self._namespaces.items() if keys
+                }
+            }
+
+
 class CacheManager:
     """فئة لإدارة التخزين المؤقت"""
     
-    def __init__(self, redis_url: Optional[str] = None):
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        max_memory_bytes: Optional[int] = None,
+        max_memory_entries: Optional[int] = None,
+        namespace_quotas: Optional[Dict[str, int]] = None,
+        redis_client: Optional[Any] = None,
+        l1_enabled: Optional[bool] = None,
+        codec: Optional[DataFrameCodec] = None,
+        disk_path: Optional[str] = None
+    ):
         """
         تهيئة الفئة
         
+        عند استخدام Redis يعمل التخزين في الذاكرة كطبقة أولى (L1) لكل عملية أمام Redis (L2)، ويتم إبطال
+        مفاتيحها في جميع العمليات عبر قناة Redis pub/sub عند تحديث القيم أو حذفها.
+        
+        بدون Redis يمكن تفعيل طبقة دائمة على القرص (SQLite) مشتركة بين العمليات على نفس الخادم، ويعمل التخزين
+        في الذاكرة حينها كطبقة أولى أمامها، ويتم إبطال مفاتيحها من سجل الإبطال في قاعدة البيانات.
+        
         المعلمات:
             redis_url (str, optional): عنوان URL لخادم Redis. إذا لم يتم تحديده، سيتم استخدام التخزين المؤقت في الذاكرة.
+            max_memory_bytes (int, optional): الحد الأقصى لحجم التخزين المؤقت في الذاكرة بالبايت
+            max_memory_entries (int, optional): الحد الأقصى لعدد المدخلات في الذاكرة
+            namespace_quotas (Dict[str, int], optional): الحد الأقصى بالبايت لكل مساحة أسماء في الذاكرة
+            redis_client (Any, optional): عميل Redis جاهز بدلاً من redis_url
+            l1_enabled (bool, optional): تفعيل الطبقة الأولى في الذاكرة أمام Redis. إذا لم يتم تحديده، سيتم استخدام CACHE_L1_ENABLED من متغيرات البيئة.
+            codec (DataFrameCodec, optional): ترميز إطارات البيانات في Redis
+            disk_path (str, optional): مسار ملف التخزين المؤقت على القرص عند عدم استخدام Redis. إذا لم يتم تحديده، سيتم استخدام التخزين المؤقت في الذاكرة فقط.
         """
-        self.use_redis = redis_url is not None
-        self.redis_client = None
-        self.memory_cache = {}
+        self.use_redis = redis_url is not None or redis_client is not None
+        self.redis_client = redis_client
+        self.codec = codec or DataFrameCodec()
+        self.instance_id = uuid.uuid4().hex
+        self.invalidation_channel = os.getenv("CACHE_INVALIDATION_CHANNEL", "seba:cache:invalidate")
+        self.l1_ttl = int(os.getenv("CACHE_L1_TTL", "60"))
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "l2_misses": 0, "invalidations": 0}
+        self.stale_grace = int(os.getenv("CACHE_STALE_GRACE", "900"))
+        self.refresh_retry = int(os.getenv("CACHE_REFRESH_RETRY", "30"))
+        self.refresh_lock_ttl = int(os.getenv("CACHE_REFRESH_LOCK_TTL", "60"))
+        self.refresh_workers = int(os.getenv("CACHE_REFRESH_WORKERS", "4"))
+        self.refresh_stats = {"stale_hits": 0, "refreshes": 0, "refresh_failures": 0}
+        self.negative_stats = {"negative_hits": 0, "negative_stores": 0}
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_executor = None
+        self._invalidation_sequence = 0
+        self._invalidation_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._pubsub = None
+        self.disk_cache = None
+        self._disk_version = None
+        self._disk_sequence = 0
         
-        if self.use_redis:
+        if self.use_redis and self.redis_client is None:
             try:
                 self.redis_client = redis.from_url(redis_url)
                 logger.info(f"تم الاتصال بخادم Redis: {redis_url}")
@@ -39,7 +334,229 @@ class CacheManager:
                 logger.error(f"خطأ في الاتصال بخادم Redis: {str(e)}")
                 self.use_redis = False
         
-        logger.info(f"تهيئة مدير التخزين المؤقت (استخدام Redis: {self.use_redis})")
+        if not self.use_redis:
+            if disk_path:
+                try:
+                    self.disk_cache = DiskCache(disk_path, codec=self.codec)
+                except Exception as e:
+                    logger.error(f"خطأ في تهيئة التخزين المؤقت على القرص: {str(e)}")
+        
+        if l1_enabled is None:
+            l1_enabled = os.getenv("CACHE_L1_ENABLED", "true").lower() in ["1", "true", "yes"]
+        self.l1_enabled = (self.use_redis or self.disk_cache is not None) and l1_enabled
+        
+        # الطبقة الأولى أصغر من التخزين في الذاكرة بدون Redis لأنها تحتفظ بالمفاتيح الساخنة فقط
+        if self.l1_enabled:
+            max_memory_bytes = max_memory_bytes if max_memory_bytes is not None else int(float(os.getenv("CACHE_L1_MAX_MB", "64")) * 1024 * 1024)
+            max_memory_entries = max_memory_entries if max_memory_entries is not None else int(os.getenv("CACHE_L1_MAX_ENTRIES", "2000"))
+        self.memory_cache = MemoryCache(max_memory_bytes, max_memory_entries, namespace_quotas)
+        
+        if self.l1_enabled and self.use_redis:
+            self._start_invalidation_listener()
+        elif self.l1_enabled:
+            self._disk_version = self.disk_cache.data_version()
+            self._disk_sequence = self.disk_cache.changes_since(0)[0]
+        
+        logger.info(f"تهيئة مدير التخزين المؤقت (استخدام Redis: {self.use_redis}، القرص: {self.disk_cache is not None}، الطبقة الأولى في الذاكرة: {self.l1_enabled})")
+    
+    def _start_invalidation_listener(self) -> None:
+        """الاشتراك في قناة الإبطال وبدء خيط الاستماع"""
+        try:
+            self._pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(self.invalidation_channel)
+        except Exception as e:
+            # بدون الإبطال لا يمكن ضمان اتساق الطبقة الأولى
+            logger.error(f"خطأ في الاشتراك في قناة إبطال التخزين المؤقت، سيتم تعطيل الطبقة الأولى: {str(e)}")
+            self.l1_enabled = False
+            return
+        
+        listener = threading.Thread(target=self._listen_invalidations, name="seba-cache-invalidation", daemon=True)
+        listener.start()
+    
+    def _listen_invalidations(self) -> None:
+        """استقبال رسائل الإبطال من العمليات الأخرى وتطبيقها على الطبقة الأولى"""
+        while not self._stop_event.is_set():
+            try:
+                message = self._pubsub.get_message(timeout=1.0)
+            except Exception as e:
+                # ربما فاتت رسائل أثناء انقطاع الاتصال
+                logger.error(f"خطأ في استقبال رسائل إبطال التخزين المؤقت: {str(e)}")
+                self._bump_invalidation_sequence()
+                self.memory_cache.clear()
+                self._stop_event.wait(1.0)
+                continue
+            
+            if message and message.get("type") == "message":
+                self._apply_invalidation(message["data"])
+    
+    def _apply_invalidation(self, data: Union[str, bytes]) -> None:
+        """تطبيق رسالة إبطال على الطبقة الأولى"""
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning(f"رسالة إبطال غير صالحة: {data}")
+            return
+        
+        if payload.get("origin") == self.instance_id:
+            return
+        
+        self._bump_invalidation_sequence()
+        self.stats["invalidations"] += 1
+        keys = payload.get("keys", [])
+        if "*" in keys:
+            self.memory_cache.clear()
+        else:
+            for key in keys:
+                self.memory_cache.delete(key)
+    
+    def _bump_invalidation_sequence(self) -> None:
+        """زيادة رقم الإبطال لمنع تخزين قيم قُرئت من Redis قبل الإبطال في الطبقة الأولى"""
+        with self._invalidation_lock:
+            self._invalidation_sequence += 1
+    
+    def _invalidate(self, keys: List[str]) -> None:
+        """
+        إبطال مفاتيح في الطبقة الأولى لهذه العملية ونشر الإبطال إلى العمليات الأخرى
+        
+        المعلمات:
+            keys (List[str]): المفاتيح، أو ["*"] لمسح الطبقة الأولى بالكامل
+        """
+        if not self.l1_enabled:
+            return
+        
+        self._bump_invalidation_sequence()
+        if "*" in keys:
+            self.memory_cache.clear()
+        else:
+            for key in keys:
+                self.memory_cache.delete(key)
+        
+        # العمليات الأخرى تقرأ إبطالات القرص من سجل الإبطال في قاعدة البيانات
+        if not self.use_redis:
+            return
+        
+        try:
+            self.redis_client.publish(self.invalidation_channel, json.dumps({"origin": self.instance_id, "keys": keys}))
+        except Exception as e:
+            logger.error(f"خطأ في نشر إبطال التخزين المؤقت: {str(e)}")
+    
+    def _read_through(self, key: str, decode: Callable[[bytes], Any]) -> Optional[Any]:
+        """
+        قراءة قيمة من الطبقة الأولى، أو من Redis مع تخزينها في الطبقة الأولى بعد فك ترميزها
+        
+        المعلمات:
+            key (str): المفتاح
+            decode (Callable): دالة فك ترميز القيمة الخام من Redis
+        
+        العائد:
+            Any: القيمة، أو None إذا لم يتم العثور على المفتاح
+        """
+        if not self.l1_enabled:
+            raw_value = self.redis_client.get(key)
+            return self._record_lookup("redis", decode(raw_value) if raw_value else None)
+        
+        value = self._record_lookup("l1", self.memory_cache.get(key))
+        if value is not None:
+            self.stats["l1_hits"] += 1
+            return value
+        
+        # قراءة القيمة ومدة صلاحيتها المتبقية في رحلة واحدة إلى Redis
+        sequence = self._invalidation_sequence
+        pipeline = self.redis_client.pipeline()
+        pipeline.get(key)
+        pipeline.pttl(key)
+        raw_value, remaining_ms = pipeline.execute()
+        if not raw_value:
+            self.stats["l2_misses"] += 1
+            return self._record_lookup("redis", None)
+        
+        self.stats["l2_hits"] += 1
+        value = self._record_lookup("redis", decode(raw_value))
+        
+        # لا تُخزن القيمة في الطبقة الأولى إذا وصل إبطال أثناء قراءتها
+        if sequence == self._invalidation_sequence and remaining_ms != -2:
+            ttl = self.l1_ttl if remaining_ms < 0 else min(self.l1_ttl, remaining_ms / 1000)
+            if ttl > 0:
+                self.memory_cache.set(key, value, ttl)
+        return value
+    
+    def _sync_disk_invalidations(self) -> None:
+        """تطبيق الإبطالات التي كتبتها الاتصالات أو العمليات الأخرى على القرص على الطبقة الأولى"""
+        with self._invalidation_lock:
+            version = self.disk_cache.data_version()
+            if version == self._disk_version:
+                return
+            self._disk_version = version
+            self._disk_sequence, keys = self.disk_cache.changes_since(self._disk_sequence)
+            if keys == []:
+                return
+            self._invalidation_sequence += 1
+        
+        self.stats["invalidations"] += 1
+        # None تعني أن سجلات إبطال حُذفت قبل قراءتها
+        if keys is None or "*" in keys:
+            self.memory_cache.clear()
+        else:
+            for key in keys:
+                self.memory_cache.delete(key)
+    
+    @staticmethod
+    def _record_lookup(tier: str, value: Any) -> Any:
+        """تسجيل نتيجة القراءة من طبقة تخزين مؤقت في سجل المقاييس وإعادة القيمة كما هي"""
+        _cache_lookups.inc(tier=tier, result="miss" if value is None else "hit")
+        return value
+    
+    def _read_disk(self, key: str) -> Optional[Any]:
+        """
+        قراءة قيمة من الطبقة الأولى، أو من القرص مع تخزينها في الطبقة الأولى
+        
+        المعلمات:
+            key (str): المفتاح
+        
+        العائد:
+            Any: القيمة، أو None إذا لم يتم العثور على المفتاح
+        """
+        if not self.l1_enabled:
+            return self._record_lookup("disk", self.disk_cache.get(key))
+        
+        self._sync_disk_invalidations()
+        value = self._record_lookup("l1", self.memory_cache.get(key))
+        if value is not None:
+            self.stats["l1_hits"] += 1
+            return value
+        
+        sequence = self._invalidation_sequence
+        value, expires_at = self.disk_cache.get_entry(key)
+        self._record_lookup("disk", value)
+        if value is None:
+            self.stats["l2_misses"] += 1
+            return None
+        
+        self.stats["l2_hits"] += 1
+        if sequence == self._invalidation_sequence:
+            ttl = self.l1_ttl if expires_at is None else min(self.l1_ttl, expires_at - time.time())
+            if ttl > 0:
+                self.memory_cache.set(key, value, ttl)
+        return value
+    
+    def _decode_dataframe(self, raw_value: bytes) -> pd.DataFrame:
+        """فك ترميز إطار بيانات من Redis (مع دعم السجلات بصيغة JSON المخزنة سابقاً)"""
+        if is_encoded(raw_value):
+            return self.codec.decode(raw_value)
+        return pd.DataFrame.from_dict(json.loads(raw_value))
+    
+    def close(self) -> None:
+        """إيقاف خيط الاستماع لرسائل الإبطال وخيوط التحديث في الخلفية"""
+        self._stop_event.set()
+        if self._refresh_executor is not None:
+            self._refresh_executor.shutdown(wait=False)
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except Exception as e:
+                logger.error(f"خطأ في إغلاق اشتراك إبطال التخزين المؤقت: {str(e)}")
+        if self.disk_cache is not None:
+            self.disk_cache.close()
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -53,12 +570,11 @@ class CacheManager:
         """
         try:
             if self.use_redis and self.redis_client:
-                value = self.redis_client.get(key)
-                if value:
-                    return json.loads(value)
-                return None
+                return self._read_through(key, json.loads)
+            elif self.disk_cache is not None:
+                return self._read_disk(key)
             else:
-                return self.memory_cache.get(key)
+                return self._record_lookup("memory", self.memory_cache.get(key))
         except Exception as e:
             logger.error(f"خطأ في الحصول على قيمة من التخزين المؤقت: {str(e)}")
             return None
@@ -77,16 +593,18 @@ class CacheManager:
         """
         try:
             if self.use_redis and self.redis_client:
-                serialized_value = json.dumps(value)
+                serialized_value = json.dumps(value, default=str)
                 if expiry:
                     self.redis_client.setex(key, expiry, serialized_value)
                 else:
                     self.redis_client.set(key, serialized_value)
+                self._invalidate([key])
+            elif self.disk_cache is not None:
+                stored = self.disk_cache.set(key, value, expiry)
+                self._invalidate([key])
+                return stored
             else:
-                self.memory_cache[key] = value
-                if expiry:
-                    # تنفيذ آلية انتهاء الصلاحية في الذاكرة غير مدعوم حالياً
-                    pass
+                return self.memory_cache.set(key, value, expiry)
             return True
         except Exception as e:
             logger.error(f"خطأ في تخزين قيمة في التخزين المؤقت: {str(e)}")
@@ -105,9 +623,12 @@ class CacheManager:
         try:
             if self.use_redis and self.redis_client:
                 self.redis_client.delete(key)
+                self._invalidate([key])
+            elif self.disk_cache is not None:
+                self.disk_cache.delete(key)
+                self._invalidate([key])
             else:
-                if key in self.memory_cache:
-                    del self.memory_cache[key]
+                self.memory_cache.delete(key)
             return True
         except Exception as e:
             logger.error(f"خطأ في حذف قيمة من التخزين المؤقت: {str(e)}")
@@ -123,6 +644,10 @@ class CacheManager:
         try:
             if self.use_redis and self.redis_client:
                 self.redis_client.flushdb()
+                self._invalidate(["*"])
+            elif self.disk_cache is not None:
+                self.disk_cache.clear()
+                self._invalidate(["*"])
             else:
                 self.memory_cache.clear()
             return True
@@ -130,6 +655,32 @@ class CacheManager:
             logger.error(f"خطأ في مسح التخزين المؤقت: {str(e)}")
             return False
     
+    def get_stats(self) -> Dict:
+        """
+        الحصول على إحصائيات التخزين المؤقت
+        
+        العائد:
+            Dict: الإحصائيات
+        """
+        if self.use_redis and self.redis_client:
+            return {
+                "backend": "redis",
+                **self.stats,
+                **self.refresh_stats,
+                **self.negative_stats,
+                "l1": self.memory_cache.get_stats() if self.l1_enabled else None
+            }
+        if self.disk_cache is not None:
+            return {
+                "backend": "disk",
+                **self.stats,
+                **self.refresh_stats,
+                **self.negative_stats,
+                "disk": self.disk_cache.get_stats(),
+                "l1": self.memory_cache.get_stats() if self.l1_enabled else None
+            }
+        return {"backend": "memory", **self.memory_cache.get_stats(), **self.refresh_stats, **self.negative_stats}
+    
     def get_dataframe(self, key: str) -> Optional[pd.DataFrame]:
         """
         الحصول على DataFrame من التخزين المؤقت
@@ -138,12 +689,19 @@ class CacheManager:
             key (str): المفتاح
             
         العائد:
-            pd.DataFrame: DataFrame المخزن، أو None إذا لم يتم العثور على المفتاح
+            pd.DataFrame: نسخة من DataFrame المخزن بنفس أنواع الأعمدة والفهرس، أو None إذا لم يتم العثور على المفتاح
         """
         try:
-            data = self.get(key)
-            if data:
-                return pd.DataFrame.from_dict(data)
+            if self.use_redis and self.redis_client:
+                df = self._read_through(key, self._decode_dataframe)
+            elif self.disk_cache is not None:
+                df = self._read_disk(key)
+            else:
+                df = self._record_lookup("memory", self.memory_cache.get(key))
+            
+            # نسخة حتى لا تؤثر تعديلات المستدعي على القيمة المخزنة
+            if isinstance(df, pd.DataFrame):
+                return df.copy()
             return None
         except Exception as e:
             logger.error(f"خطأ في الحصول على DataFrame من التخزين المؤقت: {str(e)}")
@@ -153,6 +711,8 @@ class CacheManager:
         """
         تخزين DataFrame في التخزين المؤقت
         
+        يُخزن الإطار كما هو في الذاكرة، وبترميز ثنائي يحافظ على أنواع الأعمدة والفهرس في Redis وعلى القرص.
+        
         المعلمات:
             key (str): المفتاح
             df (pd.DataFrame): DataFrame
@@ -162,49 +722,586 @@ class CacheManager:
             bool: True في حالة النجاح، False في حالة الفشل
         """
         try:
-            data = df.to_dict(orient="records")
-            return self.set(key, data, expiry)
+            if self.use_redis and self.redis_client:
+                payload = self.codec.encode(df)
+                if expiry:
+                    self.redis_client.setex(key, expiry, payload)
+                else:
+                    self.redis_client.set(key, payload)
+                self._invalidate([key])
+                return True
+            
+            if self.disk_cache is not None:
+                stored = self.disk_cache.set(key, df, expiry)
+                self._invalidate([key])
+                return stored
+            
+            return self.memory_cache.set(key, df.copy(), expiry)
         except Exception as e:
             logger.error(f"خطأ في تخزين DataFrame في التخزين المؤقت: {str(e)}")
             return False
+    
+    
+    @staticmethod
+    def _state_key(key: str) -> str:
+        """مفتاح حالة الصلاحية المرافق لمفتاح مخزن بسياسة stale-while-revalidate"""
+        return f"{key}:swr"
+    
+    @staticmethod
+    def _is_empty(value: Any) -> bool:
+        """التحقق مما إذا كانت النتيجة فارغة (تعيد المصادر إطاراً أو قاموساً فارغاً عند الفشل)"""
+        if value is None:
+            return True
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value.empty
+        if isinstance(value, (dict, list, tuple)):
+            return not value
+        return False
+    
+    @staticmethod
+    def result_kind(value: Any) -> str:
+        """نوع النتيجة لإعادة إنشاء نتيجة فارغة من نفس النوع (dataframe, list, dict)"""
+        if isinstance(value, pd.DataFrame):
+            return "dataframe"
+        if isinstance(value, list):
+            return "list"
+        return "dict"
+    
+    @staticmethod
+    def empty_result(kind: str) -> Any:
+        """إنشاء نتيجة فارغة من نوع معين"""
+        return {"dataframe": pd.DataFrame, "list": list}.get(kind, dict)()
+    
+    def set_negative(self, key: str, reason: str, expiry: int, kind: str = "dict") -> bool:
+        """
+        تخزين نتيجة سلبية لمفتاح (مثل رمز غير موجود أو عدم وجود بيانات أو رفض المصدر للطلب)
+        
+        المعلمات:
+            key (str): المفتاح
+            reason (str): سبب النتيجة السلبية
+            expiry (int): مدة الصلاحية بالثواني
+            kind (str, optional): نوع النتيجة (dataframe, list, dict) أو error إذا كان المصدر قد رفع استثناءً
+        
+        العائد:
+            bool: True في حالة النجاح، False في حالة الفشل
+        """
+        if expiry <= 0:
+            return False
+        self.negative_stats["negative_stores"] += 1
+        return self.set(f"{key}:miss", {"reason": reason, "kind": kind}, expiry)
+    
+    def get_negative(self, key: str) -> Optional[Dict]:
+        """
+        الحصول على النتيجة السلبية المخزنة لمفتاح
+        
+        المعلمات:
+            key (str): المفتاح
+        
+        العائد:
+            Dict: السبب والنوع، أو None إذا لم توجد نتيجة سلبية
+        """
+        marker = self.get(f"{key}:miss")
+        if not marker:
+            return None
+        self.negative_stats["negative_hits"] += 1
+        return marker
+    
+    def _store_fresh(self, key: str, value: Any, expiry: Optional[int], stale_grace: int, dataframe: bool) -> None:
+        """تخزين قيمة جديدة مع بقائها متاحة كقيمة قديمة لمدة السماح بعد انتهاء صلاحيتها"""
+        if not expiry or stale_grace <= 0:
+            if dataframe:
+                self.set_dataframe(key, value, expiry)
+            else:
+                self.set(key, value, expiry)
+            return
+        
+        hard_expiry = expiry + stale_grace
+        if dataframe:
+            self.set_dataframe(key, value, hard_expiry)
+        else:
+            self.set(key, value, hard_expiry)
+        self.set(self._state_key(key), {"fresh_until": time.time() + expiry, "refresh_failed": False}, hard_expiry)
+    
+    def get_entry_state(self, key: str) -> Dict:
+        """
+        الحصول على حالة صلاحية مدخل مخزن بسياسة stale-while-revalidate
+        
+        المعلمات:
+            key (str): المفتاح
+        
+        العائد:
+            Dict: الحالة (stale, refresh_failed, fresh_until, error)، أو قاموس فارغ إذا لم توجد حالة للمفتاح
+        """
+        state = self.get(self._state_key(key))
+        if not state:
+            return {}
+        return {**state, "stale": state.get("fresh_until") is not None and time.time() >= state["fresh_until"]}
+    
+    def _acquire_refresh_lock(self, key: str) -> bool:
+        """حجز تحديث المفتاح عبر جميع العمليات باستخدام Redis"""
+        if not self.use_redis:
+            return True
+        try:
+            return bool(self.redis_client.set(f"{key}:refresh", self.instance_id, nx=True, ex=self.refresh_lock_ttl))
+        except Exception as e:
+            logger.error(f"خطأ في حجز تحديث التخزين المؤقت: {str(e)}")
+            return True
+    
+    def _release_refresh_lock(self, key: str) -> None:
+        """تحرير حجز تحديث المفتاح"""
+        if not self.use_redis:
+            return
+        try:
+            self.redis_client.delete(f"{key}:refresh")
+        except Exception as e:
+            logger.error(f"خطأ في تحرير حجز تحديث التخزين المؤقت: {str(e)}")
+    
+    def _schedule_refresh(self, key: str, loader: Callable[[], Any], expiry: Optional[int], stale_grace: int, dataframe: bool) -> None:
+        """بدء تحديث واحد فقط في الخلفية للمفتاح إذا لم يكن هناك تحديث جارٍ"""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=self.refresh_workers, thread_name_prefix="seba-cache-refresh")
+        
+        if not self._acquire_refresh_lock(key):
+            # عملية أخرى تقوم بالتحديث
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+            return
+        
+        try:
+            self._refresh_executor.submit(self._refresh, key, loader, expiry, stale_grace, dataframe)
+        except RuntimeError as e:
+            # المنفذ مغلق بعد close
+            logger.debug(f"تعذر بدء تحديث التخزين المؤقت: {str(e)}")
+            self._release_refresh_lock(key)
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+    
+    def _refresh(self, key: str, loader: Callable[[], Any], expiry: Optional[int], stale_grace: int, dataframe: bool) -> None:
+        """تحديث قيمة قديمة في الخلفية، مع الاحتفاظ بالقيمة القديمة وتعليمها عند الفشل"""
+        try:
+            try:
+                value = loader()
+                error = "نتيجة فارغة" if self._is_empty(value) else None
+            except Exception as e:
+                error = str(e)
+            
+            if error is None:
+                self._store_fresh(key, value, expiry, stale_grace, dataframe)
+                self.refresh_stats["refreshes"] += 1
+                logger.debug(f"تم تحديث القيمة القديمة في التخزين المؤقت: {key}")
+                return
+            
+            self.refresh_stats["refresh_failures"] += 1
+            logger.warning(f"فشل تحديث القيمة القديمة في التخزين المؤقت، سيتم الاستمرار في استخدامها: {key}: {error}")
+            
+            # لا يعاد المحاولة قبل انقضاء مهلة إعادة المحاولة حتى لا يُستنزف مصدر متعطل
+            state = self.get(self._state_key(key)) or {}
+            state.update({"refresh_failed": True, "error": error, "retry_after": time.time() + self.refresh_retry})
+            self.set(self._state_key(key), state, stale_grace)
+        finally:
+            self._release_refresh_lock(key)
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+    
+    def get_or_refresh(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        expiry: Optional[int] = None,
+        stale_grace: Optional[int] = None,
+        dataframe: bool = False,
+        negative: Optional[Callable[[], Optional[Tuple[str, int]]]] = None
+    ) -> Any:
+        """
+        الحصول على قيمة بسياسة stale-while-revalidate
+        
+        تُعاد القيمة الصالحة مباشرة. بعد انتهاء صلاحيتها وخلال مدة السماح تُعاد القيمة القديمة فوراً ويبدأ
+        تحديث واحد فقط في الخلفية، وعند فشله تبقى القيمة القديمة مع تعليمها. عند عدم وجود القيمة يتم
+        تحميلها مرة واحدة للطلبات المتزامنة. لا يتم تخزين النتائج الفارغة إلا كنتائج سلبية عند تحديد negative.
+        تحمل إطارات البيانات القديمة العلامتين cache_stale و cache_refresh_failed في attrs، ويمكن الحصول على حالة
+        أي مفتاح عبر get_entry_state.
+        
+        المعلمات:
+            key (str): المفتاح
+            loader (Callable): دالة تحميل القيمة بدون معلمات
+            expiry (int, optional): مدة الصلاحية بالثواني
+            stale_grace (int, optional): مدة السماح بالثواني بعد انتهاء الصلاحية. إذا لم يتم تحديدها، سيتم استخدام CACHE_STALE_GRACE من متغيرات البيئة.
+            dataframe (bool, optional): القيمة إطار بيانات
+            negative (Callable, optional): دالة تعيد سبب النتيجة الفارغة ومدة تخزينها السلبي بالثواني، أو None لعدم تخزينها
+        
+        العائد:
+            Any: القيمة
+        """
+        stale_grace = self.stale_grace if stale_grace is None else stale_grace
+        use_state = bool(expiry) and stale_grace > 0
+        
+        def lookup() -> Optional[Any]:
+            return self.get_dataframe(key) if dataframe else self.get(key)
+        
+        value = lookup()
+        if value is not None:
+            state = self.get(self._state_key(key)) if use_state else None
+            now = time.time()
+            if not state or now < state.get("fresh_until", now + 1):
+                return value
+            
+            self.refresh_stats["stale_hits"] += 1
+            if now >= state.get("retry_after", 0):
+                self._schedule_refresh(key, loader, expiry, stale_grace, dataframe)
+            
+            if isinstance(value, pd.DataFrame):
+                value.attrs["cache_stale"] = True
+                value.attrs["cache_refresh_failed"] = bool(state.get("refresh_failed"))
+            logger.debug(f"تم الحصول على قيمة قديمة من التخزين المؤقت أثناء تحديثها: {key}")
+            return value
+        
+        def compute():
+            # ربما خزن استدعاء سابق القيمة أثناء الانتظار
+            cached = lookup()
+            if cached is not None:
+                return cached
+            
+            if negative is not None:
+                marker = self.get_negative(key)
+                if marker:
+                    logger.debug(f"تم الحصول على نتيجة سلبية من التخزين المؤقت ({marker['reason']}): {key}")
+                    empty = self.empty_result(marker["kind"])
+                    if isinstance(empty, pd.DataFrame):
+                        empty.attrs["cache_negative"] = marker["reason"]
+                    return empty
+            
+            result = loader()
+            if not self._is_empty(result):
+                self._store_fresh(key, result, expiry, stale_grace, dataframe)
+            elif negative is not None:
+                classification = negative()
+                if classification is not None:
+                    reason, ttl = classification
+                    self.set_negative(key, reason, ttl, self.result_kind(result))
+            return result
+        
+        result = _single_flight.do(key, compute)
+        return result.copy() if isinstance(result, pd.DataFrame) else result
+
+
+# سجل مديري التخزين المؤقت المشترك على مستوى العملية
+_cache_managers: Dict[str, CacheManager] = {}
+_cache_managers_lock = threading.Lock()
 
 
-def cache(expiry: int = 3600):
+def get_cache_manager(name: str = "default") -> CacheManager:
     """
-    مزخرف للتخزين المؤقت
+    الحصول على مدير تخزين مؤقت مشترك على مستوى العملية
+    
+    ينشأ المدير "default" باستخدام REDIS_URL أو CACHE_DISK_PATH من متغيرات البيئة (إن وجد)، وأي اسم آخر غير مسجل
+    ينشأ كتخزين مؤقت في الذاكرة فقط.
+    
+    المعلمات:
+        name (str, optional): اسم المدير في السجل
+    
+    العائد:
+        CacheManager: مدير التخزين المؤقت
+    """
+    with _cache_managers_lock:
+        manager = _cache_managers.get(name)
+        if manager is None:
+            manager = CacheManager(redis_url=os.getenv("REDIS_URL"), disk_path=os.getenv("CACHE_DISK_PATH")) if name == "default" else CacheManager()
+            _cache_managers[name] = manager
+        return manager
+
+
+def register_cache_manager(name: str, manager: CacheManager) -> None:
+    """
+    تسجيل مدير تخزين مؤقت باسم معين لاستخدامه في المزخرف cache
+    
+    المعلمات:
+        name (str): اسم المدير
+        manager (CacheManager): مدير التخزين المؤقت
+    """
+    with _cache_managers_lock:
+        _cache_managers[name] = manager
+
+
+# معرفات ثابتة لنسخ الكائنات (مثل self) لا يُعاد استخدامها بعد تحرير الكائن كما يحدث مع id()
+_instance_tokens = weakref.WeakKeyDictionary()
+_instance_tokens_lock = threading.Lock()
+
+
+def _instance_token(value: Any) -> str:
+    """الحصول على معرف فريد لنسخة كائن طوال عمرها"""
+    try:
+        with _instance_tokens_lock:
+            token = _instance_tokens.get(value)
+            if token is None:
+                token = uuid.uuid4().hex
+                _instance_tokens[value] = token
+            return token
+    except TypeError:
+        # كائنات لا تدعم المراجع الضعيفة أو غير قابلة للبصم
+        return f"id:{id(value)}"
+
+
+def _hash_argument(value: Any, digest: Any) -> None:
+    """
+    إضافة تمثيل ثابت لمعلمة إلى البصمة
+    
+    تُبصم إطارات البيانات والمصفوفات بمحتواها، والكائنات التي ليس لها تمثيل ثابت (مثل self) بنوعها ومعرف النسخة
+    حتى لا تتشارك نسخ مختلفة الإعدادات نفس النتائج.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(f"{type(value).__name__}:{value.shape}:{list(value.dtypes) if isinstance(value, pd.DataFrame) else value.dtype}:".encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr(list(value.columns)).encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        except TypeError:
+            # خلايا غير قابلة للبصم مثل القوائم
+            digest.update(repr(value.to_dict()).encode())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"ndarray:{value.dtype}:{value.shape}:".encode())
+        if value.dtype.hasobject:
+            digest.update(repr(value.tolist()).encode())
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b"dict:")
+        for key in sorted(value, key=repr):
+            _hash_argument(key, digest)
+            _hash_argument(value[key], digest)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value
+        digest.update(f"{type(value).__name__}:{len(items)}:".encode())
+        for item in items:
+            _hash_argument(item, digest)
+    elif value is None or isinstance(value, (str, bytes, int, float, bool, date, datetime, timedelta)):
+        digest.update(f"{type(value).__name__}:{value!r};".encode())
+    else:
+        digest.update(f"object:{type(value).__module__}.{type(value).__qualname__}:{_instance_token(value)};".encode())
+
+
+def make_cache_key(func: Callable, args: tuple, kwargs: dict, namespace: str = "func") -> str:
+    """
+    إنشاء مفتاح تخزين مؤقت من الدالة وبصمة محتوى معلماتها
+    
+    المعلمات:
+        func (Callable): الدالة
+        args (tuple): المعلمات الموضعية
+        kwargs (dict): المعلمات المسماة
+        namespace (str, optional): مساحة الأسماء في التخزين المؤقت
+    
+    العائد:
+        str: مفتاح التخزين المؤقت
+    """
+    digest = hashlib.sha1()
+    try:
+        # توحيد المعلمات الموضعية والمسماة والقيم الافتراضية
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = list(bound.arguments.items())
+    except (TypeError, ValueError):
+        arguments = list(enumerate(args)) + sorted(kwargs.items())
+    
+    for name, value in arguments:
+        digest.update(f"{name}=".encode())
+        _hash_argument(value, digest)
+    
+    return f"seba:{namespace}:{func.__module__}.{func.__qualname__}:{digest.hexdigest()}"
+
+
+class _SingleFlight:
+    """فئة لضمان تنفيذ استدعاء واحد فقط لكل مفتاح في نفس الوقت، ومشاركة نتيجته مع المنتظرين"""
+    
+    def __init__(self):
+        """تهيئة الفئة"""
+        self._lock = threading.Lock()
+        self._calls = {}
+    
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        تنفيذ الدالة أو انتظار نتيجة الاستدعاء الجاري لنفس المفتاح
+        
+        المعلمات:
+            key (str): المفتاح
+            func (Callable): الدالة
+        
+        العائد:
+            Any: نتيجة الدالة
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+        
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        
+        try:
+            call["result"] = func()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["event"].set()
+    
+    async def do_async(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        النسخة غير المتزامنة من do
+        
+        المعلمات:
+            key (str): المفتاح
+            func (Callable): دالة تعيد coroutine
+        
+        العائد:
+            Any: نتيجة الدالة
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            future = self._calls.get(loop_key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._calls[loop_key] = future
+        
+        if not leader:
+            return await asyncio.shield(future)
+        
+        try:
+            result = await func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # استرجاع الاستثناء حتى لا يُسجل كاستثناء غير مستهلك إذا لم يوجد منتظرون
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(loop_key, None)
+
+
+_single_flight = _SingleFlight()
+
+
+def _detached(value: Any) -> Any:
+    """نسخة مستقلة من القيمة حتى لا تؤثر تعديلات المستدعي على القيمة المخزنة في الذاكرة أو على المستدعين الآخرين"""
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+def cache(expiry: int = 3600, namespace: str = "func", manager: str = "default", key_func: Optional[Callable[..., Any]] = None):
+    """
+    مزخرف للتخزين المؤقت للدوال المتزامنة وغير المتزامنة
+    
+    يستخدم مدير تخزين مؤقت مشتركاً من السجل، ومفاتيح مبنية على بصمة محتوى المعلمات (بما فيها إطارات
+    البيانات والمصفوفات)، ويضمن تنفيذ استدعاء واحد فقط لكل مفتاح عند تزامن الطلبات. لا يتم تخزين None.
+    يحصل كل مستدعٍ على نسخة مستقلة من النتيجة، وتُنفذ عمليات Redis والقرص في الدوال غير المتزامنة
+    خارج حلقة الأحداث. توفر الدالة المزخرفة cache_key(...) و invalidate(...) لنفس المعلمات.
     
     المعلمات:
         expiry (int, optional): مدة الصلاحية بالثواني
+        namespace (str, optional): مساحة الأسماء في التخزين المؤقت (تُطبق عليها حصص مساحات الأسماء)
+        manager (str, optional): اسم مدير التخزين المؤقت في السجل
+        key_func (Callable, optional): دالة تستقبل معلمات الدالة وتعيد القيمة التي يُبنى منها المفتاح بدلاً من المعلمات
+            (مثلاً لمشاركة النتائج بين نسخ متكافئة من نفس الفئة)
         
     العائد:
         Callable: الدالة المزخرفة
     """
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # إنشاء مفتاح التخزين المؤقت
-            key_parts = [func.__name__]
-            key_parts.extend([str(arg) for arg in args])
-            key_parts.extend([f"{k}={v}" for k, v in kwargs.items()])
-            key = hashlib.md5(":".join(key_parts).encode()).hexdigest()
-            
-            # الحصول على مدير التخزين المؤقت
-            cache_manager = CacheManager()
-            
-            # محاولة الحصول على القيمة من التخزين المؤقت
-            cached_value = cache_manager.get(key)
-            if cached_value is not None:
-                logger.debug(f"تم الحصول على القيمة من التخزين المؤقت: {key}")
-                return cached_value
-            
-            # تنفيذ الدالة
-            result = func(*args, **kwargs)
-            
-            # تخزين النتيجة في التخزين المؤقت
-            cache_manager.set(key, result, expiry)
+        # تُقرأ النتائج كإطارات بيانات إذا كان نوع العائد DataFrame أو أعادت الدالة إطار بيانات سابقاً
+        state = {"dataframe": inspect.signature(func).return_annotation is pd.DataFrame}
+        
+        def cache_key(*args, **kwargs) -> str:
+            if key_func is not None:
+                return make_cache_key(func, (key_func(*args, **kwargs),), {}, namespace)
+            return make_cache_key(func, args, kwargs, namespace)
+        
+        def lookup(cache_manager: CacheManager, key: str) -> Optional[Any]:
+            if state["dataframe"]:
+                # get_dataframe تعيد نسخة مسبقاً
+                return cache_manager.get_dataframe(key)
+            value = cache_manager.get(key)
+            return copy.deepcopy(value) if value is not None else None
+        
+        def store(cache_manager: CacheManager, key: str, result: Any) -> None:
+            if result is None:
+                return
+            if isinstance(result, pd.DataFrame):
+                state["dataframe"] = True
+                cache_manager.set_dataframe(key, result, expiry)
+            else:
+                cache_manager.set(key, result, expiry)
             logger.debug(f"تم تخزين القيمة في التخزين المؤقت: {key}")
+        
+        if inspect.iscoroutinefunction(func):
+            async def run_blocking(cache_manager: CacheManager, operation: Callable, *args) -> Any:
+                # عمليات Redis والقرص تحجب التنفيذ، فتُنفذ في مجمع الخيوط بدلاً من حلقة الأحداث
+                if cache_manager.use_redis or cache_manager.disk_cache is not None:
+                    return await asyncio.get_running_loop().run_in_executor(None, operation, cache_manager, *args)
+                return operation(cache_manager, *args)
             
-            return result
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                cache_manager = get_cache_manager(manager)
+                key = cache_key(*args, **kwargs)
+                
+                cached_value = await run_blocking(cache_manager, lookup, key)
+                if cached_value is not None:
+                    logger.debug(f"تم الحصول على القيمة من التخزين المؤقت: {key}")
+                    return cached_value
+                
+                async def compute():
+                    # ربما خزن استدعاء سابق النتيجة أثناء الانتظار
+                    cached = await run_blocking(cache_manager, lookup, key)
+                    if cached is not None:
+                        return cached
+                    result = await func(*args, **kwargs)
+                    await run_blocking(cache_manager, store, key, result)
+                    return result
+                
+                # النتيجة مشتركة بين المنتظرين وقد تكون نفس الكائن المخزن في الذاكرة
+                return _detached(await _single_flight.do_async(key, compute))
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                cache_manager = get_cache_manager(manager)
+                key = cache_key(*args, **kwargs)
+                
+                cached_value = lookup(cache_manager, key)
+                if cached_value is not None:
+                    logger.debug(f"تم الحصول على القيمة من التخزين المؤقت: {key}")
+                    return cached_value
+                
+                def compute():
+                    cached = lookup(cache_manager, key)
+                    if cached is not None:
+                        return cached
+                    result = func(*args, **kwargs)
+                    store(cache_manager, key, result)
+                    return result
+                
+                # النتيجة مشتركة بين المنتظرين وقد تكون نفس الكائن المخزن في الذاكرة
+                return _detached(_single_flight.do(key, compute))
+        
+        def invalidate(*args, **kwargs) -> bool:
+            return get_cache_manager(manager).delete(cache_key(*args, **kwargs))
+        
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
         return wrapper
     return decorator
 
@@ -215,6 +1312,7 @@ class PerformanceMonitor:
     def __init__(self):
         """تهيئة الفئة"""
         self.metrics = {}
+        self._lock = threading.Lock()
         logger.info("تهيئة مراقب الأداء")
     
     def start_timer(self, name: str) -> None:
@@ -224,11 +1322,12 @@ class PerformanceMonitor:
         المعلمات:
             name (str): اسم المؤقت
         """
-        self.metrics[name] = {
-            'start_time': time.time(),
-            'end_time': None,
-            'duration': None
-        }
+        with self._lock:
+            self.metrics[name] = {
+                'start_time': time.time(),
+                'end_time': None,
+                'duration': None
+            }
     
     def stop_timer(self, name: str) -> float:
         """
@@ -240,10 +1339,11 @@ class PerformanceMonitor:
         العائد:
             float: المدة بالثواني
         """
-        if name in self.metrics:
-            self.metrics[name]['end_time'] = time.time()
-            self.metrics[name]['duration'] = self.metrics[name]['end_time'] - self.metrics[name]['start_time']
-            return self.metrics[name]['duration']
+        with self._lock:
+            if name in self.metrics:
+                self.metrics[name]['end_time'] = time.time()
+                self.metrics[name]['duration'] = self.metrics[name]['end_time'] - self.metrics[name]['start_time']
+                return self.metrics[name]['duration']
         return 0.0
     
     def get_duration(self, name: str) -> float:
@@ -267,40 +1367,225 @@ class PerformanceMonitor:
         العائد:
             Dict: المقاييس
         """
-        return self.metrics
+        with self._lock:
+            return dict(self.metrics)
     
     def clear_metrics(self) -> None:
         """مسح جميع المقاييس"""
-        self.metrics.clear()
+        with self._lock:
+            self.metrics.clear()
+
+
+class _StepTimer:
+    """تجميع زمن التنفيذ الفعلي وزمن المعالج لخطوات مولد أو coroutine فقط، دون الوقت المستغرق خارجها"""
+    
+    def __init__(self):
+        """تهيئة الفئة"""
+        self.wall = 0.0
+        self.cpu = 0.0
+    
+    def _step(self, method: Callable, argument: Any) -> Any:
+        """تنفيذ خطوة واحدة وقياسها"""
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            return method(argument)
+        finally:
+            self.wall += time.perf_counter() - wall_start
+            self.cpu += time.thread_time() - cpu_start
+    
+    def iterate(self, iterator: Any):
+        """
+        مولد يمرر القيم والاستثناءات إلى المولد الأصلي (أو مكرر __await__ لـ coroutine) مع قياس كل خطوة
+        
+        المعلمات:
+            iterator (Any): المولد أو المكرر
+        
+        العائد:
+            Generator: مولد بنفس القيم والنتيجة النهائية
+        """
+        method, argument = iterator.send, None
+        while True:
+            try:
+                item = self._step(method, argument)
+            except StopIteration as stop:
+                return stop.value
+            
+            try:
+                argument = yield item
+                method = iterator.send
+            except GeneratorExit:
+                iterator.close()
+                raise
+            except BaseException as e:
+                method, argument = iterator.throw, e
+
+
+class _Measured:
+    """كائن قابل للانتظار يقيس خطوات coroutine أثناء تنفيذها في حلقة الأحداث"""
+    
+    def __init__(self, timer: _StepTimer, awaitable: Any):
+        self.timer = timer
+        self.awaitable = awaitable
+    
+    def __await__(self):
+        return self.timer.iterate(self.awaitable.__await__())
+
 
+# حالة قياس ذروة الذاكرة: tracemalloc يقيس العملية بالكامل، لذلك يُسمح بالقياس لخيط واحد فقط في كل مرة
+# (مع دعم الاستدعاءات المتداخلة في نفس الخيط عبر مكدس الإطارات)
+_allocation_lock = threading.Lock()
+_allocation_state = {"owner": None, "stack": [], "started": False}
 
-def measure_performance(name: str):
+
+def _allocation_start() -> Optional[List[int]]:
+    """
+    بدء قياس ذروة الذاكرة المخصصة لاستدعاء (مع الحفاظ على ذروة الاستدعاءات الخارجية قبل إعادة تعيينها)
+    
+    العائد:
+        List[int]: إطار القياس، أو None إذا كان خيط آخر يقيس حالياً (لا يُقاس الاستدعاء حتى لا تتداخل الذروات)
+    """
+    thread_id = threading.get_ident()
+    with _allocation_lock:
+        if _allocation_state["owner"] not in (None, thread_id):
+            return None
+        
+        stack = _allocation_state["stack"]
+        if not stack and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _allocation_state["started"] = True
+        _allocation_state["owner"] = thread_id
+        
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in stack:
+            frame[1] = max(frame[1], peak)
+        tracemalloc.reset_peak()
+        
+        frame = [current, current]
+        stack.append(frame)
+        return frame
+
+
+def _allocation_stop(frame: List[int]) -> int:
+    """إنهاء قياس ذروة الذاكرة المخصصة لاستدعاء وإعادتها بالبايت (وإيقاف tracemalloc إذا بدأه القياس)"""
+    with _allocation_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        stack = _allocation_state["stack"]
+        stack.remove(frame)
+        
+        frame_peak = max(frame[1], peak)
+        for outer in stack:
+            outer[1] = max(outer[1], frame_peak)
+        
+        if not stack:
+            _allocation_state["owner"] = None
+            if _allocation_state["started"]:
+                tracemalloc.stop()
+                _allocation_state["started"] = False
+        
+        return max(0, frame_peak - frame[0])
+
+
+def measure_performance(name: str, allocation_sample_rate: Optional[float] = None):
     """
     مزخرف لقياس أداء الدالة
     
+    يدعم الدوال المتزامنة وغير المتزامنة والمولدات. تُسجل في سجل المقاييس المشترك بتسمية name:
+    زمن التنفيذ الفعلي (seba_function_duration_seconds)، وزمن المعالج (seba_function_cpu_seconds)، وعدد
+    الاستدعاءات حسب النتيجة، وذروة الذاكرة المخصصة (seba_function_peak_allocation_bytes) للاستدعاءات المختارة بالعينة.
+    
+    في الدوال غير المتزامنة يشمل زمن التنفيذ الفعلي وقت الانتظار، بينما يُحسب زمن المعالج لخطوات الدالة فقط.
+    في المولدات يُحسب الزمن داخل المولد فقط دون وقت المستهلك بين العناصر. قياس الذاكرة اختياري (معطل افتراضياً)
+    وللدوال المتزامنة فقط: يقيس خيط واحد فقط في كل مرة ولا تُسجل ذروة للاستدعاءات التي تتزامن مع قياس في خيط آخر،
+    ويُوقف tracemalloc بعد القياس إذا لم يكن مفعلاً قبله. تشمل الذروة ما تخصصه الخيوط الأخرى غير المقاسة أثناء الاستدعاء.
+    
     المعلمات:
         name (str): اسم المقياس
+        allocation_sample_rate (float, optional): نسبة الاستدعاءات التي تُقاس ذاكرتها (بين 0 و 1). إذا لم يتم تحديدها، سيتم استخدام PERF_ALLOCATION_SAMPLE_RATE من متغيرات البيئة.
         
     العائد:
         Callable: الدالة المزخرفة
     """
+    if allocation_sample_rate is None:
+        allocation_sample_rate = float(os.getenv("PERF_ALLOCATION_SAMPLE_RATE", "0"))
+    
+    def record(wall: float, cpu: float, error: bool, allocated: Optional[int] = None) -> None:
+        """تسجيل قياسات استدعاء في سجل المقاييس"""
+        _function_latency.observe(wall, name=name)
+        _function_cpu.observe(cpu, name=name)
+        _function_calls.inc(name=name, outcome="error" if error else "success")
+        if allocated is not None:
+            _function_allocations.observe(allocated, name=name)
+        logger.debug(f"مدة تنفيذ {name}: {wall:.4f} ثانية (المعالج: {cpu:.4f} ثانية)")
+    
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # إنشاء مراقب الأداء
-            monitor = PerformanceMonitor()
-            
-            # بدء المؤقت
-            monitor.start_timer(name)
-            
-            # تنفيذ الدالة
-            result = func(*args, **kwargs)
-            
-            # إيقاف المؤقت
-            duration = monitor.stop_timer(name)
-            logger.debug(f"مدة تنفيذ {name}: {duration:.4f} ثانية")
-            
-            return result
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                timer = _StepTimer()
+                start_time = time.perf_counter()
+                error = True
+                try:
+                    result = await _Measured(timer, func(*args, **kwargs))
+                    error = False
+                    return result
+                finally:
+                    record(time.perf_counter() - start_time, timer.cpu, error)
+        
+        elif inspect.isasyncgenfunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                generator = func(*args, **kwargs)
+                timer = _StepTimer()
+                wall = 0.0
+                error = True
+                try:
+                    while True:
+                        step_start = time.perf_counter()
+                        try:
+                            item = await _Measured(timer, generator.__anext__())
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            wall += time.perf_counter() - step_start
+                        yield item
+                    error = False
+                except GeneratorExit:
+                    # توقف المستهلك قبل نهاية المولد ليس خطأ
+                    error = False
+                    await generator.aclose()
+                    raise
+                finally:
+                    record(wall, timer.cpu, error)
+        
+        elif inspect.isgeneratorfunction(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                timer = _StepTimer()
+                error = True
+                try:
+                    result = yield from timer.iterate(func(*args, **kwargs))
+                    error = False
+                    return result
+                except GeneratorExit:
+                    error = False
+                    raise
+                finally:
+                    record(timer.wall, timer.cpu, error)
+        
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                frame = _allocation_start() if allocation_sample_rate > 0 and random.random() < allocation_sample_rate else None
+                wall_start, cpu_start = time.perf_counter(), time.thread_time()
+                error = True
+                try:
+                    result = func(*args, **kwargs)
+                    error = False
+                    return result
+                finally:
+                    wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+                    record(wall, cpu, error, _allocation_stop(frame) if frame is not None else None)
+        
         return wrapper
     return decorator
 
@@ -310,14 +1595,27 @@ class OptimizationManager:
     
     def __init__(self):
         """تهيئة الفئة"""
-        self.cache_manager = CacheManager()
+        self.cache_manager = get_cache_manager()
         self.performance_monitor = PerformanceMonitor()
         logger.info("تهيئة مدير تحسين الأداء")
     
+    def _timed_loader(self, data_loader: Callable, key: str, *args, **kwargs) -> Callable[[], Any]:
+        """إنشاء دالة تحميل بدون معلمات تقيس مدة التحميل"""
+        def load():
+            self.performance_monitor.start_timer(key)
+            data = data_loader(*args, **kwargs)
+            duration = self.performance_monitor.stop_timer(key)
+            _cache_load_latency.observe(duration, namespace=MemoryCache.namespace_of(key))
+            logger.debug(f"مدة تحميل البيانات {key}: {duration:.4f} ثانية")
+            return data
+        return load
+    
     def optimize_data_loading(self, data_loader: Callable, key: str, expiry: int = 3600, *args, **kwargs) -> Any:
         """
         تحسين تحميل البيانات باستخدام التخزين المؤقت
         
+        بعد انتهاء الصلاحية وخلال مدة السماح (CACHE_STALE_GRACE) تُعاد القيمة القديمة فوراً ويتم تحديثها في الخلفية.
+        
         المعلمات:
             data_loader (Callable): دالة تحميل البيانات
             key (str): مفتاح التخزين المؤقت
@@ -328,28 +1626,16 @@ class OptimizationManager:
         العائد:
             Any: البيانات المحملة
         """
-        # محاولة الحصول على البيانات من التخزين المؤقت
-        cached_data = self.cache_manager.get(key)
-        if cached_data is not None:
-            logger.debug(f"تم الحصول على البيانات من التخزين المؤقت: {key}")
-            return cached_data
-        
-        # تحميل البيانات
-        self.performance_monitor.start_timer(key)
-        data = data_loader(*args, **kwargs)
-        duration = self.performance_monitor.stop_timer(key)
-        logger.debug(f"مدة تحميل البيانات {key}: {duration:.4f} ثانية")
-        
-        # تخزين البيانات في التخزين المؤقت
-        self.cache_manager.set(key, data, expiry)
-        logger.debug(f"تم تخزين البيانات في التخزين المؤقت: {key}")
-        
-        return data
+        loader = self._timed_loader(data_loader, key, *args, **kwargs)
+        return self.cache_manager.get_or_refresh(key, loader, expiry)
     
     def optimize_dataframe_loading(self, data_loader: Callable, key: str, expiry: int = 3600, *args, **kwargs) -> pd.DataFrame:
         """
         تحسين تحميل DataFrame باستخدام التخزين المؤقت
         
+        بعد انتهاء الصلاحية وخلال مدة السماح (CACHE_STALE_GRACE) يُعاد DataFrame القديم فوراً مع
+        attrs["cache_stale"] ويتم تحديثه في الخلفية.
+        
         المعلمات:
             data_loader (Callable): دالة تحميل البيانات
             key (str): مفتاح التخزين المؤقت
@@ -360,23 +1646,8 @@ class OptimizationManager:
         العائد:
             pd.DataFrame: DataFrame المحمل
         """
-        # محاولة الحصول على البيانات من التخزين المؤقت
-        cached_df = self.cache_manager.get_dataframe(key)
-        if cached_df is not None:
-            logger.debug(f"تم الحصول على DataFrame من التخزين المؤقت: {key}")
-            return cached_df
-        
-        # تحميل البيانات
-        self.performance_monitor.start_timer(key)
-        df = data_loader(*args, **kwargs)
-        duration = self.performance_monitor.stop_timer(key)
-        logger.debug(f"مدة تحميل DataFrame {key}: {duration:.4f} ثانية")
-        
-        # تخزين البيانات في التخزين المؤقت
-        self.cache_manager.set_dataframe(key, df, expiry)
-        logger.debug(f"تم تخزين DataFrame في التخزين المؤقت: {key}")
-        
-        return df
+        loader = self._timed_loader(data_loader, key, *args, **kwargs)
+        return self.cache_manager.get_or_refresh(key, loader, expiry, dataframe=True)
     
     def get_performance_metrics(self) -> Dict:
         """
@@ -0,0 +1,347 @@
+"""
+وحدة تحليل الأداء بأخذ العينات لمشروع SEBA
+توفر هذه الوحدة محللاً منخفض التكلفة يأخذ عينات من مكدسات الخيوط أثناء معالجة الطلبات المطابقة لمسار معين،
+لعدد محدد من الطلبات أو لمدة محددة، ويحفظ النتيجة بصيغة المكدسات المطوية (collapsed stacks) المتوافقة مع flamegraph
+"""
+
+import os
+import re
+import sys
+import time
+import uuid
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+
+def _project_root() -> str:
+    """المجلد الذي يحتوي على حزمة seba"""
+    package = sys.modules.get(__name__.split(".")[0])
+    path = getattr(package, "__file__", None) or __file__
+    return os.path.dirname(os.path.dirname(os.path.abspath(path)))
+
+
+# جذر المشروع: المكدسات التي لا تمر بملفات المشروع (خيوط خاملة أو حلقة الأحداث) لا تُسجل
+PROJECT_ROOT = os.getenv("PROFILER_ROOT") or _project_root()
+
+MAX_STACK_DEPTH = 128
+
+# الخيوط المنتظرة في هذه الإطارات خاملة (مثل حلقات الخلفية التي تنتظر Event أو طابوراً) ولا تُسجل
+IDLE_FRAMES = {("threading.py", "wait")}
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_CANCELLED = "cancelled"
+
+
+def route_pattern(route: Optional[str]) -> Optional[re.Pattern]:
+    """
+    تحويل قالب مسار (مثل /stocks/{symbol}) إلى تعبير منتظم لمطابقة مسارات الطلبات
+    
+    المعلمات:
+        route (str): قالب المسار، أو None لمطابقة جميع الطلبات
+    
+    العائد:
+        re.Pattern: التعبير المنتظم، أو None
+    """
+    if not route:
+        return None
+    parts = re.split(r"(\{[^}]+\})", route.rstrip("/") or "/")
+    return re.compile("^" + "".join("[^/]+" if part.startswith("{") else re.escape(part) for part in parts) + "/?$")
+
+
+class SamplingProfiler:
+    """فئة لالتقاط عينات مكدسات الخيوط أثناء معالجة الطلبات المطابقة"""
+    
+    def __init__(
+        self,
+        interval_ms: Optional[float] = None,
+        max_seconds: Optional[float] = None,
+        output_dir: Optional[str] = None,
+        history_size: Optional[int] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            interval_ms (float, optional): الفاصل الافتراضي بين العينات بالمللي ثانية. إذا لم يتم تحديده، سيتم استخدام PROFILER_INTERVAL_MS من متغيرات البيئة.
+            max_seconds (float, optional): الحد الأقصى لمدة الالتقاط. إذا لم يتم تحديده، سيتم استخدام PROFILER_MAX_SECONDS من متغيرات البيئة.
+            output_dir (str, optional): مجلد حفظ ملفات المكدسات المطوية. إذا لم يتم تحديده، سيتم استخدام PROFILER_DIR من متغيرات البيئة.
+            history_size (int, optional): عدد عمليات الالتقاط المحتفظ بها في الذاكرة
+        """
+        self.interval_ms = interval_ms if interval_ms is not None else float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+        self.max_seconds = max_seconds if max_seconds is not None else float(os.getenv("PROFILER_MAX_SECONDS", "300"))
+        self.output_dir = output_dir or os.getenv("PROFILER_DIR", "data/profiles")
+        history_size = history_size if history_size is not None else int(os.getenv("PROFILER_HISTORY", "20"))
+        self._captures = deque(maxlen=history_size)
+        self._active = None
+        self._pattern = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start_capture(
+        self,
+        route: Optional[str] = None,
+        requests: Optional[int] = None,
+        seconds: Optional[float] = None,
+        interval_ms: Optional[float] = None
+    ) -> Dict:
+        """
+        بدء التقاط لعدد من الطلبات التالية أو لمدة محددة
+        
+        المعلمات:
+            route (str, optional): قالب المسار (مثل /screen). إذا لم يتم تحديده، سيتم التقاط جميع الطلبات.
+            requests (int, optional): عدد الطلبات المطابقة التي ينتهي بعدها الالتقاط
+            seconds (float, optional): مدة الالتقاط بالثواني (بحد أقصى max_seconds، وهي الافتراضية إذا لم يتم تحديد عدد الطلبات)
+            interval_ms (float, optional): الفاصل بين العينات بالمللي ثانية
+        
+        العائد:
+            Dict: ملخص عملية الالتقاط
+        """
+        if requests is not None and requests < 1:
+            raise ValueError("عدد الطلبات يجب أن يكون 1 على الأقل")
+        seconds = min(seconds if seconds is not None else self.max_seconds, self.max_seconds)
+        if seconds <= 0:
+            raise ValueError("مدة الالتقاط يجب أن تكون أكبر من صفر")
+        
+        with self._lock:
+            if self._active is not None:
+                raise ValueError(f"يوجد التقاط قيد التشغيل بالفعل: {self._active['id']}")
+            
+            capture = {
+                "id": uuid.uuid4().hex[:12],
+                "route": route,
+                "max_requests": requests,
+                "seconds": seconds,
+                "interval_ms": interval_ms or self.interval_ms,
+                "status": STATUS_RUNNING,
+                "started_at": datetime.now().isoformat(),
+                "ended_at": None,
+                "requests": 0,
+                "samples": 0,
+                "file": None,
+                "stacks": Counter(),
+                "deadline": time.monotonic() + seconds
+            }
+            self._active = capture
+            self._pattern = route_pattern(route)
+            self._in_flight = 0
+            self._captures.append(capture)
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, args=(capture,), name="seba-profiler", daemon=True)
+            self._thread.start()
+        
+        logger.info(f"بدء التقاط تحليل الأداء {capture['id']} للمسار {route or '*'} (الطلبات: {requests}، المدة: {seconds} ثانية)")
+        return self.summary(capture)
+    
+    def stop_capture(self) -> Optional[Dict]:
+        """
+        إيقاف عملية الالتقاط الحالية
+        
+        العائد:
+            Dict: ملخص عملية الالتقاط، أو None إذا لم يكن هناك التقاط قيد التشغيل
+        """
+        with self._lock:
+            capture = self._active
+        if capture is None:
+            return None
+        self._finish(capture, STATUS_CANCELLED)
+        return self.summary(capture)
+    
+    def request_started(self, path: str) -> bool:
+        """
+        تسجيل بدء طلب (يُستدعى من middleware)
+        
+        المعلمات:
+            path (str): مسار الطلب
+        
+        العائد:
+            bool: True إذا كان الطلب مشمولاً بالالتقاط الحالي (يجب تمريره إلى request_finished)
+        """
+        if self._active is None:
+            return False
+        with self._lock:
+            if self._active is None or (self._pattern is not None and not self._pattern.match(path)):
+                return False
+            self._in_flight += 1
+            return True
+    
+    def request_finished(self, tracked: bool) -> None:
+        """
+        تسجيل انتهاء طلب
+        
+        المعلمات:
+            tracked (bool): القيمة المعادة من request_started
+        """
+        if not tracked:
+            return
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            capture = self._active
+            if capture is None:
+                return
+            capture["requests"] += 1
+            done = capture["max_requests"] is not None and capture["requests"] >= capture["max_requests"]
+        if done:
+            self._finish(capture, STATUS_DONE)
+    
+    def _run(self, capture: Dict) -> None:
+        """حلقة أخذ العينات حتى انتهاء المدة أو إيقاف الالتقاط"""
+        interval = capture["interval_ms"] / 1000
+        own_thread = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(interval) and capture["status"] == STATUS_RUNNING:
+            if time.monotonic() >= capture["deadline"]:
+                self._finish(capture, STATUS_DONE)
+                return
+            if not self._in_flight:
+                continue
+            
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            samples = Counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = self._collapse(frame)
+                if stack:
+                    samples[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+            
+            with self._lock:
+                capture["stacks"].update(samples)
+                capture["samples"] += sum(samples.values())
+    
+    @staticmethod
+    def _collapse(frame: Any) -> Optional[str]:
+        """تحويل مكدس خيط إلى سطر مطوي (من الجذر إلى الإطار الحالي)، أو None إذا كان خاملاً أو لم يمر بملفات المشروع"""
+        if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+            return None
+        
+        frames = []
+        in_project = False
+        while frame is not None and len(frames) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            in_project = in_project or (code.co_filename.startswith(PROJECT_ROOT) and "site-packages" not in code.co_filename)
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)})".replace(";", ":"))
+            frame = frame.f_back
+        if not in_project:
+            return None
+        return ";".join(reversed(frames))
+    
+    def _finish(self, capture: Dict, status: str) -> None:
+        """إنهاء عملية الالتقاط وحفظ ملف المكدسات المطوية"""
+        with self._lock:
+            if capture["status"] != STATUS_RUNNING:
+                return
+            capture["status"] = status
+            capture["ended_at"] = datetime.now().isoformat()
+            if self._active is capture:
+                self._active = None
+                self._pattern = None
+                self._in_flight = 0
+                self._stop_event.set()
+        
+        # حفظ الملف بعد انتهاء الالتقاط حتى يمكن تحميله لاحقاً بعد خروجه من الذاكرة
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"{capture['id']}.folded")
+            with open(path, "w", encoding="utf-8") as output:
+                output.write(self.collapsed(capture))
+            capture["file"] = path
+        except OSError as e:
+            logger.error(f"خطأ في حفظ ملف تحليل الأداء {capture['id']}: {str(e)}")
+        
+        logger.info(f"انتهاء التقاط تحليل الأداء {capture['id']} ({status}): {capture['requests']} طلب، {capture['samples']} عينة")
+    
+    def _stacks(self, capture: Dict) -> Dict[str, int]:
+        """نسخة من مكدسات عملية التقاط (قد تكون قيد التشغيل)"""
+        with self._lock:
+            return dict(capture["stacks"])
+    
+    def collapsed(self, capture: Dict) -> str:
+        """
+        المكدسات المطوية لعملية التقاط (سطر لكل مكدس متبوعاً بعدد العينات) للاستخدام مع flamegraph.pl أو speedscope
+        
+        المعلمات:
+            capture (Dict): عملية الالتقاط
+        
+        العائد:
+            str: النص
+        """
+        stacks = sorted(self._stacks(capture).items())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+    
+    def top_functions(self, capture: Dict, limit: int = 20) -> List[Dict]:
+        """
+        الدوال الأكثر ظهوراً في العينات
+        
+        المعلمات:
+            capture (Dict): عملية الالتقاط
+            limit (int, optional): الحد الأقصى لعدد الدوال
+        
+        العائد:
+            List[Dict]: لكل دالة عدد العينات التي كانت فيها الإطار الحالي (self) أو ضمن المكدس (total)
+        """
+        own = Counter()
+        total = Counter()
+        for stack, count in self._stacks(capture).items():
+            frames = stack.split(";")[1:]
+            own[frames[-1]] += count
+            for function in set(frames):
+                total[function] += count
+        
+        samples = capture["samples"] or 1
+        return [
+            {
+                "function": function,
+                "self": own[function],
+                "total": count,
+                "self_percent": round(100 * own[function] / samples, 2),
+                "total_percent": round(100 * count / samples, 2)
+            }
+            for function, count in sorted(total.items(), key=lambda item: (-own[item[0]], -item[1]))[:limit]
+        ]
+    
+    @staticmethod
+    def summary(capture: Dict) -> Dict:
+        """
+        ملخص عملية التقاط بدون المكدسات
+        
+        المعلمات:
+            capture (Dict): عملية الالتقاط
+        
+        العائد:
+            Dict: الملخص
+        """
+        return {key: value for key, value in capture.items() if key not in ("stacks", "deadline")}
+    
+    def get_capture(self, capture_id: str) -> Optional[Dict]:
+        """
+        الحصول على عملية التقاط
+        
+        المعلمات:
+            capture_id (str): المعرف
+        
+        العائد:
+            Dict: عملية الالتقاط، أو None إذا لم يتم العثور عليها
+        """
+        with self._lock:
+            return next((capture for capture in self._captures if capture["id"] == capture_id), None)
+    
+    def list_captures(self) -> List[Dict]:
+        """
+        الحصول على ملخصات عمليات الالتقاط المحتفظ بها (الأحدث أولاً)
+        
+        العائد:
+            List[Dict]: الملخصات
+        """
+        with self._lock:
+            captures = list(self._captures)
+        return [self.summary(capture) for capture in reversed(captures)]
@@ -0,0 +1,353 @@
+"""
+وحدة مراقبة صحة مصادر البيانات
+توفر هذه الوحدة إحصائيات متجددة لكل مصدر بيانات (زمن الاستجابة، نسبة الأخطاء،
+أحداث تقييد المعدل، تأخر حداثة البيانات) وقواطع دائرة لتجاوز المصادر المتعثرة
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# حدود فئات مدرج زمن الاستجابة بالثواني
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf")]
+
+
+class ProviderUnavailableError(Exception):
+    """استثناء عند عدم توفر أي مصدر بيانات (جميع قواطع الدائرة مفتوحة)"""
+
+
+class ProviderStats:
+    """فئة لحفظ الإحصائيات المتجددة لمصدر بيانات واحد"""
+    
+    def __init__(self, window: int = 300):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            window (int, optional): النافذة الزمنية للإحصائيات بالثواني
+        """
+        self.window = window
+        self.samples = deque()  # (الوقت، زمن الاستجابة، نجاح، تقييد المعدل)
+        self.freshness_lags = deque()  # (الوقت، تأخر الحداثة بالثواني)
+    
+    def _prune(self, current_time: float) -> None:
+        """إزالة العينات الأقدم من النافذة الزمنية"""
+        while self.samples and current_time - self.samples[0][0] > self.window:
+            self.samples.popleft()
+        while self.freshness_lags and current_time - self.freshness_lags[0][0] > self.window:
+            self.freshness_lags.popleft()
+    
+    def record(self, latency: float, success: bool, throttled: bool = False, freshness_lag: Optional[float] = None) -> None:
+        """
+        تسجيل نتيجة طلب
+        
+        المعلمات:
+            latency (float): زمن الاستجابة بالثواني
+            success (bool): ما إذا كان الطلب ناجحاً
+            throttled (bool, optional): ما إذا رفض المصدر الطلب بسبب تقييد المعدل
+            freshness_lag (float, optional): الفارق بالثواني بين الآن وأحدث نقطة بيانات
+        """
+        current_time = time.monotonic()
+        self.samples.append((current_time, latency, success, throttled))
+        if freshness_lag is not None:
+            self.freshness_lags.append((current_time, freshness_lag))
+        self._prune(current_time)
+    
+    def count(self) -> int:
+        """عدد العينات ضمن النافذة الزمنية"""
+        self._prune(time.monotonic())
+        return len(self.samples)
+    
+    def error_rate(self) -> float:
+        """نسبة الطلبات الفاشلة ضمن النافذة الزمنية"""
+        self._prune(time.monotonic())
+        if not self.samples:
+            return 0.0
+        return sum(1 for sample in self.samples if not sample[2]) / len(self.samples)
+    
+    def throttle_events(self) -> int:
+        """عدد أحداث تقييد المعدل ضمن النافذة الزمنية"""
+        self._prune(time.monotonic())
+        return sum(1 for sample in self.samples if sample[3])
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """
+        حساب نسبة مئوية لزمن الاستجابة
+        
+        المعلمات:
+            percentile (float): النسبة المئوية (0-100)
+        
+        العائد:
+            float: زمن الاستجابة بالثواني، أو None إذا لم تتوفر عينات
+        """
+        self._prune(time.monotonic())
+        if not self.samples:
+            return None
+        latencies = sorted(sample[1] for sample in self.samples)
+        index = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+        return latencies[index]
+    
+    def latency_histogram(self) -> Dict[str, int]:
+        """مدرج زمن الاستجابة حسب الفئات المحددة في LATENCY_BUCKETS"""
+        self._prune(time.monotonic())
+        histogram = {str(bucket): 0 for bucket in LATENCY_BUCKETS}
+        for sample in self.samples:
+            for bucket in LATENCY_BUCKETS:
+                if sample[1] <= bucket:
+                    histogram[str(bucket)] += 1
+                    break
+        return histogram
+    
+    def freshness_lag(self) -> Optional[float]:
+        """متوسط تأخر حداثة البيانات بالثواني"""
+        self._prune(time.monotonic())
+        if not self.freshness_lags:
+            return None
+        return sum(lag for _, lag in self.freshness_lags) / len(self.freshness_lags)
+
+
+class CircuitBreaker:
+    """قاطع دائرة لتجاوز مصدر بيانات متعثر خلال فترة تهدئة"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, cool_down: int = 60):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            failure_threshold (int, optional): عدد الإخفاقات المتتالية لفتح القاطع
+            cool_down (int, optional): فترة التهدئة بالثواني قبل السماح بطلب تجريبي
+        """
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+    
+    def allow_request(self) -> bool:
+        """
+        التحقق مما إذا كان مسموحاً بإرسال طلب إلى المصدر
+        
+        بعد انتهاء فترة التهدئة يُسمح بطلب تجريبي واحد، وتُرفض بقية الطلبات حتى تُسجل نتيجته
+        (أو تنقضي فترة تهدئة أخرى دون نتيجة فيُسمح بطلب تجريبي جديد).
+        
+        العائد:
+            bool: True إذا كان الطلب مسموحاً به، False خلاف ذلك
+        """
+        current_time = time.monotonic()
+        if self.state == self.OPEN:
+            if current_time - self.opened_at >= self.cool_down:
+                # السماح بطلب تجريبي واحد بعد انتهاء فترة التهدئة
+                self.state = self.HALF_OPEN
+                self.probe_started_at = current_time
+                return True
+            return False
+        if self.state == self.HALF_OPEN:
+            if current_time - self.probe_started_at >= self.cool_down:
+                self.probe_started_at = current_time
+                return True
+            return False
+        return True
+    
+    def is_open(self) -> bool:
+        """التحقق مما إذا كان القاطع مفتوحاً دون تغيير حالته"""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.cool_down
+    
+    def record_success(self) -> None:
+        """تسجيل طلب ناجح وإغلاق القاطع"""
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self.opened_at = None
+    
+    def record_failure(self) -> bool:
+        """
+        تسجيل طلب فاشل
+        
+        العائد:
+            bool: True إذا أدى الفشل إلى فتح القاطع
+        """
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            was_open = self.state == self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            return not was_open
+        return False
+
+
+class ProviderHealthMonitor:
+    """فئة لمراقبة صحة مصادر البيانات واختيار المصدر الأفضل لكل نوع بيانات"""
+    
+    def __init__(
+        self,
+        window: int = 300,
+        failure_threshold: int = 5,
+        cool_down: int = 60,
+        min_samples: int = 5,
+        default_latency: float = 1.0
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            window (int, optional): النافذة الزمنية للإحصائيات بالثواني
+            failure_threshold (int, optional): عدد الإخفاقات المتتالية لفتح قاطع الدائرة
+            cool_down (int, optional): فترة التهدئة بالثواني
+            min_samples (int, optional): الحد الأدنى للعينات قبل الاعتماد على إحصائيات المصدر
+            default_latency (float, optional): زمن الاستجابة المفترض لمصدر بلا عينات كافية
+        """
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self.min_samples = min_samples
+        self.default_latency = default_latency
+        self.stats: Dict[str, ProviderStats] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        logger.info("تهيئة مراقب صحة مصادر البيانات")
+    
+    def _get(self, provider: str):
+        """الحصول على إحصائيات وقاطع المصدر، وإنشاؤهما إذا لم يكونا موجودين"""
+        if provider not in self.stats:
+            self.stats[provider] = ProviderStats(self.window)
+            self.breakers[provider] = CircuitBreaker(self.failure_threshold, self.cool_down)
+        return self.stats[provider], self.breakers[provider]
+    
+    def record_success(self, provider: str, latency: float, freshness_lag: Optional[float] = None) -> None:
+        """
+        تسجيل طلب ناجح
+        
+        المعلمات:
+            provider (str): اسم المصدر
+            latency (float): زمن الاستجابة بالثواني
+            freshness_lag (float, optional): تأخر حداثة البيانات بالثواني
+        """
+        with self._lock:
+            stats, breaker = self._get(provider)
+            stats.record(latency, True, freshness_lag=freshness_lag)
+            breaker.record_success()
+    
+    def record_failure(self, provider: str, latency: float, throttled: bool = False) -> None:
+        """
+        تسجيل طلب فاشل
+        
+        المعلمات:
+            provider (str): اسم المصدر
+            latency (float): زمن الاستجابة بالثواني
+            throttled (bool, optional): ما إذا كان الفشل بسبب تقييد المعدل
+        """
+        with self._lock:
+            stats, breaker = self._get(provider)
+            stats.record(latency, False, throttled=throttled)
+            if breaker.record_failure():
+                logger.warning(f"تم فتح قاطع الدائرة للمصدر {provider} لمدة {breaker.cool_down} ثانية")
+    
+    def allow_request(self, provider: str) -> bool:
+        """
+        التحقق مما إذا كان مسموحاً بإرسال طلب إلى المصدر، مع حجز الطلب التجريبي بعد فترة التهدئة
+        
+        المعلمات:
+            provider (str): اسم المصدر
+        
+        العائد:
+            bool: True إذا كان الطلب مسموحاً به
+        """
+        with self._lock:
+            _, breaker = self._get(provider)
+            return breaker.allow_request()
+    
+    def is_available(self, provider: str) -> bool:
+        """
+        التحقق مما إذا كان المصدر متاحاً (قاطع الدائرة غير مفتوح) دون تغيير حالة القاطع
+        
+        المعلمات:
+            provider (str): اسم المصدر
+        
+        العائد:
+            bool: True إذا كان المصدر متاحاً
+        """
+        with self._lock:
+            _, breaker = self._get(provider)
+            return not breaker.is_open()
+    
+    def is_degraded(self, provider: str, max_error_rate: float = 0.5) -> bool:
+        """
+        التحقق مما إذا كانت نسبة أخطاء المصدر الحديثة مرتفعة (عطل عام وليس خطأ خاصاً بطلب معين)
+        
+        المعلمات:
+            provider (str): اسم المصدر
+            max_error_rate (float, optional): نسبة الأخطاء التي يعتبر المصدر بعدها متعثراً
+        
+        العائد:
+            bool: True إذا كان القاطع مفتوحاً أو تجاوزت نسبة الأخطاء الحد مع عينات كافية
+        """
+        with self._lock:
+            stats, breaker = self._get(provider)
+            if breaker.is_open():
+                return True
+            return stats.count() >= self.min_samples and stats.error_rate() >= max_error_rate
+    
+    def score(self, provider: str) -> float:
+        """
+        حساب درجة المصدر (الأقل هو الأفضل)
+        
+        تعتمد الدرجة على p95 لزمن الاستجابة مضروباً في عقوبة نسبة الأخطاء وأحداث تقييد المعدل.
+        
+        المعلمات:
+            provider (str): اسم المصدر
+        
+        العائد:
+            float: درجة المصدر
+        """
+        with self._lock:
+            stats, _ = self._get(provider)
+            if stats.count() < self.min_samples:
+                return self.default_latency
+            p95 = stats.latency_percentile(95) or self.default_latency
+            penalty = 1 + 4 * stats.error_rate() + 0.5 * stats.throttle_events()
+            return p95 * penalty
+    
+    def rank_providers(self, candidates: List[str]) -> List[str]:
+        """
+        ترتيب المصادر المرشحة من الأفضل إلى الأسوأ مع استبعاد المصادر ذات القاطع المفتوح
+        
+        المعلمات:
+            candidates (List[str]): المصادر المرشحة بترتيب الأفضلية الافتراضي
+        
+        العائد:
+            List[str]: المصادر المتاحة مرتبة حسب الدرجة
+        """
+        with self._lock:
+            available = [provider for provider in candidates if not self._get(provider)[1].is_open()]
+        return sorted(available, key=lambda provider: (self.score(provider), candidates.index(provider)))
+    
+    def get_snapshot(self) -> Dict[str, Dict]:
+        """
+        الحصول على لقطة لصحة جميع المصادر
+        
+        العائد:
+            Dict[str, Dict]: إحصائيات كل مصدر
+        """
+        with self._lock:
+            return {
+                provider: {
+                    "samples": stats.count(),
+                    "error_rate": stats.error_rate(),
+                    "throttle_events": stats.throttle_events(),
+                    "latency_p50": stats.latency_percentile(50),
+                    "latency_p95": stats.latency_percentile(95),
+                    "latency_histogram": stats.latency_histogram(),
+                    "freshness_lag": stats.freshness_lag(),
+                    "circuit_state": self.breakers[provider].state
+                }
+                for provider, stats in self.stats.items()
+            }
@@ -0,0 +1,341 @@
+"""
+وحدة تسجيل وإعادة تشغيل ردود مصادر البيانات لمشروع SEBA
+توفر هذه الوحدة تسجيل نتائج مصادر البيانات الحقيقية (Yahoo Finance, Alpha Vantage, IEX Cloud) على القرص
+وبديلاً محلياً يعيد تشغيلها مع زمن استجابة وأخطاء قابلة للضبط، لتشغيل اختبارات الأداء والحمل دون اتصال بالشبكة
+"""
+
+import os
+import json
+import time
+import pickle
+import random
+import inspect
+import functools
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+import pandas as pd
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# أوضاع تشغيل المصادر
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# المصادر التي يمكن تسجيلها وإعادة تشغيلها في مدير تكامل البيانات
+PROVIDER_ATTRIBUTES = ("yahoo_finance", "alpha_vantage", "iex_cloud")
+
+
+class ReplayError(Exception):
+    """خطأ مُحقن أثناء إعادة التشغيل لمحاكاة فشل المصدر"""
+    pass
+
+
+class RecordingStore:
+    """فئة لحفظ التسجيلات على القرص وقراءتها"""
+    
+    def __init__(self, directory: str):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            directory (str): مجلد التسجيلات
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _symbol_of(arguments: Dict[str, Any]) -> str:
+        """استخراج رمز السهم من معلمات الاستدعاء لاستخدامه في مسار التسجيل"""
+        symbol = arguments.get("symbol") or arguments.get("keywords") or arguments.get("query")
+        if symbol is None and arguments.get("symbols"):
+            symbol = "+".join(sorted(arguments["symbols"]))[:100]
+        return "".join(c if c.isalnum() else "_" for c in str(symbol)) if symbol else "_"
+    
+    @staticmethod
+    def _digest(arguments: Dict[str, Any]) -> str:
+        """إنشاء بصمة ثابتة لمعلمات الاستدعاء"""
+        serialized = json.dumps(arguments, sort_keys=True, default=str)
+        return hashlib.md5(serialized.encode()).hexdigest()
+    
+    def path_for(self, provider: str, method: str, arguments: Dict[str, Any]) -> str:
+        """
+        الحصول على مسار ملف التسجيل لاستدعاء معين
+        
+        المعلمات:
+            provider (str): اسم المصدر
+            method (str): اسم الدالة
+            arguments (Dict[str, Any]): معلمات الاستدعاء
+        
+        العائد:
+            str: مسار الملف
+        """
+        return os.path.join(
+            self.directory, provider, method, self._symbol_of(arguments), f"{self._digest(arguments)}.pkl"
+        )
+    
+    def save(self, provider: str, method: str, arguments: Dict[str, Any], result: Any) -> str:
+        """
+        حفظ نتيجة استدعاء على القرص
+        
+        المعلمات:
+            provider (str): اسم المصدر
+            method (str): اسم الدالة
+            arguments (Dict[str, Any]): معلمات الاستدعاء
+            result (Any): النتيجة
+        
+        العائد:
+            str: مسار الملف
+        """
+        path = self.path_for(provider, method, arguments)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {"arguments": arguments, "result": result, "recorded_at": time.time()}
+        
+        # الكتابة إلى ملف مؤقت ثم استبداله حتى لا يقرأ مشغل آخر ملفاً ناقصاً
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        return path
+    
+    def load(self, provider: str, method: str, arguments: Dict[str, Any], fallback: bool = True) -> Tuple[bool, Any]:
+        """
+        قراءة نتيجة استدعاء مسجلة
+        
+        إذا لم يوجد تسجيل مطابق تماماً وكان fallback مفعلاً، يُستخدم أي تسجيل لنفس الدالة والرمز
+        (مفيد عندما تتغير التواريخ النسبية بين التسجيل وإعادة التشغيل).
+        
+        المعلمات:
+            provider (str): اسم المصدر
+            method (str): اسم الدالة
+            arguments (Dict[str, Any]): معلمات الاستدعاء
+            fallback (bool, optional): استخدام تسجيل آخر لنفس الرمز عند عدم وجود تطابق تام
+        
+        العائد:
+            Tuple[bool, Any]: (تم العثور على تسجيل، النتيجة)
+        """
+        path = self.path_for(provider, method, arguments)
+        if not os.path.exists(path) and fallback:
+            symbol_dir = os.path.dirname(path)
+            candidates = sorted(f for f in os.listdir(symbol_dir) if f.endswith(".pkl")) if os.path.isdir(symbol_dir) else []
+            path = os.path.join(symbol_dir, candidates[0]) if candidates else path
+        
+        if not os.path.exists(path):
+            return False, None
+        
+        with open(path, "rb") as f:
+            return True, pickle.load(f)["result"]
+    
+    def list_recordings(self) -> List[str]:
+        """
+        الحصول على قائمة ملفات التسجيل
+        
+        العائد:
+            List[str]: المسارات النسبية لملفات التسجيل
+        """
+        recordings = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".pkl"):
+                    recordings.append(os.path.relpath(os.path.join(root, name), self.directory))
+        return sorted(recordings)
+
+
+def _public_methods(provider_class: type) -> Dict[str, Callable]:
+    """الحصول على الدوال العامة لفئة مصدر البيانات"""
+    return {
+        name: member for name, member in inspect.getmembers(provider_class, inspect.isfunction)
+        if not name.startswith("_")
+    }
+
+
+def _bind_arguments(func: Callable, args: tuple, kwargs: dict) -> Dict[str, Any]:
+    """ربط معلمات الاستدعاء بأسمائها مع القيم الافتراضية"""
+    bound = inspect.signature(func).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    return {k: v for k, v in list(bound.arguments.items())[1:]}
+
+
+def _empty_result(func: Callable) -> Any:
+    """إنشاء نتيجة فارغة بنفس نوع العائد الذي تعيده الدالة الحقيقية عند الفشل"""
+    annotation = inspect.signature(func).return_annotation
+    if annotation is pd.DataFrame:
+        return pd.DataFrame()
+    origin = getattr(annotation, "__origin__", annotation)
+    if origin in (list, List):
+        return []
+    if origin in (dict, Dict):
+        return {}
+    return None
+
+
+class RecordingProvider:
+    """وكيل لمصدر بيانات حقيقي يسجل نتيجة كل استدعاء على القرص"""
+    
+    def __init__(self, provider: Any, name: str, store: RecordingStore):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            provider (Any): كائن المصدر الحقيقي (YahooFinanceAPI, AlphaVantageAPI, IEXCloudAPI)
+            name (str): اسم المصدر
+            store (RecordingStore): مخزن التسجيلات
+        """
+        self._provider = provider
+        self._name = name
+        self._store = store
+        self._methods = _public_methods(type(provider))
+    
+    def __getattr__(self, attribute: str) -> Any:
+        value = getattr(self._provider, attribute)
+        func = self._methods.get(attribute)
+        if func is None:
+            return value
+        
+        @functools.wraps(value)
+        def recorded(*args, **kwargs):
+            result = value(*args, **kwargs)
+            # لا تُسجل النتائج الفارغة لأن المصادر تعيدها عند الأخطاء العابرة
+            is_empty = result is None or (result.empty if isinstance(result, pd.DataFrame) else not result)
+            if not is_empty:
+                self._store.save(self._name, attribute, _bind_arguments(func, args, kwargs), result)
+            return result
+        
+        return recorded
+
+
+class ReplayProvider:
+    """بديل محلي لمصدر بيانات يعيد النتائج المسجلة مع زمن استجابة وأخطاء قابلة للضبط"""
+    
+    def __init__(
+        self,
+        provider_class: type,
+        name: str,
+        store: RecordingStore,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_mode: str = "raise",
+        fallback: bool = True,
+        seed: Optional[int] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            provider_class (type): فئة المصدر الحقيقي (لمعرفة الدوال وأنواع العائد)
+            name (str): اسم المصدر
+            store (RecordingStore): مخزن التسجيلات
+            latency (float, optional): زمن الاستجابة الأساسي بالثواني
+            latency_jitter (float, optional): التذبذب العشوائي الأقصى المضاف لزمن الاستجابة بالثواني
+            error_rate (float, optional): نسبة الاستدعاءات التي تفشل (0-1)
+            error_mode (str, optional): طريقة الفشل (raise: رفع ReplayError بخطأ 429 كما تفعل المصادر، empty: نتيجة فارغة)
+            fallback (bool, optional): استخدام تسجيل آخر لنفس الرمز عند عدم وجود تطابق تام
+            seed (int, optional): بذرة المولد العشوائي لنتائج قابلة للتكرار
+        """
+        self._name = name
+        self._store = store
+        self._methods = _public_methods(provider_class)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_mode = error_mode
+        self.fallback = fallback
+        self.api_key = "replay"
+        self.stats = {"calls": 0, "hits": 0, "misses": 0, "errors": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def __getattr__(self, attribute: str) -> Any:
+        func = self._methods.get(attribute)
+        if func is None:
+            raise AttributeError(f"{self._name} لا يحتوي على الدالة {attribute}")
+        
+        @functools.wraps(func)
+        def replayed(*args, **kwargs):
+            return self._replay(attribute, func, args, kwargs)
+        
+        # توقيع الدالة المرتبطة (دون self) كما في المصدر الحقيقي
+        signature = inspect.signature(func)
+        replayed.__signature__ = signature.replace(parameters=list(signature.parameters.values())[1:])
+        return replayed
+    
+    def _replay(self, method: str, func: Callable, args: tuple, kwargs: dict) -> Any:
+        """إعادة تشغيل استدعاء واحد"""
+        with self._lock:
+            self.stats["calls"] += 1
+            delay = self.latency + (self._random.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0)
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+        
+        if delay > 0:
+            time.sleep(delay)
+        
+        if failed:
+            with self._lock:
+                self.stats["errors"] += 1
+            if self.error_mode == "raise":
+                raise ReplayError(f"429 Too Many Requests (محاكاة فشل {self._name}.{method})")
+            return _empty_result(func)
+        
+        found, result = self._store.load(self._name, method, _bind_arguments(func, args, kwargs), self.fallback)
+        with self._lock:
+            self.stats["hits" if found else "misses"] += 1
+        
+        if not found:
+            logger.warning(f"لا يوجد تسجيل لـ {self._name}.{method} بالمعلمات {args} {kwargs}")
+            return _empty_result(func)
+        
+        # نسخة مستقلة حتى لا يعدل المستدعي النتيجة المسجلة
+        return result.copy() if isinstance(result, pd.DataFrame) else result
+
+
+def install_provider_mode(
+    data_manager: Any,
+    mode: Optional[str] = None,
+    directory: Optional[str] = None,
+    **replay_options
+) -> str:
+    """
+    تفعيل وضع التسجيل أو إعادة التشغيل لجميع مصادر مدير تكامل البيانات
+    
+    المعلمات:
+        data_manager (DataIntegrationManager): مدير تكامل البيانات
+        mode (str, optional): الوضع (live, record, replay). إذا لم يتم تحديده، سيتم استخدام PROVIDER_MODE من متغيرات البيئة.
+        directory (str, optional): مجلد التسجيلات. إذا لم يتم تحديده، سيتم استخدام PROVIDER_RECORDINGS_DIR من متغيرات البيئة.
+        **replay_options: خيارات ReplayProvider (latency, latency_jitter, error_rate, error_mode, fallback, seed).
+            القيم غير المحددة تُقرأ من REPLAY_LATENCY و REPLAY_LATENCY_JITTER و REPLAY_ERROR_RATE و REPLAY_ERROR_MODE و REPLAY_SEED.
+    
+    العائد:
+        str: الوضع المفعل
+    """
+    mode = (mode or os.getenv("PROVIDER_MODE", MODE_LIVE)).lower()
+    if mode == MODE_LIVE:
+        return mode
+    
+    directory = directory or os.getenv("PROVIDER_RECORDINGS_DIR", "recordings")
+    store = RecordingStore(directory)
+    
+    if mode == MODE_RECORD:
+        for attribute in PROVIDER_ATTRIBUTES:
+            setattr(data_manager, attribute, RecordingProvider(getattr(data_manager, attribute), attribute, store))
+    elif mode == MODE_REPLAY:
+        replay_options.setdefault("latency", float(os.getenv("REPLAY_LATENCY", "0")))
+        replay_options.setdefault("latency_jitter", float(os.getenv("REPLAY_LATENCY_JITTER", "0")))
+        replay_options.setdefault("error_rate", float(os.getenv("REPLAY_ERROR_RATE", "0")))
+        replay_options.setdefault("error_mode", os.getenv("REPLAY_ERROR_MODE", "raise"))
+        if os.getenv("REPLAY_SEED"):
+            replay_options.setdefault("seed", int(os.getenv("REPLAY_SEED")))
+        for attribute in PROVIDER_ATTRIBUTES:
+            provider = getattr(data_manager, attribute)
+            setattr(data_manager, attribute, ReplayProvider(type(provider), attribute, store, **replay_options))
+    else:
+        logger.error(f"وضع مصادر البيانات غير معروف: {mode}")
+        return MODE_LIVE
+    
+    logger.info(f"وضع مصادر البيانات: {mode} (مجلد التسجيلات: {directory})")
+    return mode
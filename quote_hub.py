@@ -0,0 +1,328 @@
+"""
+وحدة مركز الأسعار اللحظية لمشروع SEBA
+توفر هذه الوحدة مركزاً يستطلع كل رمز مراقَب مرة واحدة في كل فترة باستخدام الطلبات المجمعة،
+ويحفظ آخر سعر في ذاكرة مشتركة ويوزع التحديثات على المشتركين داخل العملية وعملاء واجهة برمجة التطبيقات
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import itertools
+from typing import Dict, List, Optional, Any, Callable, Iterable, Tuple
+
+from seba.utils.trading_calendar import TradingCalendar
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# الحقول التي يعني تغيرها وجود تحديث جديد للسعر
+QUOTE_CHANGE_FIELDS = ("price", "volume", "day_high", "day_low")
+
+
+class QuoteSubscription:
+    """فئة تمثل اشتراكاً في تحديثات أسعار مجموعة من الرموز"""
+    
+    def __init__(self, hub: "QuoteHub", subscription_id: int, symbols: List[str], callback: Callable[[str, Dict], None]):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            hub (QuoteHub): مركز الأسعار
+            subscription_id (int): معرف الاشتراك
+            symbols (List[str]): الرموز المشترك بها
+            callback (Callable): الدالة التي تُستدعى بالرمز والسعر عند كل تحديث
+        """
+        self.hub = hub
+        self.id = subscription_id
+        self.symbols = symbols
+        self.callback = callback
+        self.active = True
+    
+    def unsubscribe(self) -> None:
+        """إلغاء الاشتراك"""
+        if self.active:
+            self.active = False
+            self.hub.unsubscribe(self)
+
+
+class QuoteHub:
+    """مركز لاستطلاع الأسعار اللحظية مرة واحدة لكل رمز وتوزيعها على المشتركين"""
+    
+    def __init__(
+        self,
+        data_manager: Any,
+        interval: Optional[float] = None,
+        off_hours_interval: Optional[float] = None,
+        source: Optional[str] = None,
+        batch_size: int = 100,
+        calendar: Optional[TradingCalendar] = None,
+        auto_start: bool = True
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            data_manager (DataIntegrationManager): مدير تكامل البيانات
+            interval (float, optional): فترة الاستطلاع بالثواني أثناء ساعات التداول. إذا لم يتم تحديدها، سيتم استخدام QUOTE_POLL_INTERVAL من متغيرات البيئة.
+            off_hours_interval (float, optional): فترة الاستطلاع بالثواني خارج ساعات التداول
+            source (str, optional): مصدر البيانات. إذا لم يتم تحديده، يختاره مدير تكامل البيانات.
+            batch_size (int, optional): الحد الأقصى لعدد الرموز في الطلب المجمع الواحد
+            calendar (TradingCalendar, optional): تقويم التداول
+            auto_start (bool, optional): بدء الاستطلاع تلقائياً عند أول اشتراك
+        """
+        self.data_manager = data_manager
+        self.interval = interval if interval is not None else float(os.getenv("QUOTE_POLL_INTERVAL", "5"))
+        self.off_hours_interval = off_hours_interval if off_hours_interval is not None else float(os.getenv("QUOTE_POLL_OFF_HOURS_INTERVAL", "60"))
+        self.source = source
+        self.batch_size = batch_size
+        self.calendar = calendar or TradingCalendar()
+        self.auto_start = auto_start
+        
+        self.latest: Dict[str, Dict] = {}
+        self.watchers: Dict[str, int] = {}
+        self.subscriptions: Dict[int, QuoteSubscription] = {}
+        self.stats = {"polls": 0, "provider_requests": 0, "updates": 0, "errors": 0}
+        
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        logger.info(f"تهيئة مركز الأسعار اللحظية (فترة الاستطلاع: {self.interval} ثانية)")
+    
+    @staticmethod
+    def normalize(symbols: Iterable[str]) -> List[str]:
+        """توحيد الرموز وإزالة التكرار مع الحفاظ على الترتيب"""
+        return list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol and symbol.strip()))
+    
+    def subscribe(self, symbols: Iterable[str], callback: Callable[[str, Dict], None]) -> QuoteSubscription:
+        """
+        الاشتراك في تحديثات أسعار مجموعة من الرموز
+        
+        يبدأ الاستطلاع عند أول اشتراك (إذا كان auto_start مفعلاً)، ويُرسل آخر سعر معروف لكل رمز فوراً.
+        
+        المعلمات:
+            symbols (Iterable[str]): الرموز
+            callback (Callable): الدالة التي تُستدعى بالرمز والسعر عند كل تحديث
+        
+        العائد:
+            QuoteSubscription: الاشتراك
+        """
+        symbols = self.normalize(symbols)
+        
+        with self._lock:
+            subscription = QuoteSubscription(self, next(self._ids), symbols, callback)
+            self.subscriptions[subscription.id] = subscription
+            new_symbols = []
+            for symbol in symbols:
+                self.watchers[symbol] = self.watchers.get(symbol, 0) + 1
+                if self.watchers[symbol] == 1:
+                    new_symbols.append(symbol)
+            known = {symbol: self.latest[symbol] for symbol in symbols if symbol in self.latest}
+        
+        for symbol, quote in known.items():
+            self._notify(subscription, symbol, quote)
+        
+        if self.auto_start:
+            self.start()
+        if new_symbols:
+            # استطلاع الرموز الجديدة دون انتظار نهاية الفترة الحالية
+            self._wake.set()
+        
+        logger.debug(f"اشتراك جديد {subscription.id} في {len(symbols)} رمز")
+        return subscription
+    
+    def subscribe_queue(
+        self,
+        symbols: Iterable[str],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        maxsize: int = 100
+    ) -> Tuple[QuoteSubscription, asyncio.Queue]:
+        """
+        الاشتراك في تحديثات الأسعار عبر طابور asyncio لعملاء واجهة برمجة التطبيقات
+        
+        إذا امتلأ الطابور لعميل بطيء، يُحذف أقدم تحديث بدلاً من حجز مركز الأسعار.
+        
+        المعلمات:
+            symbols (Iterable[str]): الرموز
+            loop (asyncio.AbstractEventLoop, optional): حلقة الأحداث. إذا لم يتم تحديدها، سيتم استخدام الحلقة الحالية.
+            maxsize (int, optional): الحد الأقصى لحجم الطابور
+        
+        العائد:
+            Tuple[QuoteSubscription, asyncio.Queue]: الاشتراك وطابور التحديثات (الرمز، السعر)
+        """
+        loop = loop or asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        
+        def put_latest(item):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(item)
+        
+        def callback(symbol: str, quote: Dict) -> None:
+            loop.call_soon_threadsafe(put_latest, (symbol, quote))
+        
+        return self.subscribe(symbols, callback), queue
+    
+    def unsubscribe(self, subscription: QuoteSubscription) -> None:
+        """
+        إلغاء اشتراك وإيقاف مراقبة الرموز التي لم يعد لها مشتركون
+        
+        المعلمات:
+            subscription (QuoteSubscription): الاشتراك
+        """
+        with self._lock:
+            if self.subscriptions.pop(subscription.id, None) is None:
+                return
+            for symbol in subscription.symbols:
+                count = self.watchers.get(symbol, 0) - 1
+                if count > 0:
+                    self.watchers[symbol] = count
+                else:
+                    # حذف آخر سعر حتى لا يُقدَّم سعر قديم لرمز لم يعد مراقباً
+                    self.watchers.pop(symbol, None)
+                    self.latest.pop(symbol, None)
+        subscription.active = False
+    
+    def get_latest(self, symbol: str) -> Optional[Dict]:
+        """
+        الحصول على آخر سعر معروف لرمز معين من الذاكرة المشتركة
+        
+        المعلمات:
+            symbol (str): رمز السهم
+        
+        العائد:
+            Dict: آخر سعر، أو None إذا لم يتم استطلاع الرمز بعد
+        """
+        return self.latest.get(symbol.strip().upper())
+    
+    def get_snapshot(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """
+        الحصول على آخر الأسعار المعروفة لعدة رموز
+        
+        المعلمات:
+            symbols (Iterable[str], optional): الرموز. إذا لم يتم تحديدها، يتم إرجاع جميع الرموز.
+        
+        العائد:
+            Dict[str, Dict]: آخر سعر لكل رمز
+        """
+        with self._lock:
+            if symbols is None:
+                return dict(self.latest)
+            return {symbol: self.latest[symbol] for symbol in self.normalize(symbols) if symbol in self.latest}
+    
+    def get_stats(self) -> Dict:
+        """
+        الحصول على إحصائيات مركز الأسعار
+        
+        العائد:
+            Dict: عدد الرموز المراقبة والمشتركين وعمليات الاستطلاع وطلبات المصدر
+        """
+        with self._lock:
+            return {
+                **self.stats,
+                "symbols": len(self.watchers),
+                "subscribers": len(self.subscriptions),
+                "running": self.is_running
+            }
+    
+    @property
+    def is_running(self) -> bool:
+        """التحقق مما إذا كان الاستطلاع يعمل"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self) -> None:
+        """بدء الاستطلاع في خيط خلفي"""
+        with self._lock:
+            if self.is_running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="seba-quote-hub", daemon=True)
+            self._thread.start()
+        logger.info("تم بدء مركز الأسعار اللحظية")
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        إيقاف الاستطلاع
+        
+        المعلمات:
+            timeout (float, optional): المهلة بالثواني لانتظار انتهاء الخيط الخلفي
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("تم إيقاف مركز الأسعار اللحظية")
+    
+    def _current_interval(self) -> float:
+        """فترة الاستطلاع الحالية حسب حالة السوق"""
+        return self.interval if self.calendar.is_market_open() else self.off_hours_interval
+    
+    def _run(self) -> None:
+        """حلقة الاستطلاع"""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"خطأ في استطلاع الأسعار اللحظية: {str(e)}")
+            
+            self._wake.wait(max(0.0, self._current_interval() - (time.monotonic() - started)))
+            self._wake.clear()
+    
+    def poll(self) -> int:
+        """
+        استطلاع جميع الرموز المراقبة مرة واحدة وتوزيع التحديثات
+        
+        العائد:
+            int: عدد الرموز التي تغير سعرها
+        """
+        with self._lock:
+            symbols = list(self.watchers)
+        
+        if not symbols:
+            return 0
+        
+        self.stats["polls"] += 1
+        updated = 0
+        for i in range(0, len(symbols), self.batch_size):
+            batch = symbols[i:i + self.batch_size]
+            self.stats["provider_requests"] += 1
+            quotes = self.data_manager.get_realtime_data_batch(batch, source=self.source) or {}
+            
+            for symbol, quote in quotes.items():
+                symbol = symbol.upper()
+                if quote and self._update(symbol, quote):
+                    updated += 1
+        
+        return updated
+    
+    def _update(self, symbol: str, quote: Dict) -> bool:
+        """تحديث آخر سعر لرمز معين وإبلاغ المشتركين إذا تغير"""
+        with self._lock:
+            # قد يُلغى آخر اشتراك في الرمز أثناء الاستطلاع، فلا يُعاد تخزين سعره بعد إزالته
+            if symbol not in self.watchers:
+                return False
+            previous = self.latest.get(symbol)
+            if previous is not None and all(previous.get(field) == quote.get(field) for field in QUOTE_CHANGE_FIELDS):
+                return False
+            self.latest[symbol] = quote
+            subscribers = [s for s in self.subscriptions.values() if symbol in s.symbols]
+        
+        self.stats["updates"] += 1
+        for subscription in subscribers:
+            self._notify(subscription, symbol, quote)
+        return True
+    
+    @staticmethod
+    def _notify(subscription: QuoteSubscription, symbol: str, quote: Dict) -> None:
+        """إرسال تحديث إلى مشترك مع عزل أخطائه عن باقي المشتركين"""
+        try:
+            subscription.callback(symbol, quote)
+        except Exception as e:
+            logger.error(f"خطأ في إرسال تحديث السعر للرمز {symbol} إلى الاشتراك {subscription.id}: {str(e)}")
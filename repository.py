@@ -8,13 +8,15 @@ from typing import List, Dict, Optional, Union, Any
 from datetime import datetime, date
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import and_, or_, desc, func
+import pandas as pd
 
 from seba.database.db_manager import DatabaseManager
 from seba.database.models import (
     Stock, HistoricalData, FundamentalData, TechnicalIndicator,
     Earnings, SEPAAnalysis, StockList, User, Alert, MarketData,
-    ChatSession, ChatMessage
+    ChatSession, ChatMessage, CorporateAction
 )
+from seba.models.corporate_actions import CorporateActionsEngine
 
 # إعداد السجل
 logger = logging.getLogger(__name__)
@@ -129,6 +131,25 @@ class StockRepository:
         finally:
             session.close()
     
+    def get_stock_list_symbols(self) -> Dict[str, List[str]]:
+        """
+        الحصول على رموز الأسهم في جميع قوائم الأسهم (قوائم النظام وقوائم المتابعة)
+        
+        العائد:
+            Dict[str, List[str]]: قاموس يربط اسم كل قائمة برموز أسهمها
+        """
+        session = self.db_manager.get_session()
+        try:
+            return {
+                stock_list.name: [stock.symbol for stock in stock_list.stocks]
+                for stock_list in session.query(StockList).all()
+            }
+        except SQLAlchemyError as e:
+            logger.error(f"خطأ في الحصول على قوائم الأسهم: {str(e)}")
+            return {}
+        finally:
+            session.close()
+    
     def search_stocks(self, search_term: str) -> List[Stock]:
         """
         البحث عن الأسهم
@@ -179,6 +200,7 @@ class StockRepository:
             session.query(TechnicalIndicator).filter(TechnicalIndicator.stock_id == stock.id).delete()
             session.query(Earnings).filter(Earnings.stock_id == stock.id).delete()
             session.query(SEPAAnalysis).filter(SEPAAnalysis.stock_id == stock.id).delete()
+            session.query(CorporateAction).filter(CorporateAction.stock_id == stock.id).delete()
             session.query(Alert).filter(Alert.stock_id == stock.id).delete()
             
             # حذف السهم
@@ -253,6 +275,11 @@ class HistoricalDataRepository:
             
             session.commit()
             logger.info(f"تمت إضافة {len(records)} سجل من البيانات التاريخية للسهم {symbol}")
+            
+            # حفظ أحداث التقسيم وتوزيعات الأرباح إذا كانت متوفرة في البيانات
+            if 'dividend' in data_df.columns or 'split_coefficient' in data_df.columns:
+                CorporateActionRepository().add_actions_from_dataframe(symbol, data_df, source)
+            
             return True
             
         except SQLAlchemyError as e:
@@ -312,6 +339,350 @@ class HistoricalDataRepository:
             return []
         finally:
             session.close()
+    
+    def get_historical_dataframe(
+        self,
+        symbol: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        adjusted: bool = False,
+        include_dividends: bool = True
+    ) -> pd.DataFrame:
+        """
+        الحصول على البيانات التاريخية لسهم معين كإطار بيانات، خاماً أو معدلاً
+        
+        تُبنى البيانات المعدلة من الأشرطة الخام المخزنة وأحداث الشركة دون الحاجة إلى تنزيلها مجدداً.
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            start_date (date, optional): تاريخ البداية
+            end_date (date, optional): تاريخ النهاية
+            adjusted (bool, optional): إرجاع بيانات OHLCV معدلة وفقاً لإجراءات الشركة
+            include_dividends (bool, optional): تضمين توزيعات الأرباح في التعديل
+        
+        العائد:
+            pd.DataFrame: إطار بيانات مرتب حسب التاريخ تصاعدياً
+        """
+        session = self.db_manager.get_session()
+        try:
+            stock = self.stock_repo.get_stock_by_symbol(symbol)
+            if not stock:
+                logger.error(f"لم يتم العثور على السهم {symbol} للحصول على البيانات التاريخية")
+                return pd.DataFrame()
+            
+            query = session.query(
+                HistoricalData.date,
+                HistoricalData.open,
+                HistoricalData.high,
+                HistoricalData.low,
+                HistoricalData.close,
+                HistoricalData.adj_close,
+                HistoricalData.volume
+            ).filter(HistoricalData.stock_id == stock.id)
+            
+            if start_date:
+                query = query.filter(HistoricalData.date >= start_date)
+            
+            if end_date:
+                query = query.filter(HistoricalData.date <= end_date)
+            
+            df = pd.DataFrame(
+                query.order_by(HistoricalData.date).all(),
+                columns=['date', 'open', 'high', 'low', 'close', 'adj_close', 'volume']
+            )
+            df['symbol'] = symbol
+            
+            if adjusted and not df.empty:
+                # الأحداث اللاحقة لنهاية النطاق تؤثر أيضاً على الأسعار المعدلة
+                actions = CorporateActionRepository().get_corporate_actions(symbol)
+                df = CorporateActionsEngine.adjust_ohlcv(df, actions, include_dividends)
+            
+            return df
+        
+        except SQLAlchemyError as e:
+            logger.error(f"خطأ في الحصول على البيانات التاريخية للسهم {symbol}: {str(e)}")
+            return pd.DataFrame()
+        finally:
+            session.close()
+    
+    def get_stored_dates(
+        self,
+        symbols: List[str],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, pd.DatetimeIndex]:
+        """
+        الحصول على تواريخ البيانات التاريخية المخزنة لعدة أسهم في استعلام واحد
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم
+            start_date (date, optional): تاريخ البداية
+            end_date (date, optional): تاريخ النهاية
+        
+        العائد:
+            Dict[str, pd.DatetimeIndex]: قاموس بالتواريخ المخزنة مرتبة تصاعدياً لكل سهم، أو None في حالة خطأ قاعدة البيانات
+        """
+        session = self.db_manager.get_session()
+        try:
+            query = session.query(Stock.symbol, HistoricalData.date).join(
+                Stock, Stock.id == HistoricalData.stock_id
+            ).filter(Stock.symbol.in_(symbols))
+            
+            if start_date:
+                query = query.filter(HistoricalData.date >= start_date)
+            
+            if end_date:
+                query = query.filter(HistoricalData.date <= end_date)
+            
+            df = pd.DataFrame(query.all(), columns=['symbol', 'date'])
+            
+            result = {symbol: pd.DatetimeIndex([]) for symbol in symbols}
+            for symbol, dates in df.groupby('symbol')['date']:
+                result[symbol] = pd.DatetimeIndex(pd.to_datetime(dates)).sort_values()
+            
+            return result
+        
+        except SQLAlchemyError as e:
+            logger.error(f"خطأ في الحصول على تواريخ البيانات التاريخية المخزنة: {str(e)}")
+            return None
+        finally:
+            session.close()
+    
+    def get_first_stored_dates(self, symbols: List[str]) -> Optional[Dict[str, date]]:
+        """
+        الحصول على تاريخ أول شريط مخزن لعدة أسهم في استعلام واحد
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم
+        
+        العائد:
+            Dict[str, date]: قاموس بتاريخ أول شريط لكل سهم له بيانات مخزنة، أو None في حالة خطأ قاعدة البيانات
+        """
+        session = self.db_manager.get_session()
+        try:
+            rows = session.query(Stock.symbol, func.min(HistoricalData.date)).join(
+                Stock, Stock.id == HistoricalData.stock_id
+            ).filter(Stock.symbol.in_(symbols)).group_by(Stock.symbol).all()
+            
+            return {symbol: pd.Timestamp(first_date).date() for symbol, first_date in rows if first_date is not None}
+        
+        except SQLAlchemyError as e:
+            logger.error(f"خطأ في الحصول على تواريخ أول البيانات التاريخية المخزنة: {str(e)}")
+            return None
+        finally:
+            session.close()
+
+class CorporateActionRepository:
+    """فئة للتعامل مع تخزين واسترجاع إجراءات الشركات وإعادة حساب الأسعار المعدلة"""
+    
+    # مصادر تعيد أسعاراً معدلة مسبقاً (yf.download يعدل الأسعار افتراضياً)، فلا يُعاد تعديل أشرطتها
+    ADJUSTED_SOURCES = ("yahoo_finance",)
+    
+    def __init__(self):
+        """تهيئة الفئة"""
+        self.db_manager = DatabaseManager()
+        self.stock_repo = StockRepository()
+    
+    def add_corporate_action(
+        self,
+        symbol: str,
+        action_date: date,
+        action_type: str,
+        value: float,
+        source: str = "manual",
+        recompute: bool = True
+    ) -> bool:
+        """
+        إضافة حدث تقسيم أو توزيع أرباح لسهم معين
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            action_date (date): تاريخ الاستحقاق
+            action_type (str): نوع الإجراء (split, dividend)
+            value (float): معامل التقسيم أو قيمة التوزيع للسهم
+            source (str, optional): مصدر البيانات
+            recompute (bool, optional): إعادة حساب سعر الإغلاق المعدل المخزن بعد الإضافة
+        
+        العائد:
+            bool: True في حالة النجاح، False في حالة الفشل
+        """
+        actions = pd.DataFrame({'date': [action_date], 'action_type': [action_type], 'value': [value]})
+        return self.add_actions(symbol, actions, source, recompute)
+    
+    def add_actions_from_dataframe(self, symbol: str, data_df: pd.DataFrame, source: str = "alpha_vantage") -> bool:
+        """
+        استخراج أحداث الشركة من البيانات الخام (عمودا dividend و split_coefficient) وحفظها
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            data_df (pd.DataFrame): إطار البيانات الخام
+            source (str, optional): مصدر البيانات
+        
+        العائد:
+            bool: True في حالة النجاح، False في حالة الفشل
+        """
+        actions = CorporateActionsEngine.extract_actions(data_df)
+        if actions.empty:
+            return True
+        return self.add_actions(symbol, actions, source)
+    
+    def add_actions(self, symbol: str, actions: pd.DataFrame, source: str = "alpha_vantage", recompute: bool = True) -> bool:
+        """
+        حفظ مجموعة من أحداث الشركة مع استبدال الأحداث المخزنة لنفس التاريخ والنوع
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            actions (pd.DataFrame): الأحداث بالأعمدة date و action_type و value
+            source (str, optional): مصدر البيانات
+            recompute (bool, optional): إعادة حساب سعر الإغلاق المعدل المخزن بعد الإضافة
+        
+        العائد:
+            bool: True في حالة النجاح، False في حالة الفشل
+        """
+        session = self.db_manager.get_session()
+        new_actions = []
+        replaced = False
+        try:
+            stock = self.stock_repo.get_stock_by_symbol(symbol)
+            if not stock:
+                logger.error(f"لم يتم العثور على السهم {symbol} لإضافة إجراءات الشركة")
+                return False
+            
+            for action in actions.itertuples(index=False):
+                action_date = pd.Timestamp(action.date).date()
+                value = float(action.value)
+                existing = session.query(CorporateAction).filter(
+                    and_(
+                        CorporateAction.stock_id == stock.id,
+                        CorporateAction.date == action_date,
+                        CorporateAction.action_type == action.action_type
+                    )
+                ).all()
+                
+                # الحدث المخزن مسبقاً بنفس القيمة مطبق على الأسعار المعدلة بالفعل
+                if existing and all(row.value == value for row in existing):
+                    continue
+                
+                replaced = replaced or bool(existing)
+                for row in existing:
+                    session.delete(row)
+                session.add(CorporateAction(
+                    stock_id=stock.id,
+                    date=action_date,
+                    action_type=action.action_type,
+                    value=value,
+                    source=source,
+                    created_at=datetime.utcnow()
+                ))
+                new_actions.append({'date': action_date, 'action_type': action.action_type, 'value': value})
+            
+            session.commit()
+            logger.info(f"تمت إضافة {len(new_actions)} حدث جديد من إجراءات الشركة للسهم {symbol}")
+        
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"خطأ في إضافة إجراءات الشركة للسهم {symbol}: {str(e)}")
+            return False
+        finally:
+            session.close()
+        
+        if not recompute or not new_actions:
+            return True
+        
+        # تغيير قيمة حدث مخزن يتطلب إعادة الحساب من الأسعار الخام، وإلا يُطبق عامل الأحداث الجديدة فقط
+        if replaced:
+            return self.recompute_adjusted_close(symbol)
+        return self.recompute_adjusted_close(symbol, pd.DataFrame(new_actions))
+    
+    def get_corporate_actions(self, symbol: str) -> pd.DataFrame:
+        """
+        الحصول على جميع أحداث الشركة لسهم معين
+        
+        المعلمات:
+            symbol (str): رمز السهم
+        
+        العائد:
+            pd.DataFrame: الأحداث بالأعمدة date و action_type و value مرتبة حسب التاريخ
+        """
+        session = self.db_manager.get_session()
+        try:
+            stock = self.stock_repo.get_stock_by_symbol(symbol)
+            if not stock:
+                return pd.DataFrame(columns=['date', 'action_type', 'value'])
+            
+            rows = session.query(
+                CorporateAction.date,
+                CorporateAction.action_type,
+                CorporateAction.value
+            ).filter(CorporateAction.stock_id == stock.id).order_by(CorporateAction.date).all()
+            
+            return pd.DataFrame(rows, columns=['date', 'action_type', 'value'])
+        
+        except SQLAlchemyError as e:
+            logger.error(f"خطأ في الحصول على إجراءات الشركة للسهم {symbol}: {str(e)}")
+            return pd.DataFrame(columns=['date', 'action_type', 'value'])
+        finally:
+            session.close()
+    
+    def recompute_adjusted_close(self, symbol: str, actions: Optional[pd.DataFrame] = None) -> bool:
+        """
+        تحديث سعر الإغلاق المعدل المخزن لسهم معين وفقاً لأحداث الشركة
+        
+        عند تحديد actions يُطبق عامل هذه الأحداث فقط على سعر الإغلاق المعدل الحالي للأشرطة التي تسبق
+        تاريخ استحقاقها. وبدونها يُعاد الحساب من الأسعار الخام بجميع الأحداث المخزنة، ويفترض ذلك أن
+        الأحداث المخزنة تغطي تاريخ السهم كاملاً. لا تُعدل أشرطة المصادر التي تعيد أسعاراً معدلة مسبقاً.
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            actions (pd.DataFrame, optional): الأحداث الجديدة بالأعمدة date و action_type و value
+        
+        العائد:
+            bool: True في حالة النجاح، False في حالة الفشل
+        """
+        session = self.db_manager.get_session()
+        try:
+            stock = self.stock_repo.get_stock_by_symbol(symbol)
+            if not stock:
+                logger.error(f"لم يتم العثور على السهم {symbol} لإعادة حساب الأسعار المعدلة")
+                return False
+            
+            bars = pd.DataFrame(
+                session.query(
+                    HistoricalData.id, HistoricalData.date, HistoricalData.close,
+                    HistoricalData.adj_close, HistoricalData.source
+                ).filter(
+                    HistoricalData.stock_id == stock.id
+                ).order_by(HistoricalData.date).all(),
+                columns=['id', 'date', 'close', 'adj_close', 'source']
+            )
+            if bars.empty:
+                return True
+            
+            # تُحسب العوامل على جميع الأشرطة (سعر الإغلاق السابق لتوزيعات الأرباح) وتُطبق على الأشرطة الخام فقط
+            if actions is None:
+                base = bars['close']
+                factors = CorporateActionsEngine.calculate_adjustment_factors(bars, self.get_corporate_actions(symbol))[0]
+            else:
+                base = bars['adj_close'].fillna(bars['close'])
+                factors = CorporateActionsEngine.calculate_adjustment_factors(bars, actions)[0]
+            
+            raw = ~bars['source'].isin(self.ADJUSTED_SOURCES)
+            bars['adj_close'] = base.astype(float) * factors
+            updates = bars.loc[raw, ['id', 'adj_close']]
+            if updates.empty:
+                return True
+            
+            session.bulk_update_mappings(HistoricalData, updates.to_dict(orient="records"))
+            session.commit()
+            logger.info(f"تمت إعادة حساب {len(updates)} سعر إغلاق معدل للسهم {symbol}")
+            return True
+        
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"خطأ في إعادة حساب الأسعار المعدلة للسهم {symbol}: {str(e)}")
+            return False
+        finally:
+            session.close()
 
 class FundamentalDataRepository:
     """فئة للتعامل مع تخزين واسترجاع البيانات الأساسية"""
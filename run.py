@@ -36,6 +36,11 @@ def main():
     parser.add_argument('--port', type=int, default=8000, help='المنفذ (الافتراضي: 8000)')
     parser.add_argument('--reload', action='store_true', help='إعادة التحميل عند تغيير الملفات')
     parser.add_argument('--debug', action='store_true', help='تشغيل في وضع التصحيح')
+    parser.add_argument('--provider-mode', type=str, choices=['live', 'record', 'replay'], help='وضع مصادر البيانات: live، أو record لتسجيل الردود، أو replay لإعادة تشغيلها دون اتصال')
+    parser.add_argument('--recordings-dir', type=str, help='مجلد تسجيلات مصادر البيانات (الافتراضي: recordings)')
+    parser.add_argument('--warmup', action='store_true', help='تسخين التخزين المؤقت والتخزين المحلي ثم الخروج دون تشغيل الخادم')
+    parser.add_argument('--warmup-on-start', action='store_true', help='تسخين التخزين المؤقت في الخلفية عند بدء الخادم')
+    parser.add_argument('--warmup-schedule', action='store_true', help='تسخين التخزين المؤقت تلقائياً قبل افتتاح كل جلسة تداول')
     args = parser.parse_args()
 
     # تعيين مستوى السجل
@@ -43,10 +48,28 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
         logger.debug('تم تفعيل وضع التصحيح')
 
+    # تمرير وضع مصادر البيانات إلى التطبيق عبر متغيرات البيئة
+    if args.provider_mode:
+        os.environ['PROVIDER_MODE'] = args.provider_mode
+    if args.recordings_dir:
+        os.environ['PROVIDER_RECORDINGS_DIR'] = args.recordings_dir
+    
+    # تسخين التخزين المؤقت كمهمة مستقلة (يسخن Redis وقاعدة البيانات، أما التخزين في ذاكرة الخادم فيُسخن بالخيارين التاليين)
+    if args.warmup:
+        from seba.data_integration.cache_warmer import CacheWarmer
+        report = CacheWarmer().run()
+        logger.info(f"تقرير تسخين التخزين المؤقت: {report}")
+        sys.exit(1 if report.get('failed') else 0)
+    if args.warmup_on_start:
+        os.environ['WARMUP_ON_STARTUP'] = 'true'
+    if args.warmup_schedule:
+        os.environ['WARMUP_SCHEDULE_ENABLED'] = 'true'
+
     # طباعة معلومات التشغيل
     logger.info(f'بدء تشغيل نظام SEBA على {args.host}:{args.port}')
     logger.info(f'إعادة التحميل: {args.reload}')
     logger.info(f'وضع التصحيح: {args.debug}')
+    logger.info(f"وضع مصادر البيانات: {os.getenv('PROVIDER_MODE', 'live')}")
 
     # تشغيل التطبيق
     try:
@@ -0,0 +1,375 @@
+"""
+وحدة اكتشاف الفجوات وتعبئتها لمشروع SEBA
+توفر هذه الوحدة مقارنة تواريخ البيانات التاريخية المخزنة بتقويم التداول لاكتشاف الأشرطة المفقودة،
+وتجميع الفجوات في أقل عدد من طلبات المصادر، وتعبئتها دون المساس بالبيانات الموجودة، وتقرير تغطية للأسهم
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Union, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from seba.data_integration.data_manager import DataIntegrationManager
+from seba.database.repository import HistoricalDataRepository
+from seba.utils.trading_calendar import TradingCalendar
+from seba.utils.security import RateLimiter
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+
+def _missing_runs(stored_dates: pd.DatetimeIndex, expected_dates: pd.DatetimeIndex) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    حساب مواقع أيام التداول المفقودة وبدايات ونهايات سلاسلها المتتالية في فهرس الأيام المتوقعة
+    
+    العائد:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: مواقع الأيام المفقودة، بدايات السلاسل، نهايات السلاسل
+    """
+    missing = np.flatnonzero(~expected_dates.isin(stored_dates.normalize()))
+    if len(missing) == 0:
+        return missing, missing, missing
+    
+    # تنتهي السلسلة عند أول يوم تداول مخزن (العطل ونهايات الأسبوع لا تقطع الفجوة)
+    breaks = np.flatnonzero(np.diff(missing) != 1) + 1
+    starts = missing[np.concatenate(([0], breaks))]
+    ends = missing[np.concatenate((breaks - 1, [len(missing) - 1]))]
+    return missing, starts, ends
+
+
+def find_gaps(stored_dates: Any, expected_dates: pd.DatetimeIndex) -> List[Dict]:
+    """
+    اكتشاف فجوات البيانات بمقارنة التواريخ المخزنة بأيام التداول المتوقعة
+    
+    المعلمات:
+        stored_dates: التواريخ المخزنة (أي قيم يمكن تحويلها إلى DatetimeIndex)
+        expected_dates (pd.DatetimeIndex): أيام التداول المتوقعة من تقويم التداول
+    
+    العائد:
+        List[Dict]: قائمة بالفجوات (start, end, days) مرتبة زمنياً
+    """
+    expected_dates = pd.DatetimeIndex(expected_dates)
+    _, starts, ends = _missing_runs(pd.DatetimeIndex(pd.to_datetime(stored_dates)), expected_dates)
+    return [
+        {
+            "start": expected_dates[start].date(),
+            "end": expected_dates[end].date(),
+            "days": int(end - start + 1)
+        }
+        for start, end in zip(starts, ends)
+    ]
+
+
+class BackfillPlanner:
+    """فئة لاكتشاف فجوات البيانات التاريخية وتخطيط تعبئتها وتنفيذها"""
+    
+    def __init__(
+        self,
+        data_manager: Optional[DataIntegrationManager] = None,
+        repository: Optional[HistoricalDataRepository] = None,
+        calendar: Optional[TradingCalendar] = None,
+        merge_days: Optional[int] = None,
+        max_request_days: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        requests_per_minute: Optional[int] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            data_manager (DataIntegrationManager, optional): مدير تكامل البيانات لجلب الأشرطة المفقودة
+            repository (HistoricalDataRepository, optional): مستودع البيانات التاريخية
+            calendar (TradingCalendar, optional): تقويم التداول
+            merge_days (int, optional): الحد الأقصى لأيام التداول المخزنة بين فجوتين لدمجهما في طلب واحد
+            max_request_days (int, optional): الحد الأقصى لأيام التداول في الطلب الواحد (0 بدون حد)
+            max_workers (int, optional): عدد الطلبات المتزامنة
+            requests_per_minute (int, optional): الحد الأقصى لطلبات التعبئة في الدقيقة لكل مصدر
+        """
+        self.data_manager = data_manager or DataIntegrationManager()
+        self.repository = repository or HistoricalDataRepository()
+        self.calendar = calendar or TradingCalendar()
+        self.merge_days = merge_days if merge_days is not None else int(os.getenv("BACKFILL_MERGE_DAYS", "5"))
+        self.max_request_days = max_request_days if max_request_days is not None else int(os.getenv("BACKFILL_MAX_REQUEST_DAYS", "0"))
+        self.max_workers = max_workers or int(os.getenv("BACKFILL_WORKERS", "4"))
+        self.rate_limiter = RateLimiter(
+            max_requests=requests_per_minute or int(os.getenv("BACKFILL_REQUESTS_PER_MINUTE", "60")),
+            time_window=60
+        )
+        self._rate_lock = threading.Lock()
+    
+    def _resolve_range(
+        self,
+        start_date: Union[str, date],
+        end_date: Optional[Union[str, date]]
+    ) -> Tuple[date, date]:
+        """تحديد نطاق الفحص (آخر يوم تداول مكتمل إذا لم يتم تحديد النهاية)"""
+        start_date = pd.Timestamp(start_date).date()
+        if end_date is None:
+            end_date = self.calendar.previous_trading_day(self.calendar.now().date())
+        return start_date, pd.Timestamp(end_date).date()
+    
+    def _resolve_symbols(self, symbols: Optional[List[str]]) -> List[str]:
+        """الحصول على قائمة الرموز (جميع الأسهم النشطة إذا لم يتم تحديدها)"""
+        if symbols is None:
+            return [stock.symbol for stock in self.repository.stock_repo.get_all_stocks()]
+        return [symbol.upper() for symbol in symbols]
+    
+    def _load_stored_dates(
+        self,
+        symbols: List[str],
+        start_date: date,
+        end_date: date
+    ) -> Tuple[Dict[str, pd.DatetimeIndex], Dict[str, date]]:
+        """
+        قراءة التواريخ المخزنة ضمن النطاق وتاريخ أول شريط مخزن لكل سهم
+        
+        يُرفع استثناء عند فشل القراءة حتى لا يُعامل خطأ قاعدة البيانات كأنه لا توجد بيانات مخزنة.
+        """
+        stored = self.repository.get_stored_dates(symbols, start_date, end_date)
+        first_dates = self.repository.get_first_stored_dates(symbols)
+        if stored is None or first_dates is None:
+            raise RuntimeError("تعذر قراءة التواريخ المخزنة من قاعدة البيانات، تم إلغاء العملية")
+        return stored, first_dates
+    
+    @staticmethod
+    def _expected_for(symbol: str, expected: pd.DatetimeIndex, first_dates: Dict[str, date]) -> pd.DatetimeIndex:
+        """أيام التداول المتوقعة لسهم بدءاً من أول شريط مخزن له (لا تُعد الأيام السابقة للإدراج فجوات)"""
+        first_date = first_dates.get(symbol)
+        if first_date is None:
+            return expected
+        return expected[expected >= pd.Timestamp(first_date)]
+    
+    def detect_gaps(
+        self,
+        symbols: Optional[List[str]],
+        start_date: Union[str, date],
+        end_date: Optional[Union[str, date]] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        اكتشاف فجوات البيانات التاريخية لعدة أسهم
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم (None لجميع الأسهم النشطة)
+            start_date (str|date): تاريخ البداية
+            end_date (str|date, optional): تاريخ النهاية
+        
+        العائد:
+            Dict[str, List[Dict]]: قاموس بالفجوات لكل سهم
+        """
+        symbols = self._resolve_symbols(symbols)
+        start_date, end_date = self._resolve_range(start_date, end_date)
+        expected = self.calendar.trading_days(start_date, end_date)
+        stored, first_dates = self._load_stored_dates(symbols, start_date, end_date)
+        
+        return {
+            symbol: find_gaps(stored.get(symbol, pd.DatetimeIndex([])), self._expected_for(symbol, expected, first_dates))
+            for symbol in symbols
+        }
+    
+    def _plan_symbol(self, symbol: str, stored_dates: pd.DatetimeIndex, expected: pd.DatetimeIndex) -> List[Dict]:
+        """تجميع فجوات سهم واحد في أقل عدد من الطلبات"""
+        missing, starts, ends = _missing_runs(stored_dates, expected)
+        if len(missing) == 0:
+            return []
+        
+        # دمج الفجوات التي يفصل بينها عدد قليل من أيام التداول المخزنة
+        new_request = np.concatenate(([True], starts[1:] - ends[:-1] - 1 > self.merge_days))
+        request_starts = starts[new_request]
+        request_ends = ends[np.concatenate((new_request[1:], [True]))]
+        
+        requests = []
+        for first, last in zip(request_starts, request_ends):
+            span = self.max_request_days or (last - first + 1)
+            for chunk_start in range(first, last + 1, span):
+                chunk_end = min(chunk_start + span - 1, last)
+                chunk_missing = missing[np.searchsorted(missing, chunk_start):np.searchsorted(missing, chunk_end, side="right")]
+                if len(chunk_missing) == 0:
+                    continue
+                
+                requests.append({
+                    "symbol": symbol,
+                    "start_date": expected[chunk_missing[0]].date(),
+                    "end_date": expected[chunk_missing[-1]].date(),
+                    "trading_days": int(chunk_missing[-1] - chunk_missing[0] + 1),
+                    "missing_dates": [day.date() for day in expected[chunk_missing]]
+                })
+        
+        return requests
+    
+    def plan(
+        self,
+        symbols: Optional[List[str]],
+        start_date: Union[str, date],
+        end_date: Optional[Union[str, date]] = None
+    ) -> List[Dict]:
+        """
+        تخطيط طلبات التعبئة لعدة أسهم
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم (None لجميع الأسهم النشطة)
+            start_date (str|date): تاريخ البداية
+            end_date (str|date, optional): تاريخ النهاية
+        
+        العائد:
+            List[Dict]: قائمة بالطلبات (symbol, start_date, end_date, trading_days, missing_dates)
+        """
+        symbols = self._resolve_symbols(symbols)
+        start_date, end_date = self._resolve_range(start_date, end_date)
+        expected = self.calendar.trading_days(start_date, end_date)
+        stored, first_dates = self._load_stored_dates(symbols, start_date, end_date)
+        
+        requests = []
+        for symbol in symbols:
+            requests.extend(self._plan_symbol(
+                symbol,
+                stored.get(symbol, pd.DatetimeIndex([])),
+                self._expected_for(symbol, expected, first_dates)
+            ))
+        
+        missing_days = sum(len(request["missing_dates"]) for request in requests)
+        logger.info(f"خطة التعبئة: {missing_days} يوم تداول مفقود في {len(requests)} طلب لـ {len(symbols)} سهم")
+        return requests
+    
+    def _wait_for_slot(self, source: str) -> None:
+        """الانتظار حتى يسمح محدد المعدل بطلب جديد للمصدر"""
+        while True:
+            with self._rate_lock:
+                if self.rate_limiter.is_allowed(source):
+                    return
+            time.sleep(0.5)
+    
+    def _execute_request(self, request: Dict, source: Optional[str]) -> int:
+        """تنفيذ طلب تعبئة واحد وتخزين الأشرطة المفقودة فقط"""
+        symbol = request["symbol"]
+        self._wait_for_slot(source or "default")
+        
+        # تاريخ النهاية في المصادر غير شامل
+        data = self.data_manager.get_historical_data(
+            symbol=symbol,
+            start_date=request["start_date"].strftime("%Y-%m-%d"),
+            end_date=(request["end_date"] + timedelta(days=1)).strftime("%Y-%m-%d"),
+            interval="1d",
+            source=source,
+            use_cache=False
+        )
+        if data.empty:
+            logger.warning(f"لم يتم العثور على بيانات لتعبئة فجوة السهم {symbol} ({request['start_date']} - {request['end_date']})")
+            return 0
+        
+        # تجاهل الأشرطة المخزنة مسبقاً التي أعادها المصدر ضمن النطاق
+        dates = pd.DatetimeIndex(pd.to_datetime(data["date"])).normalize()
+        data = data[dates.isin(pd.DatetimeIndex(request["missing_dates"]))]
+        if data.empty:
+            return 0
+        
+        if not self.repository.add_historical_data(symbol, data, source=source or self.data_manager.default_source):
+            raise RuntimeError(f"فشل تخزين بيانات التعبئة للسهم {symbol}")
+        return len(data)
+    
+    def execute(self, requests: List[Dict], source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        تنفيذ طلبات التعبئة بالتوازي مع احترام حد معدل الطلبات
+        
+        المعلمات:
+            requests (List[Dict]): الطلبات الناتجة من plan
+            source (str, optional): مصدر البيانات. إذا لم يتم تحديده، يختار مدير تكامل البيانات المصدر الأفضل.
+        
+        العائد:
+            Dict[str, Any]: ملخص التنفيذ (requests, succeeded, failed, bars_added, failures)
+        """
+        summary = {"requests": len(requests), "succeeded": 0, "failed": 0, "bars_added": 0, "failures": []}
+        if not requests:
+            return summary
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="seba-backfill") as executor:
+            futures = {executor.submit(self._execute_request, request, source): request for request in requests}
+            for future in as_completed(futures):
+                request = futures[future]
+                try:
+                    summary["bars_added"] += future.result()
+                    summary["succeeded"] += 1
+                except Exception as e:
+                    logger.error(f"خطأ في تعبئة فجوة السهم {request['symbol']}: {str(e)}")
+                    summary["failed"] += 1
+                    summary["failures"].append({
+                        "symbol": request["symbol"],
+                        "start_date": request["start_date"],
+                        "end_date": request["end_date"],
+                        "error": str(e)
+                    })
+        
+        logger.info(f"اكتملت التعبئة: {summary['bars_added']} شريط من {summary['succeeded']} طلب ناجح و{summary['failed']} طلب فاشل")
+        return summary
+    
+    def backfill(
+        self,
+        symbols: Optional[List[str]],
+        start_date: Union[str, date],
+        end_date: Optional[Union[str, date]] = None,
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        اكتشاف الفجوات وتعبئتها لعدة أسهم
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم (None لجميع الأسهم النشطة)
+            start_date (str|date): تاريخ البداية
+            end_date (str|date, optional): تاريخ النهاية
+            source (str, optional): مصدر البيانات
+        
+        العائد:
+            Dict[str, Any]: ملخص التنفيذ
+        """
+        return self.execute(self.plan(symbols, start_date, end_date), source=source)
+    
+    def coverage_report(
+        self,
+        symbols: Optional[List[str]],
+        start_date: Union[str, date],
+        end_date: Optional[Union[str, date]] = None
+    ) -> pd.DataFrame:
+        """
+        تقرير تغطية البيانات التاريخية لعدة أسهم مقارنة بتقويم التداول
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم (None لجميع الأسهم النشطة)
+            start_date (str|date): تاريخ البداية
+            end_date (str|date, optional): تاريخ النهاية
+        
+        العائد:
+            pd.DataFrame: إطار بيانات مرتب من الأقل تغطية (symbol, expected_days, stored_days, missing_days,
+                coverage, gaps, first_missing, last_missing, non_trading_days)
+        """
+        symbols = self._resolve_symbols(symbols)
+        start_date, end_date = self._resolve_range(start_date, end_date)
+        trading_days = self.calendar.trading_days(start_date, end_date)
+        stored, first_dates = self._load_stored_dates(symbols, start_date, end_date)
+        
+        rows = []
+        for symbol in symbols:
+            stored_dates = stored.get(symbol, pd.DatetimeIndex([])).normalize()
+            expected = self._expected_for(symbol, trading_days, first_dates)
+            missing, starts, _ = _missing_runs(stored_dates, expected)
+            rows.append({
+                "symbol": symbol,
+                "expected_days": len(expected),
+                "stored_days": len(expected) - len(missing),
+                "missing_days": len(missing),
+                "coverage": round(100.0 * (1 - len(missing) / len(expected)), 2) if len(expected) else 100.0,
+                "gaps": len(starts),
+                "first_missing": expected[missing[0]].date() if len(missing) else None,
+                "last_missing": expected[missing[-1]].date() if len(missing) else None,
+                # أشرطة مخزنة في أيام ليست أيام تداول (عطل أو نهايات أسبوع)
+                "non_trading_days": int((~stored_dates.isin(trading_days)).sum())
+            })
+        
+        report = pd.DataFrame(rows, columns=[
+            "symbol", "expected_days", "stored_days", "missing_days", "coverage",
+            "gaps", "first_missing", "last_missing", "non_trading_days"
+        ])
+        return report.sort_values(["coverage", "symbol"]).reset_index(drop=True)
@@ -0,0 +1,642 @@
+"""
+وحدة قياس الأداء لمشروع SEBA
+توفر هذه الوحدة مجموعة قياسات لسرعة المؤشرات الفنية والأنماط ومحرك SEPA ومستودع البيانات التاريخية
+ومسارات الواجهة الرئيسية عبر أحجام مدخلات مختلفة (عدد الأسهم وعدد السنوات)، وتحفظ النتائج بصيغة JSON
+لمقارنتها بين الإصدارات واكتشاف التراجع في الأداء
+
+الاستخدام:
+    python -m seba.utils.benchmark --symbols 1,100 --years 1,5
+    python -m seba.utils.benchmark --full --compare data/benchmarks/baseline.json
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from contextlib import contextmanager, ExitStack
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from seba.models.technical_analysis import TechnicalIndicators, PatternRecognition
+from seba.models.sepa_engine import SEPAEngine
+from seba.data_integration.synthetic_data import SyntheticMarketGenerator, INDEX_SYMBOL
+from seba.utils.optimization import get_cache_manager
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# إصدار صيغة ملف النتائج
+RESULTS_VERSION = 1
+
+# مجلد ملفات النتائج الافتراضي
+BENCHMARK_DIR = os.getenv("BENCHMARK_DIR", "data/benchmarks")
+
+# عدد مرات تكرار كل قياس
+BENCHMARK_REPEAT = int(os.getenv("BENCHMARK_REPEAT", "3"))
+
+# نسبة التباطؤ (في الوسيط) التي تُعد تراجعاً في الأداء عند المقارنة
+BENCHMARK_THRESHOLD = float(os.getenv("BENCHMARK_THRESHOLD", "0.2"))
+
+# الفرق المطلق الأدنى بالثواني لاعتبار التباطؤ تراجعاً (لتجاهل ضجيج القياسات القصيرة جداً)
+MIN_REGRESSION_SECONDS = 0.001
+
+# أحجام المدخلات الافتراضية، والأحجام الكاملة المستخدمة مع --full
+DEFAULT_SYMBOLS = [1, 100]
+DEFAULT_YEARS = [1, 5]
+FULL_SYMBOLS = [1, 100, 1000, 5000]
+FULL_YEARS = [1, 5, 20]
+
+# المؤشرات الفنية التي تُقاس كل منها على حدة (تصنيف القوة النسبية يُقاس منفصلاً لحاجته إلى المؤشر المرجعي)
+INDICATOR_METHODS = [
+    "calculate_sma",
+    "calculate_ema",
+    "calculate_rsi",
+    "calculate_macd",
+    "calculate_bollinger_bands",
+    "calculate_atr",
+    "calculate_adx",
+    "calculate_stochastic",
+    "calculate_obv",
+]
+
+
+def _git_commit() -> Optional[str]:
+    """الحصول على معرف الإيداع الحالي في git، أو None إذا لم يكن متاحاً"""
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        return output.stdout.strip() or None
+    except Exception:
+        return None
+
+
+@contextmanager
+def _patched(target: Any, **attributes) -> Iterator[None]:
+    """استبدال سمات كائن مؤقتاً واستعادتها عند الخروج"""
+    originals = {name: vars(target)[name] for name in attributes if name in vars(target)}
+    for name, value in attributes.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name in attributes:
+            if name in originals:
+                setattr(target, name, originals[name])
+            else:
+                delattr(target, name)
+
+
+class BenchmarkSuite:
+    """فئة لتشغيل قياسات الأداء عبر أحجام مدخلات مختلفة وحفظ نتائجها"""
+    
+    def __init__(self, repeat: Optional[int] = None, seed: int = 0, max_rows: Optional[int] = None):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            repeat (int, optional): عدد مرات تكرار كل قياس
+            seed (int, optional): بذرة توليد البيانات (نفس البذرة تعطي نفس البيانات بين الإصدارات)
+            max_rows (int, optional): حد أقصى لعدد الصفوف يتجاوز حدود القياسات الافتراضية (0 لإلغاء الحدود)
+        """
+        self.repeat = repeat or BENCHMARK_REPEAT
+        self.seed = seed
+        self.max_rows = max_rows
+        self.cases: Dict[str, Dict[str, Any]] = {}
+        self._register_default_cases()
+    
+    def add_case(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        group: str = "custom",
+        prepare: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        max_rows: Optional[int] = None,
+        max_symbols: Optional[int] = None
+    ) -> None:
+        """
+        تسجيل قياس
+        
+        المعلمات:
+            name (str): اسم القياس
+            func (Callable): الدالة المقاسة، تستقبل سياق الحجم (panel, index, symbols, years)
+            group (str, optional): مجموعة القياس
+            prepare (Callable, optional): دالة تُستدعى قبل كل تكرار خارج التوقيت (مثل مسح التخزين المؤقت)
+            max_rows (int, optional): يُتخطى القياس إذا تجاوز إجمالي الصفوف هذا الحد
+            max_symbols (int, optional): يُتخطى القياس إذا تجاوز عدد الأسهم هذا الحد
+        """
+        self.cases[name] = {
+            'name': name,
+            'group': group,
+            'func': func,
+            'prepare': prepare,
+            'max_rows': max_rows,
+            'max_symbols': max_symbols,
+        }
+    
+    def _register_default_cases(self) -> None:
+        """تسجيل القياسات الافتراضية للمؤشرات والأنماط ومحرك SEPA والمستودع والواجهة"""
+        for method in INDICATOR_METHODS:
+            self.add_case(f"indicators.{method}", self._per_symbol(method), "indicators")
+        self.add_case(
+            "indicators.calculate_rs_rating",
+            lambda ctx: [TechnicalIndicators.calculate_rs_rating(df, ctx['index']) for df in ctx['panel'].values()],
+            "indicators"
+        )
+        self.add_case(
+            "indicators.calculate_all_indicators",
+            lambda ctx: [TechnicalIndicators.calculate_all_indicators(df, ctx['index']) for df in ctx['panel'].values()],
+            "indicators",
+            prepare=self._clear_local_cache
+        )
+        
+        self.add_case("patterns.detect_vcp", lambda ctx: [PatternRecognition.detect_vcp(df) for df in ctx['panel'].values()], "patterns")
+        self.add_case(
+            "patterns.check_trend_template",
+            lambda ctx: [PatternRecognition.check_trend_template(df) for df in ctx['panel'].values()],
+            "patterns"
+        )
+        
+        self.add_case(
+            "sepa.analyze_stock",
+            lambda ctx: [self._sepa_engine(ctx).analyze_stock(df, ctx['index']) for df in ctx['panel'].values()],
+            "sepa",
+            prepare=self._clear_local_cache
+        )
+        self.add_case(
+            "sepa.screen_trend_template",
+            lambda ctx: self._sepa_engine(ctx).get_trend_template_stocks(ctx['panel'], ctx['index'], 5),
+            "sepa",
+            prepare=self._clear_local_cache
+        )
+        self.add_case(
+            "sepa.screen_vcp",
+            lambda ctx: self._sepa_engine(ctx).get_vcp_stocks(ctx['panel']),
+            "sepa",
+            prepare=self._clear_local_cache
+        )
+        
+        # الإدراج يمر عبر ORM صفاً صفاً، لذا تُحد أحجامه الافتراضية
+        self.add_case("repository.bulk_insert", self._repository_insert, "repository", max_rows=500_000)
+        self.add_case(
+            "repository.read_dataframe",
+            lambda ctx: [self._repository(ctx).get_historical_dataframe(symbol) for symbol in ctx['panel']],
+            "repository",
+            prepare=self._ensure_stored,
+            max_rows=500_000
+        )
+        self.add_case(
+            "repository.stored_dates",
+            lambda ctx: self._repository(ctx).get_stored_dates(list(ctx['panel'])),
+            "repository",
+            prepare=self._ensure_stored,
+            max_rows=500_000
+        )
+        
+        # مسارات الواجهة تُطلب لكل سهم، ومسار الفحص يفحص 100 سهم على الأكثر
+        self.add_case(
+            "api.stocks_historical",
+            lambda ctx: [
+                self._api_request(ctx, "post", "/stocks/historical", json=self._historical_request(ctx, symbol))
+                for symbol in ctx['panel']
+            ],
+            "api",
+            max_symbols=100
+        )
+        self.add_case(
+            "api.stock_indicators",
+            lambda ctx: [self._api_request(ctx, "get", f"/stocks/{symbol}/indicators") for symbol in ctx['panel']],
+            "api",
+            prepare=self._clear_local_cache,
+            max_symbols=100
+        )
+        self.add_case(
+            "api.analysis",
+            lambda ctx: [self._api_request(ctx, "post", f"/analysis/{symbol}", params={'report_type': 'none'}) for symbol in ctx['panel']],
+            "api",
+            prepare=self._clear_local_cache,
+            max_symbols=100
+        )
+        self.add_case(
+            "api.screen",
+            lambda ctx: self._api_request(ctx, "post", "/screen", json={'criteria': {'trend_template': True, 'vcp': True}}),
+            "api",
+            prepare=self._clear_local_cache,
+            max_symbols=100
+        )
+    
+    @staticmethod
+    def _per_symbol(method: str) -> Callable[[Dict[str, Any]], List[Any]]:
+        """تحويل مؤشر فني يعمل على إطار سهم واحد إلى قياس يمر على جميع أسهم الحجم"""
+        return lambda ctx: [getattr(TechnicalIndicators, method)(df) for df in ctx['panel'].values()]
+    
+    @staticmethod
+    def _clear_local_cache(ctx: Dict[str, Any]) -> None:
+        """مسح التخزين المؤقت المحلي حتى تقيس التكرارات الحساب الفعلي وليس قراءة النتائج المخزنة"""
+        get_cache_manager("local").clear()
+    
+    def _context(self, symbols: int, years: int) -> Dict[str, Any]:
+        """
+        إنشاء سياق حجم: لوحة أسهم اصطناعية والمؤشر المرجعي
+        
+        المعلمات:
+            symbols (int): عدد الأسهم
+            years (int): عدد السنوات
+        
+        العائد:
+            Dict[str, Any]: سياق الحجم
+        """
+        market = SyntheticMarketGenerator(seed=self.seed).generate(symbols, years)
+        return {
+            'symbols': symbols,
+            'years': years,
+            'panel': market['prices'],
+            'index': market['index'],
+            'labels': market['labels'],
+            'rows': sum(len(df) for df in market['prices'].values()),
+        }
+    
+    def _sepa_engine(self, ctx: Dict[str, Any]) -> SEPAEngine:
+        """الحصول على محرك SEPA مشترك للسياق"""
+        if 'sepa_engine' not in ctx:
+            ctx['sepa_engine'] = SEPAEngine()
+        return ctx['sepa_engine']
+    
+    def _repository(self, ctx: Dict[str, Any]):
+        """
+        الحصول على مستودع البيانات التاريخية للسياق بعد إنشاء الجداول وتسجيل الأسهم المولدة
+        
+        يستخدم المستودع قاعدة البيانات المحددة في متغيرات البيئة (DB_TYPE و DB_PATH)؛ ويضبطها سطر الأوامر
+        على قاعدة SQLite مؤقتة ما لم يُحدد --db-path.
+        """
+        if 'repository' not in ctx:
+            from seba.database.repository import StockRepository, HistoricalDataRepository
+            
+            repository = HistoricalDataRepository()
+            repository.db_manager.create_tables()
+            stock_repository = StockRepository()
+            for symbol in ctx['panel']:
+                stock_repository.add_stock({'symbol': symbol, 'name': f"Synthetic {symbol}"})
+            ctx['repository'] = repository
+        return ctx['repository']
+    
+    def _repository_insert(self, ctx: Dict[str, Any]) -> None:
+        """إدراج جميع أسهم السياق في المستودع"""
+        repository = self._repository(ctx)
+        for symbol, df in ctx['panel'].items():
+            repository.add_historical_data(symbol, df, source="benchmark")
+        ctx['stored'] = True
+    
+    def _ensure_stored(self, ctx: Dict[str, Any]) -> None:
+        """إدراج أسهم السياق قبل قياسات القراءة إذا لم تكن مخزنة"""
+        if not ctx.get('stored'):
+            self._repository_insert(ctx)
+    
+    @staticmethod
+    def _historical_request(ctx: Dict[str, Any], symbol: str) -> Dict[str, str]:
+        """جسم طلب البيانات التاريخية لسهم يغطي نطاق تواريخ بياناته المولدة"""
+        dates = ctx['panel'][symbol]['date']
+        return {
+            'symbol': symbol,
+            'start_date': pd.Timestamp(dates.iloc[0]).strftime("%Y-%m-%d"),
+            'end_date': pd.Timestamp(dates.iloc[-1]).strftime("%Y-%m-%d"),
+            'interval': '1d'
+        }
+    
+    def _api_request(self, ctx: Dict[str, Any], method: str, path: str, **kwargs) -> Any:
+        """
+        إرسال طلب إلى الواجهة عبر عميل اختبار يقرأ بيانات السياق بدلاً من مصادر البيانات
+        
+        تُستبدل استدعاءات مصادر البيانات والنماذج اللغوية ومصادقة المستخدم لقياس زمن المعالجة داخل الخادم فقط.
+        يُرفع استثناء عند أي رد غير ناجح حتى يُسجل القياس كخطأ بدلاً من قياس زمن رفض الطلب.
+        """
+        client = ctx.get('api_client')
+        if client is None:
+            client = self._start_api_client(ctx)
+        response = getattr(client, method)(path, **kwargs)
+        if not 200 <= response.status_code < 300:
+            raise RuntimeError(f"{method.upper()} {path}: {response.status_code} {response.text[:200]}")
+        return response.status_code
+    
+    def _start_api_client(self, ctx: Dict[str, Any]) -> Any:
+        """إنشاء عميل الواجهة للسياق (يُغلق عند انتهاء قياسات الحجم)"""
+        from fastapi.testclient import TestClient
+        from seba.api import api
+        
+        def get_historical_data(symbol, *args, **kwargs):
+            if symbol == INDEX_SYMBOL:
+                return ctx['index'].copy()
+            return ctx['panel'].get(symbol, pd.DataFrame()).copy()
+        
+        cleanup = ctx['cleanup']
+        cleanup.enter_context(_patched(
+            api.data_manager,
+            get_historical_data=get_historical_data,
+            get_symbols_list=lambda *args, **kwargs: list(ctx['panel']),
+            get_stock_info=lambda symbol, *args, **kwargs: {'symbol': symbol, 'name': f"Synthetic {symbol}"}
+        ))
+        cleanup.enter_context(_patched(
+            api.ai_manager,
+            generate_stock_analysis_report=lambda *args, **kwargs: "",
+            generate_natural_language_recommendation=lambda *args, **kwargs: ""
+        ))
+        
+        api.app.dependency_overrides[api.get_current_active_user] = lambda: api.User(username="benchmark", is_admin=True)
+        cleanup.callback(api.app.dependency_overrides.pop, api.get_current_active_user, None)
+        
+        ctx['api_client'] = TestClient(api.app)
+        cleanup.callback(ctx['api_client'].close)
+        return ctx['api_client']
+    
+    def _limit(self, case: Dict[str, Any]) -> Optional[int]:
+        """الحد الأقصى للصفوف الفعلي للقياس"""
+        if self.max_rows is not None:
+            return self.max_rows or None
+        return case['max_rows']
+    
+    def _measure(self, case: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        تشغيل قياس واحد على سياق حجم
+        
+        المعلمات:
+            case (Dict[str, Any]): القياس
+            ctx (Dict[str, Any]): سياق الحجم
+        
+        العائد:
+            Dict[str, Any]: نتيجة القياس
+        """
+        result = {
+            'name': case['name'],
+            'group': case['group'],
+            'symbols': ctx['symbols'],
+            'years': ctx['years'],
+            'rows': ctx['rows'],
+            'status': 'ok',
+        }
+        
+        max_rows = self._limit(case)
+        if max_rows and ctx['rows'] > max_rows:
+            result.update({'status': 'skipped', 'reason': f"rows > {max_rows}"})
+            return result
+        if case['max_symbols'] and ctx['symbols'] > case['max_symbols']:
+            result.update({'status': 'skipped', 'reason': f"symbols > {case['max_symbols']}"})
+            return result
+        
+        timings = []
+        try:
+            for _ in range(self.repeat):
+                if case['prepare']:
+                    case['prepare'](ctx)
+                gc.collect()
+                started = time.perf_counter()
+                case['func'](ctx)
+                timings.append(time.perf_counter() - started)
+        except Exception as e:
+            logger.error(f"خطأ في قياس {case['name']} ({ctx['symbols']} سهم، {ctx['years']} سنة): {str(e)}")
+            result.update({'status': 'error', 'error': f"{type(e).__name__}: {str(e)}"})
+            return result
+        
+        median = statistics.median(timings)
+        result.update({
+            'repeat': len(timings),
+            'min': min(timings),
+            'median': median,
+            'mean': statistics.mean(timings),
+            'max': max(timings),
+            'per_symbol': median / ctx['symbols'],
+            'rows_per_second': ctx['rows'] / median if median > 0 else None,
+        })
+        return result
+    
+    def run(
+        self,
+        symbols: Optional[List[int]] = None,
+        years: Optional[List[int]] = None,
+        only: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        تشغيل القياسات على جميع تركيبات الأحجام
+        
+        المعلمات:
+            symbols (List[int], optional): أعداد الأسهم
+            years (List[int], optional): أعداد السنوات
+            only (List[str], optional): أسماء القياسات أو مجموعاتها أو بادئاتها المطلوبة (جميعها إذا لم يتم تحديدها)
+        
+        العائد:
+            Dict[str, Any]: تقرير النتائج القابل للحفظ بصيغة JSON
+        """
+        symbols = symbols or DEFAULT_SYMBOLS
+        years = years or DEFAULT_YEARS
+        cases = [
+            case for case in self.cases.values()
+            if not only or any(case['name'] == item or case['group'] == item or case['name'].startswith(item) for item in only)
+        ]
+        
+        started_at = datetime.utcnow()
+        results = []
+        for symbol_count in symbols:
+            for year_count in years:
+                logger.info(f"قياس الأداء: {symbol_count} سهم، {year_count} سنة")
+                ctx = self._context(symbol_count, year_count)
+                with ExitStack() as cleanup:
+                    ctx['cleanup'] = cleanup
+                    for case in cases:
+                        result = self._measure(case, ctx)
+                        results.append(result)
+                        logger.info(f"{result['name']}: {result['status']}")
+        
+        return {
+            'version': RESULTS_VERSION,
+            'created_at': started_at.isoformat(),
+            'duration': (datetime.utcnow() - started_at).total_seconds(),
+            'commit': _git_commit(),
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+            },
+            'settings': {
+                'symbols': symbols,
+                'years': years,
+                'repeat': self.repeat,
+                'seed': self.seed,
+            },
+            'results': results,
+        }
+
+
+def save_results(report: Dict[str, Any], path: Optional[str] = None) -> str:
+    """
+    حفظ تقرير النتائج بصيغة JSON
+    
+    المعلمات:
+        report (Dict[str, Any]): تقرير النتائج
+        path (str, optional): مسار الملف (افتراضياً ملف باسم الإيداع والوقت في BENCHMARK_DIR)
+    
+    العائد:
+        str: مسار الملف المحفوظ
+    """
+    if not path:
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(BENCHMARK_DIR, f"benchmark-{report.get('commit') or 'unknown'}-{stamp}.json")
+    
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """
+    تحميل تقرير نتائج محفوظ
+    
+    المعلمات:
+        path (str): مسار الملف
+    
+    العائد:
+        Dict[str, Any]: تقرير النتائج
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    مقارنة تقريرين حسب وسيط الزمن لكل قياس وحجم مشترك بينهما
+    
+    المعلمات:
+        baseline (Dict[str, Any]): تقرير الأساس (مثل نتائج الفرع الرئيسي)
+        current (Dict[str, Any]): التقرير الحالي
+        threshold (float, optional): نسبة التباطؤ التي تُعد تراجعاً
+    
+    العائد:
+        List[Dict[str, Any]]: قائمة المقارنات، مع regression=True للقياسات التي تراجع أداؤها
+    """
+    threshold = BENCHMARK_THRESHOLD if threshold is None else threshold
+    
+    def index(report: Dict[str, Any]) -> Dict[tuple, Dict[str, Any]]:
+        return {
+            (result['name'], result['symbols'], result['years']): result
+            for result in report.get('results', [])
+            if result.get('status') == 'ok'
+        }
+    
+    baseline_results = index(baseline)
+    comparisons = []
+    for key, result in index(current).items():
+        previous = baseline_results.get(key)
+        if previous is None:
+            continue
+        
+        ratio = result['median'] / previous['median'] if previous['median'] > 0 else None
+        regression = (
+            ratio is not None
+            and ratio > 1 + threshold
+            and result['median'] - previous['median'] > MIN_REGRESSION_SECONDS
+        )
+        comparisons.append({
+            'name': key[0],
+            'symbols': key[1],
+            'years': key[2],
+            'baseline': previous['median'],
+            'current': result['median'],
+            'ratio': ratio,
+            'regression': regression,
+        })
+    
+    return sorted(comparisons, key=lambda item: item['ratio'] or 0, reverse=True)
+
+
+def _format_table(report: Dict[str, Any]) -> str:
+    """تنسيق نتائج التقرير كجدول نصي"""
+    lines = [f"{'benchmark':<40} {'symbols':>7} {'years':>5} {'median (s)':>12} {'rows/s':>14}  status"]
+    for result in report['results']:
+        median = f"{result['median']:.4f}" if 'median' in result else "-"
+        rate = f"{result['rows_per_second']:.0f}" if result.get('rows_per_second') else "-"
+        status = result['status'] if result['status'] == 'ok' else f"{result['status']}: {result.get('reason') or result.get('error')}"
+        lines.append(f"{result['name']:<40} {result['symbols']:>7} {result['years']:>5} {median:>12} {rate:>14}  {status}")
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> List[int]:
+    """تحويل قائمة أعداد مفصولة بفواصل"""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    الدالة الرئيسية لسطر أوامر قياس الأداء
+    
+    المعلمات:
+        argv (List[str], optional): معلمات سطر الأوامر
+    
+    العائد:
+        int: رمز الخروج (1 إذا اكتُشف تراجع في الأداء عند المقارنة)
+    """
+    parser = argparse.ArgumentParser(description='قياس أداء نظام SEBA')
+    parser.add_argument('--symbols', type=_int_list, help=f"أعداد الأسهم مفصولة بفواصل (الافتراضي: {','.join(map(str, DEFAULT_SYMBOLS))})")
+    parser.add_argument('--years', type=_int_list, help=f"أعداد السنوات مفصولة بفواصل (الافتراضي: {','.join(map(str, DEFAULT_YEARS))})")
+    parser.add_argument('--full', action='store_true', help='استخدام الأحجام الكاملة (حتى 5000 سهم و20 سنة)')
+    parser.add_argument('--only', type=str, help='أسماء القياسات أو مجموعاتها مفصولة بفواصل (مثل indicators,sepa.analyze_stock)')
+    parser.add_argument('--repeat', type=int, help=f'عدد مرات تكرار كل قياس (الافتراضي: {BENCHMARK_REPEAT})')
+    parser.add_argument('--seed', type=int, default=0, help='بذرة توليد البيانات')
+    parser.add_argument('--max-rows', type=int, help='تجاوز حدود الصفوف الافتراضية للقياسات (0 لإلغائها)')
+    parser.add_argument('--output', type=str, help=f'مسار ملف النتائج (الافتراضي: ملف جديد في {BENCHMARK_DIR})')
+    parser.add_argument('--compare', type=str, help='ملف نتائج سابق للمقارنة واكتشاف التراجع')
+    parser.add_argument('--threshold', type=float, help=f'نسبة التباطؤ التي تُعد تراجعاً (الافتراضي: {BENCHMARK_THRESHOLD})')
+    parser.add_argument('--db-path', type=str, help='قاعدة SQLite لقياسات المستودع (الافتراضي: ملف مؤقت)')
+    parser.add_argument('--list', action='store_true', help='عرض القياسات المتاحة والخروج')
+    args = parser.parse_args(argv)
+    
+    # لا تُقاس عمليات المستودع على قاعدة البيانات الفعلية أبداً
+    os.environ['DB_TYPE'] = 'sqlite'
+    os.environ['DB_PATH'] = args.db_path or os.path.join(tempfile.mkdtemp(prefix="seba-benchmark-"), "benchmark.db")
+    
+    suite = BenchmarkSuite(repeat=args.repeat, seed=args.seed, max_rows=args.max_rows)
+    if args.list:
+        for case in suite.cases.values():
+            print(f"{case['group']:<12} {case['name']}")
+        return 0
+    
+    report = suite.run(
+        symbols=args.symbols or (FULL_SYMBOLS if args.full else DEFAULT_SYMBOLS),
+        years=args.years or (FULL_YEARS if args.full else DEFAULT_YEARS),
+        only=[item.strip() for item in args.only.split(",")] if args.only else None
+    )
+    path = save_results(report, args.output)
+    print(_format_table(report))
+    print(f"\nتم حفظ النتائج في {path}")
+    
+    if args.compare:
+        comparisons = compare_results(load_results(args.compare), report, args.threshold)
+        regressions = [item for item in comparisons if item['regression']]
+        for item in comparisons:
+            marker = "REGRESSION" if item['regression'] else ""
+            print(f"{item['name']:<40} {item['symbols']:>7} {item['years']:>5} {item['baseline']:.4f} -> {item['current']:.4f} ({item['ratio']:.2f}x) {marker}")
+        if regressions:
+            print(f"\nتم اكتشاف تراجع في أداء {len(regressions)} قياس")
+            return 1
+    
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+وحدة سياسات التخزين المؤقت لمشروع SEBA
+توفر هذه الوحدة مدة صلاحية مناسبة لكل نوع بيانات (الأسعار اللحظية، الأشرطة اليومية وداخل اليوم،
+البيانات الأساسية، الأرباح، ملفات الشركات) اعتماداً على تقويم التداول
+"""
+
+import os
+import inspect
+import hashlib
+import contextvars
+import logging
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Dict, Optional, Union, Any, Callable
+
+import pandas as pd
+
+from seba.utils.trading_calendar import TradingCalendar
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# أنواع البيانات المدعومة
+DATA_TYPE_QUOTE = "quote"
+DATA_TYPE_INTRADAY = "intraday"
+DATA_TYPE_DAILY = "daily"
+DATA_TYPE_FUNDAMENTAL = "fundamental"
+DATA_TYPE_EARNINGS = "earnings"
+DATA_TYPE_PROFILE = "profile"
+
+# أسباب النتائج السلبية المخزنة مؤقتاً
+NEGATIVE_NOT_FOUND = "not_found"
+NEGATIVE_NO_DATA = "no_data"
+NEGATIVE_REJECTED = "rejected"
+
+# الفواصل الزمنية التي تُعامل كأشرطة يومية أو أطول
+DAILY_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo", "daily", "weekly", "monthly"}
+
+# المصادر التي فشل استدعاؤها أثناء تحميل القيمة الحالية عبر policy_cached
+# (تنتقل إلى خيوط التحوط مع السياق عبر bind_context)
+_load_failures: contextvars.ContextVar = contextvars.ContextVar("seba_load_failures", default=None)
+
+
+def record_load_failure(source: str) -> None:
+    """
+    تسجيل فشل استدعاء مصدر أثناء تحميل قيمة عبر policy_cached
+    
+    النتيجة الفارغة لتحميل فشل فيه أحد المصادر لا تُخزن كنتيجة سلبية، لأنها قد تكون نتيجة العطل وليست رداً من المصدر.
+    
+    المعلمات:
+        source (str): اسم المصدر
+    """
+    failures = _load_failures.get()
+    if failures is not None:
+        failures.add(source)
+
+
+class CachePolicy:
+    """فئة لحساب مدة صلاحية التخزين المؤقت حسب نوع البيانات وحالة السوق"""
+    
+    def __init__(
+        self,
+        calendar: Optional[TradingCalendar] = None,
+        quote_ttl: Optional[int] = None,
+        quote_off_hours_ttl: Optional[int] = None,
+        intraday_ttl: Optional[int] = None,
+        fundamental_ttl: Optional[int] = None,
+        earnings_ttl: Optional[int] = None,
+        profile_ttl: Optional[int] = None,
+        publish_delay: Optional[int] = None,
+        stale_grace: Optional[int] = None,
+        intraday_stale_grace: Optional[int] = None,
+        not_found_ttl: Optional[int] = None,
+        no_data_ttl: Optional[int] = None,
+        rejected_ttl: Optional[int] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            calendar (TradingCalendar, optional): تقويم التداول
+            quote_ttl (int, optional): صلاحية السعر اللحظي بالثواني أثناء ساعات التداول
+            quote_off_hours_ttl (int, optional): الحد الأقصى لصلاحية السعر اللحظي خارج ساعات التداول
+            intraday_ttl (int, optional): صلاحية الأشرطة داخل اليوم بالثواني أثناء ساعات التداول
+            fundamental_ttl (int, optional): صلاحية البيانات الأساسية بالثواني
+            earnings_ttl (int, optional): صلاحية بيانات الأرباح بالثواني
+            profile_ttl (int, optional): صلاحية ملف الشركة بالثواني
+            publish_delay (int, optional): المهلة بالثواني بعد الإغلاق حتى تنشر المصادر الشريط اليومي النهائي
+            stale_grace (int, optional): مدة السماح بالثواني لاستخدام القيم القديمة أثناء تحديثها
+            intraday_stale_grace (int, optional): مدة السماح بالثواني للأشرطة داخل اليوم
+            not_found_ttl (int, optional): صلاحية نتيجة "الرمز غير موجود" بالثواني
+            no_data_ttl (int, optional): الحد الأقصى لصلاحية نتيجة "لا توجد بيانات في النطاق" بالثواني
+            rejected_ttl (int, optional): صلاحية نتيجة "رفض المصدر للطلب" بالثواني
+        """
+        self.calendar = calendar or TradingCalendar()
+        self.quote_ttl = quote_ttl if quote_ttl is not None else int(os.getenv("CACHE_QUOTE_TTL", "5"))
+        self.quote_off_hours_ttl = quote_off_hours_ttl if quote_off_hours_ttl is not None else int(os.getenv("CACHE_QUOTE_OFF_HOURS_TTL", "900"))
+        self.intraday_ttl = intraday_ttl if intraday_ttl is not None else int(os.getenv("CACHE_INTRADAY_TTL", "60"))
+        self.fundamental_ttl = fundamental_ttl if fundamental_ttl is not None else int(os.getenv("CACHE_FUNDAMENTAL_TTL", "86400"))
+        self.earnings_ttl = earnings_ttl if earnings_ttl is not None else int(os.getenv("CACHE_EARNINGS_TTL", "86400"))
+        self.profile_ttl = profile_ttl if profile_ttl is not None else int(os.getenv("CACHE_PROFILE_TTL", "604800"))
+        self.publish_delay = publish_delay if publish_delay is not None else int(os.getenv("CACHE_PUBLISH_DELAY", "900"))
+        self.stale_grace = stale_grace if stale_grace is not None else int(os.getenv("CACHE_STALE_GRACE", "900"))
+        self.intraday_stale_grace = intraday_stale_grace if intraday_stale_grace is not None else int(os.getenv("CACHE_INTRADAY_STALE_GRACE", "30"))
+        self.negative_ttls = {
+            NEGATIVE_NOT_FOUND: not_found_ttl if not_found_ttl is not None else int(os.getenv("CACHE_NEGATIVE_NOT_FOUND_TTL", "3600")),
+            NEGATIVE_NO_DATA: no_data_ttl if no_data_ttl is not None else int(os.getenv("CACHE_NEGATIVE_NO_DATA_TTL", "300")),
+            NEGATIVE_REJECTED: rejected_ttl if rejected_ttl is not None else int(os.getenv("CACHE_NEGATIVE_REJECTED_TTL", "600"))
+        }
+    
+    @staticmethod
+    def data_type_for_interval(interval: Optional[str]) -> str:
+        """
+        تحديد نوع البيانات التاريخية حسب الفاصل الزمني
+        
+        المعلمات:
+            interval (str): الفاصل الزمني (1m, 5m, 1h, 1d, ...)
+        
+        العائد:
+            str: daily أو intraday
+        """
+        if not interval or interval.lower() in DAILY_INTERVALS:
+            return DATA_TYPE_DAILY
+        return DATA_TYPE_INTRADAY
+    
+    def get_expiry(self, data_type: str, now: Optional[datetime] = None) -> datetime:
+        """
+        حساب وقت انتهاء صلاحية بيانات تم جلبها في وقت معين
+        
+        المعلمات:
+            data_type (str): نوع البيانات (quote, intraday, daily, fundamental, earnings, profile)
+            now (datetime, optional): وقت الجلب. إذا لم يتم تحديده، سيتم استخدام الوقت الحالي.
+        
+        العائد:
+            datetime: وقت انتهاء الصلاحية بتوقيت السوق
+        """
+        now = self.calendar.to_market_time(now)
+        
+        if data_type in (DATA_TYPE_QUOTE, DATA_TYPE_INTRADAY):
+            if self.calendar.is_market_open(now):
+                ttl = self.quote_ttl if data_type == DATA_TYPE_QUOTE else self.intraday_ttl
+                # لا تتجاوز الصلاحية إغلاق الجلسة الحالية
+                return min(now + timedelta(seconds=ttl), self.calendar.next_session_close(now))
+            
+            next_open = self.calendar.next_session_open(now)
+            if data_type == DATA_TYPE_QUOTE:
+                return min(now + timedelta(seconds=self.quote_off_hours_ttl), next_open)
+            return next_open
+        
+        if data_type == DATA_TYPE_DAILY:
+            # يبقى الشريط اليومي صالحاً حتى نشر شريط الجلسة التالية
+            delay = timedelta(seconds=self.publish_delay)
+            return self.calendar.next_session_close(now - delay) + delay
+        
+        ttl = {
+            DATA_TYPE_FUNDAMENTAL: self.fundamental_ttl,
+            DATA_TYPE_EARNINGS: self.earnings_ttl,
+            DATA_TYPE_PROFILE: self.profile_ttl
+        }.get(data_type)
+        
+        if ttl is None:
+            logger.warning(f"نوع بيانات غير معروف في سياسة التخزين المؤقت: {data_type}")
+            ttl = 3600
+        
+        return now + timedelta(seconds=ttl)
+    
+    def get_ttl(self, data_type: str, now: Optional[datetime] = None) -> int:
+        """
+        حساب مدة الصلاحية بالثواني لبيانات يتم جلبها الآن
+        
+        المعلمات:
+            data_type (str): نوع البيانات
+            now (datetime, optional): وقت الجلب. إذا لم يتم تحديده، سيتم استخدام الوقت الحالي.
+        
+        العائد:
+            int: مدة الصلاحية بالثواني (1 على الأقل)
+        """
+        now = self.calendar.to_market_time(now)
+        return max(1, int((self.get_expiry(data_type, now) - now).total_seconds()))
+    
+    def get_stale_grace(self, data_type: str) -> int:
+        """
+        الحصول على مدة السماح لاستخدام القيمة القديمة بعد انتهاء صلاحيتها أثناء تحديثها في الخلفية
+        
+        المعلمات:
+            data_type (str): نوع البيانات
+        
+        العائد:
+            int: مدة السماح بالثواني (0 للأسعار اللحظية، إذ لا يُعرض سعر قديم)
+        """
+        if data_type == DATA_TYPE_QUOTE:
+            return 0
+        if data_type == DATA_TYPE_INTRADAY:
+            return self.intraday_stale_grace
+        return self.stale_grace
+    
+    def get_negative_ttl(self, reason: str, data_type: Optional[str] = None, now: Optional[datetime] = None) -> int:
+        """
+        حساب مدة صلاحية نتيجة سلبية
+        
+        لا تتجاوز صلاحية "لا توجد بيانات" صلاحية البيانات نفسها، إذ قد تظهر بيانات جديدة عند انتهائها.
+        
+        المعلمات:
+            reason (str): سبب النتيجة السلبية (not_found, no_data, rejected)
+            data_type (str, optional): نوع البيانات
+            now (datetime, optional): الوقت الحالي
+        
+        العائد:
+            int: مدة الصلاحية بالثواني (0 لعدم التخزين)
+        """
+        ttl = self.negative_ttls.get(reason, 0)
+        if reason == NEGATIVE_NO_DATA and data_type is not None:
+            ttl = min(ttl, self.get_ttl(data_type, now))
+        return ttl
+    
+    @staticmethod
+    def make_key(data_type: str, name: str, arguments: Dict[str, Any]) -> str:
+        """
+        إنشاء مفتاح التخزين المؤقت من نوع البيانات واسم الدالة ومعلماتها
+        
+        المعلمات:
+            data_type (str): نوع البيانات
+            name (str): اسم الدالة
+            arguments (Dict[str, Any]): معلمات الاستدعاء
+        
+        العائد:
+            str: مفتاح التخزين المؤقت
+        """
+        parts = [f"{k}={v}" for k, v in sorted(arguments.items())]
+        digest = hashlib.md5(":".join(parts).encode()).hexdigest()
+        return f"seba:{data_type}:{name}:{digest}"
+
+
+def policy_cached(data_type: Union[str, Callable[[Dict[str, Any]], str]]):
+    """
+    مزخرف لتخزين نتائج دوال مدير تكامل البيانات مؤقتاً حسب سياسة نوع البيانات
+    
+    يتطلب أن يحتوي الكائن على الخاصيتين cache (CacheManager) و cache_policy (CachePolicy).
+    تضيف الدالة المزخرفة المعلمة use_cache (افتراضياً True) لتجاوز التخزين المؤقت.
+    تُخزن النتائج الفارغة كنتائج سلبية قصيرة الصلاحية حسب سببها (يحدده الكائن عبر classify_miss إن وجدت)،
+    ما لم يفشل استدعاء أحد المصادر أثناء التحميل (record_load_failure)،
+    وتُعاد القيم القديمة خلال مدة السماح أثناء تحديثها في الخلفية.
+    
+    المعلمات:
+        data_type (str|Callable): نوع البيانات، أو دالة تحدده من معلمات الاستدعاء
+    
+    العائد:
+        Callable: الدالة المزخرفة
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        @wraps(func)
+        def wrapper(self, *args, use_cache: bool = True, **kwargs):
+            cache_manager = getattr(self, "cache", None)
+            policy = getattr(self, "cache_policy", None)
+            if not use_cache or cache_manager is None or policy is None:
+                return func(self, *args, **kwargs)
+            
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = {k: v for k, v in bound.arguments.items() if k != "self"}
+            resolved_type = data_type(arguments) if callable(data_type) else data_type
+            key = policy.make_key(resolved_type, func.__name__, arguments)
+            failures = set()
+            
+            def load():
+                failures.clear()
+                token = _load_failures.set(failures)
+                try:
+                    return func(self, *args, **kwargs)
+                finally:
+                    _load_failures.reset(token)
+            
+            def negative():
+                # النتيجة الفارغة بعد فشل استدعاء مصدر لم يؤكدها أي رد، فلا تُخزن
+                if failures:
+                    return None
+                # يحدد الكائن سبب النتيجة الفارغة، أو None إذا كانت بسبب عطل عام في المصادر
+                classify_miss = getattr(self, "classify_miss", None)
+                reason = classify_miss(arguments.get("symbol")) if classify_miss else NEGATIVE_NO_DATA
+                if reason is None:
+                    return None
+                return reason, policy.get_negative_ttl(reason, resolved_type)
+            
+            # القيمة القديمة خلال مدة السماح تُعاد فوراً ويتم تحديثها في الخلفية، والنتائج الفارغة تُخزن كنتائج سلبية
+            return cache_manager.get_or_refresh(
+                key,
+                load,
+                policy.get_ttl(resolved_type),
+                policy.get_stale_grace(resolved_type),
+                dataframe=signature.return_annotation is pd.DataFrame,
+                negative=negative
+            )
+        
+        return wrapper
+    
+    return decorator
@@ -0,0 +1,302 @@
+"""
+وحدة تسخين التخزين المؤقت لمشروع SEBA
+توفر هذه الوحدة مهمة تُشغل قبل افتتاح السوق (أو بعد النشر) لتحميل البيانات التاريخية والأساسية للأسهم وقوائم
+المتابعة وسلاسل المؤشرات إلى التخزين المؤقت وقاعدة البيانات، مع حساب المؤشرات الفنية ونتائج SEPA مسبقاً
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+
+import pandas as pd
+
+from seba.data_integration.data_manager import DataIntegrationManager
+from seba.database.repository import StockRepository, HistoricalDataRepository
+from seba.models.technical_analysis import TechnicalIndicators, DataProcessor
+from seba.models.sepa_engine import SEPAEngine
+from seba.utils.trading_calendar import TradingCalendar
+from seba.utils.security import RateLimiter
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """فئة لتسخين التخزين المؤقت والتخزين المحلي قبل افتتاح السوق"""
+    
+    def __init__(
+        self,
+        data_manager: Optional[DataIntegrationManager] = None,
+        sepa_engine: Optional[SEPAEngine] = None,
+        stock_repository: Optional[StockRepository] = None,
+        historical_repository: Optional[HistoricalDataRepository] = None,
+        calendar: Optional[TradingCalendar] = None,
+        index_symbols: Optional[List[str]] = None,
+        universe_size: Optional[int] = None,
+        lookback_days: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        lead_minutes: Optional[int] = None,
+        store_history: Optional[bool] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            data_manager (DataIntegrationManager, optional): مدير تكامل البيانات (يجب أن يكون نفس مدير الخادم لتسخين تخزينه المؤقت)
+            sepa_engine (SEPAEngine, optional): محرك قواعد SEPA
+            stock_repository (StockRepository, optional): مستودع الأسهم وقوائم الأسهم
+            historical_repository (HistoricalDataRepository, optional): مستودع البيانات التاريخية
+            calendar (TradingCalendar, optional): تقويم التداول
+            index_symbols (List[str], optional): رموز المؤشرات، أولها المؤشر المرجعي للمؤشرات الفنية وSEPA
+            universe_size (int, optional): عدد الرموز المأخوذة من قائمة الرموز (0 لجميعها)
+            lookback_days (int, optional): عدد الأيام التاريخية المحملة (نفس نطاق طلبات الواجهة)
+            max_workers (int, optional): عدد الأسهم التي تُسخن بالتوازي
+            requests_per_minute (int, optional): الحد الأقصى لطلبات المصادر في الدقيقة
+            lead_minutes (int, optional): عدد الدقائق قبل افتتاح السوق لتشغيل المهمة المجدولة
+            store_history (bool, optional): تخزين الأشرطة اليومية غير المخزنة في قاعدة البيانات
+        """
+        self.data_manager = data_manager or DataIntegrationManager()
+        self.sepa_engine = sepa_engine or SEPAEngine()
+        self.stock_repository = stock_repository or StockRepository()
+        self.historical_repository = historical_repository or HistoricalDataRepository()
+        self.calendar = calendar or TradingCalendar()
+        
+        if index_symbols is None:
+            index_symbols = [symbol.strip() for symbol in os.getenv("WARMUP_INDEX_SYMBOLS", "^GSPC,^IXIC,^DJI").split(",") if symbol.strip()]
+        self.index_symbols = index_symbols
+        self.universe_size = universe_size if universe_size is not None else int(os.getenv("WARMUP_UNIVERSE_SIZE", "100"))
+        self.lookback_days = lookback_days or int(os.getenv("WARMUP_LOOKBACK_DAYS", "365"))
+        self.max_workers = max_workers or int(os.getenv("WARMUP_WORKERS", "4"))
+        self.rate_limiter = RateLimiter(
+            max_requests=requests_per_minute or int(os.getenv("WARMUP_REQUESTS_PER_MINUTE", "120")),
+            time_window=60
+        )
+        self.lead_minutes = lead_minutes if lead_minutes is not None else int(os.getenv("WARMUP_LEAD_MINUTES", "45"))
+        if store_history is None:
+            store_history = os.getenv("WARMUP_STORE_HISTORY", "true").lower() in ["1", "true", "yes"]
+        self.store_history = store_history
+        
+        self.last_report = None
+        self._rate_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def _history_range(self) -> Dict[str, str]:
+        """نطاق البيانات التاريخية بنفس صيغة طلبات الواجهة حتى تتطابق مفاتيح التخزين المؤقت"""
+        return {
+            "start_date": (datetime.now() - timedelta(days=self.lookback_days)).strftime("%Y-%m-%d"),
+            "end_date": datetime.now().strftime("%Y-%m-%d")
+        }
+    
+    def _wait_for_slot(self) -> None:
+        """الانتظار حتى يسمح محدد المعدل بطلب جديد"""
+        while True:
+            with self._rate_lock:
+                if self.rate_limiter.is_allowed("warmup"):
+                    return
+            time.sleep(0.5)
+    
+    def get_universe(self) -> List[str]:
+        """
+        الحصول على رموز الأسهم المراد تسخينها: قوائم الأسهم أولاً، ثم الأسهم النشطة في قاعدة البيانات،
+        ثم أول universe_size رمز من قائمة الرموز
+        
+        العائد:
+            List[str]: الرموز بدون تكرار
+        """
+        symbols = []
+        for list_symbols in self.stock_repository.get_stock_list_symbols().values():
+            symbols.extend(list_symbols)
+        symbols.extend(stock.symbol for stock in self.stock_repository.get_all_stocks())
+        
+        listed = self.data_manager.get_symbols_list()
+        symbols.extend(listed[:self.universe_size] if self.universe_size else listed)
+        
+        universe = []
+        seen = set(self.index_symbols)
+        for symbol in symbols:
+            symbol = symbol.strip().upper()
+            if symbol and symbol not in seen:
+                seen.add(symbol)
+                universe.append(symbol)
+        return universe
+    
+    def _fetch_history(self, symbol: str) -> pd.DataFrame:
+        """جلب البيانات التاريخية اليومية (من التخزين المؤقت إذا كانت صالحة)"""
+        self._wait_for_slot()
+        return self.data_manager.get_historical_data(symbol=symbol, interval="1d", **self._history_range())
+    
+    def _store_history(self, symbol: str, history: pd.DataFrame) -> int:
+        """تخزين الأشرطة اليومية غير المخزنة فقط في قاعدة البيانات"""
+        if "date" not in history.columns:
+            return 0
+        
+        dates = pd.DatetimeIndex(pd.to_datetime(history["date"])).normalize()
+        stored = self.historical_repository.get_stored_dates([symbol], dates.min().date(), dates.max().date())
+        if stored is None:
+            # تعذر معرفة الأشرطة المخزنة، فلا يُخزن شيء حتى لا تتكرر الأشرطة الموجودة
+            logger.error(f"تعذر قراءة التواريخ المخزنة للسهم {symbol}، تم تخطي تخزين الأشرطة")
+            return 0
+        
+        missing = history[~dates.isin(stored.get(symbol, pd.DatetimeIndex([])))]
+        if missing.empty:
+            return 0
+        
+        return len(missing) if self.historical_repository.add_historical_data(symbol, missing) else 0
+    
+    def warm_indices(self) -> Dict[str, pd.DataFrame]:
+        """
+        تسخين سلاسل المؤشرات
+        
+        العائد:
+            Dict[str, pd.DataFrame]: البيانات التاريخية لكل مؤشر
+        """
+        indices = {}
+        for symbol in self.index_symbols:
+            try:
+                indices[symbol] = self._fetch_history(symbol)
+            except Exception as e:
+                logger.error(f"خطأ في تسخين بيانات المؤشر {symbol}: {str(e)}")
+                indices[symbol] = pd.DataFrame()
+        return indices
+    
+    def warm_symbol(self, symbol: str, index_data: Optional[pd.DataFrame] = None, tracked: bool = False) -> Dict:
+        """
+        تسخين سهم واحد: البيانات التاريخية والأساسية والمؤشرات الفنية ونتائج SEPA
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            index_data (pd.DataFrame, optional): بيانات المؤشر المرجعي
+            tracked (bool, optional): السهم موجود في قاعدة البيانات ويمكن تخزين أشرطته
+        
+        العائد:
+            Dict: نتيجة التسخين (status: warmed, no_data, failed)
+        """
+        result = {"symbol": symbol, "status": "warmed", "stored_rows": 0}
+        try:
+            history = self._fetch_history(symbol)
+            if history is None or history.empty:
+                result["status"] = "no_data"
+                return result
+            
+            if self.store_history and tracked:
+                result["stored_rows"] = self._store_history(symbol, history)
+            
+            self._wait_for_slot()
+            self.data_manager.get_fundamental_data(symbol)
+            
+            # نفس الاستدعاءات التي تنفذها الواجهة حتى تُستخدم النتائج المخزنة مؤقتاً
+            TechnicalIndicators.calculate_all_indicators(DataProcessor.preprocess_data(history), index_data)
+            self.sepa_engine.analyze_stock(history, index_data)
+        except Exception as e:
+            logger.error(f"خطأ في تسخين التخزين المؤقت للسهم {symbol}: {str(e)}")
+            result["status"] = "failed"
+            result["error"] = str(e)
+        return result
+    
+    def run(self, symbols: Optional[List[str]] = None) -> Dict:
+        """
+        تشغيل مهمة التسخين
+        
+        المعلمات:
+            symbols (List[str], optional): الرموز المراد تسخينها. إذا لم يتم تحديدها، سيتم استخدام get_universe.
+        
+        العائد:
+            Dict: تقرير التسخين (عدد الأسهم والمؤشرات، الأسهم المسخنة، بدون بيانات، الفاشلة، الأشرطة المخزنة، المدة)
+        """
+        if not self._run_lock.acquire(blocking=False):
+            logger.warning("مهمة تسخين التخزين المؤقت قيد التشغيل بالفعل")
+            return {}
+        
+        try:
+            start_time = time.monotonic()
+            logger.info("بدء تسخين التخزين المؤقت")
+            
+            indices = self.warm_indices()
+            index_data = indices.get(self.index_symbols[0]) if self.index_symbols else None
+            
+            symbols = [symbol.upper() for symbol in symbols] if symbols is not None else self.get_universe()
+            tracked = {stock.symbol for stock in self.stock_repository.get_all_stocks()} if self.store_history else set()
+            
+            results = []
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="seba-warmup") as executor:
+                futures = [executor.submit(self.warm_symbol, symbol, index_data, symbol in tracked) for symbol in symbols]
+                for future in as_completed(futures):
+                    results.append(future.result())
+            
+            report = {
+                "indices": sum(1 for data in indices.values() if not data.empty),
+                "symbols": len(symbols),
+                "warmed": sum(1 for result in results if result["status"] == "warmed"),
+                "no_data": sorted(result["symbol"] for result in results if result["status"] == "no_data"),
+                "failed": sorted(result["symbol"] for result in results if result["status"] == "failed"),
+                "stored_rows": sum(result["stored_rows"] for result in results),
+                "duration": time.monotonic() - start_time,
+                "finished_at": datetime.now().isoformat()
+            }
+            self.last_report = report
+            logger.info(
+                f"اكتمل تسخين التخزين المؤقت: {report['warmed']} من {report['symbols']} سهم و {report['indices']} مؤشر "
+                f"خلال {report['duration']:.1f} ثانية"
+            )
+            return report
+        finally:
+            self._run_lock.release()
+    
+    def run_in_background(self, symbols: Optional[List[str]] = None) -> threading.Thread:
+        """
+        تشغيل مهمة التسخين في خيط منفصل (مثلاً بعد النشر)
+        
+        المعلمات:
+            symbols (List[str], optional): الرموز المراد تسخينها
+        
+        العائد:
+            threading.Thread: الخيط
+        """
+        thread = threading.Thread(target=self.run, args=(symbols,), name="seba-warmup-run", daemon=True)
+        thread.start()
+        return thread
+    
+    def next_run_time(self, now: Optional[datetime] = None) -> datetime:
+        """
+        حساب وقت التشغيل المجدول التالي (lead_minutes قبل افتتاح الجلسة التالية)
+        
+        المعلمات:
+            now (datetime, optional): الوقت الحالي
+        
+        العائد:
+            datetime: وقت التشغيل بتوقيت السوق
+        """
+        now = self.calendar.to_market_time(now)
+        lead = timedelta(minutes=self.lead_minutes)
+        return self.calendar.next_session_open(now + lead) - lead
+    
+    def _schedule_loop(self) -> None:
+        """انتظار وقت التشغيل المجدول وتشغيل المهمة قبل كل جلسة"""
+        while not self._stop_event.is_set():
+            run_at = self.next_run_time()
+            logger.info(f"تسخين التخزين المؤقت المجدول التالي: {run_at.isoformat()}")
+            if self._stop_event.wait(max(0.0, (run_at - self.calendar.now()).total_seconds())):
+                return
+            try:
+                self.run()
+            except Exception as e:
+                logger.error(f"خطأ في تسخين التخزين المؤقت المجدول: {str(e)}")
+    
+    def start_schedule(self) -> None:
+        """بدء تشغيل المهمة تلقائياً قبل افتتاح كل جلسة تداول"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._schedule_loop, name="seba-warmup-schedule", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """إيقاف الجدولة"""
+        self._stop_event.set()
@@ -3,31 +3,149 @@
 توفر هذه الوحدة واجهة موحدة للتعامل مع مصادر البيانات المختلفة
 """
 
+import os
+import time
 import logging
-from typing import Dict, List, Optional, Union, Any
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional, Union, Any, Callable
 import pandas as pd
 from datetime import datetime, timedelta
 
 from seba.data_integration.yahoo_finance import YahooFinanceAPI
 from seba.data_integration.alpha_vantage import AlphaVantageAPI
 from seba.data_integration.iex_cloud import IEXCloudAPI
+from seba.data_integration.provider_health import ProviderHealthMonitor, ProviderUnavailableError
+from seba.data_integration.symbol_master import SymbolMaster
+from seba.data_integration.provider_replay import install_provider_mode
+from seba.data_integration.cache_policy import (
+    CachePolicy, policy_cached, DATA_TYPE_QUOTE, DATA_TYPE_FUNDAMENTAL, DATA_TYPE_EARNINGS, DATA_TYPE_PROFILE,
+    NEGATIVE_NOT_FOUND, NEGATIVE_NO_DATA, NEGATIVE_REJECTED, record_load_failure
+)
+from seba.utils.optimization import CacheManager
+from seba.utils.metrics import get_metrics_registry, symbol_class
+from seba.utils.tracing import get_tracer, bind_context
+from seba.database.intraday_store import IntradayBarStore, INTERVAL_MINUTES
+from seba.utils.trading_calendar import MARKET_TIMEZONE
 
 # إعداد السجل
 logger = logging.getLogger(__name__)
 
+# مقاييس طلبات مصادر البيانات
+_metrics = get_metrics_registry()
+_provider_requests = _metrics.counter(
+    "seba_provider_requests_total", "عدد طلبات مصادر البيانات حسب المصدر والدالة وتصنيف الرمز والنتيجة",
+    ["provider", "method", "symbol_class", "outcome"]
+)
+_provider_latency = _metrics.histogram(
+    "seba_provider_request_duration_seconds", "زمن استجابة مصادر البيانات", ["provider", "method", "symbol_class"]
+)
+
 class DataIntegrationManager:
     """فئة لإدارة تكامل مصادر البيانات المتعددة"""
     
-    def __init__(self):
-        """تهيئة الفئة"""
+    def __init__(
+        self,
+        hedge_enabled: Optional[bool] = None,
+        hedge_budget: Optional[float] = None,
+        hedge_max_ratio: Optional[float] = None,
+        cache_enabled: Optional[bool] = None,
+        hedge_timeout: Optional[float] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            hedge_enabled (bool, optional): تفعيل وضع التحوط للبيانات التاريخية. إذا لم يتم تحديده، سيتم استخدام HEDGE_ENABLED من متغيرات البيئة.
+            hedge_budget (float, optional): ميزانية الزمن بالثواني (p95 للمصدر الأساسي) قبل إرسال الطلب التحوطي
+            hedge_max_ratio (float, optional): الحد الأقصى لنسبة الطلبات التي يُسمح بتحوطها
+            cache_enabled (bool, optional): تفعيل التخزين المؤقت حسب نوع البيانات. إذا لم يتم تحديده، سيتم استخدام CACHE_ENABLED من متغيرات البيئة.
+            hedge_timeout (float, optional): المهلة القصوى بالثواني لانتظار المصدر في وضع التحوط قبل التحويل إلى المصدر الثانوي
+        """
         logger.info("تهيئة مدير تكامل البيانات")
-        self.yahoo_finance = YahooFinanceAPI()
-        self.alpha_vantage = AlphaVantageAPI()
-        self.iex_cloud = IEXCloudAPI()
+        # المصادر ترفع أخطاء الاتصال والخادم حتى تُسجل كإخفاقات في مراقب الصحة ولا تُعامل كنتائج فارغة
+        self.yahoo_finance = YahooFinanceAPI(raise_errors=True)
+        self.alpha_vantage = AlphaVantageAPI(raise_errors=True)
+        self.iex_cloud = IEXCloudAPI(raise_errors=True)
+        
+        # تسجيل ردود المصادر أو إعادة تشغيلها من القرص (PROVIDER_MODE: live, record, replay)
+        self.provider_mode = install_provider_mode(self)
         
         # تعيين مصدر البيانات الافتراضي
         self.default_source = "yahoo_finance"
+        
+        # السجل الرئيسي للرموز (يُحمّل عند أول استخدام)
+        self.symbol_master = SymbolMaster()
+        # إعادة المحاولة بعد فشل التحميل بفاصل زمني يتضاعف مع كل فشل متتالٍ
+        self.symbol_master_retry_seconds = float(os.getenv("SYMBOL_MASTER_RETRY_SECONDS", "30"))
+        self.symbol_master_max_retry_seconds = float(os.getenv("SYMBOL_MASTER_MAX_RETRY_SECONDS", "1800"))
+        self._symbol_master_failures = 0
+        self._symbol_master_retry_at = 0.0
+        self._symbol_master_lock = threading.Lock()
+        
+        # المصادر المرشحة لكل نوع بيانات بترتيب الأفضلية الافتراضي
+        self.provider_candidates = {
+            "historical": ["yahoo_finance", "alpha_vantage", "iex_cloud"],
+            "realtime": ["yahoo_finance", "iex_cloud"],
+            "fundamental": ["yahoo_finance", "alpha_vantage", "iex_cloud"],
+            "earnings": ["alpha_vantage", "iex_cloud"],
+            "profile": ["iex_cloud", "alpha_vantage", "yahoo_finance"]
+        }
+        
+        # التخزين المؤقت بمدة صلاحية تعتمد على نوع البيانات وتقويم التداول
+        if cache_enabled is None:
+            cache_enabled = os.getenv("CACHE_ENABLED", "true").lower() in ["1", "true", "yes"]
+        self.cache = CacheManager(redis_url=os.getenv("REDIS_URL"), disk_path=os.getenv("CACHE_DISK_PATH")) if cache_enabled else None
+        self.cache_policy = CachePolicy()
+        
+        # لا تُخزن النتائج الفارغة كنتائج سلبية عندما تكون نسبة أخطاء المصدر مرتفعة (عطل عام وليس رمزاً مفقوداً)
+        self.negative_max_error_rate = float(os.getenv("CACHE_NEGATIVE_MAX_ERROR_RATE", "0.5"))
+        
+        # التخزين المحلي للأشرطة داخل اليوم
+        self.intraday_store = IntradayBarStore()
+        
+        # مراقبة صحة المصادر واختيار المصدر الأفضل تلقائياً
+        self.adaptive_routing = os.getenv("ADAPTIVE_ROUTING", "true").lower() in ["1", "true", "yes"]
+        self.health_monitor = ProviderHealthMonitor(
+            failure_threshold=int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5")),
+            cool_down=int(os.getenv("CIRCUIT_BREAKER_COOL_DOWN", "60"))
+        )
+        
+        # إعدادات وضع التحوط
+        if hedge_enabled is None:
+            hedge_enabled = os.getenv("HEDGE_ENABLED", "false").lower() in ["1", "true", "yes"]
+        self.hedge_enabled = hedge_enabled
+        self.hedge_budget = hedge_budget if hedge_budget is not None else float(os.getenv("HEDGE_BUDGET_SECONDS", "2.0"))
+        self.hedge_max_ratio = hedge_max_ratio if hedge_max_ratio is not None else float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+        self.hedge_timeout = hedge_timeout if hedge_timeout is not None else float(os.getenv("HEDGE_TIMEOUT_SECONDS", "30"))
+        self.hedge_window = 60
+        
+        # المصدر الثانوي لكل مصدر أساسي
+        self.hedge_sources = {
+            "yahoo_finance": "alpha_vantage",
+            "alpha_vantage": "yahoo_finance",
+            "iex_cloud": "yahoo_finance"
+        }
+        
+        # المصادر التي تدعم الأشرطة داخل اليوم (Alpha Vantage يعيد بيانات يومية لهذه الفواصل)
+        self.intraday_sources = ["yahoo_finance", "iex_cloud"]
+        
+        # المصادر التي تلتزم بتاريخي البداية والنهاية (Alpha Vantage يعيد آخر 100 نقطة أو السلسلة كاملة،
+        # و IEX Cloud يعيد نطاقاً محدداً مسبقاً افتراضه شهر واحد)
+        self.date_range_sources = ["yahoo_finance"]
+        # الفترات التي تعيد لها IEX Cloud أشرطة داخل اليوم (1d و 5dm)
+        self.iex_intraday_periods = ["1d", "5d"]
+        
+        self.hedge_stats = {"requests": 0, "hedged": 0, "failures": 0, "wins": {}}
+        self._hedge_requests = deque()
+        self._hedge_times = deque()
+        self._hedge_lock = threading.Lock()
+        self._hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="seba-hedge")
+        
+        logger.info(f"وضع التحوط: {self.hedge_enabled} (الميزانية: {self.hedge_budget} ثانية، الحد الأقصى للنسبة: {self.hedge_max_ratio})")
     
+    @policy_cached(lambda arguments: CachePolicy.data_type_for_interval(arguments["interval"]))
     def get_historical_data(
         self, 
         symbol: str, 
@@ -51,67 +169,34 @@ class DataIntegrationManager:
         العائد:
             pd.DataFrame: إطار بيانات يحتوي على البيانات التاريخية
         """
-        # تحديد مصدر البيانات
-        source = source or self.default_source
+        # تحديد مصدر البيانات من المصادر التي تدعم الفاصل الزمني والنطاق المطلوبين
+        source = self._resolve_source("historical", source, self._historical_sources(period, interval))
+        if source is None:
+            return pd.DataFrame()
+        
+        # استخدام وضع التحوط إذا كان مفعلاً وكان للمصدر الأساسي مصدر ثانوي يدعم الطلب
+        secondary = self._hedge_secondary(source, period, interval) if self.hedge_enabled else None
+        if secondary:
+            return self._get_historical_data_hedged(
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                period=period,
+                interval=interval,
+                source=source,
+                secondary=secondary
+            )
         
         try:
             logger.info(f"جلب البيانات التاريخية للسهم {symbol} من {source}")
-            
-            if source == "yahoo_finance":
-                return self.yahoo_finance.get_historical_data(
-                    symbol=symbol,
-                    start_date=start_date,
-                    end_date=end_date,
-                    period=period,
-                    interval=interval
-                )
-            elif source == "alpha_vantage":
-                # تحويل المعلمات إلى تنسيق Alpha Vantage
-                output_size = "full" if period and period.lower() in ["1y", "2y", "5y", "10y", "max"] else "compact"
-                av_interval = "daily"
-                if interval:
-                    if interval in ["1d", "daily"]:
-                        av_interval = "daily"
-                    elif interval in ["1wk", "weekly"]:
-                        av_interval = "weekly"
-                    elif interval in ["1mo", "monthly"]:
-                        av_interval = "monthly"
-                
-                return self.alpha_vantage.get_historical_data(
-                    symbol=symbol,
-                    output_size=output_size,
-                    interval=av_interval
-                )
-            elif source == "iex_cloud":
-                # تحويل المعلمات إلى تنسيق IEX Cloud
-                range_period = "1m"  # افتراضي
-                if period:
-                    if period == "1d":
-                        range_period = "1d"
-                    elif period == "5d":
-                        range_period = "5d"
-                    elif period == "1mo" or period == "1m":
-                        range_period = "1m"
-                    elif period == "3mo" or period == "3m":
-                        range_period = "3m"
-                    elif period == "6mo" or period == "6m":
-                        range_period = "6m"
-                    elif period == "1y":
-                        range_period = "1y"
-                    elif period == "2y":
-                        range_period = "2y"
-                    elif period == "5y":
-                        range_period = "5y"
-                    elif period == "max":
-                        range_period = "max"
-                
-                return self.iex_cloud.get_historical_data(
-                    symbol=symbol,
-                    range_period=range_period
-                )
-            else:
-                logger.error(f"مصدر البيانات غير معروف: {source}")
-                return pd.DataFrame()
+            return self._fetch_historical_data(
+                source=source,
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                period=period,
+                interval=interval
+            )
                 
         except Exception as e:
             logger.error(f"خطأ في جلب البيانات التاريخية للسهم {symbol} من {source}: {str(e)}")
@@ -119,7 +204,10 @@ class DataIntegrationManager:
             # محاولة استخدام مصدر بديل
             if source != "yahoo_finance":
                 logger.info(f"محاولة استخدام Yahoo Finance كمصدر بديل للسهم {symbol}")
-                return self.yahoo_finance.get_historical_data(
+                return self._call_fallback(
+                    "yahoo_finance",
+                    self.yahoo_finance.get_historical_data,
+                    pd.DataFrame(),
                     symbol=symbol,
                     start_date=start_date,
                     end_date=end_date,
@@ -129,6 +217,508 @@ class DataIntegrationManager:
             
             return pd.DataFrame()
     
+    def _fetch_historical_data(
+        self,
+        source: str,
+        symbol: str,
+        start_date: Optional[Union[str, datetime]] = None,
+        end_date: Optional[Union[str, datetime]] = None,
+        period: Optional[str] = None,
+        interval: str = "1d"
+    ) -> pd.DataFrame:
+        """
+        جلب البيانات التاريخية من مصدر واحد دون أي آلية بديلة
+        
+        المعلمات:
+            source (str): مصدر البيانات (yahoo_finance, alpha_vantage, iex_cloud)
+            symbol (str): رمز السهم
+            start_date (str|datetime, optional): تاريخ البداية
+            end_date (str|datetime, optional): تاريخ النهاية
+            period (str, optional): الفترة
+            interval (str, optional): الفاصل الزمني
+        
+        العائد:
+            pd.DataFrame: إطار بيانات يحتوي على البيانات التاريخية
+        """
+        if source == "yahoo_finance":
+            return self._call_provider(
+                "yahoo_finance",
+                self.yahoo_finance.get_historical_data,
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                period=period,
+                interval=interval
+            )
+        elif source == "alpha_vantage":
+            # تحويل المعلمات إلى تنسيق Alpha Vantage
+            # الحجم المختصر 100 نقطة فقط، فالفترات الأطول من 3 أشهر تتطلب السلسلة كاملة
+            output_size = "compact" if period and period.lower() in ["1d", "5d", "1mo", "3mo"] else "full"
+            av_interval = "daily"
+            if interval:
+                if interval in ["1d", "daily"]:
+                    av_interval = "daily"
+                elif interval in ["1wk", "weekly"]:
+                    av_interval = "weekly"
+                elif interval in ["1mo", "monthly"]:
+                    av_interval = "monthly"
+            
+            return self._call_provider(
+                "alpha_vantage",
+                self.alpha_vantage.get_historical_data,
+                symbol=symbol,
+                output_size=output_size,
+                interval=av_interval
+            )
+        elif source == "iex_cloud":
+            # تحويل المعلمات إلى تنسيق IEX Cloud
+            range_period = "1m"  # افتراضي
+            if period:
+                if period == "1d":
+                    range_period = "1d"
+                elif period == "5d":
+                    range_period = "5d"
+                elif period == "1mo" or period == "1m":
+                    range_period = "1m"
+                elif period == "3mo" or period == "3m":
+                    range_period = "3m"
+                elif period == "6mo" or period == "6m":
+                    range_period = "6m"
+                elif period == "1y":
+                    range_period = "1y"
+                elif period == "2y":
+                    range_period = "2y"
+                elif period == "5y":
+                    range_period = "5y"
+                elif period == "max":
+                    range_period = "max"
+            
+            # تعيد IEX Cloud أشرطة الدقائق فقط لنطاقي 1d و 5dm
+            chart_interval = 1
+            if INTERVAL_MINUTES.get(interval):
+                range_period = "5dm" if period == "5d" else "1d"
+                chart_interval = INTERVAL_MINUTES[interval]
+            
+            return self._call_provider(
+                "iex_cloud",
+                self.iex_cloud.get_historical_data,
+                symbol=symbol,
+                range_period=range_period,
+                chart_interval=chart_interval
+            )
+        else:
+            logger.error(f"مصدر البيانات غير معروف: {source}")
+            return pd.DataFrame()
+    
+    def _get_historical_data_hedged(
+        self,
+        symbol: str,
+        start_date: Optional[Union[str, datetime]],
+        end_date: Optional[Union[str, datetime]],
+        period: Optional[str],
+        interval: str,
+        source: str,
+        secondary: str
+    ) -> pd.DataFrame:
+        """
+        جلب البيانات التاريخية مع طلب تحوطي إلى مصدر ثانوي
+        
+        يُرسل الطلب إلى المصدر الأساسي أولاً، وإذا لم يُجب خلال ميزانية الزمن
+        المحددة يُرسل الطلب نفسه إلى المصدر الثانوي وتُعتمد أول استجابة صالحة.
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            start_date (str|datetime, optional): تاريخ البداية
+            end_date (str|datetime, optional): تاريخ النهاية
+            period (str, optional): الفترة
+            interval (str): الفاصل الزمني
+            source (str): مصدر البيانات الأساسي
+            secondary (str): مصدر البيانات الثانوي
+        
+        العائد:
+            pd.DataFrame: إطار بيانات يحتوي على البيانات التاريخية
+        """
+        fetch_kwargs = {
+            "symbol": symbol,
+            "start_date": start_date,
+            "end_date": end_date,
+            "period": period,
+            "interval": interval
+        }
+        with self._hedge_lock:
+            self._hedge_requests.append(time.monotonic())
+        
+        logger.info(f"جلب البيانات التاريخية للسهم {symbol} من {source} (وضع التحوط)")
+        futures = {self._hedge_executor.submit(bind_context(self._fetch_historical_data), source, **fetch_kwargs): source}
+        
+        done, _ = wait(futures, timeout=self.hedge_budget)
+        hedged = False
+        if not done and self.health_monitor.is_available(secondary) and self._acquire_hedge_slot():
+            logger.info(
+                f"تجاوز {source} ميزانية الزمن ({self.hedge_budget} ثانية) للسهم {symbol}، "
+                f"إرسال طلب تحوطي إلى {secondary}"
+            )
+            futures[self._hedge_executor.submit(bind_context(self._fetch_historical_data), secondary, **fetch_kwargs)] = secondary
+            hedged = True
+        
+        # اعتماد أول استجابة صالحة، دون انتظار مصدر معلق بلا نهاية
+        deadline = time.monotonic() + self.hedge_timeout
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                if secondary in futures.values() or not self.health_monitor.is_available(secondary):
+                    logger.warning(f"انتهت مهلة جلب البيانات التاريخية للسهم {symbol} ({self.hedge_timeout} ثانية)")
+                    break
+                
+                logger.warning(f"تجاوز {source} المهلة ({self.hedge_timeout} ثانية) للسهم {symbol}، التحويل إلى {secondary}")
+                future = self._hedge_executor.submit(bind_context(self._fetch_historical_data), secondary, **fetch_kwargs)
+                futures[future] = secondary
+                pending.add(future)
+                deadline = time.monotonic() + self.hedge_timeout
+                continue
+            
+            for future in done:
+                provider = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    logger.error(f"خطأ في جلب البيانات التاريخية للسهم {symbol} من {provider}: {str(e)}")
+                    continue
+                
+                if data is not None and not data.empty:
+                    self._record_hedge_result(provider, hedged)
+                    return data
+        
+        self._record_hedge_result(None, hedged)
+        
+        # لم يُجب أي مصدر باستجابة صالحة، محاولة استخدام Yahoo Finance كمصدر بديل
+        if "yahoo_finance" not in futures.values():
+            logger.info(f"محاولة استخدام Yahoo Finance كمصدر بديل للسهم {symbol}")
+            return self._call_fallback("yahoo_finance", self.yahoo_finance.get_historical_data, pd.DataFrame(), **fetch_kwargs)
+        
+        return pd.DataFrame()
+    
+    def _hedge_secondary(self, source: str, period: Optional[str], interval: str) -> Optional[str]:
+        """
+        تحديد المصدر الثانوي لطلب تحوطي
+        
+        لا يُستخدم المصدر الثانوي إذا لم يكن يدعم الفاصل الزمني أو النطاق المطلوب،
+        أو إذا لم يتم تحديد مفتاح API له.
+        
+        المعلمات:
+            source (str): مصدر البيانات الأساسي
+            period (str, optional): الفترة
+            interval (str): الفاصل الزمني
+        
+        العائد:
+            str: اسم المصدر الثانوي، أو None لعدم التحوط
+        """
+        secondary = self.hedge_sources.get(source)
+        if not secondary or secondary not in self._historical_sources(period, interval):
+            return None
+        if not getattr(getattr(self, secondary), "api_key", True):
+            return None
+        return secondary
+    
+    def _acquire_hedge_slot(self) -> bool:
+        """
+        التحقق مما إذا كان مسموحاً بإرسال طلب تحوطي جديد
+        
+        لا يُسمح بأن تتجاوز نسبة الطلبات التحوطية الحد الأقصى المحدد
+        خلال النافذة الزمنية الحالية.
+        
+        العائد:
+            bool: True إذا كان الطلب التحوطي مسموحاً به، False خلاف ذلك
+        """
+        with self._hedge_lock:
+            current_time = time.monotonic()
+            while self._hedge_requests and current_time - self._hedge_requests[0] > self.hedge_window:
+                self._hedge_requests.popleft()
+            while self._hedge_times and current_time - self._hedge_times[0] > self.hedge_window:
+                self._hedge_times.popleft()
+            
+            if len(self._hedge_times) + 1 > max(1, int(len(self._hedge_requests) * self.hedge_max_ratio)):
+                logger.warning("تم بلوغ الحد الأقصى لنسبة الطلبات التحوطية، انتظار المصدر الأساسي")
+                return False
+            
+            self._hedge_times.append(current_time)
+            return True
+    
+    def _record_hedge_result(self, provider: Optional[str], hedged: bool) -> None:
+        """
+        تسجيل نتيجة طلب في وضع التحوط
+        
+        المعلمات:
+            provider (str, optional): المصدر الفائز، أو None إذا لم يُجب أي مصدر
+            hedged (bool): ما إذا تم إرسال طلب تحوطي
+        """
+        with self._hedge_lock:
+            self.hedge_stats["requests"] += 1
+            if hedged:
+                self.hedge_stats["hedged"] += 1
+            if provider is None:
+                self.hedge_stats["failures"] += 1
+            else:
+                wins = self.hedge_stats["wins"]
+                wins[provider] = wins.get(provider, 0) + 1
+        
+        if provider is not None:
+            logger.info(f"المصدر الفائز في وضع التحوط: {provider}")
+    
+    def _historical_sources(self, period: Optional[str], interval: str) -> List[str]:
+        """
+        تحديد المصادر القادرة على تلبية طلب بيانات تاريخية دون اقتطاعه
+        
+        الطلب دون فترة محددة هو طلب نطاق تواريخ (صريح أو سنة واحدة افتراضياً)، ولا يلبيه إلا مصدر
+        يلتزم بتاريخي البداية والنهاية. وطلبات الأشرطة داخل اليوم لا تلبيها إلا المصادر التي تدعمها.
+        
+        المعلمات:
+            period (str, optional): الفترة
+            interval (str): الفاصل الزمني
+        
+        العائد:
+            List[str]: المصادر القادرة على تلبية الطلب
+        """
+        sources = self.provider_candidates["historical"]
+        if not period:
+            sources = [source for source in sources if source in self.date_range_sources]
+        if INTERVAL_MINUTES.get(interval):
+            sources = [
+                source for source in sources
+                if source in self.intraday_sources and (source != "iex_cloud" or period in self.iex_intraday_periods)
+            ]
+        return sources
+    
+    def _select_source(self, data_type: str, capable: Optional[List[str]] = None) -> str:
+        """
+        اختيار مصدر البيانات الأسرع والأكثر صحة لنوع بيانات معين
+        
+        المعلمات:
+            data_type (str): نوع البيانات (historical, realtime, fundamental, earnings)
+            capable (List[str], optional): المصادر القادرة على تلبية الطلب، تُستبعد بقية المرشحين قبل الترتيب
+        
+        العائد:
+            str: اسم مصدر البيانات المختار (يرفع ProviderUnavailableError إذا كانت قواطع جميع المرشحين مفتوحة)
+        """
+        candidates = self.provider_candidates.get(data_type, [self.default_source])
+        if capable is not None:
+            candidates = [provider for provider in candidates if provider in capable]
+            if not candidates:
+                raise ProviderUnavailableError(f"لا يوجد مصدر يدعم طلب {data_type} المطلوب")
+        if not self.adaptive_routing:
+            return candidates[0]
+        
+        # تفضيل المصادر التي تم تحديد مفتاح API لها
+        configured = [
+            provider for provider in candidates
+            if getattr(getattr(self, provider), "api_key", True)
+        ] or candidates
+        
+        # أول مصدر يسمح قاطعه بالطلب (بعد فترة التهدئة يُسمح بطلب تجريبي واحد فقط حتى تُعرف نتيجته)
+        selected = next(
+            (provider for provider in self.health_monitor.rank_providers(configured) if self.health_monitor.allow_request(provider)),
+            None
+        )
+        if selected is None:
+            # لا يُوجه الطلب إلى مصدر قاطعه مفتوح، بل إلى المرشحين الآخرين ولو بلا مفتاح
+            unconfigured = [provider for provider in candidates if provider not in configured]
+            selected = next(
+                (provider for provider in self.health_monitor.rank_providers(unconfigured) if self.health_monitor.allow_request(provider)),
+                None
+            )
+            if selected is None:
+                raise ProviderUnavailableError(f"جميع مصادر {data_type} متعثرة حالياً")
+            logger.warning(f"جميع مصادر {data_type} المهيأة متعثرة حالياً، استخدام {selected}")
+            return selected
+        
+        if selected != candidates[0]:
+            logger.info(f"توجيه طلب {data_type} إلى {selected} بناءً على صحة المصادر")
+        return selected
+    
+    def _resolve_source(self, data_type: str, source: Optional[str] = None, capable: Optional[List[str]] = None) -> Optional[str]:
+        """
+        تحديد مصدر البيانات المطلوب أو اختيار الأفضل، مع معالجة تعثر جميع المصادر
+        
+        المعلمات:
+            data_type (str): نوع البيانات (historical, realtime, fundamental, earnings, profile)
+            source (str, optional): المصدر المحدد من المستدعي
+            capable (List[str], optional): المصادر القادرة على تلبية الطلب
+        
+        العائد:
+            str: اسم مصدر البيانات، أو None إذا لم يتوفر أي مصدر
+        """
+        if source:
+            return source
+        try:
+            return self._select_source(data_type, capable)
+        except ProviderUnavailableError as e:
+            logger.error(str(e))
+            # النتيجة الفارغة هنا بسبب تعثر المصادر وليست رداً منها، فلا تُخزن كنتيجة سلبية
+            record_load_failure(data_type)
+            return None
+    
+    def classify_miss(self, symbol: Optional[str], source: Optional[str] = None) -> Optional[str]:
+        """
+        تحديد سبب نتيجة فارغة لتخزينها كنتيجة سلبية
+        
+        المعلمات:
+            symbol (str, optional): رمز السهم
+            source (str, optional): المصدر الذي أعاد النتيجة. إذا لم يتم تحديده، يتم التحقق من جميع المصادر.
+        
+        العائد:
+            str: not_found إذا لم يكن الرمز في السجل الرئيسي، no_data خلاف ذلك، أو None إذا كان أحد المصادر متعثراً
+        """
+        if symbol and self.symbol_master.is_loaded and self.symbol_master.get(symbol) is None:
+            return NEGATIVE_NOT_FOUND
+        
+        providers = [source] if source else list(self.health_monitor.stats)
+        if any(self.health_monitor.is_degraded(provider, self.negative_max_error_rate) for provider in providers):
+            return None
+        return NEGATIVE_NO_DATA
+    
+    @staticmethod
+    def _rejection_reason(error: Exception) -> Optional[str]:
+        """
+        تحديد ما إذا كان استثناء المصدر رفضاً للطلب نفسه (وليس عطلاً مؤقتاً أو تقييداً للمعدل)
+        
+        المعلمات:
+            error (Exception): الاستثناء
+        
+        العائد:
+            str: not_found أو rejected، أو None إذا كان الخطأ مؤقتاً
+        """
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+        message = str(error).lower()
+        if status_code == 404 or "unknown symbol" in message or "not found" in message:
+            return NEGATIVE_NOT_FOUND
+        if status_code in (400, 401, 402, 403) or "not supported" in message or "invalid api call" in message:
+            return NEGATIVE_REJECTED
+        return None
+    
+    def _call_provider(self, source: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        استدعاء دالة مصدر بيانات وتسجيل زمن الاستجابة والنتيجة في مراقب الصحة
+        
+        تُخزن النتائج الفارغة ورفض المصدر لطلبات سهم معين كنتائج سلبية قصيرة الصلاحية، ولا يُرسل الطلب
+        نفسه إلى المصدر مرة أخرى حتى انتهاء صلاحيتها.
+        
+        المعلمات:
+            source (str): اسم مصدر البيانات
+            func (Callable): دالة المصدر المراد استدعاؤها
+            *args: المعلمات الإضافية للدالة
+            **kwargs: المعلمات الإضافية المسماة للدالة
+        
+        العائد:
+            Any: نتيجة الدالة
+        """
+        symbol = kwargs.get("symbol")
+        labels = {"provider": source, "method": getattr(func, "__name__", "call"), "symbol_class": symbol_class(symbol)}
+        with get_tracer().span(f"provider.{source}.{labels['method']}", symbol=symbol):
+            negative_key = None
+            if self.cache is not None and isinstance(symbol, str):
+                arguments = {**{str(index): value for index, value in enumerate(args)}, **kwargs}
+                negative_key = self.cache_policy.make_key("negative", f"{source}.{labels['method']}", arguments)
+                marker = self.cache.get_negative(negative_key)
+                if marker:
+                    _provider_requests.inc(outcome="negative", **labels)
+                    logger.debug(f"تجاوز طلب {source} للسهم {symbol} بسبب نتيجة سلبية مخزنة: {marker['reason']}")
+                    if marker["kind"] == "error":
+                        raise ValueError(f"رفض المصدر {source} طلب السهم {symbol} سابقاً ({marker['reason']})")
+                    return self.cache.empty_result(marker["kind"])
+            
+            start_time = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                message = str(e).lower()
+                throttled = "429" in message or "rate limit" in message or "too many requests" in message
+                reason = None if throttled else self._rejection_reason(e)
+                latency = time.perf_counter() - start_time
+                # رد المصدر بأن الرمز غير موجود استجابة سليمة، وما عداه (اتصال، خادم، تقييد، رفض) إخفاق
+                if reason == NEGATIVE_NOT_FOUND:
+                    self.health_monitor.record_success(source, latency)
+                else:
+                    self.health_monitor.record_failure(source, latency, throttled=throttled)
+                    record_load_failure(source)
+                _provider_requests.inc(outcome="throttled" if throttled else "error", **labels)
+                _provider_latency.observe(latency, **labels)
+                
+                if negative_key is not None and reason is not None:
+                    self.cache.set_negative(negative_key, reason, self.cache_policy.get_negative_ttl(reason), "error")
+                raise
+            
+            latency = time.perf_counter() - start_time
+            _provider_latency.observe(latency, **labels)
+            
+            # النتيجة الفارغة (رمز غير صالح أو بلا بيانات) استجابة سليمة من المصدر، وتُعالج بالتخزين السلبي
+            # وليس بقاطع الدائرة، حتى لا تفتح أخطاء كتابة الرموز القاطع لجميع الأسهم
+            is_empty = result is None or (result.empty if isinstance(result, pd.DataFrame) else not result)
+            _provider_requests.inc(outcome="empty" if is_empty else "success", **labels)
+            if is_empty:
+                self.health_monitor.record_success(source, latency)
+                reason = self.classify_miss(symbol, source) if negative_key is not None else None
+                if reason is not None:
+                    self.cache.set_negative(negative_key, reason, self.cache_policy.get_negative_ttl(reason), self.cache.result_kind(result))
+                return result
+            
+            # حساب تأخر حداثة البيانات التاريخية
+            freshness_lag = None
+            if isinstance(result, pd.DataFrame) and "date" in result.columns:
+                latest_date = pd.to_datetime(result["date"]).max()
+                if pd.notna(latest_date):
+                    # الأشرطة داخل اليوم من yfinance تحمل منطقة زمنية، والطوابع دون منطقة زمنية بتوقيت السوق
+                    if latest_date.tzinfo is None:
+                        latest_date = latest_date.tz_localize(MARKET_TIMEZONE)
+                    freshness_lag = max(0.0, (pd.Timestamp.now(tz="UTC") - latest_date.tz_convert("UTC")).total_seconds())
+            
+            self.health_monitor.record_success(source, latency, freshness_lag=freshness_lag)
+            return result
+    
+    def _call_fallback(self, source: str, func: Callable, empty: Any, **kwargs) -> Any:
+        """
+        استدعاء مصدر بديل بعد فشل المصدر الأساسي، مع إعادة نتيجة فارغة بدلاً من رفع الاستثناء
+        
+        المعلمات:
+            source (str): اسم مصدر البيانات البديل
+            func (Callable): دالة المصدر المراد استدعاؤها
+            empty (Any): النتيجة الفارغة المعادة عند فشل المصدر البديل
+            **kwargs: المعلمات المسماة للدالة
+        
+        العائد:
+            Any: نتيجة الدالة، أو empty في حالة الفشل
+        """
+        try:
+            return self._call_provider(source, func, **kwargs)
+        except Exception as e:
+            logger.error(f"خطأ في المصدر البديل {source}: {str(e)}")
+            return empty
+    
+    def get_provider_health(self) -> Dict[str, Dict]:
+        """
+        الحصول على إحصائيات صحة مصادر البيانات
+        
+        العائد:
+            Dict[str, Dict]: زمن الاستجابة ونسبة الأخطاء وأحداث تقييد المعدل وتأخر الحداثة وحالة قاطع الدائرة لكل مصدر
+        """
+        return self.health_monitor.get_snapshot()
+    
+    def get_hedge_stats(self) -> Dict:
+        """
+        الحصول على إحصائيات وضع التحوط
+        
+        العائد:
+            Dict: عدد الطلبات والطلبات التحوطية والمصدر الفائز لكل طلب
+        """
+        with self._hedge_lock:
+            return {
+                "requests": self.hedge_stats["requests"],
+                "hedged": self.hedge_stats["hedged"],
+                "failures": self.hedge_stats["failures"],
+                "wins": dict(self.hedge_stats["wins"])
+            }
+    
+    @policy_cached(DATA_TYPE_QUOTE)
     def get_realtime_data(self, symbol: str, source: Optional[str] = None) -> Dict:
         """
         الحصول على البيانات في الوقت الفعلي لسهم معين
@@ -141,15 +731,17 @@ class DataIntegrationManager:
             Dict: قاموس يحتوي على البيانات في الوقت الفعلي
         """
         # تحديد مصدر البيانات
-        source = source or self.default_source
+        source = self._resolve_source("realtime", source)
+        if source is None:
+            return {}
         
         try:
             logger.info(f"جلب البيانات في الوقت الفعلي للسهم {symbol} من {source}")
             
             if source == "yahoo_finance":
-                return self.yahoo_finance.get_realtime_data(symbol=symbol)
+                return self._call_provider("yahoo_finance", self.yahoo_finance.get_realtime_data, symbol=symbol)
             elif source == "iex_cloud":
-                return self.iex_cloud.get_quote(symbol=symbol)
+                return self._call_provider("iex_cloud", self.iex_cloud.get_quote, symbol=symbol)
             else:
                 logger.error(f"مصدر البيانات غير معروف أو لا يدعم البيانات في الوقت الفعلي: {source}")
                 return {}
@@ -160,10 +752,42 @@ class DataIntegrationManager:
             # محاولة استخدام مصدر بديل
             if source != "yahoo_finance":
                 logger.info(f"محاولة استخدام Yahoo Finance كمصدر بديل للسهم {symbol}")
-                return self.yahoo_finance.get_realtime_data(symbol=symbol)
+                return self._call_fallback("yahoo_finance", self.yahoo_finance.get_realtime_data, {}, symbol=symbol)
             
             return {}
     
+    def get_realtime_data_batch(self, symbols: List[str], source: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        الحصول على البيانات في الوقت الفعلي لعدة أسهم باستخدام الطلبات المجمعة إن توفرت لدى المصدر
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم
+            source (str, optional): مصدر البيانات (yahoo_finance, iex_cloud)
+        
+        العائد:
+            Dict[str, Dict]: قاموس يحتوي على البيانات في الوقت الفعلي لكل سهم
+        """
+        # تحديد مصدر البيانات
+        source = self._resolve_source("realtime", source)
+        if source is None:
+            return {}
+        
+        try:
+            logger.info(f"جلب البيانات في الوقت الفعلي لـ {len(symbols)} سهم من {source}")
+            
+            if source == "yahoo_finance":
+                return self._call_provider("yahoo_finance", self.yahoo_finance.get_multiple_realtime_data, symbols=symbols)
+            elif source == "iex_cloud":
+                return self._call_provider("iex_cloud", self.iex_cloud.get_quotes_batch, symbols=symbols)
+            else:
+                logger.error(f"مصدر البيانات غير معروف أو لا يدعم البيانات في الوقت الفعلي: {source}")
+                return {}
+        
+        except Exception as e:
+            logger.error(f"خطأ في جلب البيانات في الوقت الفعلي لعدة أسهم من {source}: {str(e)}")
+            return {}
+    
+    @policy_cached(DATA_TYPE_FUNDAMENTAL)
     def get_fundamental_data(self, symbol: str, source: Optional[str] = None) -> Dict:
         """
         الحصول على البيانات الأساسية لسهم معين
@@ -176,20 +800,21 @@ class DataIntegrationManager:
             Dict: قاموس يحتوي على البيانات الأساسية
         """
         # تحديد مصدر البيانات
-        source = source or self.default_source
+        source = self._resolve_source("fundamental", source)
+        if source is None:
+            return {}
         
         try:
             logger.info(f"جلب البيانات الأساسية للسهم {symbol} من {source}")
             
             if source == "yahoo_finance":
-                return self.yahoo_finance.get_fundamental_data(symbol=symbol)
+                return self._call_provider("yahoo_finance", self.yahoo_finance.get_fundamental_data, symbol=symbol)
             elif source == "alpha_vantage":
-                return self.alpha_vantage.get_company_overview(symbol=symbol)
+                return self._call_provider("alpha_vantage", self.alpha_vantage.get_company_overview, symbol=symbol)
             elif source == "iex_cloud":
-                # دمج معلومات الشركة والإحصائيات
-                company_info = self.iex_cloud.get_company_info(symbol=symbol)
-                stats = self.iex_cloud.get_stats(symbol=symbol)
-                return {**company_info, **stats}
+                # دمج معلومات الشركة والإحصائيات بطلب مجمع واحد
+                fundamentals = self._call_provider("iex_cloud", self.iex_cloud.get_fundamentals_batch, symbols=[symbol])
+                return fundamentals.get(symbol.upper(), {})
             else:
                 logger.error(f"مصدر البيانات غير معروف: {source}")
                 return {}
@@ -200,10 +825,162 @@ class DataIntegrationManager:
             # محاولة استخدام مصدر بديل
             if source != "yahoo_finance":
                 logger.info(f"محاولة استخدام Yahoo Finance كمصدر بديل للسهم {symbol}")
-                return self.yahoo_finance.get_fundamental_data(symbol=symbol)
+                return self._call_fallback("yahoo_finance", self.yahoo_finance.get_fundamental_data, {}, symbol=symbol)
+            
+            return {}
+    
+    def get_fundamental_data_batch(self, symbols: List[str], source: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        الحصول على البيانات الأساسية لعدة أسهم باستخدام الطلبات المجمعة إن توفرت لدى المصدر
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم
+            source (str, optional): مصدر البيانات (iex_cloud, yahoo_finance, alpha_vantage)
+        
+        العائد:
+            Dict[str, Dict]: قاموس يحتوي على البيانات الأساسية لكل سهم
+        """
+        # تحديد مصدر البيانات
+        source = self._resolve_source("fundamental", source)
+        if source is None:
+            return {}
+        
+        try:
+            logger.info(f"جلب البيانات الأساسية لـ {len(symbols)} سهم من {source}")
+            
+            if source == "iex_cloud":
+                return self._call_provider("iex_cloud", self.iex_cloud.get_fundamentals_batch, symbols=symbols)
+            
+            # المصادر التي لا تدعم الطلبات المجمعة تُستدعى لكل سهم على حدة
+            result = {}
+            for symbol in symbols:
+                data = self.get_fundamental_data(symbol, source=source)
+                if data:
+                    result[symbol] = data
+            return result
+        
+        except Exception as e:
+            logger.error(f"خطأ في جلب البيانات الأساسية لعدة أسهم من {source}: {str(e)}")
+            return {}
+    
+    @policy_cached(DATA_TYPE_PROFILE)
+    def get_company_profile(self, symbol: str, source: Optional[str] = None) -> Dict:
+        """
+        الحصول على ملف الشركة (الاسم، القطاع، الصناعة، الوصف)
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            source (str, optional): مصدر البيانات (iex_cloud, alpha_vantage, yahoo_finance)
+        
+        العائد:
+            Dict: قاموس يحتوي على ملف الشركة
+        """
+        # تحديد مصدر البيانات
+        source = self._resolve_source("profile", source)
+        if source is None:
+            return {}
+        
+        try:
+            logger.info(f"جلب ملف الشركة للسهم {symbol} من {source}")
             
+            if source == "iex_cloud":
+                return self._call_provider("iex_cloud", self.iex_cloud.get_company_info, symbol=symbol)
+            elif source == "alpha_vantage":
+                return self._call_provider("alpha_vantage", self.alpha_vantage.get_company_overview, symbol=symbol)
+            elif source == "yahoo_finance":
+                return self._call_provider("yahoo_finance", self.yahoo_finance.get_fundamental_data, symbol=symbol)
+            else:
+                logger.error(f"مصدر البيانات غير معروف: {source}")
+                return {}
+        
+        except Exception as e:
+            logger.error(f"خطأ في جلب ملف الشركة للسهم {symbol} من {source}: {str(e)}")
             return {}
     
+    def clear_cache(self) -> bool:
+        """
+        مسح البيانات المخزنة مؤقتاً لمدير تكامل البيانات
+        
+        العائد:
+            bool: True في حالة النجاح، False في حالة الفشل
+        """
+        if self.cache is None:
+            return True
+        return self.cache.clear()
+    
+    def ingest_intraday_data(self, symbol: str, period: str = "5d", source: Optional[str] = None) -> int:
+        """
+        جلب الأشرطة داخل اليوم لسهم معين وإلحاق الجديد منها بالتخزين المحلي
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            period (str, optional): الفترة المطلوبة من المصدر
+            source (str, optional): مصدر البيانات (yahoo_finance, iex_cloud)
+        
+        العائد:
+            int: عدد الأشرطة الجديدة المخزنة
+        """
+        source = source or "yahoo_finance"
+        if source not in self.intraday_sources:
+            logger.error(f"مصدر البيانات لا يدعم الأشرطة داخل اليوم: {source}")
+            return 0
+        
+        try:
+            # الجلب من المصدر المحدد مباشرة دون تحوط أو مصدر بديل حتى لا تُخزن أشرطة بفاصل مختلف
+            bars = self._fetch_historical_data(
+                source=source,
+                symbol=symbol,
+                period=period,
+                interval=self.intraday_store.base_interval
+            )
+            if bars.empty:
+                logger.warning(f"لم يتم العثور على أشرطة داخل اليوم للسهم {symbol} من {source}")
+                return 0
+            
+            return self.intraday_store.append(symbol, bars)
+        
+        except Exception as e:
+            logger.error(f"خطأ في تخزين الأشرطة داخل اليوم للسهم {symbol}: {str(e)}")
+            return 0
+    
+    def get_intraday_data(
+        self,
+        symbol: str,
+        interval: str = "5m",
+        start: Optional[Union[str, datetime]] = None,
+        end: Optional[Union[str, datetime]] = None
+    ) -> pd.DataFrame:
+        """
+        الحصول على الأشرطة داخل اليوم لسهم معين من التخزين المحلي دون استدعاء المصادر
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            interval (str, optional): الفاصل الزمني (1m, 5m, 15m, 30m, 1h, 1d)
+            start (str|datetime, optional): بداية النطاق
+            end (str|datetime, optional): نهاية النطاق
+        
+        العائد:
+            pd.DataFrame: إطار بيانات يحتوي على الأشرطة
+        """
+        try:
+            return self.intraday_store.get_bars(symbol, start=start, end=end, interval=interval)
+        except Exception as e:
+            logger.error(f"خطأ في قراءة الأشرطة داخل اليوم للسهم {symbol}: {str(e)}")
+            return pd.DataFrame()
+    
+    def get_relative_volume(self, symbol: str, lookback: int = 20) -> Optional[float]:
+        """
+        حساب الحجم النسبي لسهم معين من الأشرطة داخل اليوم المخزنة
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            lookback (int, optional): عدد الجلسات السابقة للمقارنة
+        
+        العائد:
+            float: الحجم النسبي، أو None إذا لم تتوفر بيانات كافية
+        """
+        return self.intraday_store.get_relative_volume(symbol, lookback=lookback)
+    
     def get_technical_indicators(
         self, 
         symbol: str, 
@@ -243,19 +1020,97 @@ class DataIntegrationManager:
             logger.error(f"خطأ في جلب المؤشر الفني {indicator} للسهم {symbol} من {source}: {str(e)}")
             return pd.DataFrame()
     
-    def search_stocks(self, query: str, source: Optional[str] = None) -> List[Dict]:
+    def _ensure_symbol_master(self) -> bool:
+        """
+        تحميل السجل الرئيسي للرموز عند أول استخدام
+        
+        إذا فشل التحميل تُعاد المحاولة لاحقاً بفاصل زمني أسي (SYMBOL_MASTER_RETRY_SECONDS
+        يتضاعف حتى SYMBOL_MASTER_MAX_RETRY_SECONDS) بدلاً من التوقف عن المحاولة نهائياً.
+        
+        العائد:
+            bool: True إذا كان السجل محملاً
+        """
+        if self.symbol_master.is_loaded:
+            return True
+        
+        with self._symbol_master_lock:
+            if self.symbol_master.is_loaded or time.monotonic() < self._symbol_master_retry_at:
+                return self.symbol_master.is_loaded
+            
+            if self.reload_symbol_master():
+                self._symbol_master_failures = 0
+                self._symbol_master_retry_at = 0.0
+            else:
+                delay = min(
+                    self.symbol_master_retry_seconds * (2 ** self._symbol_master_failures),
+                    self.symbol_master_max_retry_seconds
+                )
+                self._symbol_master_failures += 1
+                self._symbol_master_retry_at = time.monotonic() + delay
+                logger.warning(f"تعذر تحميل السجل الرئيسي للرموز، إعادة المحاولة بعد {delay:.0f} ثانية")
+        
+        return self.symbol_master.is_loaded
+    
+    def reload_symbol_master(self) -> int:
+        """
+        تحميل السجل الرئيسي للرموز من الملف المحلي، أو من قاعدة البيانات إذا لم يتوفر الملف
+        
+        العائد:
+            int: عدد الرموز المحملة
+        """
+        count = 0
+        if self.symbol_master.symbols_file:
+            count = self.symbol_master.load_from_file()
+        
+        if not count:
+            try:
+                from seba.database.repository import StockRepository
+                count = self.symbol_master.load_from_database(StockRepository())
+            except Exception as e:
+                logger.error(f"خطأ في تحميل الرموز من قاعدة البيانات: {str(e)}")
+        
+        return count
+    
+    def get_symbols_list(self, exchange: Optional[str] = None, sector: Optional[str] = None) -> List[str]:
+        """
+        الحصول على قائمة رموز الأسهم من السجل الرئيسي للرموز
+        
+        المعلمات:
+            exchange (str, optional): السوق
+            sector (str, optional): القطاع
+        
+        العائد:
+            List[str]: قائمة الرموز
+        """
+        if not self._ensure_symbol_master():
+            logger.warning("السجل الرئيسي للرموز فارغ")
+            return []
+        
+        return self.symbol_master.get_symbols(exchange=exchange, sector=sector)
+    
+    def search_stocks(self, query: str, source: Optional[str] = None, limit: int = 10) -> List[Dict]:
         """
         البحث عن الأسهم باستخدام استعلام
         
+        يُستخدم السجل الرئيسي للرموز في الذاكرة افتراضياً، ولا يتم الرجوع إلى مصادر البيانات
+        إلا إذا لم يكن السجل محملاً أو لم يعثر على نتائج.
+        
         المعلمات:
             query (str): استعلام البحث
-            source (str, optional): مصدر البيانات (yahoo_finance, alpha_vantage)
+            source (str, optional): مصدر البيانات (symbol_master, yahoo_finance, alpha_vantage)
+            limit (int, optional): الحد الأقصى لعدد النتائج من السجل الرئيسي للرموز
             
         العائد:
             List[Dict]: قائمة بالأسهم المطابقة
         """
+        # البحث في السجل الرئيسي للرموز دون أي اتصال بمصادر البيانات
+        if source in (None, "symbol_master") and self._ensure_symbol_master():
+            results = self.symbol_master.search(query, limit=limit)
+            if results or source == "symbol_master":
+                return results
+        
         # تحديد مصدر البيانات
-        source = source or "alpha_vantage"  # Alpha Vantage يوفر واجهة بحث أفضل
+        source = source if source not in (None, "symbol_master") else "alpha_vantage"  # Alpha Vantage يوفر واجهة بحث أفضل
         
         try:
             logger.info(f"البحث عن الأسهم باستخدام الاستعلام: {query} من {source}")
@@ -274,7 +1129,7 @@ class DataIntegrationManager:
             # محاولة استخدام مصدر بديل
             if source != "yahoo_finance":
                 logger.info(f"محاولة استخدام Yahoo Finance كمصدر بديل للبحث عن {query}")
-                return self.yahoo_finance.search_stocks(query=query)
+                return self._call_fallback("yahoo_finance", self.yahoo_finance.search_stocks, [], query=query)
             
             return []
     
@@ -317,6 +1172,7 @@ class DataIntegrationManager:
             logger.error(f"خطأ في جلب بيانات السوق من نوع {data_type} من {source}: {str(e)}")
             return None
     
+    @policy_cached(DATA_TYPE_EARNINGS)
     def get_earnings_data(self, symbol: str, source: Optional[str] = None) -> Dict:
         """
         الحصول على بيانات الأرباح للشركة
@@ -329,15 +1185,17 @@ class DataIntegrationManager:
             Dict: قاموس يحتوي على بيانات الأرباح
         """
         # تحديد مصدر البيانات
-        source = source or "alpha_vantage"
+        source = self._resolve_source("earnings", source)
+        if source is None:
+            return {}
         
         try:
             logger.info(f"جلب بيانات الأرباح للسهم {symbol} من {source}")
             
             if source == "alpha_vantage":
-                return self.alpha_vantage.get_earnings(symbol=symbol)
+                return self._call_provider("alpha_vantage", self.alpha_vantage.get_earnings, symbol=symbol)
             elif source == "iex_cloud":
-                return {"earnings": self.iex_cloud.get_earnings(symbol=symbol)}
+                return {"earnings": self._call_provider("iex_cloud", self.iex_cloud.get_earnings, symbol=symbol)}
             else:
                 logger.error(f"مصدر البيانات غير معروف أو لا يدعم بيانات الأرباح: {source}")
                 return {}
@@ -348,7 +1206,7 @@ class DataIntegrationManager:
             # محاولة استخدام مصدر بديل
             if source != "alpha_vantage":
                 logger.info(f"محاولة استخدام Alpha Vantage كمصدر بديل للسهم {symbol}")
-                return self.alpha_vantage.get_earnings(symbol=symbol)
+                return self._call_fallback("alpha_vantage", self.alpha_vantage.get_earnings, {}, symbol=symbol)
             
             return {}
     
@@ -0,0 +1,441 @@
+"""
+وحدة تخزين الأشرطة داخل اليوم لمشروع SEBA
+توفر هذه الوحدة تخزيناً عمودياً للأشرطة داخل اليوم بطوابع زمنية على القرص بأسلوب الإلحاق فقط،
+مع إعادة تجميع سريعة إلى فواصل أكبر (5m, 15m, 1h, 1d) وحساب الحجم النسبي من البيانات المحلية
+"""
+
+import os
+import glob
+import logging
+import threading
+from datetime import datetime, date
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from seba.utils.trading_calendar import MARKET_TIMEZONE, MARKET_OPEN
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# تخطيط السجل الواحد على القرص: الطابع الزمني بالنانوثانية (UTC) وقيم OHLCV
+BAR_DTYPE = np.dtype([
+    ("ts", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8")
+])
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+
+# الفواصل المدعومة بالدقائق (None للشريط اليومي)
+INTERVAL_MINUTES = {
+    "1m": 1,
+    "2m": 2,
+    "5m": 5,
+    "15m": 15,
+    "30m": 30,
+    "60m": 60,
+    "1h": 60,
+    "90m": 90,
+    "1d": None
+}
+
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_HOUR = 60 * NS_PER_MINUTE
+NS_PER_DAY = 24 * NS_PER_HOUR
+SESSION_OPEN_OFFSET = (MARKET_OPEN.hour * 60 + MARKET_OPEN.minute) * NS_PER_MINUTE
+
+
+def _hour_runs(values: np.ndarray) -> np.ndarray:
+    """بداية كل سلسلة متتالية من القيم في نفس الساعة (تتغير فروق التوقيت فقط عند حدود الساعات)"""
+    hours = values // NS_PER_HOUR
+    return np.concatenate(([0], np.flatnonzero(np.diff(hours)) + 1))
+
+
+def _to_local_ns(ts: np.ndarray) -> np.ndarray:
+    """تحويل طوابع UTC بالنانوثانية إلى الوقت المحلي للسوق (بدون منطقة زمنية) بالنانوثانية"""
+    if len(ts) == 0:
+        return ts.copy()
+    
+    # حساب فرق التوقيت مرة واحدة لكل ساعة بدلاً من كل شريط
+    starts = _hour_runs(ts)
+    sample = (ts[starts] // NS_PER_HOUR) * NS_PER_HOUR
+    local = pd.DatetimeIndex(sample.view("datetime64[ns]")).tz_localize("UTC").tz_convert(MARKET_TIMEZONE).tz_localize(None).asi8
+    return ts + np.repeat(local - sample, np.diff(np.append(starts, len(ts))))
+
+
+def _from_local_ns(local: np.ndarray) -> np.ndarray:
+    """تحويل أوقات السوق المحلية بالنانوثانية إلى طوابع UTC بالنانوثانية"""
+    if len(local) == 0:
+        return local.copy()
+    
+    starts = _hour_runs(local)
+    sample = (local[starts] // NS_PER_HOUR) * NS_PER_HOUR
+    utc = pd.DatetimeIndex(sample.view("datetime64[ns]")).tz_localize(
+        MARKET_TIMEZONE,
+        ambiguous=np.zeros(len(sample), dtype=bool),
+        nonexistent="shift_forward"
+    ).tz_convert("UTC").asi8
+    return local + np.repeat(utc - sample, np.diff(np.append(starts, len(local))))
+
+
+def _resample_array(bars: np.ndarray, interval: str) -> np.ndarray:
+    """
+    إعادة تجميع مصفوفة أشرطة مرتبة زمنياً إلى فاصل أكبر
+    
+    تبدأ الأشرطة داخل اليوم من افتتاح الجلسة (09:30 ثم 10:30 لفاصل الساعة)، والشريط اليومي من منتصف الليل.
+    """
+    if interval not in INTERVAL_MINUTES:
+        raise ValueError(f"فاصل زمني غير مدعوم: {interval}")
+    
+    if len(bars) == 0:
+        return bars
+    
+    local = _to_local_ns(bars["ts"])
+    day_start = (local // NS_PER_DAY) * NS_PER_DAY
+    minutes = INTERVAL_MINUTES[interval]
+    if minutes is None:
+        bucket_start = day_start
+    else:
+        width = minutes * NS_PER_MINUTE
+        bucket_start = day_start + SESSION_OPEN_OFFSET + ((local - day_start - SESSION_OPEN_OFFSET) // width) * width
+    
+    # حدود المجموعات في المصفوفة المرتبة
+    boundaries = np.flatnonzero(np.diff(bucket_start)) + 1
+    first = np.concatenate(([0], boundaries))
+    last = np.concatenate((boundaries - 1, [len(bars) - 1]))
+    
+    result = np.empty(len(first), dtype=BAR_DTYPE)
+    result["ts"] = _from_local_ns(bucket_start[first])
+    result["open"] = bars["open"][first]
+    result["high"] = np.fmax.reduceat(bars["high"], first)
+    result["low"] = np.fmin.reduceat(bars["low"], first)
+    result["close"] = bars["close"][last]
+    result["volume"] = np.add.reduceat(bars["volume"], first)
+    return result
+
+
+def _to_frame(bars: np.ndarray, symbol: Optional[str] = None) -> pd.DataFrame:
+    """تحويل مصفوفة أشرطة إلى إطار بيانات بعمود timestamp بتوقيت السوق"""
+    df = pd.DataFrame({field: bars[field] for field in BAR_FIELDS})
+    df.insert(0, "timestamp", pd.to_datetime(bars["ts"], utc=True).tz_convert(MARKET_TIMEZONE))
+    if symbol:
+        df["symbol"] = symbol
+    return df
+
+
+def bars_to_array(bars: pd.DataFrame) -> np.ndarray:
+    """
+    تحويل إطار بيانات أشرطة إلى مصفوفة مرتبة زمنياً بدون تكرار
+    
+    يُقرأ الطابع الزمني من العمود timestamp أو date أو من الفهرس. الطوابع بدون منطقة زمنية تُعامل كتوقيت السوق.
+    
+    المعلمات:
+        bars (pd.DataFrame): إطار بيانات يحتوي على الأعمدة open, high, low, close, volume
+    
+    العائد:
+        np.ndarray: مصفوفة من نوع BAR_DTYPE
+    """
+    if bars is None or bars.empty:
+        return np.empty(0, dtype=BAR_DTYPE)
+    
+    if "timestamp" in bars.columns:
+        timestamps = bars["timestamp"]
+    elif "date" in bars.columns:
+        timestamps = bars["date"]
+    else:
+        timestamps = bars.index
+    
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps))
+    if index.tz is None:
+        index = index.tz_localize(MARKET_TIMEZONE, ambiguous="NaT", nonexistent="NaT")
+    
+    result = np.empty(len(bars), dtype=BAR_DTYPE)
+    result["ts"] = index.tz_convert("UTC").as_unit("ns").asi8
+    for field in BAR_FIELDS:
+        if field in bars.columns:
+            result[field] = pd.to_numeric(bars[field], errors="coerce").to_numpy(dtype="f8")
+        else:
+            result[field] = np.nan
+    result["volume"] = np.nan_to_num(result["volume"])
+    
+    # استبعاد الأشرطة بدون طابع زمني أو سعر إغلاق
+    result = result[~index.isna() & ~np.isnan(result["close"])]
+    
+    # ترتيب زمني مع الاحتفاظ بآخر نسخة من الطوابع المكررة
+    result = result[np.argsort(result["ts"], kind="stable")]
+    keep = np.append(result["ts"][1:] != result["ts"][:-1], True)
+    return result[keep]
+
+
+def resample_bars(bars: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    إعادة تجميع أشرطة داخل اليوم إلى فاصل أكبر
+    
+    المعلمات:
+        bars (pd.DataFrame): إطار بيانات الأشرطة
+        interval (str): الفاصل المطلوب (5m, 15m, 30m, 1h, 1d, ...)
+    
+    العائد:
+        pd.DataFrame: إطار بيانات بالأشرطة المجمعة
+    """
+    symbol = bars["symbol"].iloc[0] if "symbol" in bars.columns and not bars.empty else None
+    return _to_frame(_resample_array(bars_to_array(bars), interval), symbol)
+
+
+class IntradayBarStore:
+    """فئة لتخزين الأشرطة داخل اليوم على القرص وقراءتها"""
+    
+    def __init__(self, directory: Optional[str] = None, base_interval: Optional[str] = None):
+        """
+        تهيئة الفئة
+        
+        تُحفظ الأشرطة في أقسام حسب الرمز ويوم التداول: {directory}/{SYMBOL}/{YYYY-MM-DD}/{segment}.npy
+        ويضيف كل إلحاق مقطعاً جديداً دون تعديل المقاطع السابقة.
+        
+        المعلمات:
+            directory (str, optional): مجلد التخزين. إذا لم يتم تحديده، سيتم استخدام INTRADAY_STORE_DIR من متغيرات البيئة.
+            base_interval (str, optional): فاصل الأشرطة المخزنة. إذا لم يتم تحديده، سيتم استخدام INTRADAY_BASE_INTERVAL من متغيرات البيئة.
+        """
+        self.directory = directory or os.getenv("INTRADAY_STORE_DIR", os.path.join("data", "intraday"))
+        self.base_interval = base_interval or os.getenv("INTRADAY_BASE_INTERVAL", "1m")
+        if INTERVAL_MINUTES.get(self.base_interval) is None:
+            raise ValueError(f"فاصل أساسي غير مدعوم للأشرطة داخل اليوم: {self.base_interval}")
+        self._lock = threading.Lock()
+    
+    def _partition_path(self, symbol: str, day: str) -> str:
+        """مسار قسم رمز معين في يوم معين"""
+        return os.path.join(self.directory, symbol.upper(), day)
+    
+    @staticmethod
+    def _read_partition(path: str) -> np.ndarray:
+        """قراءة جميع مقاطع قسم معين كمصفوفة مرتبة زمنياً"""
+        segments = sorted(glob.glob(os.path.join(path, "*.npy")))
+        if not segments:
+            return np.empty(0, dtype=BAR_DTYPE)
+        if len(segments) == 1:
+            return np.load(segments[0], mmap_mode="r")
+        
+        bars = np.concatenate([np.load(segment, mmap_mode="r") for segment in segments])
+        return bars[np.argsort(bars["ts"], kind="stable")]
+    
+    @staticmethod
+    def _write_segment(path: str, bars: np.ndarray) -> str:
+        """كتابة مقطع جديد في قسم معين بشكل ذري"""
+        os.makedirs(path, exist_ok=True)
+        existing = glob.glob(os.path.join(path, "*.npy"))
+        sequence = max((int(os.path.basename(p)[:-4]) for p in existing), default=0) + 1
+        segment_path = os.path.join(path, f"{sequence:06d}.npy")
+        tmp_path = f"{segment_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, bars)
+        os.replace(tmp_path, segment_path)
+        return segment_path
+    
+    def append(self, symbol: str, bars: pd.DataFrame) -> int:
+        """
+        إلحاق أشرطة جديدة لرمز معين
+        
+        يتم تجاهل الأشرطة الموجودة مسبقاً (نفس الطابع الزمني)، لذا يمكن إعادة الإلحاق من نوافذ متداخلة بأمان.
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            bars (pd.DataFrame): إطار بيانات الأشرطة بفاصل base_interval
+        
+        العائد:
+            int: عدد الأشرطة الجديدة المكتوبة
+        """
+        new_bars = bars_to_array(bars)
+        if len(new_bars) == 0:
+            return 0
+        
+        days = _to_local_ns(new_bars["ts"]) // NS_PER_DAY
+        written = 0
+        
+        with self._lock:
+            for day in np.unique(days):
+                partition = new_bars[days == day]
+                path = self._partition_path(symbol, str(np.datetime64(int(day), "D")))
+                
+                stored = self._read_partition(path)
+                if len(stored):
+                    partition = partition[~np.isin(partition["ts"], stored["ts"])]
+                
+                if len(partition):
+                    self._write_segment(path, partition)
+                    written += len(partition)
+        
+        logger.info(f"تمت إضافة {written} شريط داخل اليوم للسهم {symbol}")
+        return written
+    
+    def symbols(self) -> List[str]:
+        """الحصول على الرموز المخزنة"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if os.path.isdir(os.path.join(self.directory, name)))
+    
+    def days(self, symbol: str) -> List[date]:
+        """الحصول على أيام التداول المخزنة لرمز معين"""
+        path = os.path.join(self.directory, symbol.upper())
+        if not os.path.isdir(path):
+            return []
+        return sorted(date.fromisoformat(name) for name in os.listdir(path))
+    
+    def read(
+        self,
+        symbol: str,
+        start: Optional[Union[str, date, datetime]] = None,
+        end: Optional[Union[str, date, datetime]] = None
+    ) -> np.ndarray:
+        """
+        قراءة الأشرطة المخزنة لرمز معين كمصفوفة
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            start (str|date|datetime, optional): بداية النطاق (شاملة)
+            end (str|date|datetime, optional): نهاية النطاق (شاملة، والتاريخ بدون وقت يشمل اليوم كاملاً)
+        
+        العائد:
+            np.ndarray: مصفوفة من نوع BAR_DTYPE مرتبة زمنياً
+        """
+        start_ts = self._bound(start)
+        end_ts = self._bound(end, end_of_day=True)
+        
+        partitions = [
+            self._read_partition(self._partition_path(symbol, day.isoformat()))
+            for day in self.days(symbol)
+            if (start_ts is None or day >= start_ts.date()) and (end_ts is None or day <= end_ts.date())
+        ]
+        if not partitions:
+            return np.empty(0, dtype=BAR_DTYPE)
+        
+        bars = np.concatenate(partitions)
+        mask = np.ones(len(bars), dtype=bool)
+        if start_ts is not None:
+            mask &= bars["ts"] >= start_ts.tz_convert("UTC").value
+        if end_ts is not None:
+            mask &= bars["ts"] <= end_ts.tz_convert("UTC").value
+        return bars[mask]
+    
+    @staticmethod
+    def _bound(value: Optional[Union[str, date, datetime]], end_of_day: bool = False) -> Optional[pd.Timestamp]:
+        """تحويل حد النطاق إلى طابع زمني بتوقيت السوق"""
+        if value is None:
+            return None
+        
+        timestamp = pd.Timestamp(value)
+        if timestamp.tz is None:
+            timestamp = timestamp.tz_localize(MARKET_TIMEZONE)
+        else:
+            timestamp = timestamp.tz_convert(MARKET_TIMEZONE)
+        
+        if end_of_day and not isinstance(value, datetime) and timestamp == timestamp.normalize():
+            timestamp = timestamp + pd.Timedelta(days=1) - pd.Timedelta(1, unit="ns")
+        return timestamp
+    
+    def get_bars(
+        self,
+        symbol: str,
+        start: Optional[Union[str, date, datetime]] = None,
+        end: Optional[Union[str, date, datetime]] = None,
+        interval: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        الحصول على الأشرطة المخزنة لرمز معين مع إعادة تجميعها إلى الفاصل المطلوب
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            start (str|date|datetime, optional): بداية النطاق
+            end (str|date|datetime, optional): نهاية النطاق
+            interval (str, optional): الفاصل المطلوب (5m, 15m, 1h, 1d, ...). إذا لم يتم تحديده، تُعاد الأشرطة كما خُزنت.
+        
+        العائد:
+            pd.DataFrame: إطار بيانات بالأعمدة timestamp, open, high, low, close, volume, symbol
+        """
+        bars = self.read(symbol, start, end)
+        if interval and interval != self.base_interval:
+            base_minutes = INTERVAL_MINUTES[self.base_interval]
+            target_minutes = INTERVAL_MINUTES.get(interval)
+            if target_minutes is not None and target_minutes % base_minutes != 0:
+                raise ValueError(f"لا يمكن تجميع أشرطة {self.base_interval} إلى {interval}")
+            bars = _resample_array(bars, interval)
+        
+        return _to_frame(bars, symbol.upper())
+    
+    def compact(self, symbol: str) -> int:
+        """
+        دمج مقاطع كل قسم لرمز معين في مقطع واحد لتسريع القراءة
+        
+        المعلمات:
+            symbol (str): رمز السهم
+        
+        العائد:
+            int: عدد الأقسام التي تم دمجها
+        """
+        compacted = 0
+        with self._lock:
+            for day in self.days(symbol):
+                path = self._partition_path(symbol, day.isoformat())
+                segments = sorted(glob.glob(os.path.join(path, "*.npy")))
+                if len(segments) < 2:
+                    continue
+                
+                bars = np.array(self._read_partition(path))
+                self._write_segment(path, bars)
+                for segment in segments:
+                    os.remove(segment)
+                compacted += 1
+        
+        if compacted:
+            logger.info(f"تم دمج {compacted} قسم من الأشرطة داخل اليوم للسهم {symbol}")
+        return compacted
+    
+    def get_relative_volume(
+        self,
+        symbol: str,
+        moment: Optional[datetime] = None,
+        lookback: int = 20
+    ) -> Optional[float]:
+        """
+        حساب الحجم النسبي: الحجم التراكمي لليوم حتى وقت معين مقارنة بمتوسط الحجم التراكمي
+        حتى نفس الوقت في الجلسات السابقة
+        
+        المعلمات:
+            symbol (str): رمز السهم
+            moment (datetime, optional): الوقت. إذا لم يتم تحديده، سيتم استخدام آخر شريط مخزن.
+            lookback (int, optional): عدد الجلسات السابقة للمقارنة
+        
+        العائد:
+            float: الحجم النسبي، أو None إذا لم تتوفر بيانات كافية
+        """
+        days = self.days(symbol)
+        if moment is not None:
+            moment = self._bound(moment)
+            days = [day for day in days if day <= moment.date()]
+        if len(days) < 2:
+            return None
+        
+        bars = self.read(symbol, days[-(lookback + 1):][0], days[-1])
+        if moment is not None:
+            bars = bars[bars["ts"] <= moment.tz_convert("UTC").value]
+        if len(bars) == 0:
+            return None
+        
+        local = _to_local_ns(bars["ts"])
+        day_index = local // NS_PER_DAY
+        time_of_day = local - day_index * NS_PER_DAY
+        
+        # الحجم التراكمي لكل جلسة حتى وقت آخر شريط في الجلسة الحالية
+        current_day = day_index[-1]
+        cutoff = time_of_day[-1]
+        mask = time_of_day <= cutoff
+        sessions, positions = np.unique(day_index[mask], return_inverse=True)
+        volumes = np.bincount(positions, weights=bars["volume"][mask])
+        
+        history = volumes[sessions != current_day]
+        if len(history) == 0 or history.mean() <= 0:
+            return None
+        return float(volumes[sessions == current_day].sum() / history.mean())
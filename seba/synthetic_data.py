@@ -0,0 +1,375 @@
+"""
+وحدة توليد بيانات سوق اصطناعية لمشروع SEBA
+توفر هذه الوحدة مولداً متجهاً للوحات أسعار OHLCV مترابطة (حركة براونية هندسية بأنظمة سوق متبدلة،
+وعامل سوق وعوامل قطاعية، وأحجام تداول واقعية، وفجوات سعرية، وتقسيمات أسهم) مع زرع أنماط VCP
+والمرحلة الثانية بتسميات معروفة، لقياس أداء المحركات واختبارها بأحجام الإنتاج دون اتصال بمصادر البيانات
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union, Any
+
+import numpy as np
+import pandas as pd
+
+from seba.utils.trading_calendar import TradingCalendar
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# عدد أيام التداول في السنة
+TRADING_DAYS_PER_YEAR = 252
+
+# أنظمة السوق: العائد والتقلب السنويان ومتوسط مدة النظام بأيام التداول
+REGIMES = {
+    'bull': {'drift': 0.15, 'volatility': 0.13, 'duration': 400},
+    'sideways': {'drift': 0.02, 'volatility': 0.17, 'duration': 150},
+    'bear': {'drift': -0.25, 'volatility': 0.32, 'duration': 110},
+}
+
+SECTORS = [
+    "Technology", "Healthcare", "Financials", "Consumer Discretionary", "Consumer Staples", "Industrials",
+    "Energy", "Materials", "Utilities", "Real Estate", "Communication Services",
+]
+
+# التقلب السنوي للعوامل القطاعية
+SECTOR_VOLATILITY = 0.10
+
+# احتمال الفجوة السعرية اليومي وانحراف حجمها المعياري (لوغاريتمياً)
+GAP_PROBABILITY = float(os.getenv("SYNTHETIC_GAP_PROBABILITY", "0.01"))
+GAP_SIZE = 0.04
+
+# متوسط عدد تقسيمات السهم في السنة ونسبها المحتملة
+SPLITS_PER_YEAR = float(os.getenv("SYNTHETIC_SPLITS_PER_YEAR", "0.03"))
+SPLIT_RATIOS = [2.0, 2.0, 2.0, 3.0, 4.0]
+
+# العائد اليومي الإضافي في نوافذ المرحلة الثانية
+STAGE2_DRIFT = 0.003
+
+# عدد الأسهم المولدة في كل دفعة (يحد استهلاك الذاكرة عند توليد آلاف الأسهم)
+SYNTHETIC_CHUNK_SIZE = int(os.getenv("SYNTHETIC_CHUNK_SIZE", "500"))
+
+INDEX_SYMBOL = "^GSPC"
+
+# أعمدة الإطار المولد لكل سهم (نفس أعمدة البيانات الخام من المصادر، والأسعار غير معدلة)
+FRAME_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'adj_close', 'volume', 'split_coefficient', 'symbol']
+
+
+class SyntheticMarketGenerator:
+    """فئة لتوليد لوحات أسعار اصطناعية مترابطة بأنماط مزروعة معروفة التسميات"""
+    
+    def __init__(
+        self,
+        seed: int = 0,
+        calendar: Optional[TradingCalendar] = None,
+        chunk_size: Optional[int] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            seed (int, optional): بذرة المولد العشوائي (نفس البذرة والمعلمات تعطي نفس البيانات)
+            calendar (TradingCalendar, optional): تقويم التداول المستخدم لتواريخ الجلسات
+            chunk_size (int, optional): عدد الأسهم المولدة في كل دفعة
+        """
+        self.seed = seed
+        self.calendar = calendar or TradingCalendar()
+        self.chunk_size = chunk_size or SYNTHETIC_CHUNK_SIZE
+    
+    def _sessions(self, days: int, end_date: Optional[Union[str, datetime]]) -> pd.DatetimeIndex:
+        """الحصول على آخر عدد محدد من جلسات التداول حتى تاريخ النهاية"""
+        end = pd.Timestamp(end_date or datetime.now()).normalize()
+        start = end - timedelta(days=int(days * 365 / TRADING_DAYS_PER_YEAR * 1.05) + 30)
+        return self.calendar.trading_days(start, end)[-days:]
+    
+    @staticmethod
+    def _regime_path(rng: np.random.Generator, days: int) -> np.ndarray:
+        """
+        توليد مسار أنظمة السوق كسلسلة ماركوف بمدد هندسية
+        
+        العائد:
+            np.ndarray: رقم النظام (حسب ترتيب REGIMES) لكل يوم
+        """
+        names = list(REGIMES)
+        regimes, durations = [], []
+        regime = 0
+        total = 0
+        while total < days:
+            duration = int(rng.geometric(1.0 / REGIMES[names[regime]]['duration']))
+            regimes.append(regime)
+            durations.append(duration)
+            total += duration
+            regime = int(rng.choice([i for i in range(len(names)) if i != regime]))
+        return np.repeat(regimes, durations)[:days]
+    
+    @staticmethod
+    def _vcp_template(rng: np.random.Generator) -> Dict[str, Any]:
+        """
+        بناء قالب نمط VCP: انكماشات متتالية متناقصة العمق والمدة ثم اختراق بحجم مرتفع
+        
+        العائد:
+            Dict[str, Any]: العوائد اللوغاريتمية اليومية للقالب ومضاعفات الحجم وعمق كل انكماش
+        """
+        contractions = int(rng.integers(2, 5))
+        first_depth = rng.uniform(0.15, 0.35)
+        shrink = rng.uniform(0.45, 0.65)
+        depths = [first_depth * shrink ** k for k in range(contractions)]
+        lengths = [max(int(rng.uniform(20, 35) * 0.7 ** k), 6) for k in range(contractions)]
+        
+        # نقاط المسار اللوغاريتمي نسبة إلى القمة المحورية في بداية القاعدة
+        knots_t, knots_v = [0], [0.0]
+        for depth, length in zip(depths, lengths):
+            down = max(int(length * 0.6), 2)
+            knots_t += [knots_t[-1] + down, knots_t[-1] + length]
+            knots_v += [np.log(1 - depth), np.log(1 - min(depth / 3, 0.03))]
+        base = np.interp(np.arange(knots_t[-1] + 1), knots_t, knots_v)
+        
+        breakout_days = 3
+        breakout = base[-1] + np.cumsum(np.full(breakout_days, 0.025))
+        path = np.concatenate([base, breakout])
+        
+        # جفاف الحجم داخل القاعدة ثم ارتفاعه عند الاختراق
+        volume = np.concatenate([np.linspace(1.0, 0.45, len(base) - 1), np.full(breakout_days, 2.8)])
+        
+        return {
+            'returns': np.diff(path),
+            'volume': volume,
+            'depths': depths,
+            'base_days': len(base) - 1,
+            'breakout_days': breakout_days,
+        }
+    
+    def generate(
+        self,
+        symbols: Union[int, List[str]] = 100,
+        years: float = 5,
+        end_date: Optional[Union[str, datetime]] = None,
+        vcp_fraction: float = 0.05,
+        stage2_fraction: float = 0.15
+    ) -> Dict[str, Any]:
+        """
+        توليد لوحة أسعار اصطناعية
+        
+        المعلمات:
+            symbols (int|List[str], optional): عدد الأسهم (برموز SYN00000...) أو قائمة رموزها
+            years (float, optional): عدد السنوات (252 جلسة لكل سنة)
+            end_date (str|datetime, optional): تاريخ آخر جلسة (الافتراضي: اليوم)
+            vcp_fraction (float, optional): نسبة الأسهم التي يُزرع فيها نمط VCP في آخر الفترة (بعد صعود المرحلة الثانية)
+            stage2_fraction (float, optional): نسبة الأسهم التي تُزرع فيها المرحلة الثانية فقط في آخر الفترة
+        
+        العائد:
+            Dict[str, Any]: قاموس يحتوي على:
+                prices: قاموس رمز -> إطار بيانات بالأعمدة FRAME_COLUMNS (أسعار خام، و adj_close معدل وفقاً للتقسيمات،
+                    والعمود date بقيم datetime.date كما تعيده مصادر البيانات)
+                index: إطار بيانات المؤشر المرجعي بنفس الأعمدة
+                labels: إطار بيانات الأنماط المزروعة (symbol, pattern, start_date, end_date, pivot, contractions, breakout_date)
+                splits: إطار بيانات التقسيمات (symbol, date, split_coefficient)
+                universe: إطار بيانات خصائص الأسهم (symbol, sector, beta, volatility)
+                regimes: سلسلة نظام السوق لكل جلسة
+        """
+        rng = np.random.default_rng(self.seed)
+        names = symbols if isinstance(symbols, list) else [f"SYN{i:05d}" for i in range(symbols)]
+        n = len(names)
+        days = max(int(round(years * TRADING_DAYS_PER_YEAR)), 2)
+        dates = self._sessions(days, end_date).astype('datetime64[ns]')
+        days = len(dates)
+        # تواريخ الجلسات بقيم datetime.date مثل عمود date في مصادر البيانات
+        session_dates = dates.date
+        dt = 1.0 / TRADING_DAYS_PER_YEAR
+        
+        # عامل السوق حسب النظام
+        regime_path = self._regime_path(rng, days)
+        regime_params = list(REGIMES.values())
+        drift = np.array([p['drift'] for p in regime_params])[regime_path]
+        volatility = np.array([p['volatility'] for p in regime_params])[regime_path]
+        market = (drift - 0.5 * volatility ** 2) * dt + volatility * np.sqrt(dt) * rng.standard_normal(days)
+        sector_returns = SECTOR_VOLATILITY * np.sqrt(dt) * rng.standard_normal((days, len(SECTORS)))
+        
+        # خصائص الأسهم
+        universe = pd.DataFrame({
+            'symbol': names,
+            'sector': rng.choice(SECTORS, size=n),
+            'beta': rng.uniform(0.6, 1.6, n),
+            'volatility': np.clip(rng.lognormal(np.log(0.25), 0.35, n), 0.1, 0.8),
+        })
+        sector_ids = pd.Categorical(universe['sector'], categories=SECTORS).codes
+        alpha = rng.normal(0.02, 0.05, n)
+        start_price = np.exp(rng.normal(np.log(40), 0.8, n))
+        base_volume = np.exp(rng.normal(np.log(1_000_000), 1.0, n))
+        
+        # اختيار الأسهم التي تُزرع فيها الأنماط
+        pattern = rng.random(n)
+        vcp_mask = pattern < vcp_fraction
+        stage2_mask = (pattern >= vcp_fraction) & (pattern < vcp_fraction + stage2_fraction)
+        
+        prices, labels, splits = {}, [], []
+        for start in range(0, n, self.chunk_size):
+            chunk = slice(start, min(start + self.chunk_size, n))
+            frames, chunk_labels, chunk_splits = self._generate_chunk(
+                rng, session_dates, names[chunk], market, sector_returns[:, sector_ids[chunk]],
+                universe['beta'].values[chunk], universe['volatility'].values[chunk], alpha[chunk],
+                start_price[chunk], base_volume[chunk], vcp_mask[chunk], stage2_mask[chunk]
+            )
+            prices.update(frames)
+            labels.extend(chunk_labels)
+            splits.extend(chunk_splits)
+        
+        # المؤشر المرجعي هو مسار عامل السوق
+        index_close = 1000.0 * np.exp(np.cumsum(market))
+        index_open = np.concatenate([[1000.0], index_close[:-1]]) * np.exp(rng.normal(0, 0.002, days))
+        index_range = np.abs(rng.normal(0, 0.004, days))
+        index = pd.DataFrame({
+            'date': session_dates,
+            'open': index_open,
+            'high': np.maximum(index_open, index_close) * np.exp(index_range),
+            'low': np.minimum(index_open, index_close) * np.exp(-index_range),
+            'close': index_close,
+            'adj_close': index_close,
+            'volume': np.exp(rng.normal(np.log(3e9), 0.2, days)).astype(np.int64),
+            'split_coefficient': 1.0,
+            'symbol': INDEX_SYMBOL,
+        })
+        
+        logger.info(f"تم توليد بيانات اصطناعية لـ {n} سهم على {days} جلسة، مع {len(labels)} نمط مزروع")
+        
+        return {
+            'prices': prices,
+            'index': index,
+            'labels': pd.DataFrame(labels, columns=['symbol', 'pattern', 'start_date', 'end_date', 'pivot', 'contractions', 'breakout_date']),
+            'splits': pd.DataFrame(splits, columns=['symbol', 'date', 'split_coefficient']),
+            'universe': universe,
+            'regimes': pd.Series(np.array(list(REGIMES))[regime_path], index=dates, name='regime'),
+        }
+    
+    def _generate_chunk(
+        self,
+        rng: np.random.Generator,
+        dates: np.ndarray,
+        names: List[str],
+        market: np.ndarray,
+        sector_returns: np.ndarray,
+        beta: np.ndarray,
+        sigma: np.ndarray,
+        alpha: np.ndarray,
+        start_price: np.ndarray,
+        base_volume: np.ndarray,
+        vcp_mask: np.ndarray,
+        stage2_mask: np.ndarray
+    ) -> tuple:
+        """
+        توليد دفعة من الأسهم كمصفوفات (جلسات × أسهم) ثم تحويلها إلى إطارات بيانات
+        
+        العائد:
+            tuple: قاموس الإطارات، وقائمة تسميات الأنماط، وقائمة التقسيمات
+        """
+        days, n = len(dates), len(names)
+        dt = 1.0 / TRADING_DAYS_PER_YEAR
+        daily_sigma = sigma * np.sqrt(dt)
+        
+        # العوائد اللوغاريتمية: بيتا × السوق + العامل القطاعي + عائد خاص بالسهم
+        returns = (
+            market[:, None] * beta
+            + sector_returns
+            + (alpha - 0.5 * sigma ** 2) * dt
+            + daily_sigma * rng.standard_normal((days, n))
+        )
+        returns[0] = 0.0
+        volume_multiplier = np.ones((days, n))
+        planted = np.zeros((days, n), dtype=bool)
+        labels = []
+        
+        # زرع المرحلة الثانية: صعود بعائد إضافي وتقلب أقل حتى آخر جلسة
+        for j in np.flatnonzero(stage2_mask):
+            length = min(int(rng.integers(150, 261)), days - 1)
+            window = slice(days - length, days)
+            returns[window, j] = STAGE2_DRIFT + 0.6 * returns[window, j]
+            volume_multiplier[window, j] = 1.2
+            planted[window, j] = True
+            labels.append({'symbol': names[j], 'pattern': 'stage2', 'start_date': dates[days - length], 'end_date': dates[-1]})
+        
+        # زرع VCP: صعود المرحلة الثانية ثم قاعدة انكماشات ثم اختراق في آخر الفترة
+        for j in np.flatnonzero(vcp_mask):
+            template = self._vcp_template(rng)
+            advance = int(rng.integers(120, 201))
+            pattern_days = len(template['returns'])
+            if advance + pattern_days >= days:
+                continue
+            
+            base_start = days - pattern_days - 1
+            advance_window = slice(base_start - advance + 1, base_start + 1)
+            returns[advance_window, j] = STAGE2_DRIFT + 0.6 * returns[advance_window, j]
+            returns[base_start + 1:, j] = template['returns'] + rng.normal(0, 0.003, pattern_days)
+            volume_multiplier[base_start + 1:, j] = template['volume']
+            planted[base_start - advance + 1:, j] = True
+            
+            breakout = days - template['breakout_days']
+            labels.append({'symbol': names[j], 'pattern': 'stage2', 'start_date': dates[base_start - advance + 1], 'end_date': dates[-1]})
+            labels.append({
+                'symbol': names[j],
+                'pattern': 'vcp',
+                'start_date': dates[base_start],
+                'end_date': dates[-1],
+                'pivot': None,
+                'contractions': len(template['depths']),
+                'breakout_date': dates[breakout],
+            })
+        
+        # الفجوات السعرية خارج الأنماط المزروعة
+        gaps = (rng.random((days, n)) < GAP_PROBABILITY) & ~planted
+        gaps[0] = False
+        gap_returns = np.zeros((days, n))
+        gap_returns[gaps] = rng.normal(0, GAP_SIZE, int(gaps.sum()))
+        returns += gap_returns
+        
+        # الأسعار المعدلة (بعملة آخر جلسة) من العوائد، والافتتاح من فجوة الليلة
+        adj_close = start_price * np.exp(np.cumsum(returns, axis=0))
+        overnight = gap_returns + rng.normal(0, 0.25, (days, n)) * daily_sigma
+        previous_close = np.vstack([adj_close[:1], adj_close[:-1]])
+        adj_open = previous_close * np.exp(overnight)
+        adj_open[0] = adj_close[0]
+        intraday_range = np.abs(rng.standard_normal((days, n))) * daily_sigma * 0.6
+        adj_high = np.maximum(adj_open, adj_close) * np.exp(intraday_range)
+        adj_low = np.minimum(adj_open, adj_close) * np.exp(-np.abs(rng.standard_normal((days, n))) * daily_sigma * 0.6)
+        
+        # الحجم: يرتفع مع حجم الحركة اليومية ويحمل مضاعفات الأنماط
+        move = np.minimum(np.abs(returns) / daily_sigma, 6.0)
+        adj_volume = base_volume * np.exp(0.35 * rng.standard_normal((days, n)) + 0.25 * move - 0.2) * volume_multiplier
+        
+        # التقسيمات خارج الأنماط المزروعة: الأسعار الخام قبل التقسيم أعلى بنسبته والحجم أقل
+        split_events = (rng.random((days, n)) < SPLITS_PER_YEAR / TRADING_DAYS_PER_YEAR) & ~planted
+        split_events[0] = False
+        split_coefficient = np.ones((days, n))
+        split_coefficient[split_events] = rng.choice(SPLIT_RATIOS, size=int(split_events.sum()))
+        factor = np.vstack([np.cumprod(split_coefficient[::-1], axis=0)[::-1][1:], np.ones((1, n))])
+        
+        # تُنقل المصفوفات إلى ترتيب (أسهم × جلسات) متصل حتى يكون عمود كل سهم متصلاً في الذاكرة
+        raw = {
+            'open': adj_open * factor,
+            'high': adj_high * factor,
+            'low': adj_low * factor,
+            'close': adj_close * factor,
+            'adj_close': adj_close,
+            'volume': np.round(adj_volume / factor).astype(np.int64),
+            'split_coefficient': split_coefficient,
+        }
+        raw = {column: np.ascontiguousarray(values.T) for column, values in raw.items()}
+        
+        frames = {
+            symbol: pd.DataFrame({'date': dates, **{column: values[j] for column, values in raw.items()}, 'symbol': symbol})
+            for j, symbol in enumerate(names)
+        }
+        
+        # سعر المحور للأنماط المزروعة (الإغلاق الخام في بداية القاعدة)
+        for label in labels:
+            if label['pattern'] == 'vcp':
+                frame = frames[label['symbol']]
+                label['pivot'] = float(frame.loc[frame['date'] == label['start_date'], 'close'].iloc[0])
+        
+        split_rows, split_cols = np.nonzero(split_events)
+        splits = [
+            {'symbol': names[col], 'date': dates[row], 'split_coefficient': split_coefficient[row, col]}
+            for row, col in zip(split_rows, split_cols)
+        ]
+        
+        return frames, labels, splits
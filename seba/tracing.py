@@ -0,0 +1,419 @@
+"""
+وحدة التتبع لمشروع SEBA
+توفر هذه الوحدة تتبعاً خفيفاً للطلبات بفترات (spans) متداخلة تنتقل عبر contextvars في الكود المتزامن
+وغير المتزامن وخيوط التنفيذ، مع معرف تتبع لكل طلب وذاكرة دائرية للتتبعات البطيئة أو المختارة بالعينة
+"""
+
+import os
+import time
+import uuid
+import random
+import inspect
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Dict, List, Optional, Any, Callable, Iterator
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# الفترة الحالية في السياق (الطلب أو المهمة أو الخيط)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("seba_current_span", default=None)
+
+
+class Span:
+    """فترة زمنية مسماة داخل تتبع"""
+    
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            trace (Trace): التتبع الذي تنتمي إليه الفترة
+            name (str): اسم الفترة
+            parent_id (str): معرف الفترة الأم
+            attributes (Dict[str, Any]): خصائص الفترة
+        """
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.end = None
+        self.error = None
+    
+    def set_attribute(self, key: str, value: Any) -> None:
+        """
+        تعيين خاصية للفترة
+        
+        المعلمات:
+            key (str): اسم الخاصية
+            value (Any): القيمة
+        """
+        self.attributes[key] = value
+    
+    @property
+    def duration_ms(self) -> float:
+        """مدة الفترة بالمللي ثانية (حتى الآن إذا لم تنته بعد)"""
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+    
+    def to_dict(self) -> Dict:
+        """
+        تحويل الفترة إلى قاموس
+        
+        العائد:
+            Dict: الفترة مع بدايتها بالنسبة لبداية التتبع
+        """
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "offset_ms": round((self.start - self.trace.origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "finished": self.end is not None,
+            "thread": self.thread,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class Trace:
+    """تتبع طلب واحد وفتراته"""
+    
+    def __init__(self, trace_id: str, max_spans: int):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            trace_id (str): معرف التتبع
+            max_spans (int): الحد الأقصى لعدد الفترات المسجلة
+        """
+        self.trace_id = trace_id
+        self.max_spans = max_spans
+        self.started_at = datetime.now()
+        self.origin = time.perf_counter()
+        self.root = None
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self._lock = threading.Lock()
+    
+    def add(self, span: Span) -> bool:
+        """إضافة فترة (تُهمل الفترات بعد بلوغ الحد الأقصى)"""
+        with self._lock:
+            if len(self.spans) >= self.max_spans:
+                self.dropped_spans += 1
+                return False
+            self.spans.append(span)
+            return True
+    
+    @property
+    def duration_ms(self) -> float:
+        """مدة التتبع بالمللي ثانية"""
+        return self.root.duration_ms if self.root is not None else 0.0
+    
+    def summary(self) -> Dict:
+        """
+        ملخص التتبع
+        
+        العائد:
+            Dict: المعرف والاسم والمدة وعدد الفترات والخطأ إن وجد
+        """
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name if self.root is not None else None,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 3),
+            "span_count": len(self.spans),
+            "dropped_spans": self.dropped_spans,
+            "attributes": self.root.attributes if self.root is not None else {},
+            "error": self.root.error if self.root is not None else None
+        }
+    
+    def waterfall(self) -> List[Dict]:
+        """
+        الفترات مرتبة كشلال (كل فترة بعد أمها، والفترات الشقيقة حسب وقت البدء) مع عمق كل فترة
+        
+        العائد:
+            List[Dict]: الفترات
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        
+        children: Dict[Optional[str], List[Span]] = {}
+        known = {span.span_id for span in spans}
+        for span in spans:
+            # الفترات التي أُهملت أمها تظهر في المستوى الأعلى
+            parent_id = span.parent_id if span.parent_id in known else None
+            children.setdefault(parent_id, []).append(span)
+        
+        result = []
+        stack = [(span, 0) for span in reversed(children.get(None, []))]
+        while stack:
+            span, depth = stack.pop()
+            result.append({**span.to_dict(), "depth": depth})
+            stack.extend((child, depth + 1) for child in reversed(children.get(span.span_id, [])))
+        return result
+    
+    def render_waterfall(self, width: int = 60) -> str:
+        """
+        عرض الشلال كنص
+        
+        المعلمات:
+            width (int, optional): عرض شريط الزمن بالأحرف
+        
+        العائد:
+            str: النص
+        """
+        rows = self.waterfall()
+        total = max([row["offset_ms"] + row["duration_ms"] for row in rows] + [self.duration_ms, 1e-9])
+        name_width = max([len(row["name"]) + 2 * row["depth"] for row in rows] + [4])
+        
+        lines = [f"trace {self.trace_id} {self.duration_ms:.1f}ms"]
+        for row in rows:
+            start = min(width - 1, int(row["offset_ms"] / total * width))
+            length = max(1, min(width - start, int(round(row["duration_ms"] / total * width))))
+            bar = " " * start + "█" * length
+            label = ("  " * row["depth"] + row["name"]).ljust(name_width)
+            marker = " !" if row["error"] else ""
+            lines.append(f"{label} |{bar.ljust(width)}| {row['offset_ms']:9.1f} +{row['duration_ms']:9.1f}ms{marker}")
+        return "\n".join(lines)
+    
+    def to_dict(self) -> Dict:
+        """
+        تحويل التتبع إلى قاموس
+        
+        العائد:
+            Dict: الملخص والفترات كشلال
+        """
+        return {**self.summary(), "spans": self.waterfall()}
+
+
+class Tracer:
+    """فئة لإنشاء التتبعات والفترات والاحتفاظ بالتتبعات البطيئة أو المختارة بالعينة"""
+    
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        slow_threshold_ms: Optional[float] = None,
+        buffer_size: Optional[int] = None,
+        max_spans: Optional[int] = None
+    ):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            enabled (bool, optional): تفعيل التتبع. إذا لم يتم تحديده، سيتم استخدام TRACE_ENABLED من متغيرات البيئة.
+            sample_rate (float, optional): نسبة التتبعات السريعة المحتفظ بها. إذا لم يتم تحديدها، سيتم استخدام TRACE_SAMPLE_RATE من متغيرات البيئة.
+            slow_threshold_ms (float, optional): مدة التتبع التي يُحتفظ بعدها بالتتبع دائماً. إذا لم يتم تحديدها، سيتم استخدام TRACE_SLOW_MS من متغيرات البيئة.
+            buffer_size (int, optional): عدد التتبعات المحتفظ بها في الذاكرة. إذا لم يتم تحديده، سيتم استخدام TRACE_BUFFER_SIZE من متغيرات البيئة.
+            max_spans (int, optional): الحد الأقصى لعدد الفترات في التتبع الواحد
+        """
+        if enabled is None:
+            enabled = os.getenv("TRACE_ENABLED", "true").lower() in ["1", "true", "yes"]
+        self.enabled = enabled
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+        self.slow_threshold_ms = slow_threshold_ms if slow_threshold_ms is not None else float(os.getenv("TRACE_SLOW_MS", "1000"))
+        buffer_size = buffer_size if buffer_size is not None else int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+        self.max_spans = max_spans if max_spans is not None else int(os.getenv("TRACE_MAX_SPANS", "500"))
+        self.stats = {"traces": 0, "recorded": 0}
+        self._traces = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def trace(self, name: str, trace_id: Optional[str] = None, **attributes) -> Iterator[Optional[Span]]:
+        """
+        بدء تتبع جديد بفترة جذرية (مثل طلب واجهة برمجة التطبيقات)
+        
+        المعلمات:
+            name (str): اسم الفترة الجذرية
+            trace_id (str, optional): معرف التتبع (مثل ترويسة X-Trace-Id). إذا لم يتم تحديده، سيتم إنشاء معرف جديد.
+            **attributes: خصائص الفترة الجذرية
+        
+        العائد:
+            Iterator[Span]: الفترة الجذرية، أو None إذا كان التتبع غير مفعل
+        """
+        if not self.enabled:
+            yield None
+            return
+        
+        trace = Trace(trace_id or uuid.uuid4().hex, self.max_spans)
+        root = Span(trace, name, None, attributes)
+        trace.root = root
+        trace.add(root)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            root.end = time.perf_counter()
+            _current_span.reset(token)
+            self._finish(trace)
+    
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """
+        بدء فترة فرعية داخل التتبع الحالي (لا تفعل شيئاً خارج أي تتبع)
+        
+        المعلمات:
+            name (str): اسم الفترة
+            **attributes: خصائص الفترة
+        
+        العائد:
+            Iterator[Span]: الفترة، أو None خارج أي تتبع
+        """
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        if not parent.trace.add(span):
+            yield None
+            return
+        
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+    
+    def _finish(self, trace: Trace) -> None:
+        """الاحتفاظ بالتتبع إذا كان بطيئاً أو فاشلاً أو تم اختياره بالعينة"""
+        keep = (
+            trace.duration_ms >= self.slow_threshold_ms
+            or trace.root.error is not None
+            or random.random() < self.sample_rate
+        )
+        with self._lock:
+            self.stats["traces"] += 1
+            if keep:
+                self.stats["recorded"] += 1
+                self._traces.append(trace)
+    
+    def get_traces(self, limit: int = 50, min_duration_ms: float = 0) -> List[Dict]:
+        """
+        الحصول على ملخصات التتبعات المحتفظ بها (الأحدث أولاً)
+        
+        المعلمات:
+            limit (int, optional): الحد الأقصى لعدد التتبعات
+            min_duration_ms (float, optional): أقل مدة للتتبع
+        
+        العائد:
+            List[Dict]: ملخصات التتبعات
+        """
+        with self._lock:
+            traces = list(self._traces)
+        result = [trace.summary() for trace in reversed(traces) if trace.duration_ms >= min_duration_ms]
+        return result[:limit]
+    
+    def get_trace(self, trace_id: str) -> Optional[Trace]:
+        """
+        الحصول على تتبع محتفظ به
+        
+        المعلمات:
+            trace_id (str): معرف التتبع
+        
+        العائد:
+            Trace: التتبع، أو None إذا لم يتم العثور عليه
+        """
+        with self._lock:
+            return next((trace for trace in self._traces if trace.trace_id == trace_id), None)
+    
+    def clear(self) -> None:
+        """مسح التتبعات المحتفظ بها"""
+        with self._lock:
+            self._traces.clear()
+
+
+def current_span() -> Optional[Span]:
+    """
+    الحصول على الفترة الحالية في السياق
+    
+    العائد:
+        Span: الفترة، أو None خارج أي تتبع
+    """
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """
+    الحصول على معرف التتبع الحالي (لإضافته إلى السجلات أو الطلبات الخارجية)
+    
+    العائد:
+        str: المعرف، أو None خارج أي تتبع
+    """
+    span = _current_span.get()
+    return span.trace.trace_id if span is not None else None
+
+
+def bind_context(func: Callable) -> Callable:
+    """
+    ربط دالة بالسياق الحالي لتشغيلها في خيط آخر (مثل ThreadPoolExecutor.submit) ضمن نفس التتبع
+    
+    المعلمات:
+        func (Callable): الدالة
+    
+    العائد:
+        Callable: دالة تعمل داخل نسخة من السياق الحالي
+    """
+    context = contextvars.copy_context()
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return wrapper
+
+
+# المتتبع المشترك على مستوى العملية
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """
+    الحصول على المتتبع المشترك على مستوى العملية
+    
+    العائد:
+        Tracer: المتتبع
+    """
+    return _tracer
+
+
+def traced(name: Optional[str] = None):
+    """
+    مزخرف لتسجيل كل استدعاء للدالة كفترة داخل التتبع الحالي (للدوال المتزامنة وغير المتزامنة)
+    
+    المعلمات:
+        name (str, optional): اسم الفترة. إذا لم يتم تحديده، سيتم استخدام الاسم المؤهل للدالة.
+    
+    العائد:
+        Callable: الدالة المزخرفة
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+        
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                with get_tracer().span(span_name):
+                    return await func(*args, **kwargs)
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with get_tracer().span(span_name):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,247 @@
+"""
+وحدة تقويم التداول لمشروع SEBA
+توفر هذه الوحدة أيام التداول وأوقات افتتاح وإغلاق الجلسات للسوق الأمريكية (NYSE/NASDAQ)
+مع العطل الرسمية وأيام الإغلاق المبكر
+"""
+
+import logging
+from datetime import datetime, date, time, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Union
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """الحصول على اليوم رقم n من يوم الأسبوع المحدد في الشهر (n = -1 لآخر يوم)"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """حساب تاريخ عيد الفصح (خوارزمية غاوس المعدلة)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(holiday: date) -> date:
+    """نقل العطلة إلى يوم الجمعة إذا صادفت السبت أو إلى يوم الاثنين إذا صادفت الأحد"""
+    if holiday.weekday() == 5:
+        return holiday - timedelta(days=1)
+    if holiday.weekday() == 6:
+        return holiday + timedelta(days=1)
+    return holiday
+
+
+class TradingCalendar:
+    """فئة لتقويم التداول في السوق الأمريكية"""
+    
+    def __init__(self, exchange: str = "NYSE"):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            exchange (str, optional): السوق (NYSE, NASDAQ)
+        """
+        self.exchange = exchange
+        self.timezone = MARKET_TIMEZONE
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def holidays(year: int) -> Dict[date, str]:
+        """
+        الحصول على العطل الرسمية للسوق في سنة معينة
+        
+        المعلمات:
+            year (int): السنة
+        
+        العائد:
+            Dict[date, str]: قاموس بتواريخ العطل وأسمائها
+        """
+        result = {
+            _nth_weekday(year, 1, 0, 3): "Martin Luther King Jr. Day",
+            _nth_weekday(year, 2, 0, 3): "Presidents' Day",
+            _easter(year) - timedelta(days=2): "Good Friday",
+            _nth_weekday(year, 5, 0, -1): "Memorial Day",
+            _observed(date(year, 7, 4)): "Independence Day",
+            _nth_weekday(year, 9, 0, 1): "Labor Day",
+            _nth_weekday(year, 11, 3, 4): "Thanksgiving Day",
+            _observed(date(year, 12, 25)): "Christmas Day",
+        }
+        
+        # لا يُنقل رأس السنة إلى الجمعة السابقة لأنها في سنة مالية مختلفة
+        new_year = date(year, 1, 1)
+        if new_year.weekday() == 6:
+            result[new_year + timedelta(days=1)] = "New Year's Day"
+        elif new_year.weekday() != 5:
+            result[new_year] = "New Year's Day"
+        
+        if year >= 2022:
+            result[_observed(date(year, 6, 19))] = "Juneteenth"
+        
+        return result
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def early_closes(year: int) -> Set[date]:
+        """
+        الحصول على أيام الإغلاق المبكر (13:00) في سنة معينة
+        
+        المعلمات:
+            year (int): السنة
+        
+        العائد:
+            Set[date]: مجموعة بتواريخ الإغلاق المبكر
+        """
+        holidays = TradingCalendar.holidays(year)
+        candidates = [
+            date(year, 7, 3),
+            _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+            date(year, 12, 24),
+        ]
+        return {d for d in candidates if d.weekday() < 5 and d not in holidays}
+    
+    def is_trading_day(self, day: Union[date, datetime]) -> bool:
+        """
+        التحقق مما إذا كان اليوم يوم تداول
+        
+        المعلمات:
+            day (date|datetime): اليوم
+        
+        العائد:
+            bool: True إذا كان يوم تداول
+        """
+        if isinstance(day, datetime):
+            day = day.date()
+        return day.weekday() < 5 and day not in self.holidays(day.year)
+    
+    def is_early_close(self, day: date) -> bool:
+        """التحقق مما إذا كان اليوم يوم إغلاق مبكر"""
+        return day in self.early_closes(day.year)
+    
+    def session_open(self, day: date) -> datetime:
+        """وقت افتتاح الجلسة في يوم معين (بتوقيت السوق)"""
+        return datetime.combine(day, MARKET_OPEN, tzinfo=self.timezone)
+    
+    def session_close(self, day: date) -> datetime:
+        """وقت إغلاق الجلسة في يوم معين (بتوقيت السوق)"""
+        close_time = EARLY_CLOSE if self.is_early_close(day) else MARKET_CLOSE
+        return datetime.combine(day, close_time, tzinfo=self.timezone)
+    
+    def now(self) -> datetime:
+        """الوقت الحالي بتوقيت السوق"""
+        return datetime.now(self.timezone)
+    
+    def to_market_time(self, moment: Optional[datetime]) -> datetime:
+        """تحويل الوقت إلى توقيت السوق (الأوقات بدون منطقة زمنية تُعامل كتوقيت UTC)"""
+        if moment is None:
+            return self.now()
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=ZoneInfo("UTC"))
+        return moment.astimezone(self.timezone)
+    
+    def is_market_open(self, moment: Optional[datetime] = None) -> bool:
+        """
+        التحقق مما إذا كانت السوق مفتوحة في وقت معين
+        
+        المعلمات:
+            moment (datetime, optional): الوقت. إذا لم يتم تحديده، سيتم استخدام الوقت الحالي.
+        
+        العائد:
+            bool: True إذا كانت السوق مفتوحة
+        """
+        moment = self.to_market_time(moment)
+        day = moment.date()
+        return self.is_trading_day(day) and self.session_open(day) <= moment < self.session_close(day)
+    
+    def next_trading_day(self, day: date) -> date:
+        """الحصول على يوم التداول التالي لليوم المحدد"""
+        day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+    
+    def previous_trading_day(self, day: date) -> date:
+        """الحصول على يوم التداول السابق لليوم المحدد"""
+        day -= timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return day
+    
+    def next_session_open(self, moment: Optional[datetime] = None) -> datetime:
+        """
+        الحصول على وقت افتتاح الجلسة التالية بعد وقت معين
+        
+        المعلمات:
+            moment (datetime, optional): الوقت. إذا لم يتم تحديده، سيتم استخدام الوقت الحالي.
+        
+        العائد:
+            datetime: وقت الافتتاح بتوقيت السوق
+        """
+        moment = self.to_market_time(moment)
+        day = moment.date()
+        if self.is_trading_day(day) and moment < self.session_open(day):
+            return self.session_open(day)
+        return self.session_open(self.next_trading_day(day))
+    
+    def next_session_close(self, moment: Optional[datetime] = None) -> datetime:
+        """
+        الحصول على وقت إغلاق الجلسة التالية بعد وقت معين
+        
+        المعلمات:
+            moment (datetime, optional): الوقت. إذا لم يتم تحديده، سيتم استخدام الوقت الحالي.
+        
+        العائد:
+            datetime: وقت الإغلاق بتوقيت السوق
+        """
+        moment = self.to_market_time(moment)
+        day = moment.date()
+        if self.is_trading_day(day) and moment < self.session_close(day):
+            return self.session_close(day)
+        return self.session_close(self.next_trading_day(day))
+    
+    def trading_days(self, start_date: Union[str, date], end_date: Union[str, date]) -> pd.DatetimeIndex:
+        """
+        الحصول على جميع أيام التداول بين تاريخين (شاملة)
+        
+        المعلمات:
+            start_date (str|date): تاريخ البداية
+            end_date (str|date): تاريخ النهاية
+        
+        العائد:
+            pd.DatetimeIndex: أيام التداول
+        """
+        start = pd.Timestamp(start_date).normalize()
+        end = pd.Timestamp(end_date).normalize()
+        if end < start:
+            return pd.DatetimeIndex([])
+        
+        holidays = [
+            np.datetime64(holiday)
+            for year in range(start.year, end.year + 1)
+            for holiday in self.holidays(year)
+        ]
+        days = np.arange(start.to_datetime64().astype("datetime64[D]"), (end + pd.Timedelta(days=1)).to_datetime64().astype("datetime64[D]"))
+        mask = np.is_busday(days, holidays=holidays)
+        return pd.DatetimeIndex(days[mask])
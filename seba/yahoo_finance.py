@@ -17,10 +17,42 @@ logger = logging.getLogger(__name__)
 class YahooFinanceAPI:
     """فئة للتعامل مع واجهة برمجة تطبيقات Yahoo Finance"""
     
-    def __init__(self):
-        """تهيئة الفئة"""
+    def __init__(self, raise_errors: bool = False):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            raise_errors (bool, optional): رفع أخطاء الاتصال والخادم بدلاً من إعادة نتيجة فارغة،
+                حتى يميزها مدير البيانات عن النتيجة الفارغة الصحيحة
+        """
+        self.raise_errors = raise_errors
         logger.info("تهيئة واجهة Yahoo Finance API")
     
+    @staticmethod
+    def _download_error(symbol: str) -> Optional[str]:
+        """
+        الحصول على خطأ التنزيل الذي سجلته yfinance لسهم معين
+        
+        تلتقط yf.download أخطاء الاتصال وتعيد إطاراً فارغاً، وتحفظ رسالة الخطأ في yf.shared._ERRORS.
+        رسائل الرموز غير الموجودة أو المشطوبة ليست أخطاء، فالنتيجة الفارغة هي الرد الصحيح لها.
+        
+        المعلمات:
+            symbol (str): رمز السهم
+        
+        العائد:
+            str: رسالة الخطأ، أو None إذا لم يُسجل خطأ
+        """
+        errors = getattr(getattr(yf, "shared", None), "_ERRORS", None)
+        if not isinstance(errors, dict):
+            return None
+        error = errors.get(symbol.upper(), errors.get(symbol))
+        if not error:
+            return None
+        message = str(error)
+        if any(marker in message.lower() for marker in ("delisted", "no data found", "no price data found")):
+            return None
+        return message
+    
     def get_historical_data(
         self, 
         symbol: str, 
@@ -59,6 +91,11 @@ class YahooFinanceAPI:
                 
                 data = yf.download(symbol, start=start_date, end=end_date, interval=interval, progress=False)
             
+            if data.empty:
+                error = self._download_error(symbol)
+                if error:
+                    raise RuntimeError(error)
+            
             # إعادة تسمية الأعمدة إلى أسماء قياسية
             data = data.rename(columns={
                 'Open': 'open',
@@ -74,16 +111,21 @@ class YahooFinanceAPI:
             
             # إعادة ضبط الفهرس وتحويل التاريخ إلى عمود
             data = data.reset_index()
-            data = data.rename(columns={'Date': 'date'})
+            data = data.rename(columns={'Date': 'date', 'Datetime': 'date'})
             
-            # التأكد من أن التاريخ بتنسيق موحد
-            data['date'] = pd.to_datetime(data['date']).dt.date
+            # التأكد من أن التاريخ بتنسيق موحد (تحتفظ الأشرطة داخل اليوم بالطابع الزمني الكامل)
+            if interval in ["1d", "5d", "1wk", "1mo", "3mo"]:
+                data['date'] = pd.to_datetime(data['date']).dt.date
+            else:
+                data['date'] = pd.to_datetime(data['date'])
             
             logger.info(f"تم جلب {len(data)} سجل من البيانات التاريخية للسهم {symbol}")
             return data
             
         except Exception as e:
             logger.error(f"خطأ في جلب البيانات التاريخية للسهم {symbol}: {str(e)}")
+            if self.raise_errors:
+                raise
             return pd.DataFrame()
     
     def get_realtime_data(self, symbol: str) -> Dict:
@@ -125,6 +167,8 @@ class YahooFinanceAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب البيانات في الوقت الفعلي للسهم {symbol}: {str(e)}")
+            if self.raise_errors:
+                raise
             return {}
     
     def get_fundamental_data(self, symbol: str) -> Dict:
@@ -171,6 +215,8 @@ class YahooFinanceAPI:
             
         except Exception as e:
             logger.error(f"خطأ في جلب البيانات الأساسية للسهم {symbol}: {str(e)}")
+            if self.raise_errors:
+                raise
             return {}
     
     def search_stocks(self, query: str) -> List[Dict]:
@@ -213,6 +259,8 @@ class YahooFinanceAPI:
             
         except Exception as e:
             logger.error(f"خطأ في البحث عن الأسهم باستخدام الاستعلام {query}: {str(e)}")
+            if self.raise_errors:
+                raise
             return []
     
     def get_multiple_stocks_data(self, symbols: List[str], period: str = "1d") -> Dict[str, pd.DataFrame]:
@@ -231,7 +279,11 @@ class YahooFinanceAPI:
             
             result = {}
             for symbol in symbols:
-                data = self.get_historical_data(symbol, period=period)
+                try:
+                    data = self.get_historical_data(symbol, period=period)
+                except Exception:
+                    # الخطأ مسجل مسبقاً، ولا يُلغي فشل سهم واحد نتائج بقية الأسهم
+                    continue
                 if not data.empty:
                     result[symbol] = data
             
@@ -241,3 +293,69 @@ class YahooFinanceAPI:
         except Exception as e:
             logger.error(f"خطأ في جلب بيانات متعددة للأسهم: {str(e)}")
             return {}
+    
+    def get_multiple_realtime_data(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        الحصول على البيانات في الوقت الفعلي لعدة أسهم بطلب مجمع واحد
+        
+        يعتمد على الأشرطة اليومية لآخر خمسة أيام: الشريط الأخير يمثل الجلسة الحالية
+        والشريط السابق يوفر سعر الإغلاق السابق.
+        
+        المعلمات:
+            symbols (List[str]): قائمة برموز الأسهم
+        
+        العائد:
+            Dict[str, Dict]: قاموس يحتوي على البيانات في الوقت الفعلي لكل سهم
+        """
+        try:
+            logger.info(f"جلب البيانات في الوقت الفعلي لـ {len(symbols)} سهم")
+            
+            data = yf.download(
+                " ".join(symbols),
+                period="5d",
+                interval="1d",
+                group_by="ticker",
+                progress=False,
+                threads=True
+            )
+            
+            result = {}
+            timestamp = datetime.now().isoformat()
+            for symbol in symbols:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    bars = data[symbol].dropna(subset=['Close'])
+                else:
+                    bars = data.dropna(subset=['Close'])
+                
+                if bars.empty:
+                    continue
+                
+                last = bars.iloc[-1]
+                previous_close = float(bars['Close'].iloc[-2]) if len(bars) > 1 else None
+                price = float(last['Close'])
+                change = price - previous_close if previous_close else None
+                
+                result[symbol] = {
+                    'symbol': symbol,
+                    'price': price,
+                    'change': change,
+                    'change_percent': change / previous_close * 100 if change is not None else None,
+                    'volume': int(last['Volume']) if pd.notna(last['Volume']) else None,
+                    'market_cap': None,
+                    'timestamp': timestamp,
+                    'previous_close': previous_close,
+                    'open': float(last['Open']),
+                    'day_high': float(last['High']),
+                    'day_low': float(last['Low']),
+                }
+            
+            logger.info(f"تم جلب البيانات في الوقت الفعلي لـ {len(result)} سهم من أصل {len(symbols)}")
+            return result
+        
+        except Exception as e:
+            logger.error(f"خطأ في جلب البيانات في الوقت الفعلي لعدة أسهم: {str(e)}")
+            if self.raise_errors:
+                raise
+            return {}
@@ -11,6 +11,8 @@ from typing import Dict, List, Optional, Union, Tuple
 from datetime import datetime, date, timedelta
 
 from seba.models.technical_analysis import TechnicalIndicators, PatternRecognition, DataProcessor
+from seba.utils.optimization import cache
+from seba.utils.tracing import traced
 
 # إعداد السجل
 logger = logging.getLogger(__name__)
@@ -22,6 +24,8 @@ class SEPAEngine:
         """تهيئة الفئة"""
         logger.info("تهيئة محرك قواعد SEPA")
     
+    @traced("sepa.analyze_stock")
+    @cache(expiry=3600, namespace="sepa", manager="local")
     def analyze_stock(self, stock_data: pd.DataFrame, base_index_data: Optional[pd.DataFrame] = None) -> Dict:
         """
         تحليل السهم باستخدام منهجية SEPA
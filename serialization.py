@@ -0,0 +1,188 @@
+"""
+وحدة ترميز إطارات البيانات لمشروع SEBA
+توفر هذه الوحدة ترميزاً ثنائياً لإطارات البيانات (pickle البروتوكول 5 مع مخازن خارج النطاق، أو Arrow IPC)
+مع ضغط اختياري (lz4, zstd) يحافظ على أنواع الأعمدة والفهرس، لاستخدامه في التخزين المؤقت
+"""
+
+import os
+import pickle
+import struct
+import logging
+from typing import Dict, Optional, Tuple, Callable
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+# ترويسة الترميز: المعرف، الصيغة، الضغط
+MAGIC = b"SBDF"
+HEADER = struct.Struct("<4sBB")
+
+FORMATS = {"pickle": 1, "arrow": 2}
+COMPRESSIONS = {"none": 0, "lz4": 1, "zstd": 2}
+
+
+def _compressors() -> Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    """الحصول على دوال الضغط وفك الضغط المتوفرة"""
+    result = {"none": (bytes, bytes)}
+    if lz4_frame is not None:
+        result["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+    if zstandard is not None:
+        result["zstd"] = (zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdDecompressor().decompress)
+    return result
+
+
+def is_encoded(payload: Optional[bytes]) -> bool:
+    """
+    التحقق مما إذا كانت البيانات مرمزة بهذه الوحدة
+    
+    المعلمات:
+        payload (bytes): البيانات
+    
+    العائد:
+        bool: True إذا بدأت البيانات بترويسة الترميز
+    """
+    return bool(payload) and bytes(payload[:len(MAGIC)]) == MAGIC
+
+
+class DataFrameCodec:
+    """فئة لترميز إطارات البيانات ترميزاً ثنائياً وفك ترميزها"""
+    
+    def __init__(self, format: Optional[str] = None, compression: Optional[str] = None):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            format (str, optional): صيغة الترميز (pickle, arrow). إذا لم يتم تحديدها، سيتم استخدام CACHE_DATAFRAME_FORMAT من متغيرات البيئة.
+            compression (str, optional): الضغط (none, lz4, zstd). إذا لم يتم تحديده، سيتم استخدام CACHE_COMPRESSION من متغيرات البيئة.
+        """
+        self.compressors = _compressors()
+        
+        self.format = (format or os.getenv("CACHE_DATAFRAME_FORMAT", "pickle")).lower()
+        if self.format not in FORMATS:
+            raise ValueError(f"صيغة ترميز غير معروفة: {self.format}")
+        if self.format == "arrow" and pa is None:
+            logger.warning("مكتبة pyarrow غير مثبتة، سيتم استخدام صيغة pickle")
+            self.format = "pickle"
+        
+        self.compression = (compression or os.getenv("CACHE_COMPRESSION", "none")).lower()
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"نوع ضغط غير معروف: {self.compression}")
+        if self.compression not in self.compressors:
+            logger.warning(f"مكتبة الضغط {self.compression} غير مثبتة، سيتم التخزين بدون ضغط")
+            self.compression = "none"
+    
+    @staticmethod
+    def _encode_pickle(df: pd.DataFrame) -> bytes:
+        """ترميز pickle البروتوكول 5 مع نقل مخازن المصفوفات خارج النطاق دون نسخها داخل التدفق"""
+        buffers = []
+        stream = pickle.dumps(df, protocol=5, buffer_callback=buffers.append)
+        raw_buffers = [buffer.raw() for buffer in buffers]
+        
+        lengths = [len(stream)] + [raw.nbytes for raw in raw_buffers]
+        layout = struct.pack(f"<I{len(lengths)}Q", len(raw_buffers), *lengths)
+        return b"".join([layout, stream, *raw_buffers])
+    
+    @staticmethod
+    def _decode_pickle(body: bytes) -> pd.DataFrame:
+        """فك ترميز pickle مع استخدام المخازن مباشرة من البيانات دون نسخ إضافي"""
+        # bytearray لتبقى مصفوفات الإطار الناتج قابلة للتعديل
+        view = memoryview(bytearray(body))
+        (buffer_count,) = struct.unpack_from("<I", view)
+        lengths = struct.unpack_from(f"<{buffer_count + 1}Q", view, 4)
+        
+        offset = 4 + 8 * (buffer_count + 1)
+        parts = []
+        for length in lengths:
+            parts.append(view[offset:offset + length])
+            offset += length
+        
+        return pickle.loads(parts[0], buffers=parts[1:])
+    
+    @staticmethod
+    def _encode_arrow(df: pd.DataFrame) -> bytes:
+        """ترميز Arrow IPC مع الاحتفاظ بالفهرس"""
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    
+    @staticmethod
+    def _decode_arrow(body: bytes) -> pd.DataFrame:
+        """فك ترميز Arrow IPC"""
+        if pa is None:
+            raise ValueError("مكتبة pyarrow غير مثبتة لفك ترميز بيانات Arrow")
+        return pa.ipc.open_stream(pa.py_buffer(body)).read_all().to_pandas()
+    
+    def encode(self, df: pd.DataFrame) -> bytes:
+        """
+        ترميز إطار بيانات
+        
+        المعلمات:
+            df (pd.DataFrame): إطار البيانات
+        
+        العائد:
+            bytes: البيانات المرمزة
+        """
+        data_format = self.format
+        if data_format == "arrow":
+            try:
+                body = self._encode_arrow(df)
+            except (pa.ArrowException, TypeError, ValueError) as e:
+                # الأعمدة ذات الأنواع المختلطة لا يمكن تمثيلها في Arrow
+                logger.debug(f"تعذر الترميز بصيغة Arrow، سيتم استخدام pickle: {str(e)}")
+                data_format = "pickle"
+        
+        if data_format == "pickle":
+            body = self._encode_pickle(df)
+        
+        compress, _ = self.compressors[self.compression]
+        if self.compression != "none":
+            body = compress(body)
+        
+        return HEADER.pack(MAGIC, FORMATS[data_format], COMPRESSIONS[self.compression]) + body
+    
+    def decode(self, payload: bytes) -> pd.DataFrame:
+        """
+        فك ترميز إطار بيانات (تُقرأ الصيغة والضغط من الترويسة وليس من إعدادات الفئة)
+        
+        المعلمات:
+            payload (bytes): البيانات المرمزة
+        
+        العائد:
+            pd.DataFrame: إطار البيانات
+        """
+        if not is_encoded(payload):
+            raise ValueError("البيانات ليست إطار بيانات مرمزاً")
+        
+        _, format_id, compression_id = HEADER.unpack_from(payload)
+        body = memoryview(payload)[HEADER.size:]
+        
+        compression = next((name for name, value in COMPRESSIONS.items() if value == compression_id), None)
+        if compression not in self.compressors:
+            raise ValueError(f"مكتبة الضغط غير مثبتة لفك الترميز: {compression}")
+        if compression != "none":
+            body = self.compressors[compression][1](body)
+        
+        if format_id == FORMATS["arrow"]:
+            return self._decode_arrow(body)
+        if format_id == FORMATS["pickle"]:
+            return self._decode_pickle(body)
+        raise ValueError(f"صيغة ترميز غير معروفة: {format_id}")
@@ -0,0 +1,294 @@
+"""
+وحدة السجل الرئيسي للرموز لمشروع SEBA
+توفر هذه الوحدة تحميل قائمة الأسهم (الرمز، الاسم، السوق، القطاع) من ملف محلي أو من قاعدة البيانات
+وبناء فهرس بادئات (Trie) وفهرس ثلاثيات أحرف (Trigram) في الذاكرة للبحث الفوري دون الاتصال بمصادر البيانات
+"""
+
+import os
+import csv
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Any
+
+# إعداد السجل
+logger = logging.getLogger(__name__)
+
+
+class SymbolMaster:
+    """فئة لإدارة السجل الرئيسي للرموز والبحث فيه"""
+    
+    def __init__(self, symbols_file: Optional[str] = None):
+        """
+        تهيئة الفئة
+        
+        المعلمات:
+            symbols_file (str, optional): مسار ملف الرموز (CSV أو JSON). إذا لم يتم تحديده، سيتم استخدام SYMBOLS_FILE من متغيرات البيئة.
+        """
+        self.symbols_file = symbols_file or os.getenv("SYMBOLS_FILE")
+        # لقطة واحدة غير قابلة للتعديل تضم جميع الفهارس، تُستبدل كاملة عند كل تحميل
+        self._index: Dict[str, Any] = self._build_index([])
+        self._lock = threading.Lock()
+        logger.info("تهيئة السجل الرئيسي للرموز")
+    
+    @property
+    def is_loaded(self) -> bool:
+        """التحقق مما إذا تم تحميل الرموز"""
+        return bool(self._index["records"])
+    
+    @property
+    def records(self) -> List[Dict]:
+        """سجلات الرموز في اللقطة الحالية"""
+        return self._index["records"]
+    
+    def load_from_file(self, path: Optional[str] = None) -> int:
+        """
+        تحميل الرموز من ملف CSV أو JSON
+        
+        يجب أن يحتوي الملف على الحقول symbol و name، والحقلان exchange و sector اختياريان.
+        
+        المعلمات:
+            path (str, optional): مسار الملف. إذا لم يتم تحديده، سيتم استخدام symbols_file.
+        
+        العائد:
+            int: عدد الرموز المحملة
+        """
+        path = path or self.symbols_file
+        if not path or not os.path.exists(path):
+            logger.warning(f"ملف الرموز غير موجود: {path}")
+            return 0
+        
+        try:
+            with open(path, encoding="utf-8") as f:
+                if path.lower().endswith(".json"):
+                    records = json.load(f)
+                else:
+                    records = list(csv.DictReader(f))
+            
+            return self.load(records)
+        except Exception as e:
+            logger.error(f"خطأ في تحميل ملف الرموز {path}: {str(e)}")
+            return 0
+    
+    def load_from_database(self, stock_repository: Any) -> int:
+        """
+        تحميل الرموز من جدول الأسهم في قاعدة البيانات
+        
+        المعلمات:
+            stock_repository (StockRepository): مستودع الأسهم
+        
+        العائد:
+            int: عدد الرموز المحملة
+        """
+        try:
+            stocks = stock_repository.get_all_stocks(active_only=True)
+            records = [
+                {
+                    "symbol": stock.symbol,
+                    "name": stock.name,
+                    "exchange": stock.exchange,
+                    "sector": stock.sector
+                }
+                for stock in stocks
+            ]
+            return self.load(records)
+        except Exception as e:
+            logger.error(f"خطأ في تحميل الرموز من قاعدة البيانات: {str(e)}")
+            return 0
+    
+    def load(self, records: List[Dict]) -> int:
+        """
+        بناء الفهارس من قائمة سجلات الرموز واستبدال الفهارس الحالية دفعة واحدة
+        
+        المعلمات:
+            records (List[Dict]): قائمة السجلات (symbol, name, exchange, sector)
+        
+        العائد:
+            int: عدد الرموز المحملة
+        """
+        cleaned = []
+        seen = set()
+        for record in records:
+            symbol = (record.get("symbol") or "").strip().upper()
+            if not symbol or symbol in seen:
+                continue
+            seen.add(symbol)
+            cleaned.append({
+                "symbol": symbol,
+                "name": (record.get("name") or "").strip(),
+                "exchange": (record.get("exchange") or "").strip(),
+                "sector": (record.get("sector") or "").strip()
+            })
+        
+        index = self._build_index(cleaned)
+        
+        # استبدال اللقطة بإسناد واحد حتى لا يرى البحث المتزامن فهارس من تحميلين مختلفين
+        with self._lock:
+            self._index = index
+        
+        logger.info(f"تم تحميل {len(cleaned)} رمز في السجل الرئيسي للرموز")
+        return len(cleaned)
+    
+    @classmethod
+    def _build_index(cls, records: List[Dict]) -> Dict[str, Any]:
+        """
+        بناء لقطة الفهارس (السجلات، الرموز، شجرة البادئات، ثلاثيات الأحرف)
+        
+        المعلمات:
+            records (List[Dict]): السجلات المنظفة
+        
+        العائد:
+            Dict[str, Any]: لقطة الفهارس
+        """
+        # الرموز الأقصر أولاً حتى تظهر المطابقات الأدق في مقدمة نتائج البادئات
+        records = sorted(records, key=lambda record: (len(record["symbol"]), record["symbol"]))
+        
+        by_symbol = {record["symbol"]: i for i, record in enumerate(records)}
+        trie: Dict = {}
+        trigrams: Dict[str, Set[int]] = defaultdict(set)
+        
+        for i, record in enumerate(records):
+            keys = [record["symbol"].lower()] + cls._tokenize(record["name"])
+            for key in keys:
+                cls._trie_insert(trie, key, i)
+            for trigram in cls._trigrams(f"{record['symbol']} {record['name']}"):
+                trigrams[trigram].add(i)
+        
+        return {
+            "records": records,
+            "by_symbol": by_symbol,
+            "trie": trie,
+            "trigrams": dict(trigrams)
+        }
+    
+    @staticmethod
+    def _trie_insert(trie: Dict, key: str, record_id: int) -> None:
+        """
+        إضافة مفتاح إلى شجرة البادئات مع حفظ معرف السجل في كل عقدة على المسار
+        
+        تُحفظ قائمة المعرفات كاملة دون اقتطاع، وبما أن المعرفات تُضاف بترتيب الأفضلية
+        فإن الاقتطاع يتم في البحث بعد تقاطع كلمات الاستعلام.
+        """
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {"#": []})
+            ids = node["#"]
+            if not ids or ids[-1] != record_id:
+                ids.append(record_id)
+    
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        """تقسيم النص إلى كلمات صغيرة الأحرف"""
+        return [token for token in "".join(c.lower() if c.isalnum() else " " for c in text).split() if token]
+    
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        """استخراج ثلاثيات الأحرف من النص"""
+        normalized = "  " + " ".join(SymbolMaster._tokenize(text)) + " "
+        return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+    
+    def get(self, symbol: str) -> Optional[Dict]:
+        """
+        الحصول على سجل رمز معين
+        
+        المعلمات:
+            symbol (str): رمز السهم
+        
+        العائد:
+            Dict: سجل الرمز، أو None إذا لم يتم العثور عليه
+        """
+        index = self._index
+        record_id = index["by_symbol"].get(symbol.strip().upper())
+        return dict(index["records"][record_id]) if record_id is not None else None
+    
+    def get_symbols(self, exchange: Optional[str] = None, sector: Optional[str] = None) -> List[str]:
+        """
+        الحصول على قائمة الرموز مع إمكانية التصفية حسب السوق أو القطاع
+        
+        المعلمات:
+            exchange (str, optional): السوق
+            sector (str, optional): القطاع
+        
+        العائد:
+            List[str]: قائمة الرموز
+        """
+        records = self._index["records"]
+        if exchange:
+            records = [record for record in records if record["exchange"].lower() == exchange.lower()]
+        if sector:
+            records = [record for record in records if record["sector"].lower() == sector.lower()]
+        return [record["symbol"] for record in records]
+    
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        البحث عن الأسهم بالرمز أو الاسم
+        
+        تُرتب النتائج: المطابقة التامة للرمز، ثم مطابقات البادئة في الرمز أو كلمات الاسم،
+        ثم المطابقات التقريبية بثلاثيات الأحرف.
+        
+        المعلمات:
+            query (str): استعلام البحث
+            limit (int, optional): الحد الأقصى لعدد النتائج
+        
+        العائد:
+            List[Dict]: قائمة بالأسهم المطابقة
+        """
+        tokens = self._tokenize(query)
+        if not tokens:
+            return []
+        
+        # قراءة اللقطة مرة واحدة حتى تبقى جميع الفهارس متسقة طوال البحث
+        index = self._index
+        records = index["records"]
+        result_ids: List[int] = []
+        seen: Set[int] = set()
+        
+        def add(record_id: int) -> None:
+            if record_id not in seen:
+                seen.add(record_id)
+                result_ids.append(record_id)
+        
+        # المطابقة التامة للرمز
+        exact = index["by_symbol"].get(query.strip().upper())
+        if exact is not None:
+            add(exact)
+        
+        # مطابقات البادئة: يجب أن تطابق جميع كلمات الاستعلام
+        prefix_sets = []
+        for token in tokens:
+            node = index["trie"]
+            for char in token:
+                node = node.get(char)
+                if node is None:
+                    break
+            prefix_sets.append(node["#"] if node else [])
+        
+        if prefix_sets:
+            common = set(prefix_sets[0]).intersection(*prefix_sets[1:])
+            for record_id in prefix_sets[0]:
+                if len(result_ids) >= limit:
+                    break
+                if record_id in common:
+                    add(record_id)
+        
+        # المطابقات التقريبية بثلاثيات الأحرف
+        if len(result_ids) < limit and len(query.strip()) >= 3:
+            scores: Dict[int, int] = defaultdict(int)
+            query_trigrams = self._trigrams(query)
+            for trigram in query_trigrams:
+                for record_id in index["trigrams"].get(trigram, ()):
+                    scores[record_id] += 1
+            
+            threshold = max(1, len(query_trigrams) // 2)
+            ranked = sorted(
+                (record_id for record_id, score in scores.items() if score >= threshold),
+                key=lambda record_id: (-scores[record_id], record_id)
+            )
+            for record_id in ranked[:limit]:
+                add(record_id)
+        
+        return [
+            {**records[record_id], "type": "Equity"}
+            for record_id in result_ids[:limit]
+        ]
@@ -9,6 +9,9 @@ import pandas as pd
 from typing import Dict, List, Optional, Union, Tuple
 from datetime import datetime, date, timedelta
 
+from seba.utils.optimization import cache, measure_performance
+from seba.utils.tracing import traced
+
 # إعداد السجل
 logger = logging.getLogger(__name__)
 
@@ -16,6 +19,7 @@ class TechnicalIndicators:
     """فئة لحساب المؤشرات الفنية المختلفة"""
     
     @staticmethod
+    @measure_performance("indicators.sma")
     def calculate_sma(data: pd.DataFrame, column: str = 'close', periods: List[int] = [20, 50, 150, 200]) -> pd.DataFrame:
         """
         حساب المتوسط المتحرك البسيط (SMA)
@@ -40,6 +44,7 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @measure_performance("indicators.ema")
     def calculate_ema(data: pd.DataFrame, column: str = 'close', periods: List[int] = [12, 26, 50, 200]) -> pd.DataFrame:
         """
         حساب المتوسط المتحرك الأسي (EMA)
@@ -64,6 +69,7 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @measure_performance("indicators.rsi")
     def calculate_rsi(data: pd.DataFrame, column: str = 'close', period: int = 14) -> pd.DataFrame:
         """
         حساب مؤشر القوة النسبية (RSI)
@@ -102,6 +108,7 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @measure_performance("indicators.macd")
     def calculate_macd(data: pd.DataFrame, column: str = 'close', fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> pd.DataFrame:
         """
         حساب مؤشر تقارب وتباعد المتوسطات المتحركة (MACD)
@@ -138,6 +145,7 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @measure_performance("indicators.bollinger_bands")
     def calculate_bollinger_bands(data: pd.DataFrame, column: str = 'close', period: int = 20, std_dev: float = 2.0) -> pd.DataFrame:
         """
         حساب نطاقات بولينجر (Bollinger Bands)
@@ -173,6 +181,7 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @measure_performance("indicators.atr")
     def calculate_atr(data: pd.DataFrame, period: int = 14) -> pd.DataFrame:
         """
         حساب المدى الحقيقي المتوسط (ATR)
@@ -208,6 +217,7 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @measure_performance("indicators.adx")
     def calculate_adx(data: pd.DataFrame, period: int = 14) -> pd.DataFrame:
         """
         حساب مؤشر الاتجاه المتوسط (ADX)
@@ -263,6 +273,7 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @measure_performance("indicators.stochastic")
     def calculate_stochastic(data: pd.DataFrame, k_period: int = 14, d_period: int = 3) -> pd.DataFrame:
         """
         حساب مؤشر الاستوكاستك (Stochastic)
@@ -294,6 +305,7 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @measure_performance("indicators.obv")
     def calculate_obv(data: pd.DataFrame) -> pd.DataFrame:
         """
         حساب مؤشر توازن الحجم (OBV)
@@ -333,6 +345,7 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @measure_performance("indicators.rs_rating")
     def calculate_rs_rating(data: pd.DataFrame, base_index_data: pd.DataFrame, period: int = 252) -> pd.DataFrame:
         """
         حساب تصنيف القوة النسبية (RS Rating) مقارنة بمؤشر السوق
@@ -389,6 +402,9 @@ class TechnicalIndicators:
             return data
     
     @staticmethod
+    @traced("indicators.calculate_all")
+    @cache(expiry=3600, namespace="indicators", manager="local")
+    @measure_performance("indicators.calculate_all")
     def calculate_all_indicators(data: pd.DataFrame, base_index_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         حساب جميع المؤشرات الفنية
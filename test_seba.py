@@ -7,9 +7,16 @@ import unittest
 import os
 import sys
 import json
+import time
+import inspect
+import tempfile
+import tracemalloc
+import asyncio
+import threading
+import requests
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from unittest.mock import MagicMock, patch
 
 # إضافة المسار إلى PYTHONPATH
@@ -18,8 +25,28 @@ sys.path.append('/home/ubuntu/SEBA_Implementation')
 # استيراد المكونات المراد اختبارها
 from seba.data_integration.data_manager import DataIntegrationManager
 from seba.data_integration.yahoo_finance import YahooFinanceAPI
+from seba.data_integration.iex_cloud import IEXCloudAPI
+from seba.data_integration.alpha_vantage import AlphaVantageAPI
+from seba.data_integration.provider_health import ProviderHealthMonitor, ProviderUnavailableError
+from seba.data_integration.symbol_master import SymbolMaster
+from seba.data_integration.cache_policy import CachePolicy
+from seba.data_integration.quote_hub import QuoteHub
+from seba.data_integration.provider_replay import install_provider_mode, ReplayProvider, RecordingStore, ReplayError
+from seba.data_integration.backfill import BackfillPlanner, find_gaps
+from seba.data_integration.cache_warmer import CacheWarmer
+from seba.data_integration.synthetic_data import SyntheticMarketGenerator, FRAME_COLUMNS
+from seba.database.intraday_store import IntradayBarStore
+from seba.utils.trading_calendar import TradingCalendar, MARKET_TIMEZONE
+from seba.utils.optimization import MemoryCache, CacheManager, cache, register_cache_manager, measure_performance
+from seba.utils.serialization import DataFrameCodec
+from seba.utils.disk_cache import DiskCache
+from seba.utils.metrics import MetricsRegistry, get_metrics_registry, symbol_class
+from seba.utils.tracing import Tracer, traced, bind_context, current_trace_id
+from seba.utils.profiler import SamplingProfiler, route_pattern
+from seba.utils.benchmark import BenchmarkSuite, compare_results, save_results, load_results
 from seba.models.technical_analysis import TechnicalIndicators, PatternRecognition, DataProcessor
 from seba.models.sepa_engine import SEPAEngine
+from seba.models.corporate_actions import CorporateActionsEngine
 from seba.models.ai_integration import OpenAIClient, ChatbotEngine, AIIntegrationManager
 
 
@@ -85,6 +112,1728 @@ class TestDataIntegration(unittest.TestCase):
         self.assertIn('volume', data.columns)
 
 
+class TestHedgedRequests(unittest.TestCase):
+    """اختبارات وضع التحوط في جلب البيانات التاريخية"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.data_manager = DataIntegrationManager(hedge_enabled=True, hedge_budget=0.05, hedge_max_ratio=1.0)
+        self.data_manager.alpha_vantage.api_key = "test_key"
+        self.test_data = pd.DataFrame({
+            'date': pd.date_range(start='2020-01-01', periods=5).date,
+            'close': np.arange(5, dtype=float)
+        })
+    
+    def test_slow_primary_is_hedged(self):
+        """اختبار اعتماد المصدر الثانوي عندما يتجاوز المصدر الأساسي الميزانية"""
+        def slow_primary(**kwargs):
+            time.sleep(0.5)
+            return self.test_data
+        
+        self.data_manager.yahoo_finance.get_historical_data = MagicMock(side_effect=slow_primary)
+        self.data_manager.alpha_vantage.get_historical_data = MagicMock(return_value=self.test_data)
+        
+        data = self.data_manager.get_historical_data("AAPL", period="1y")
+        
+        self.assertFalse(data.empty)
+        stats = self.data_manager.get_hedge_stats()
+        self.assertEqual(stats['hedged'], 1)
+        self.assertEqual(stats['wins'].get('alpha_vantage'), 1)
+    
+    def test_hung_primary_times_out_to_secondary(self):
+        """اختبار التحويل إلى المصدر الثانوي عند تعلق المصدر الأساسي دون توفر حصة تحوط"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.data_manager._acquire_hedge_slot = MagicMock(return_value=False)
+        self.data_manager.hedge_timeout = 0.2
+        self.data_manager.yahoo_finance.get_historical_data = MagicMock(side_effect=lambda **kwargs: release.wait(5) and self.test_data)
+        self.data_manager.alpha_vantage.get_historical_data = MagicMock(return_value=self.test_data)
+        
+        started = time.perf_counter()
+        data = self.data_manager.get_historical_data("AAPL", period="1y")
+        
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertFalse(data.empty)
+        self.assertEqual(self.data_manager.get_hedge_stats()['wins'].get('alpha_vantage'), 1)
+    
+    def test_intraday_interval_is_not_hedged_to_daily_source(self):
+        """اختبار عدم التحوط إلى مصدر لا يدعم الفواصل داخل اليوم"""
+        def slow_primary(**kwargs):
+            time.sleep(0.2)
+            return self.test_data
+        
+        self.data_manager.yahoo_finance.get_historical_data = MagicMock(side_effect=slow_primary)
+        self.data_manager.alpha_vantage.get_historical_data = MagicMock(return_value=self.test_data)
+        self.data_manager.intraday_store.append = MagicMock(return_value=5)
+        
+        self.data_manager.get_historical_data("AAPL", period="5d", interval="5m")
+        self.assertEqual(self.data_manager.ingest_intraday_data("AAPL"), 5)
+        
+        self.data_manager.alpha_vantage.get_historical_data.assert_not_called()
+        self.assertEqual(self.data_manager.yahoo_finance.get_historical_data.call_count, 2)
+        self.assertEqual(self.data_manager.get_hedge_stats()['hedged'], 0)
+    
+    def test_secondary_without_capability_or_key_is_not_hedged(self):
+        """اختبار عدم التحوط إلى مصدر ثانوي لا يدعم نطاق التواريخ أو بلا مفتاح API"""
+        self.assertEqual(self.data_manager._hedge_secondary("yahoo_finance", "1y", "1d"), "alpha_vantage")
+        self.assertIsNone(self.data_manager._hedge_secondary("yahoo_finance", None, "1d"))
+        self.assertIsNone(self.data_manager._hedge_secondary("yahoo_finance", "5d", "5m"))
+        
+        self.data_manager.alpha_vantage.api_key = None
+        self.assertIsNone(self.data_manager._hedge_secondary("yahoo_finance", "1y", "1d"))
+    
+    def test_fast_primary_is_not_hedged(self):
+        """اختبار عدم إرسال طلب تحوطي عندما يُجيب المصدر الأساسي ضمن الميزانية"""
+        self.data_manager.yahoo_finance.get_historical_data = MagicMock(return_value=self.test_data)
+        self.data_manager.alpha_vantage.get_historical_data = MagicMock(return_value=self.test_data)
+        
+        self.data_manager.get_historical_data("AAPL", period="1y")
+        
+        self.data_manager.alpha_vantage.get_historical_data.assert_not_called()
+        self.assertEqual(self.data_manager.get_hedge_stats()['wins'].get('yahoo_finance'), 1)
+
+
+class TestProviderHealth(unittest.TestCase):
+    """اختبارات مراقبة صحة المصادر والتوجيه التلقائي"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.data_manager = DataIntegrationManager(hedge_enabled=False)
+        self.data_manager.health_monitor = ProviderHealthMonitor(failure_threshold=3, cool_down=60)
+        self.data_manager.adaptive_routing = True
+    
+    def test_circuit_breaker_skips_failing_provider(self):
+        """اختبار تجاوز المصدر المتعثر بعد فتح قاطع الدائرة ولو لم تكن للمصادر الأخرى مفاتيح API"""
+        self.data_manager.alpha_vantage.api_key = None
+        self.data_manager.iex_cloud.api_key = None
+        for _ in range(3):
+            self.data_manager.health_monitor.record_failure("yahoo_finance", 0.1)
+        
+        self.assertFalse(self.data_manager.health_monitor.is_available("yahoo_finance"))
+        self.assertEqual(self.data_manager._select_source("historical"), "alpha_vantage")
+        
+        for provider in ("alpha_vantage", "iex_cloud"):
+            for _ in range(3):
+                self.data_manager.health_monitor.record_failure(provider, 0.1)
+        with self.assertRaises(ProviderUnavailableError):
+            self.data_manager._select_source("historical")
+    
+    def test_routing_respects_provider_capabilities(self):
+        """اختبار استبعاد المصادر التي لا تدعم نطاق التواريخ أو الأشرطة داخل اليوم قبل الترتيب"""
+        for _ in range(3):
+            self.data_manager.health_monitor.record_failure("yahoo_finance", 0.1)
+        
+        select = lambda period, interval: self.data_manager._select_source(
+            "historical", self.data_manager._historical_sources(period, interval)
+        )
+        self.assertEqual(select("1y", "1d"), "alpha_vantage")
+        self.assertEqual(select("5d", "5m"), "iex_cloud")
+        with self.assertRaises(ProviderUnavailableError):
+            select(None, "1d")
+        with self.assertRaises(ProviderUnavailableError):
+            select("1mo", "5m")
+    
+    def test_half_open_allows_single_probe(self):
+        """اختبار توجيه طلب تجريبي واحد فقط إلى المصدر بعد فترة التهدئة"""
+        self.data_manager.health_monitor = ProviderHealthMonitor(failure_threshold=1, cool_down=0.05)
+        self.data_manager.health_monitor.record_failure("yahoo_finance", 0.1)
+        time.sleep(0.06)
+        
+        self.assertEqual(self.data_manager._select_source("historical"), "yahoo_finance")
+        self.assertEqual(self.data_manager._select_source("historical"), "alpha_vantage")
+        
+        self.data_manager.health_monitor.record_success("yahoo_finance", 0.1)
+        self.assertEqual(self.data_manager._select_source("historical"), "yahoo_finance")
+    
+    def test_all_providers_unavailable_returns_empty(self):
+        """اختبار إعادة نتيجة فارغة دون رفع استثناء عند تعثر جميع المصادر"""
+        for provider in ("yahoo_finance", "alpha_vantage", "iex_cloud"):
+            for _ in range(3):
+                self.data_manager.health_monitor.record_failure(provider, 0.1)
+        
+        self.assertTrue(self.data_manager.get_historical_data("AAPL", period="1mo").empty)
+        self.assertEqual(self.data_manager.get_realtime_data("AAPL"), {})
+        self.assertEqual(self.data_manager.get_fundamental_data("AAPL"), {})
+        self.assertEqual(self.data_manager.get_earnings_data("AAPL"), {})
+    
+    def test_availability_check_keeps_probe(self):
+        """اختبار أن التحقق من التوفر لا يستهلك الطلب التجريبي بعد فترة التهدئة"""
+        monitor = ProviderHealthMonitor(failure_threshold=1, cool_down=0)
+        monitor.record_failure("yahoo_finance", 0.1)
+        
+        self.assertTrue(monitor.is_available("yahoo_finance"))
+        self.assertEqual(monitor.breakers["yahoo_finance"].state, "open")
+        self.assertTrue(monitor.breakers["yahoo_finance"].allow_request())
+        self.assertEqual(monitor.breakers["yahoo_finance"].state, "half_open")
+    
+    def test_provider_transport_errors_open_circuit(self):
+        """اختبار تسجيل أخطاء الاتصال في المصدر الحقيقي كإخفاقات دون تخزين نتيجة سلبية"""
+        self.data_manager.alpha_vantage.api_key = None
+        self.data_manager.iex_cloud.api_key = None
+        error = requests.exceptions.ConnectionError("503 Server Error: Service Unavailable")
+        
+        with patch('seba.data_integration.yahoo_finance.yf.download', side_effect=error):
+            for symbol in ("AAPL", "MSFT", "GOOGL"):
+                data = self.data_manager.get_historical_data(symbol, period="1mo", source="yahoo_finance")
+                self.assertTrue(data.empty)
+        
+        health = self.data_manager.get_provider_health()["yahoo_finance"]
+        self.assertEqual(health["error_rate"], 1.0)
+        self.assertFalse(self.data_manager.health_monitor.is_available("yahoo_finance"))
+        self.assertEqual(self.data_manager._select_source("historical"), "alpha_vantage")
+    
+    def test_freshness_lag_with_timezone_aware_bars(self):
+        """اختبار حساب تأخر الحداثة لأشرطة داخل اليوم بمنطقة زمنية (كما تعيدها yfinance)"""
+        latest = pd.Timestamp.now(tz='America/New_York').floor('min') - pd.Timedelta(minutes=10)
+        bars = pd.DataFrame({
+            'date': pd.date_range(end=latest, periods=3, freq='5min'),
+            'close': [1.0, 1.1, 1.2]
+        })
+        
+        self.data_manager._call_provider('yahoo_finance', lambda symbol: bars, symbol='AAPL')
+        self.data_manager._call_provider('yahoo_finance', lambda symbol: bars.assign(date=bars['date'].dt.tz_localize(None)), symbol='AAPL')
+        
+        health = self.data_manager.get_provider_health()['yahoo_finance']
+        self.assertEqual(health['error_rate'], 0.0)
+        self.assertAlmostEqual(health['freshness_lag'], 600, delta=120)
+    
+    def test_empty_results_do_not_open_circuit(self):
+        """اختبار أن النتائج الفارغة (رموز غير صالحة) لا تفتح قاطع الدائرة"""
+        for symbol in ("AAPLL", "MSFTT", "GOGL", "AMZM"):
+            self.data_manager._call_provider("yahoo_finance", lambda symbol: pd.DataFrame(), symbol=symbol)
+        
+        self.assertTrue(self.data_manager.health_monitor.is_available("yahoo_finance"))
+        self.assertEqual(self.data_manager.get_provider_health()["yahoo_finance"]["error_rate"], 0.0)
+    
+    def test_fastest_provider_is_selected(self):
+        """اختبار اختيار المصدر الأسرع بعد توفر عينات كافية"""
+        self.data_manager.iex_cloud.api_key = "test_key"
+        for _ in range(10):
+            self.data_manager.health_monitor.record_success("yahoo_finance", 3.0)
+            self.data_manager.health_monitor.record_success("iex_cloud", 0.2)
+        
+        self.assertEqual(self.data_manager._select_source("realtime"), "iex_cloud")
+        snapshot = self.data_manager.get_provider_health()
+        self.assertEqual(snapshot["iex_cloud"]["circuit_state"], "closed")
+        self.assertEqual(snapshot["yahoo_finance"]["error_rate"], 0.0)
+
+
+class TestSymbolMaster(unittest.TestCase):
+    """اختبارات السجل الرئيسي للرموز"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.symbol_master = SymbolMaster()
+        self.symbol_master.load([
+            {'symbol': 'AAPL', 'name': 'Apple Inc.', 'exchange': 'NASDAQ', 'sector': 'Technology'},
+            {'symbol': 'AMZN', 'name': 'Amazon.com Inc.', 'exchange': 'NASDAQ', 'sector': 'Consumer Cyclical'},
+            {'symbol': 'MSFT', 'name': 'Microsoft Corporation', 'exchange': 'NASDAQ', 'sector': 'Technology'},
+            {'symbol': 'JPM', 'name': 'JPMorgan Chase & Co.', 'exchange': 'NYSE', 'sector': 'Financial Services'}
+        ])
+    
+    def test_search_by_symbol_prefix(self):
+        """اختبار البحث ببادئة الرمز"""
+        results = self.symbol_master.search('AA')
+        self.assertEqual(results[0]['symbol'], 'AAPL')
+    
+    def test_search_by_name(self):
+        """اختبار البحث بكلمة من اسم الشركة وبجزء منها"""
+        self.assertEqual(self.symbol_master.search('micro')[0]['symbol'], 'MSFT')
+        self.assertEqual(self.symbol_master.search('morgan')[0]['symbol'], 'JPM')
+    
+    def test_get_symbols(self):
+        """اختبار الحصول على قائمة الرموز مع التصفية"""
+        self.assertEqual(len(self.symbol_master.get_symbols()), 4)
+        self.assertEqual(self.symbol_master.get_symbols(exchange='NYSE'), ['JPM'])
+    
+    def test_search_beyond_common_prefix(self):
+        """اختبار العثور على الرموز المتأخرة عندما تشترك مئات الرموز في البادئة نفسها"""
+        self.symbol_master.load([
+            {'symbol': f'A{i:03d}', 'name': f'Alpha Holdings {i}', 'exchange': 'NYSE'}
+            for i in range(200)
+        ])
+        
+        # قبل الإصلاح كانت قائمة البادئة "alpha" مقتطعة عند أول 50 رمزاً فلا يظهر إلا A018
+        results = self.symbol_master.search('alpha 18', limit=11)
+        expected = {'A018'} | {f'A{i}' for i in range(180, 190)}
+        self.assertEqual({result['symbol'] for result in results}, expected)
+        self.assertEqual(len(self.symbol_master.search('alpha', limit=100)), 100)
+    
+    def test_failed_load_is_retried_after_backoff(self):
+        """اختبار إعادة محاولة تحميل السجل بعد الفشل بفاصل زمني متزايد"""
+        data_manager = DataIntegrationManager(cache_enabled=False)
+        data_manager.symbol_master_retry_seconds = 60
+        data_manager.reload_symbol_master = MagicMock(return_value=0)
+        
+        self.assertFalse(data_manager._ensure_symbol_master())
+        self.assertFalse(data_manager._ensure_symbol_master())
+        self.assertEqual(data_manager.reload_symbol_master.call_count, 1)
+        
+        # انتهاء فترة الانتظار: تُعاد المحاولة وتتضاعف الفترة التالية
+        data_manager._symbol_master_retry_at = 0.0
+        data_manager.reload_symbol_master = MagicMock(
+            side_effect=lambda: data_manager.symbol_master.load([{'symbol': 'AAPL', 'name': 'Apple Inc.'}])
+        )
+        self.assertTrue(data_manager._ensure_symbol_master())
+        self.assertEqual(data_manager.reload_symbol_master.call_count, 1)
+        self.assertEqual(data_manager._symbol_master_failures, 0)
+
+
+class TestCachePolicy(unittest.TestCase):
+    """اختبارات سياسات التخزين المؤقت وتقويم التداول"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.calendar = TradingCalendar()
+        self.policy = CachePolicy(calendar=self.calendar, quote_ttl=5, quote_off_hours_ttl=900, publish_delay=900)
+    
+    def test_trading_calendar(self):
+        """اختبار العطل وأيام الإغلاق المبكر"""
+        self.assertFalse(self.calendar.is_trading_day(datetime(2024, 3, 29).date()))  # Good Friday
+        self.assertFalse(self.calendar.is_trading_day(datetime(2024, 7, 4).date()))
+        self.assertTrue(self.calendar.is_early_close(datetime(2024, 11, 29).date()))
+        self.assertEqual(len(self.calendar.trading_days('2024-07-01', '2024-07-07')), 4)
+    
+    def test_daily_bars_expire_after_next_close(self):
+        """اختبار بقاء الأشرطة اليومية صالحة حتى إغلاق الجلسة التالية"""
+        friday_evening = datetime(2024, 7, 5, 17, 0, tzinfo=MARKET_TIMEZONE)
+        expiry = self.policy.get_expiry('daily', friday_evening)
+        self.assertEqual(expiry, datetime(2024, 7, 8, 16, 15, tzinfo=MARKET_TIMEZONE))
+        
+        # قبل نشر الشريط النهائي لا تتجاوز الصلاحية مهلة النشر
+        after_close = datetime(2024, 7, 8, 16, 5, tzinfo=MARKET_TIMEZONE)
+        self.assertEqual(self.policy.get_ttl('daily', after_close), 600)
+    
+    def test_quote_ttl_depends_on_market_hours(self):
+        """اختبار صلاحية الأسعار اللحظية أثناء ساعات التداول وخارجها"""
+        market_hours = datetime(2024, 7, 8, 11, 0, tzinfo=MARKET_TIMEZONE)
+        self.assertEqual(self.policy.get_ttl('quote', market_hours), 5)
+        
+        sunday = datetime(2024, 7, 7, 12, 0, tzinfo=MARKET_TIMEZONE)
+        self.assertEqual(self.policy.get_ttl('quote', sunday), 900)
+        self.assertEqual(self.policy.get_ttl('profile', sunday), 7 * 24 * 3600)
+    
+    def test_data_manager_uses_cache(self):
+        """اختبار تخزين نتائج مدير تكامل البيانات مؤقتاً"""
+        data_manager = DataIntegrationManager(hedge_enabled=False, cache_enabled=True)
+        data_manager.yahoo_finance.get_realtime_data = MagicMock(return_value={'symbol': 'AAPL', 'price': 100.0})
+        
+        data_manager.get_realtime_data('AAPL', source='yahoo_finance')
+        data_manager.get_realtime_data('AAPL', source='yahoo_finance')
+        self.assertEqual(data_manager.yahoo_finance.get_realtime_data.call_count, 1)
+        
+        data_manager.get_realtime_data('AAPL', source='yahoo_finance', use_cache=False)
+        self.assertEqual(data_manager.yahoo_finance.get_realtime_data.call_count, 2)
+
+
+class TestMemoryCache(unittest.TestCase):
+    """اختبارات التخزين المؤقت في الذاكرة"""
+    
+    def test_lru_eviction_by_size(self):
+        """اختبار إخلاء الأقدم استخداماً عند تجاوز الحجم الأقصى"""
+        cache = MemoryCache(max_bytes=3 * 8000, max_entries=100, namespace_quotas={})
+        for key in ['a', 'b', 'c']:
+            self.assertTrue(cache.set(key, np.zeros(1000)))
+        
+        cache.get('a')
+        cache.set('d', np.zeros(1000))
+        
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.total_bytes, 3 * 8000)
+        self.assertEqual(cache.stats['evictions'], 1)
+        self.assertFalse(cache.set('huge', np.zeros(10000)))
+    
+    def test_expiry(self):
+        """اختبار حذف المدخلات المنتهية صلاحيتها"""
+        cache = MemoryCache(max_bytes=10 ** 6, max_entries=100, namespace_quotas={})
+        with patch('seba.utils.optimization.time.time', return_value=1000.0):
+            cache.set('seba:quote:AAPL', {'price': 1.0}, expiry=5)
+            cache.set('seba:profile:AAPL', {'name': 'Apple'})
+        
+        with patch('seba.utils.optimization.time.time', return_value=1006.0):
+            self.assertIsNone(cache.get('seba:profile:MSFT'))
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(cache.stats['expirations'], 1)
+            self.assertEqual(cache.get('seba:profile:AAPL'), {'name': 'Apple'})
+    
+    def test_namespace_quota(self):
+        """اختبار حصص مساحات الأسماء"""
+        cache = MemoryCache(max_bytes=10 ** 6, max_entries=100, namespace_quotas={'daily': 2 * 8000})
+        frame = pd.DataFrame({'close': np.zeros(1000)})
+        for symbol in ['AAPL', 'MSFT', 'GOOG']:
+            cache.set(f'seba:daily:{symbol}', frame)
+        cache.set('seba:quote:AAPL', np.zeros(1000))
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['namespaces']['daily']['entries'], 1)
+        self.assertEqual(stats['namespaces']['quote']['entries'], 1)
+        self.assertIsNotNone(cache.get('seba:daily:GOOG'))
+
+
+class FakeRedis:
+    """بديل محلي مبسط لخادم Redis للاختبارات، تتشارك نسخه البيانات والقنوات كأنها عملاء لنفس الخادم"""
+    
+    def __init__(self, server=None):
+        self.server = server if server is not None else {'data': {}, 'expiry': {}, 'subscribers': []}
+        self.commands = 0
+    
+    def client(self):
+        return FakeRedis(self.server)
+    
+    def get(self, key):
+        self.commands += 1
+        expires_at = self.server['expiry'].get(key)
+        if expires_at is not None and time.time() >= expires_at:
+            self.delete(key)
+        return self.server['data'].get(key)
+    
+    def pttl(self, key):
+        if key not in self.server['data']:
+            return -2
+        expires_at = self.server['expiry'].get(key)
+        return -1 if expires_at is None else int((expires_at - time.time()) * 1000)
+    
+    def set(self, key, value, nx=False, ex=None):
+        if nx and self.get(key) is not None:
+            return None
+        self.server['data'][key] = value.encode() if isinstance(value, str) else value
+        self.server['expiry'].pop(key, None)
+        if ex is not None:
+            self.server['expiry'][key] = time.time() + ex
+        return True
+    
+    def setex(self, key, expiry, value):
+        self.set(key, value)
+        self.server['expiry'][key] = time.time() + expiry
+    
+    def delete(self, *keys):
+        for key in keys:
+            self.server['data'].pop(key, None)
+            self.server['expiry'].pop(key, None)
+    
+    def flushdb(self):
+        self.server['data'].clear()
+        self.server['expiry'].clear()
+    
+    def publish(self, channel, message):
+        for pubsub in self.server['subscribers']:
+            if channel in pubsub.channels:
+                pubsub.messages.append({'type': 'message', 'channel': channel, 'data': message})
+    
+    def pubsub(self, ignore_subscribe_messages=False):
+        pubsub = MagicMock()
+        pubsub.channels = set()
+        pubsub.messages = []
+        pubsub.subscribe.side_effect = pubsub.channels.add
+        
+        def get_message(timeout=0):
+            if pubsub.messages:
+                return pubsub.messages.pop(0)
+            time.sleep(0.01)
+            return None
+        
+        pubsub.get_message.side_effect = get_message
+        self.server['subscribers'].append(pubsub)
+        return pubsub
+    
+    def pipeline(self):
+        client = self
+        results = []
+        pipeline = MagicMock()
+        pipeline.get.side_effect = lambda key: results.append(client.get(key))
+        pipeline.pttl.side_effect = lambda key: results.append(client.pttl(key))
+        pipeline.execute.side_effect = lambda: list(results)
+        return pipeline
+
+
+class TestTieredCache(unittest.TestCase):
+    """اختبارات التخزين المؤقت بطبقتين (الذاكرة أمام Redis) والإبطال بين العمليات"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        redis_server = FakeRedis()
+        self.workers = [
+            CacheManager(redis_client=redis_server.client(), l1_enabled=True),
+            CacheManager(redis_client=redis_server.client(), l1_enabled=True)
+        ]
+        for worker in self.workers:
+            self.addCleanup(worker.close)
+    
+    def wait_for(self, condition):
+        """انتظار تحقق شرط لمدة أقصاها ثانيتان"""
+        deadline = time.monotonic() + 2
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+    
+    def test_read_through_and_invalidation(self):
+        """اختبار تعبئة الطبقة الأولى عند القراءة وإبطالها عند التحديث من عملية أخرى"""
+        writer, reader = self.workers
+        writer.set('seba:daily:^GSPC', [{'close': 1.0}], expiry=60)
+        self.assertTrue(self.wait_for(lambda: reader.stats['invalidations'] == 1))
+        
+        self.assertEqual(reader.get('seba:daily:^GSPC'), [{'close': 1.0}])
+        commands = reader.redis_client.commands
+        self.assertEqual(reader.get('seba:daily:^GSPC'), [{'close': 1.0}])
+        self.assertEqual(reader.redis_client.commands, commands)
+        self.assertEqual(reader.stats['l1_hits'], 1)
+        
+        writer.set('seba:daily:^GSPC', [{'close': 2.0}], expiry=60)
+        self.assertTrue(self.wait_for(lambda: reader.stats['invalidations'] == 2))
+        self.assertEqual(reader.get('seba:daily:^GSPC'), [{'close': 2.0}])
+        
+        writer.delete('seba:daily:^GSPC')
+        self.assertTrue(self.wait_for(lambda: reader.get('seba:daily:^GSPC') is None))
+
+
+class TestDiskCache(unittest.TestCase):
+    """اختبارات التخزين المؤقت الدائم على القرص بدون Redis"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.db')
+    
+    def manager(self, **kwargs):
+        """إنشاء مدير تخزين مؤقت على ملف الاختبار"""
+        manager = CacheManager(disk_path=self.path, **kwargs)
+        self.addCleanup(manager.close)
+        return manager
+    
+    def test_values_survive_restart(self):
+        """اختبار بقاء القيم وأنواع أعمدة إطارات البيانات بعد إعادة التشغيل"""
+        df = pd.DataFrame(
+            {'close': [1.5, 2.5], 'volume': pd.array([100, None], dtype='Int64')},
+            index=pd.date_range('2024-01-02', periods=2, name='date')
+        )
+        writer = self.manager()
+        writer.set('seba:fundamental:AAPL', {'pe': 30.5}, expiry=60)
+        writer.set_dataframe('seba:daily:AAPL', df, expiry=60)
+        writer.close()
+        
+        reader = self.manager()
+        self.assertEqual(reader.get_stats()['backend'], 'disk')
+        self.assertEqual(reader.get('seba:fundamental:AAPL'), {'pe': 30.5})
+        pd.testing.assert_frame_equal(reader.get_dataframe('seba:daily:AAPL'), df)
+    
+    def test_expiry_and_lru_eviction(self):
+        """اختبار انتهاء الصلاحية وإخلاء الأقدم استخداماً عند تجاوز عدد المدخلات"""
+        disk = DiskCache(self.path, max_entries=2, touch_interval=0)
+        self.addCleanup(disk.close)
+        
+        with patch('seba.utils.disk_cache.time.time', return_value=1000.0):
+            disk.set('a', 1, expiry=10)
+        with patch('seba.utils.disk_cache.time.time', return_value=1011.0):
+            self.assertIsNone(disk.get('a'))
+            disk.set('a', 1)
+        with patch('seba.utils.disk_cache.time.time', return_value=1012.0):
+            disk.set('b', 2)
+        with patch('seba.utils.disk_cache.time.time', return_value=1013.0):
+            self.assertEqual(disk.get('a'), 1)
+        with patch('seba.utils.disk_cache.time.time', return_value=1014.0):
+            disk.set('c', 3)
+        
+        self.assertIsNone(disk.get('b'))
+        self.assertEqual((disk.get('a'), disk.get('c')), (1, 3))
+        self.assertEqual(len(disk), 2)
+        self.assertEqual(disk.get_stats()['evictions'], 1)
+    
+    def test_invalidation_between_workers(self):
+        """اختبار إبطال الطبقة الأولى عند تحديث القيمة من عملية أخرى"""
+        writer, reader = self.manager(), self.manager()
+        writer.set('seba:quote:AAPL', {'price': 1.0}, expiry=60)
+        writer.set('seba:quote:MSFT', {'price': 5.0}, expiry=60)
+        
+        self.assertEqual(reader.get('seba:quote:AAPL'), {'price': 1.0})
+        self.assertEqual(reader.get('seba:quote:MSFT'), {'price': 5.0})
+        self.assertEqual(reader.get('seba:quote:AAPL'), {'price': 1.0})
+        self.assertEqual(reader.stats['l1_hits'], 1)
+        
+        writer.set('seba:quote:AAPL', {'price': 2.0}, expiry=60)
+        self.assertEqual(reader.get('seba:quote:AAPL'), {'price': 2.0})
+        self.assertEqual(reader.get('seba:quote:MSFT'), {'price': 5.0})
+        self.assertEqual(reader.stats['l1_hits'], 2)
+        
+        writer.clear()
+        self.assertIsNone(reader.get('seba:quote:MSFT'))
+
+
+class TestDataFrameCodec(unittest.TestCase):
+    """اختبارات الترميز الثنائي لإطارات البيانات"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        dates = pd.bdate_range('2004-01-01', periods=5000, name='date')
+        self.test_data = pd.DataFrame({
+            'open': np.random.rand(5000) * 100,
+            'close': np.random.rand(5000) * 100,
+            'volume': np.random.randint(0, 10 ** 7, 5000),
+            'day': dates.date,
+            'symbol': pd.Categorical(['AAPL'] * 5000)
+        }, index=dates)
+    
+    def test_round_trip(self):
+        """اختبار الحفاظ على الأنواع والفهرس بعد فك الترميز"""
+        for compression in ['none', 'lz4', 'zstd']:
+            codec = DataFrameCodec(format='pickle', compression=compression)
+            decoded = codec.decode(codec.encode(self.test_data))
+            pd.testing.assert_frame_equal(decoded, self.test_data)
+            
+            # الإطار الناتج قابل للتعديل
+            decoded.iloc[0, 0] = -1.0
+        
+        with self.assertRaises(ValueError):
+            DataFrameCodec(compression='gzip')
+    
+    def test_cache_manager_round_trip(self):
+        """اختبار تخزين الإطارات في Redis مع الحفاظ على الأنواع"""
+        redis_client = FakeRedis()
+        cache_manager = CacheManager(redis_client=redis_client, l1_enabled=False)
+        
+        self.assertTrue(cache_manager.set_dataframe('seba:daily:AAPL', self.test_data, 60))
+        cached = cache_manager.get_dataframe('seba:daily:AAPL')
+        pd.testing.assert_frame_equal(cached, self.test_data)
+        
+        # السجلات المخزنة بصيغة JSON سابقاً
+        redis_client.set('seba:daily:MSFT', json.dumps([{'close': 1.0}]))
+        self.assertEqual(cache_manager.get_dataframe('seba:daily:MSFT')['close'].iloc[0], 1.0)
+        
+        memory_cache = CacheManager()
+        memory_cache.set_dataframe('seba:daily:AAPL', self.test_data)
+        memory_cache.get_dataframe('seba:daily:AAPL').iloc[0, 0] = -1.0
+        pd.testing.assert_frame_equal(memory_cache.get_dataframe('seba:daily:AAPL'), self.test_data)
+
+
+class TestCacheDecorator(unittest.TestCase):
+    """اختبارات مزخرف التخزين المؤقت"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        register_cache_manager('test', CacheManager())
+        self.calls = []
+    
+    def test_content_hashed_keys(self):
+        """اختبار إعادة استخدام النتائج لإطارات بيانات بنفس المحتوى"""
+        @cache(expiry=60, manager='test')
+        def last_close(data: pd.DataFrame, column: str = 'close') -> float:
+            self.calls.append(1)
+            return float(data[column].iloc[-1])
+        
+        data = pd.DataFrame({'close': np.arange(10, dtype=float)})
+        self.assertEqual(last_close(data), 9.0)
+        self.assertEqual(last_close(data.copy(), column='close'), 9.0)
+        self.assertEqual(len(self.calls), 1)
+        
+        changed = data.copy()
+        changed.iloc[-1, 0] = 20.0
+        self.assertEqual(last_close(changed), 20.0)
+        self.assertEqual(len(self.calls), 2)
+        
+        last_close.invalidate(data)
+        last_close(data)
+        self.assertEqual(len(self.calls), 3)
+    
+    def test_single_flight(self):
+        """اختبار تنفيذ استدعاء واحد فقط للطلبات المتزامنة"""
+        @cache(expiry=60, manager='test')
+        def slow_fetch(symbol: str) -> pd.DataFrame:
+            self.calls.append(symbol)
+            time.sleep(0.1)
+            return pd.DataFrame({'close': [1.0, 2.0]})
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow_fetch('AAPL'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.calls, ['AAPL'])
+        self.assertEqual(len(results), 8)
+        self.assertIsNot(results[0], results[1])
+        
+        @cache(expiry=60, manager='test')
+        async def async_fetch(symbol: str) -> dict:
+            self.calls.append(symbol)
+            await asyncio.sleep(0.05)
+            return {'symbol': symbol}
+        
+        async def run():
+            return await asyncio.gather(*[async_fetch('MSFT') for _ in range(5)])
+        
+        self.assertEqual(asyncio.run(run()), [{'symbol': 'MSFT'}] * 5)
+        self.assertEqual(self.calls.count('MSFT'), 1)
+    
+    def test_cached_values_are_isolated(self):
+        """اختبار أن تعديل النتيجة المعادة لا يغير القيمة المخزنة في الذاكرة"""
+        @cache(expiry=60, manager='test')
+        def fetch(symbol: str) -> dict:
+            return {'symbol': symbol, 'levels': [1.0, 2.0]}
+        
+        @cache(expiry=60, manager='test')
+        async def async_fetch(symbol: str) -> dict:
+            return {'symbol': symbol, 'levels': [1.0, 2.0]}
+        
+        fetch('AAPL')['levels'].append(3.0)
+        fetch('AAPL')['levels'].append(4.0)
+        self.assertEqual(fetch('AAPL')['levels'], [1.0, 2.0])
+        
+        async def run():
+            (await async_fetch('AAPL'))['levels'].append(3.0)
+            (await async_fetch('AAPL'))['levels'].append(4.0)
+            return await async_fetch('AAPL')
+        
+        self.assertEqual(asyncio.run(run())['levels'], [1.0, 2.0])
+    
+    def test_method_keys_include_instance(self):
+        """اختبار عدم مشاركة النتائج بين نسخ مختلفة من نفس الفئة إلا بدالة مفتاح صريحة"""
+        calls = self.calls
+        
+        class Scorer:
+            def __init__(self, weight):
+                self.weight = weight
+            
+            @cache(expiry=60, manager='test')
+            def score(self, value: float) -> float:
+                calls.append(self.weight)
+                return value * self.weight
+            
+            @cache(expiry=60, manager='test', key_func=lambda self, value: (self.weight, value))
+            def shared_score(self, value: float) -> float:
+                calls.append(self.weight)
+                return value * self.weight
+        
+        first, second = Scorer(1.0), Scorer(2.0)
+        self.assertEqual(first.score(10.0), 10.0)
+        self.assertEqual(second.score(10.0), 20.0)
+        self.assertEqual(first.score(10.0), 10.0)
+        self.assertEqual(len(calls), 2)
+        
+        self.assertEqual(Scorer(3.0).shared_score(10.0), 30.0)
+        self.assertEqual(Scorer(3.0).shared_score(10.0), 30.0)
+        self.assertEqual(len(calls), 3)
+    
+    def test_async_disk_lookups_run_off_event_loop(self):
+        """اختبار تنفيذ قراءة التخزين المؤقت على القرص خارج خيط حلقة الأحداث"""
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        disk_manager = CacheManager(disk_path=os.path.join(cache_dir.name, 'cache.db'))
+        self.addCleanup(disk_manager.close)
+        register_cache_manager('test_disk', disk_manager)
+        
+        lookup_threads = []
+        original_get = disk_manager.get
+        disk_manager.get = lambda key: lookup_threads.append(threading.current_thread()) or original_get(key)
+        
+        @cache(expiry=60, manager='test_disk')
+        async def async_fetch(symbol: str) -> dict:
+            return {'symbol': symbol}
+        
+        async def run():
+            await async_fetch('AAPL')
+            return await async_fetch('AAPL')
+        
+        self.assertEqual(asyncio.run(run()), {'symbol': 'AAPL'})
+        self.assertTrue(lookup_threads)
+        self.assertNotIn(threading.main_thread(), lookup_threads)
+
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    """اختبارات استخدام القيم القديمة أثناء تحديثها في الخلفية"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.now = [1000.0]
+        patcher = patch('seba.utils.optimization.time.time', side_effect=lambda: self.now[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    @staticmethod
+    def wait_for_refresh(cache_manager):
+        deadline = time.monotonic() + 5
+        while cache_manager._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+    
+    def test_stale_value_served_during_single_refresh(self):
+        """اختبار إعادة القيمة القديمة فوراً مع تحديث واحد فقط في الخلفية"""
+        cache_manager = CacheManager()
+        release = threading.Event()
+        calls = []
+        
+        def loader():
+            calls.append(1)
+            if len(calls) > 1:
+                release.wait(5)
+            return {'price': float(len(calls))}
+        
+        self.assertEqual(cache_manager.get_or_refresh('seba:fundamental:AAPL', loader, 10, 60), {'price': 1.0})
+        self.now[0] = 1005.0
+        self.assertEqual(cache_manager.get_or_refresh('seba:fundamental:AAPL', loader, 10, 60), {'price': 1.0})
+        self.assertEqual(len(calls), 1)
+        
+        self.now[0] = 1015.0
+        for _ in range(5):
+            self.assertEqual(cache_manager.get_or_refresh('seba:fundamental:AAPL', loader, 10, 60), {'price': 1.0})
+        self.assertTrue(cache_manager.get_entry_state('seba:fundamental:AAPL')['stale'])
+        
+        release.set()
+        self.wait_for_refresh(cache_manager)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache_manager.get_or_refresh('seba:fundamental:AAPL', loader, 10, 60), {'price': 2.0})
+        self.assertFalse(cache_manager.get_entry_state('seba:fundamental:AAPL')['stale'])
+        self.assertEqual(cache_manager.get_stats()['stale_hits'], 5)
+        
+        # بعد انتهاء مدة السماح يتم التحميل مباشرة
+        self.now[0] = 1100.0
+        self.assertEqual(cache_manager.get_or_refresh('seba:fundamental:AAPL', loader, 10, 60), {'price': 3.0})
+        cache_manager.close()
+    
+    def test_refresh_failure_keeps_stale_value(self):
+        """اختبار الاحتفاظ بالقيمة القديمة وتعليمها عند فشل التحديث"""
+        cache_manager = CacheManager()
+        frame = pd.DataFrame({'close': [1.0, 2.0]})
+        loader = MagicMock(side_effect=[frame, ValueError('provider down'), pd.DataFrame()])
+        
+        cache_manager.get_or_refresh('seba:daily:AAPL', loader, 10, 60, dataframe=True)
+        self.now[0] = 1011.0
+        stale = cache_manager.get_or_refresh('seba:daily:AAPL', loader, 10, 60, dataframe=True)
+        self.assertTrue(stale.attrs['cache_stale'])
+        self.wait_for_refresh(cache_manager)
+        
+        state = cache_manager.get_entry_state('seba:daily:AAPL')
+        self.assertTrue(state['refresh_failed'])
+        self.assertIn('provider down', state['error'])
+        
+        # لا تُعاد محاولة التحديث قبل انقضاء مهلة إعادة المحاولة
+        stale = cache_manager.get_or_refresh('seba:daily:AAPL', loader, 10, 60, dataframe=True)
+        pd.testing.assert_frame_equal(stale, frame, check_flags=False)
+        self.assertTrue(stale.attrs['cache_refresh_failed'])
+        self.assertEqual(loader.call_count, 2)
+        
+        # النتيجة الفارغة تعتبر فشلاً ولا تستبدل القيمة القديمة
+        self.now[0] = 1011.0 + cache_manager.refresh_retry
+        cache_manager.get_or_refresh('seba:daily:AAPL', loader, 10, 60, dataframe=True)
+        self.wait_for_refresh(cache_manager)
+        self.assertEqual(loader.call_count, 3)
+        self.assertEqual(len(cache_manager.get_dataframe('seba:daily:AAPL')), 2)
+        self.assertEqual(cache_manager.get_stats()['refresh_failures'], 2)
+        cache_manager.close()
+    
+    def test_single_refresh_across_processes(self):
+        """اختبار تنفيذ تحديث واحد فقط عبر العمليات المشتركة في Redis"""
+        redis_server = FakeRedis()
+        managers = [CacheManager(redis_client=redis_server.client(), l1_enabled=False) for _ in range(2)]
+        release = threading.Event()
+        loader = MagicMock(side_effect=lambda: release.wait(5) and {'eps': 2.0})
+        
+        managers[0].get_or_refresh('seba:earnings:AAPL', lambda: {'eps': 1.0}, 10, 60)
+        self.now[0] = 1011.0
+        for cache_manager in managers:
+            self.assertEqual(cache_manager.get_or_refresh('seba:earnings:AAPL', loader, 10, 60), {'eps': 1.0})
+        
+        release.set()
+        for cache_manager in managers:
+            self.wait_for_refresh(cache_manager)
+            cache_manager.close()
+        self.assertEqual(loader.call_count, 1)
+        self.assertEqual(managers[1].get('seba:earnings:AAPL'), {'eps': 2.0})
+
+
+class TestNegativeCache(unittest.TestCase):
+    """اختبارات التخزين المؤقت للنتائج السلبية"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.data_manager = DataIntegrationManager(hedge_enabled=False, cache_enabled=True)
+        self.data_manager.cache = CacheManager()
+        self.data_manager.symbol_master.load([{'symbol': 'AAPL', 'name': 'Apple Inc.', 'exchange': 'NASDAQ'}])
+    
+    def test_provider_miss_skips_repeat_requests(self):
+        """اختبار عدم إرسال الطلب نفسه إلى المصدر بعد نتيجة فارغة"""
+        self.data_manager.yahoo_finance.get_historical_data = MagicMock(return_value=pd.DataFrame())
+        
+        for _ in range(3):
+            data = self.data_manager.get_historical_data('ZZZZ', period='1mo', source='yahoo_finance', use_cache=False)
+            self.assertTrue(data.empty)
+        
+        self.assertEqual(self.data_manager.yahoo_finance.get_historical_data.call_count, 1)
+        self.assertEqual(self.data_manager.classify_miss('ZZZZ'), 'not_found')
+        self.assertEqual(self.data_manager.classify_miss('AAPL'), 'no_data')
+        self.assertEqual(self.data_manager.cache.get_stats()['negative_hits'], 2)
+    
+    def test_policy_cached_stores_empty_results(self):
+        """اختبار تخزين النتيجة الفارغة بعد جميع المصادر البديلة"""
+        self.data_manager.yahoo_finance.get_fundamental_data = MagicMock(return_value={})
+        
+        self.assertEqual(self.data_manager.get_fundamental_data('ZZZZ', source='yahoo_finance'), {})
+        self.data_manager.cache.delete(self.data_manager.cache_policy.make_key(
+            'negative', 'yahoo_finance.get_fundamental_data', {'symbol': 'ZZZZ'}
+        ) + ':miss')
+        self.assertEqual(self.data_manager.get_fundamental_data('ZZZZ', source='yahoo_finance'), {})
+        self.assertEqual(self.data_manager.yahoo_finance.get_fundamental_data.call_count, 1)
+    
+    def test_provider_rejection_falls_back(self):
+        """اختبار تخزين رفض المصدر مع استمرار استخدام المصدر البديل"""
+        error = Exception('403 Client Error: Forbidden')
+        error.response = MagicMock(status_code=403)
+        self.data_manager.iex_cloud.get_quote = MagicMock(side_effect=error)
+        self.data_manager.yahoo_finance.get_realtime_data = MagicMock(return_value={'symbol': 'AAPL', 'price': 1.0})
+        
+        for _ in range(2):
+            quote = self.data_manager.get_realtime_data('AAPL', source='iex_cloud', use_cache=False)
+            self.assertEqual(quote['price'], 1.0)
+        
+        self.assertEqual(self.data_manager.iex_cloud.get_quote.call_count, 1)
+        self.assertEqual(self.data_manager.yahoo_finance.get_realtime_data.call_count, 2)
+    
+    def test_provider_outage_not_cached(self):
+        """اختبار عدم تخزين النتيجة الفارغة الناتجة عن فشل استدعاء المصدر كنتيجة سلبية"""
+        error = requests.exceptions.ConnectionError('Connection aborted')
+        self.data_manager.yahoo_finance.get_fundamental_data = MagicMock(side_effect=error)
+        
+        for _ in range(2):
+            self.assertEqual(self.data_manager.get_fundamental_data('AAPL', source='yahoo_finance'), {})
+        
+        self.assertEqual(self.data_manager.yahoo_finance.get_fundamental_data.call_count, 2)
+        self.assertEqual(self.data_manager.cache.get_stats()['negative_hits'], 0)
+    
+    def test_degraded_provider_misses_not_cached(self):
+        """اختبار عدم تخزين النتائج الفارغة أثناء عطل عام في المصدر"""
+        for _ in range(5):
+            self.data_manager.health_monitor.record_failure('yahoo_finance', 0.1)
+        self.data_manager.yahoo_finance.get_historical_data = MagicMock(return_value=pd.DataFrame())
+        
+        for _ in range(2):
+            self.data_manager.get_historical_data('AAPL', period='1mo', source='yahoo_finance', use_cache=False)
+        self.assertEqual(self.data_manager.yahoo_finance.get_historical_data.call_count, 2)
+        
+        # لا تتجاوز صلاحية "لا توجد بيانات" صلاحية نوع البيانات
+        market_hours = datetime(2024, 7, 8, 11, 0, tzinfo=MARKET_TIMEZONE)
+        policy = CachePolicy(quote_ttl=5, no_data_ttl=300)
+        self.assertEqual(policy.get_negative_ttl('no_data', 'quote', market_hours), 5)
+        self.assertEqual(policy.get_negative_ttl('not_found', 'quote', market_hours), policy.negative_ttls['not_found'])
+
+
+class TestMetrics(unittest.TestCase):
+    """اختبارات سجل المقاييس وعرضها بصيغة Prometheus"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.registry = MetricsRegistry()
+    
+    def test_histogram_quantiles_and_render(self):
+        """اختبار تقدير النسب المئوية وعرض الفئات التراكمية"""
+        latency = self.registry.histogram('seba_test_duration_seconds', 'test', ['endpoint'], buckets=[0.1, 0.5, 1.0])
+        for value in [0.05] * 50 + [0.3] * 45 + [0.9] * 5:
+            latency.observe(value, endpoint='/screen')
+        
+        summary = self.registry.snapshot()['seba_test_duration_seconds']['/screen']
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['p50'], 0.1)
+        self.assertTrue(0.1 < summary['p95'] <= 0.5)
+        self.assertTrue(0.5 < summary['p99'] <= 0.9)
+        
+        text = self.registry.render()
+        self.assertIn('# TYPE seba_test_duration_seconds histogram', text)
+        self.assertIn('seba_test_duration_seconds_bucket{endpoint="/screen",le="0.5"} 95', text)
+        self.assertIn('seba_test_duration_seconds_bucket{endpoint="/screen",le="+Inf"} 100', text)
+        self.assertIn('seba_test_duration_seconds_count{endpoint="/screen"} 100', text)
+    
+    def test_counters_are_thread_safe(self):
+        """اختبار زيادة العداد من عدة خيوط والتحقق من التسميات"""
+        requests_total = self.registry.counter('seba_test_total', 'test', ['provider'])
+        
+        def work():
+            for _ in range(1000):
+                requests_total.inc(provider='yahoo_finance')
+        
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(requests_total.get(provider='yahoo_finance'), 4000)
+        self.assertIs(self.registry.counter('seba_test_total', 'test', ['provider']), requests_total)
+        with self.assertRaises(ValueError):
+            requests_total.inc(symbol='AAPL')
+        with self.assertRaises(ValueError):
+            self.registry.gauge('seba_test_total', 'test', ['provider'])
+    
+    def test_provider_calls_are_recorded(self):
+        """اختبار تسجيل طلبات مصادر البيانات حسب المصدر وتصنيف الرمز"""
+        self.assertEqual((symbol_class('^GSPC'), symbol_class('AAPL'), symbol_class('EURUSD=X')), ('index', 'equity', 'fx'))
+        
+        requests_total = get_metrics_registry().counter(
+            'seba_provider_requests_total', '', ['provider', 'method', 'symbol_class', 'outcome']
+        )
+        labels = {'provider': 'yahoo_finance', 'method': 'get_realtime_data', 'symbol_class': 'index'}
+        before = requests_total.get(outcome='success', **labels)
+        
+        data_manager = DataIntegrationManager(hedge_enabled=False, cache_enabled=False)
+        data_manager.yahoo_finance.get_realtime_data = MagicMock(return_value={'price': 1.0})
+        data_manager.yahoo_finance.get_realtime_data.__name__ = 'get_realtime_data'
+        data_manager.get_realtime_data('^GSPC', source='yahoo_finance')
+        
+        self.assertEqual(requests_total.get(outcome='success', **labels), before + 1)
+        self.assertIn('seba_provider_request_duration_seconds', get_metrics_registry().render())
+
+
+class TestMeasurePerformance(unittest.TestCase):
+    """اختبارات مزخرف قياس الأداء للدوال المتزامنة وغير المتزامنة والمولدات"""
+    
+    def summary(self, metric, name):
+        """الحصول على ملخص مقياس لاسم دالة"""
+        return get_metrics_registry().snapshot()[metric][name]
+    
+    def test_coroutine_wall_and_cpu_time(self):
+        """اختبار قياس زمن الانتظار في الدوال غير المتزامنة دون احتسابه كزمن معالج"""
+        @measure_performance('test.coroutine')
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return 'done'
+        
+        self.assertEqual(asyncio.run(fetch()), 'done')
+        self.assertGreaterEqual(self.summary('seba_function_duration_seconds', 'test.coroutine')['sum'], 0.05)
+        self.assertLess(self.summary('seba_function_cpu_seconds', 'test.coroutine')['sum'], 0.04)
+        self.assertEqual(self.summary('seba_function_calls_total', 'test.coroutine,success'), 1)
+    
+    def test_generator_excludes_consumer_time(self):
+        """اختبار احتساب الزمن داخل المولد فقط وتمرير القيم والنتيجة"""
+        @measure_performance('test.generator')
+        def produce():
+            received = yield 1
+            yield received
+            return 'end'
+        
+        def consume():
+            generator = produce()
+            first = next(generator)
+            time.sleep(0.05)
+            second = generator.send(2)
+            with self.assertRaises(StopIteration) as stop:
+                next(generator)
+            return first, second, stop.exception.value
+        
+        self.assertEqual(consume(), (1, 2, 'end'))
+        self.assertLess(self.summary('seba_function_duration_seconds', 'test.generator')['sum'], 0.04)
+        self.assertEqual(self.summary('seba_function_calls_total', 'test.generator,success'), 1)
+    
+    def test_allocation_peak_of_nested_calls(self):
+        """اختبار قياس ذروة الذاكرة للاستدعاءات المتداخلة والأخطاء"""
+        if not tracemalloc.is_tracing():
+            self.addCleanup(tracemalloc.stop)
+        
+        @measure_performance('test.inner', allocation_sample_rate=1.0)
+        def inner():
+            return np.ones(1_000_000).sum()
+        
+        @measure_performance('test.outer', allocation_sample_rate=1.0)
+        def outer(fail=False):
+            buffer = np.ones(2_000_000)
+            del buffer
+            inner()
+            if fail:
+                raise ValueError('bad input')
+        
+        outer()
+        with self.assertRaises(ValueError):
+            outer(fail=True)
+        
+        self.assertGreaterEqual(self.summary('seba_function_peak_allocation_bytes', 'test.outer')['max'], 16_000_000)
+        self.assertGreaterEqual(self.summary('seba_function_peak_allocation_bytes', 'test.inner')['max'], 8_000_000)
+        self.assertEqual(self.summary('seba_function_calls_total', 'test.outer,error'), 1)
+    
+    def test_overlapping_allocation_measurements_are_skipped(self):
+        """اختبار عدم تسجيل ذروة ذاكرة لاستدعاء يتزامن مع قياس في خيط آخر وإيقاف tracemalloc بعد القياس"""
+        if tracemalloc.is_tracing():
+            self.skipTest('tracemalloc مفعل مسبقاً')
+        
+        started, release = threading.Event(), threading.Event()
+        
+        @measure_performance('test.holder', allocation_sample_rate=1.0)
+        def holder():
+            started.set()
+            release.wait(5)
+        
+        @measure_performance('test.overlapping', allocation_sample_rate=1.0)
+        def overlapping():
+            return np.ones(100_000).sum()
+        
+        thread = threading.Thread(target=holder)
+        thread.start()
+        started.wait(5)
+        overlapping()
+        release.set()
+        thread.join()
+        
+        snapshot = get_metrics_registry().snapshot()
+        self.assertNotIn('test.overlapping', snapshot['seba_function_peak_allocation_bytes'])
+        self.assertEqual(snapshot['seba_function_peak_allocation_bytes']['test.holder']['count'], 1)
+        self.assertEqual(self.summary('seba_function_calls_total', 'test.overlapping,success'), 1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class TestTracing(unittest.TestCase):
+    """اختبارات تتبع الطلبات بفترات متداخلة"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.tracer = Tracer(enabled=True, sample_rate=0.0, slow_threshold_ms=0, buffer_size=10)
+        patcher = patch('seba.utils.tracing._tracer', self.tracer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_spans_cross_async_and_threads(self):
+        """اختبار انتقال الفترات عبر الدوال غير المتزامنة وخيوط التنفيذ"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        @traced('provider.fetch')
+        def fetch(symbol):
+            return current_trace_id()
+        
+        @traced('llm.generate')
+        async def generate():
+            await asyncio.sleep(0)
+            return fetch('AAPL')
+        
+        with self.tracer.trace('POST /analysis/{symbol}', trace_id='abc123') as root:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                self.assertEqual(executor.submit(bind_context(fetch), 'AAPL').result(), 'abc123')
+                self.assertIsNone(executor.submit(fetch, 'AAPL').result())
+            self.assertEqual(asyncio.run(generate()), 'abc123')
+        
+        trace = self.tracer.get_trace('abc123')
+        self.assertIs(trace.root, root)
+        rows = [(row['name'], row['depth']) for row in trace.to_dict()['spans']]
+        self.assertEqual(rows, [
+            ('POST /analysis/{symbol}', 0),
+            ('provider.fetch', 1),
+            ('llm.generate', 1),
+            ('provider.fetch', 2)
+        ])
+        self.assertIn('llm.generate', trace.render_waterfall())
+        self.assertIsNone(current_trace_id())
+    
+    def test_only_slow_or_failed_traces_are_kept(self):
+        """اختبار الاحتفاظ بالتتبعات البطيئة أو الفاشلة فقط عند عدم اختيار العينة"""
+        self.tracer.slow_threshold_ms = 60000
+        with self.tracer.trace('GET /quotes'):
+            pass
+        with self.assertRaises(ValueError):
+            with self.tracer.trace('GET /stocks/{symbol}', trace_id='failed'):
+                with self.tracer.span('provider.yahoo_finance.get_stock_info'):
+                    raise ValueError('provider down')
+        
+        traces = self.tracer.get_traces()
+        self.assertEqual([trace['trace_id'] for trace in traces], ['failed'])
+        self.assertEqual(self.tracer.stats, {'traces': 2, 'recorded': 1})
+        spans = self.tracer.get_trace('failed').to_dict()['spans']
+        self.assertTrue(all(span['error'] == 'ValueError: provider down' for span in spans))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """اختبارات محلل الأداء بأخذ العينات"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.profiler = SamplingProfiler(interval_ms=1, output_dir=directory.name)
+        self.addCleanup(self.profiler.stop_capture)
+    
+    def test_route_pattern(self):
+        """اختبار مطابقة قوالب المسارات"""
+        pattern = route_pattern('/stocks/{symbol}/indicators')
+        self.assertTrue(pattern.match('/stocks/AAPL/indicators'))
+        self.assertFalse(pattern.match('/stocks/AAPL/fundamentals'))
+        self.assertTrue(route_pattern('/screen').match('/screen/'))
+        self.assertIsNone(route_pattern(None))
+    
+    def test_capture_next_requests(self):
+        """اختبار التقاط عينات الطلبات المطابقة فقط وانتهاء الالتقاط بعد عددها"""
+        def busy_indicator_step(seconds):
+            deadline = time.perf_counter() + seconds
+            total = 0
+            while time.perf_counter() < deadline:
+                total += sum(range(100))
+            return total
+        
+        capture = self.profiler.start_capture(route='/screen', requests=1)
+        with self.assertRaises(ValueError):
+            self.profiler.start_capture(route='/screen')
+        
+        self.assertFalse(self.profiler.request_started('/quotes'))
+        busy_indicator_step(0.05)
+        self.assertEqual(self.profiler.get_capture(capture['id'])['samples'], 0)
+        
+        tracked = self.profiler.request_started('/screen')
+        self.assertTrue(tracked)
+        busy_indicator_step(0.2)
+        self.profiler.request_finished(tracked)
+        
+        result = self.profiler.get_capture(capture['id'])
+        self.assertEqual((result['status'], result['requests']), ('done', 1))
+        self.assertGreater(result['samples'], 0)
+        functions = {row['function'].split(' ')[0]: row for row in self.profiler.top_functions(result)}
+        self.assertGreater(functions['busy_indicator_step']['self'], 0)
+        
+        with open(result['file'], encoding='utf-8') as folded:
+            lines = folded.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+        self.assertTrue(any('busy_indicator_step' in line for line in lines))
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """اختبارات مجموعة قياس الأداء"""
+    
+    def test_run_sizes_and_limits(self):
+        """اختبار تشغيل قياس على عدة أحجام وتخطي الأحجام التي تتجاوز حدوده وحفظ النتائج"""
+        suite = BenchmarkSuite(repeat=2)
+        suite.add_case('custom.rows', lambda ctx: sum(len(df) for df in ctx['panel'].values()), max_symbols=2)
+        suite.add_case('custom.failing', lambda ctx: 1 / 0)
+        
+        report = suite.run(symbols=[1, 3], years=[1, 2], only=['custom'])
+        results = {(r['name'], r['symbols'], r['years']): r for r in report['results']}
+        self.assertEqual(len(results), 8)
+        
+        ok = results[('custom.rows', 1, 2)]
+        self.assertEqual((ok['status'], ok['repeat'], ok['rows']), ('ok', 2, 504))
+        self.assertLessEqual(ok['min'], ok['median'])
+        self.assertEqual(results[('custom.rows', 3, 1)]['status'], 'skipped')
+        self.assertIn('ZeroDivisionError', results[('custom.failing', 1, 1)]['error'])
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = save_results(report, os.path.join(directory, 'results.json'))
+            self.assertEqual(load_results(path)['results'], json.loads(json.dumps(report['results'])))
+    
+    def test_compare_results(self):
+        """اختبار اكتشاف التراجع في الأداء بين تقريرين"""
+        def report(**medians):
+            return {'results': [
+                {'name': name, 'symbols': 1, 'years': 1, 'status': 'ok', 'median': median}
+                for name, median in medians.items()
+            ]}
+        
+        comparisons = compare_results(
+            report(slower=0.10, noise=0.0001, same=0.5, removed=1.0),
+            report(slower=0.15, noise=0.0005, same=0.52, added=1.0),
+            threshold=0.2
+        )
+        flagged = {item['name']: item['regression'] for item in comparisons}
+        self.assertEqual(flagged, {'slower': True, 'noise': False, 'same': False})
+        self.assertEqual(comparisons[0]['name'], 'noise')
+    
+    def test_api_cases_send_valid_requests_and_fail_on_errors(self):
+        """اختبار إرسال تواريخ فعلية في طلب البيانات التاريخية واعتبار الردود غير الناجحة أخطاء"""
+        suite = BenchmarkSuite(repeat=1)
+        ctx = suite._context(1, 1)
+        symbol = next(iter(ctx['panel']))
+        
+        request = suite._historical_request(ctx, symbol)
+        self.assertEqual(request['end_date'], str(ctx['panel'][symbol]['date'].iloc[-1])[:10])
+        self.assertRegex(request['start_date'], r'^\d{4}-\d{2}-\d{2}$')
+        
+        ctx['api_client'] = MagicMock()
+        ctx['api_client'].post.return_value = MagicMock(status_code=422, text='field required')
+        with self.assertRaises(RuntimeError):
+            suite._api_request(ctx, 'post', '/stocks/historical', json=request)
+        
+        ctx['api_client'].post.return_value = MagicMock(status_code=200)
+        self.assertEqual(suite._api_request(ctx, 'post', '/stocks/historical', json=request), 200)
+
+
+class TestSyntheticMarketGenerator(unittest.TestCase):
+    """اختبارات مولد بيانات السوق الاصطناعية"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """إعداد بيئة الاختبار"""
+        cls.market = SyntheticMarketGenerator(seed=7).generate(60, years=3, end_date='2024-06-28', vcp_fraction=0.1, stage2_fraction=0.2)
+    
+    def test_frame_format(self):
+        """اختبار صيغة الإطارات وتواريخ الجلسات واتساق أسعار OHLC"""
+        prices = self.market['prices']
+        self.assertEqual(len(prices), 60)
+        
+        frame = prices['SYN00000']
+        self.assertEqual(list(frame.columns), FRAME_COLUMNS)
+        self.assertEqual(len(frame), 756)
+        self.assertEqual(frame['date'].iloc[-1], date(2024, 6, 28))
+        self.assertNotIn(date(2024, 6, 19), set(frame['date']))
+        self.assertTrue(frame['date'].equals(self.market['index']['date']))
+        self.assertTrue(all(type(value) is date for value in frame['date']))
+        
+        for frame in prices.values():
+            self.assertTrue((frame['low'] <= frame[['open', 'close']].min(axis=1) + 1e-9).all())
+            self.assertTrue((frame['high'] >= frame[['open', 'close']].max(axis=1) - 1e-9).all())
+            self.assertTrue((frame['volume'] > 0).all())
+    
+    def test_reproducible_and_correlated(self):
+        """اختبار أن نفس البذرة تعطي نفس البيانات وأن عوائد الأسهم مترابطة"""
+        again = SyntheticMarketGenerator(seed=7).generate(60, years=3, end_date='2024-06-28', vcp_fraction=0.1, stage2_fraction=0.2)
+        pd.testing.assert_frame_equal(again['prices']['SYN00042'], self.market['prices']['SYN00042'])
+        
+        returns = pd.DataFrame({symbol: frame['adj_close'].pct_change() for symbol, frame in self.market['prices'].items()})
+        correlation = returns.corr().values
+        self.assertGreater(correlation[np.triu_indices_from(correlation, 1)].mean(), 0.1)
+    
+    def test_splits_match_adjusted_close(self):
+        """اختبار أن تعديل الأسعار الخام وفقاً للتقسيمات المولدة يعيد adj_close"""
+        splits = self.market['splits']
+        self.assertFalse(splits.empty)
+        
+        symbol = splits['symbol'].iloc[0]
+        frame = self.market['prices'][symbol]
+        actions = CorporateActionsEngine.extract_actions(frame)
+        self.assertEqual(len(actions), (splits['symbol'] == symbol).sum())
+        
+        adjusted = CorporateActionsEngine.adjust_ohlcv(frame, actions, include_dividends=False)
+        np.testing.assert_allclose(adjusted['close'].values, frame['adj_close'].values)
+    
+    def test_planted_patterns(self):
+        """اختبار الأنماط المزروعة: المرحلة الثانية فوق المتوسط المتحرك 200، وVCP بانكماشات واختراق بحجم مرتفع"""
+        labels = self.market['labels']
+        vcp = labels[labels['pattern'] == 'vcp']
+        self.assertFalse(vcp.empty)
+        self.assertTrue(set(vcp['symbol']) <= set(labels.loc[labels['pattern'] == 'stage2', 'symbol']))
+        
+        for _, label in labels[labels['pattern'] == 'stage2'].iterrows():
+            close = self.market['prices'][label['symbol']]['adj_close']
+            self.assertGreater(close.iloc[-1], close.rolling(200).mean().iloc[-1])
+        
+        for _, label in vcp.iterrows():
+            frame = self.market['prices'][label['symbol']].set_index('date')
+            base = frame.loc[label['start_date']:label['breakout_date']].iloc[:-1]
+            breakout = frame.loc[label['breakout_date']:]
+            self.assertGreaterEqual(label['contractions'], 2)
+            self.assertAlmostEqual(base['close'].iloc[0], label['pivot'])
+            self.assertLess(base['close'].max(), label['pivot'] * 1.05)
+            self.assertGreater(breakout['close'].iloc[-1], label['pivot'])
+            self.assertGreater(breakout['volume'].mean(), 2 * base['volume'].iloc[-10:].mean())
+
+
+class TestQuoteHub(unittest.TestCase):
+    """اختبارات مركز الأسعار اللحظية"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.data_manager = MagicMock()
+        self.data_manager.get_realtime_data_batch.side_effect = lambda symbols, source=None: {
+            symbol: {'symbol': symbol, 'price': 100.0, 'volume': 1000} for symbol in symbols
+        }
+        self.hub = QuoteHub(self.data_manager, auto_start=False)
+    
+    def test_poll_fans_out_one_request(self):
+        """اختبار استطلاع كل رمز مرة واحدة وتوزيع السعر على جميع المشتركين"""
+        received = []
+        for _ in range(100):
+            self.hub.subscribe(['AAPL', 'msft'], lambda symbol, quote: received.append(symbol))
+        
+        self.hub.poll()
+        
+        self.data_manager.get_realtime_data_batch.assert_called_once()
+        self.assertEqual(sorted(self.data_manager.get_realtime_data_batch.call_args[0][0]), ['AAPL', 'MSFT'])
+        self.assertEqual(len(received), 200)
+        
+        # عدم إرسال تحديثات عندما لا يتغير السعر
+        self.hub.poll()
+        self.assertEqual(len(received), 200)
+        self.assertEqual(self.hub.get_latest('AAPL')['price'], 100.0)
+    
+    def test_unsubscribe_stops_watching(self):
+        """اختبار إيقاف مراقبة الرمز بعد إلغاء جميع الاشتراكات"""
+        subscription = self.hub.subscribe(['AAPL'], lambda symbol, quote: None)
+        self.hub.poll()
+        subscription.unsubscribe()
+        
+        self.assertEqual(self.hub.get_stats()['symbols'], 0)
+        self.assertIsNone(self.hub.get_latest('AAPL'))
+        self.assertEqual(self.hub.poll(), 0)
+    
+    def test_unsubscribe_during_poll(self):
+        """اختبار عدم إعادة تخزين سعر رمز أُلغي آخر اشتراك فيه أثناء الاستطلاع"""
+        received = []
+        subscription = self.hub.subscribe(['AAPL'], lambda symbol, quote: received.append(symbol))
+        
+        def fetch_and_unsubscribe(symbols, source=None):
+            # إلغاء الاشتراك من خيط آخر بينما ينتظر الاستطلاع رد المصدر
+            worker = threading.Thread(target=subscription.unsubscribe)
+            worker.start()
+            worker.join()
+            return {symbol: {'symbol': symbol, 'price': 100.0, 'volume': 1000} for symbol in symbols}
+        
+        self.data_manager.get_realtime_data_batch.side_effect = fetch_and_unsubscribe
+        
+        self.assertEqual(self.hub.poll(), 0)
+        self.assertIsNone(self.hub.get_latest('AAPL'))
+        self.assertEqual(received, [])
+        self.assertEqual(self.hub.get_stats()['symbols'], 0)
+
+
+class TestIEXBatch(unittest.TestCase):
+    """اختبارات الطلبات المجمعة لـ IEX Cloud"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.iex_api = IEXCloudAPI(api_key="test_key")
+    
+    @patch('seba.data_integration.iex_cloud.requests.get')
+    def test_batch_is_split_per_method(self, mock_get):
+        """اختبار تقسيم رد الطلب المجمع إلى أشكال نتائج الدوال المفردة"""
+        mock_get.return_value.json.return_value = {
+            'AAPL': {
+                'quote': {'symbol': 'AAPL', 'latestPrice': 190.0},
+                'stats': {'peRatio': 30.1},
+                'company': {'companyName': 'Apple Inc.'},
+                'news': [{'headline': 'a'}, {'headline': 'b'}],
+                'earnings': {'symbol': 'AAPL', 'earnings': [{'actualEPS': 1.5}]}
+            }
+        }
+        
+        batch = self.iex_api.get_batch(['aapl', 'MSFT'], list(IEXCloudAPI.BATCH_TYPES), news_last=1)
+        
+        self.assertEqual(batch['AAPL']['quote']['latestPrice'], 190.0)
+        self.assertIn('timestamp', batch['AAPL']['quote'])
+        self.assertEqual(batch['AAPL']['company']['companyName'], 'Apple Inc.')
+        self.assertEqual(len(batch['AAPL']['news']), 1)
+        self.assertEqual(batch['AAPL']['earnings'], [{'actualEPS': 1.5}])
+        self.assertEqual(batch['MSFT']['quote'], {})
+        self.assertEqual(mock_get.call_args[1]['params']['symbols'], 'AAPL,MSFT')
+    
+    @patch('seba.data_integration.iex_cloud.requests.get')
+    def test_batch_is_chunked_by_100_symbols(self, mock_get):
+        """اختبار إرسال طلب واحد لكل 100 رمز"""
+        mock_get.return_value.json.return_value = {}
+        symbols = [f"S{i}" for i in range(250)]
+        
+        self.iex_api.get_quotes_batch(symbols)
+        
+        self.assertEqual(mock_get.call_count, 3)
+
+
+class TestAlphaVantageCSV(unittest.TestCase):
+    """اختبارات التحليل السريع لردود CSV من Alpha Vantage"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.av_api = AlphaVantageAPI(api_key="test_key")
+        self.csv_text = (
+            "timestamp,open,high,low,close,adjusted_close,volume,dividend_amount,split_coefficient\r\n"
+            "2024-07-02,11.0,12.0,10.5,11.5,11.5,2000,0.0,1.0\r\n"
+            "2024-07-01,10.0,11.0,9.5,10.5,10.5,1000,0.25,2.0\r\n"
+        )
+        self.json_data = {
+            "Time Series (Daily)": {
+                "2024-07-02": {"1. open": "11.0", "2. high": "12.0", "3. low": "10.5", "4. close": "11.5",
+                               "5. adjusted close": "11.5", "6. volume": "2000", "7. dividend amount": "0.0",
+                               "8. split coefficient": "1.0"},
+                "2024-07-01": {"1. open": "10.0", "2. high": "11.0", "3. low": "9.5", "4. close": "10.5",
+                               "5. adjusted close": "10.5", "6. volume": "1000", "7. dividend amount": "0.25",
+                               "8. split coefficient": "2.0"}
+            }
+        }
+    
+    @patch('seba.data_integration.alpha_vantage.requests.get')
+    def test_csv_matches_json_frame(self, mock_get):
+        """اختبار تطابق إطار البيانات الناتج عن مساري CSV و JSON"""
+        mock_get.return_value.text = self.csv_text
+        csv_df = self.av_api.get_historical_data("IBM")
+        
+        mock_get.return_value.json.return_value = self.json_data
+        json_df = self.av_api.get_historical_data("IBM", datatype="json").reset_index(drop=True)
+        
+        self.assertEqual(mock_get.call_args_list[0][1]['params']['datatype'], 'csv')
+        pd.testing.assert_frame_equal(csv_df, json_df[csv_df.columns], check_dtype=False)
+        self.assertEqual(csv_df['volume'].dtype, np.int64)
+        self.assertEqual(csv_df['date'].iloc[0].isoformat(), '2024-07-01')
+    
+    @patch('seba.data_integration.alpha_vantage.requests.get')
+    def test_csv_error_response(self, mock_get):
+        """اختبار التعامل مع رسائل الخطأ التي ترسلها Alpha Vantage بصيغة JSON"""
+        mock_get.return_value.text = '{"Note": "API call frequency exceeded"}'
+        mock_get.return_value.json.return_value = {"Note": "API call frequency exceeded"}
+        self.assertTrue(self.av_api.get_historical_data("IBM").empty)
+        
+        # عند تفعيل raise_errors تُرفع رسالة تجاوز الحد حتى يسجلها مدير البيانات كتقييد للمعدل
+        self.av_api.raise_errors = True
+        with self.assertRaisesRegex(RuntimeError, "rate limit"):
+            self.av_api.get_historical_data("IBM")
+
+
+class TestProviderReplay(unittest.TestCase):
+    """اختبارات تسجيل ردود المصادر وإعادة تشغيلها"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        recordings = tempfile.TemporaryDirectory()
+        self.addCleanup(recordings.cleanup)
+        self.recordings_dir = recordings.name
+        self.test_data = pd.DataFrame({
+            'date': pd.date_range(start='2020-01-01', periods=5).date,
+            'close': np.arange(5, dtype=float),
+            'symbol': 'AAPL'
+        })
+    
+    def test_record_then_replay(self):
+        """اختبار إعادة تشغيل الردود المسجلة دون استدعاء المصدر الحقيقي"""
+        recorder = DataIntegrationManager(hedge_enabled=False, cache_enabled=False)
+        recorder.yahoo_finance.get_historical_data = MagicMock(return_value=self.test_data)
+        install_provider_mode(recorder, "record", self.recordings_dir)
+        recorder.get_historical_data("AAPL", period="1y", source="yahoo_finance")
+        
+        replayer = DataIntegrationManager(hedge_enabled=False, cache_enabled=False)
+        install_provider_mode(replayer, "replay", self.recordings_dir)
+        data = replayer.get_historical_data("AAPL", period="1y", source="yahoo_finance")
+        
+        pd.testing.assert_frame_equal(data, self.test_data)
+        self.assertEqual(replayer.yahoo_finance.stats['hits'], 1)
+        
+        # الدوال المغلفة تحتفظ باسم الدالة الأصلية وتوقيعها (تُستخدم في تسميات المقاييس)
+        self.assertEqual(replayer.yahoo_finance.get_historical_data.__name__, 'get_historical_data')
+        self.assertNotIn('self', inspect.signature(replayer.yahoo_finance.get_historical_data).parameters)
+        
+        # التواريخ النسبية المختلفة تستخدم تسجيل نفس الرمز
+        self.assertFalse(replayer.get_historical_data("AAPL", period="2y", source="yahoo_finance").empty)
+        self.assertTrue(replayer.get_historical_data("MSFT", period="1y", source="yahoo_finance").empty)
+    
+    def test_error_injection(self):
+        """اختبار حقن الأخطاء وزمن الاستجابة"""
+        store = RecordingStore(self.recordings_dir)
+        provider = ReplayProvider(YahooFinanceAPI, "yahoo_finance", store, latency=0.01, error_rate=1.0)
+        
+        started = time.monotonic()
+        with self.assertRaises(ReplayError):
+            provider.get_realtime_data("AAPL")
+        self.assertGreaterEqual(time.monotonic() - started, 0.01)
+        
+        provider.error_mode = "empty"
+        self.assertTrue(provider.get_historical_data("AAPL").empty)
+        self.assertEqual(provider.get_realtime_data("AAPL"), {})
+
+
+class TestIntradayBarStore(unittest.TestCase):
+    """اختبارات تخزين الأشرطة داخل اليوم وإعادة تجميعها"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = IntradayBarStore(directory.name, base_interval="1m")
+        
+        # جلستان كاملتان من أشرطة الدقيقة (390 شريطاً لكل جلسة)
+        sessions = [
+            pd.date_range('2024-01-02 09:30', periods=390, freq='1min', tz=MARKET_TIMEZONE),
+            pd.date_range('2024-01-03 09:30', periods=390, freq='1min', tz=MARKET_TIMEZONE)
+        ]
+        timestamps = sessions[0].append(sessions[1])
+        close = 100 + np.arange(780) * 0.01
+        self.test_data = pd.DataFrame({
+            'date': timestamps,
+            'open': close - 0.005,
+            'high': close + 0.02,
+            'low': close - 0.02,
+            'close': close,
+            'volume': np.r_[np.full(390, 100.0), np.full(390, 200.0)],
+            'symbol': 'AAPL'
+        })
+    
+    def test_append_only_new_bars(self):
+        """اختبار تجاهل الأشرطة المخزنة مسبقاً عند الإلحاق"""
+        self.assertEqual(self.store.append('AAPL', self.test_data.iloc[:500]), 500)
+        self.assertEqual(self.store.append('AAPL', self.test_data.iloc[400:]), 280)
+        self.assertEqual(self.store.append('AAPL', self.test_data), 0)
+        
+        bars = self.store.get_bars('AAPL')
+        self.assertEqual(len(bars), 780)
+        self.assertTrue(bars['timestamp'].is_monotonic_increasing)
+        self.assertEqual(len(self.store.get_bars('AAPL', start='2024-01-03', end='2024-01-03')), 390)
+        
+        self.assertEqual(self.store.compact('AAPL'), 1)
+        self.assertEqual(len(self.store.get_bars('AAPL')), 780)
+    
+    def test_resample(self):
+        """اختبار إعادة التجميع إلى فواصل أكبر"""
+        self.store.append('AAPL', self.test_data)
+        
+        five_minutes = self.store.get_bars('AAPL', interval='5m')
+        self.assertEqual(len(five_minutes), 156)
+        first = self.test_data.iloc[:5]
+        self.assertAlmostEqual(five_minutes['open'].iloc[0], first['open'].iloc[0])
+        self.assertAlmostEqual(five_minutes['high'].iloc[0], first['high'].max())
+        self.assertAlmostEqual(five_minutes['close'].iloc[0], first['close'].iloc[-1])
+        self.assertEqual(five_minutes['volume'].iloc[0], 500)
+        
+        # أشرطة الساعة تبدأ من افتتاح الجلسة
+        hourly = self.store.get_bars('AAPL', start='2024-01-02', end='2024-01-02', interval='1h')
+        self.assertEqual(len(hourly), 7)
+        self.assertEqual(hourly['timestamp'].iloc[1].strftime('%H:%M'), '10:30')
+        
+        daily = self.store.get_bars('AAPL', interval='1d')
+        self.assertEqual(list(daily['volume']), [39000, 78000])
+        self.assertEqual(self.store.get_relative_volume('AAPL'), 2.0)
+
+
+class TestBackfillPlanner(unittest.TestCase):
+    """اختبارات اكتشاف الفجوات وتعبئتها"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.calendar = TradingCalendar()
+        trading_days = self.calendar.trading_days('2024-01-02', '2024-01-31')
+        
+        # 10-12 و16 يناير فجوة واحدة لأن 15 يناير عطلة، و25 يناير فجوة منفصلة
+        missing = pd.to_datetime(['2024-01-10', '2024-01-11', '2024-01-12', '2024-01-16', '2024-01-25'])
+        self.stored = trading_days[~trading_days.isin(missing)]
+        
+        self.repository = MagicMock()
+        self.repository.get_stored_dates.return_value = {'AAPL': self.stored}
+        self.repository.get_first_stored_dates.return_value = {'AAPL': date(2015, 1, 2)}
+        self.repository.add_historical_data.return_value = True
+        self.data_manager = MagicMock()
+        self.data_manager.default_source = 'yahoo_finance'
+    
+    def test_find_gaps(self):
+        """اختبار اكتشاف الفجوات حسب تقويم التداول"""
+        gaps = find_gaps(self.stored, self.calendar.trading_days('2024-01-02', '2024-01-31'))
+        
+        self.assertEqual(len(gaps), 2)
+        self.assertEqual(str(gaps[0]['start']), '2024-01-10')
+        self.assertEqual(str(gaps[0]['end']), '2024-01-16')
+        self.assertEqual(gaps[0]['days'], 4)
+        self.assertEqual(gaps[1]['days'], 1)
+    
+    def test_plan_and_execute(self):
+        """اختبار دمج الفجوات في طلبات وتخزين الأيام المفقودة فقط"""
+        planner = BackfillPlanner(self.data_manager, self.repository, self.calendar, merge_days=5, max_workers=1)
+        self.assertEqual(len(planner.plan(['AAPL'], '2024-01-02', '2024-01-31')), 2)
+        
+        planner.merge_days = 6
+        requests = planner.plan(['AAPL'], '2024-01-02', '2024-01-31')
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(len(requests[0]['missing_dates']), 5)
+        
+        # يعيد المصدر النطاق كاملاً بما فيه الأيام المخزنة
+        days = self.calendar.trading_days(requests[0]['start_date'], requests[0]['end_date'])
+        self.data_manager.get_historical_data.return_value = pd.DataFrame({'date': days.date, 'close': 1.0})
+        summary = planner.execute(requests)
+        
+        self.assertEqual(summary['bars_added'], 5)
+        stored_data = self.repository.add_historical_data.call_args[0][1]
+        self.assertEqual(len(stored_data), 5)
+        
+        report = planner.coverage_report(['AAPL'], '2024-01-02', '2024-01-31')
+        self.assertEqual(report.loc[0, 'missing_days'], 5)
+        self.assertEqual(report.loc[0, 'gaps'], 2)
+    
+    def test_database_error_aborts_plan(self):
+        """اختبار إلغاء الخطة عند فشل قراءة التواريخ المخزنة بدلاً من اعتبار كل الأيام مفقودة"""
+        self.repository.get_stored_dates.return_value = None
+        planner = BackfillPlanner(self.data_manager, self.repository, self.calendar, max_workers=1)
+        
+        with self.assertRaises(RuntimeError):
+            planner.backfill(['AAPL'], '2024-01-02', '2024-01-31')
+        self.data_manager.get_historical_data.assert_not_called()
+    
+    def test_sessions_before_first_stored_bar_are_not_gaps(self):
+        """اختبار عدم اعتبار أيام التداول السابقة لأول شريط مخزن (قبل الإدراج) فجوات"""
+        listed = self.stored[self.stored >= pd.Timestamp('2024-01-22')]
+        self.repository.get_stored_dates.return_value = {'AAPL': self.stored, 'NEWCO': listed}
+        self.repository.get_first_stored_dates.return_value = {'AAPL': date(2015, 1, 2), 'NEWCO': date(2024, 1, 22)}
+        planner = BackfillPlanner(self.data_manager, self.repository, self.calendar, max_workers=1)
+        
+        gaps = planner.detect_gaps(['NEWCO'], '2024-01-02', '2024-01-31')['NEWCO']
+        self.assertEqual([(str(gap['start']), gap['days']) for gap in gaps], [('2024-01-25', 1)])
+        
+        report = planner.coverage_report(['NEWCO'], '2024-01-02', '2024-01-31').iloc[0]
+        self.assertEqual(report['expected_days'], len(listed) + 1)
+        self.assertEqual(report['missing_days'], 1)
+
+
+class TestCacheWarmer(unittest.TestCase):
+    """اختبارات تسخين التخزين المؤقت"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.data_manager = MagicMock()
+        self.data_manager.get_symbols_list.return_value = ['AAPL', 'GOOG', 'AMZN']
+        self.stock_repository = MagicMock()
+        self.stock_repository.get_stock_list_symbols.return_value = {'Watchlist': ['nvda', 'AAPL']}
+        self.stock_repository.get_all_stocks.return_value = [MagicMock(symbol='AAPL'), MagicMock(symbol='MSFT')]
+        self.historical_repository = MagicMock()
+        self.sepa_engine = MagicMock()
+        self.warmer = CacheWarmer(
+            data_manager=self.data_manager,
+            sepa_engine=self.sepa_engine,
+            stock_repository=self.stock_repository,
+            historical_repository=self.historical_repository,
+            calendar=TradingCalendar(),
+            index_symbols=['^GSPC'],
+            universe_size=2,
+            max_workers=2,
+            requests_per_minute=1000,
+            lead_minutes=45,
+            store_history=True
+        )
+    
+    def test_run_warms_universe(self):
+        """اختبار تسخين قوائم الأسهم والأسهم المخزنة وقائمة الرموز وتخزين الأشرطة غير المخزنة فقط"""
+        dates = pd.bdate_range('2024-07-01', periods=5)
+        bars = pd.DataFrame({'date': dates, 'close': np.arange(5, dtype=float)})
+        self.data_manager.get_historical_data.side_effect = lambda symbol, **kwargs: pd.DataFrame() if symbol == 'GOOG' else bars
+        self.historical_repository.get_stored_dates.side_effect = lambda symbols, start, end: {'AAPL': dates[:3]} if symbols == ['AAPL'] else {}
+        self.historical_repository.add_historical_data.return_value = True
+        
+        self.assertEqual(self.warmer.get_universe(), ['NVDA', 'AAPL', 'MSFT', 'GOOG'])
+        with patch('seba.data_integration.cache_warmer.TechnicalIndicators') as indicators, \
+                patch('seba.data_integration.cache_warmer.DataProcessor'):
+            report = self.warmer.run()
+        
+        self.assertEqual(report['indices'], 1)
+        self.assertEqual(report['warmed'], 3)
+        self.assertEqual(report['no_data'], ['GOOG'])
+        self.assertEqual(report['stored_rows'], 2 + 5)
+        self.assertEqual(indicators.calculate_all_indicators.call_count, 3)
+        self.assertEqual(self.sepa_engine.analyze_stock.call_count, 3)
+        self.assertEqual(self.data_manager.get_fundamental_data.call_count, 3)
+        
+        # نفس معلمات طلبات الواجهة حتى تتطابق مفاتيح التخزين المؤقت
+        kwargs = self.data_manager.get_historical_data.call_args_list[0].kwargs
+        self.assertEqual(kwargs['interval'], '1d')
+        self.assertEqual(kwargs['end_date'], datetime.now().strftime('%Y-%m-%d'))
+        self.assertNotIn('NVDA', [call.args[0] for call in self.historical_repository.add_historical_data.call_args_list])
+    
+    def test_stored_dates_error_skips_storage(self):
+        """اختبار عدم تخزين الأشرطة عند تعذر قراءة التواريخ المخزنة مع استمرار التسخين"""
+        self.data_manager.get_historical_data.return_value = pd.DataFrame({
+            'date': pd.date_range(start='2024-01-02', periods=5).date,
+            'close': np.arange(5, dtype=float)
+        })
+        self.historical_repository.get_stored_dates.return_value = None
+        
+        with patch('seba.data_integration.cache_warmer.TechnicalIndicators'), \
+                patch('seba.data_integration.cache_warmer.DataProcessor'):
+            result = self.warmer.warm_symbol('AAPL', tracked=True)
+        
+        self.assertEqual(result['status'], 'warmed')
+        self.assertEqual(result['stored_rows'], 0)
+        self.historical_repository.add_historical_data.assert_not_called()
+    
+    def test_next_run_time(self):
+        """اختبار جدولة التسخين قبل افتتاح الجلسة التالية"""
+        monday_morning = datetime(2024, 7, 8, 8, 0, tzinfo=MARKET_TIMEZONE)
+        self.assertEqual(self.warmer.next_run_time(monday_morning), datetime(2024, 7, 8, 8, 45, tzinfo=MARKET_TIMEZONE))
+        
+        after_warmup = datetime(2024, 7, 8, 8, 50, tzinfo=MARKET_TIMEZONE)
+        self.assertEqual(self.warmer.next_run_time(after_warmup), datetime(2024, 7, 9, 8, 45, tzinfo=MARKET_TIMEZONE))
+        
+        before_holiday = datetime(2024, 7, 3, 12, 0, tzinfo=MARKET_TIMEZONE)
+        self.assertEqual(self.warmer.next_run_time(before_holiday), datetime(2024, 7, 5, 8, 45, tzinfo=MARKET_TIMEZONE))
+
+
 class TestTechnicalAnalysis(unittest.TestCase):
     """اختبارات وحدة التحليل الفني"""
     
@@ -171,6 +1920,49 @@ class TestTechnicalAnalysis(unittest.TestCase):
         self.assertIn('daily_volatility', processed_data.columns)
 
 
+class TestCorporateActions(unittest.TestCase):
+    """اختبارات محرك تعديل البيانات وفقاً لإجراءات الشركات"""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار"""
+        self.raw_data = pd.DataFrame({
+            'date': pd.date_range(start='2020-01-01', periods=6).date,
+            'open': [100.0, 100.0, 100.0, 50.0, 50.0, 50.0],
+            'high': [101.0, 101.0, 101.0, 51.0, 51.0, 51.0],
+            'low': [99.0, 99.0, 99.0, 49.0, 49.0, 49.0],
+            'close': [100.0, 100.0, 100.0, 50.0, 50.0, 50.0],
+            'volume': [1000.0] * 6,
+            'dividend': [0.0, 0.0, 0.0, 0.0, 0.0, 1.0],
+            'split_coefficient': [1.0, 1.0, 1.0, 2.0, 1.0, 1.0]
+        })
+    
+    def test_extract_actions(self):
+        """اختبار استخراج أحداث التقسيم وتوزيعات الأرباح"""
+        actions = CorporateActionsEngine.extract_actions(self.raw_data)
+        
+        self.assertEqual(len(actions), 2)
+        self.assertEqual(list(actions['action_type']), ['split', 'dividend'])
+    
+    def test_split_adjustment(self):
+        """اختبار تعديل الأسعار والحجم بعد التقسيم"""
+        actions = CorporateActionsEngine.extract_actions(self.raw_data)
+        adjusted = CorporateActionsEngine.adjust_ohlcv(self.raw_data, actions, include_dividends=False)
+        
+        np.testing.assert_allclose(adjusted['close'].values, [50.0] * 6)
+        np.testing.assert_allclose(adjusted['volume'].values[:3], [2000.0] * 3)
+        np.testing.assert_allclose(adjusted['volume'].values[3:], [1000.0] * 3)
+    
+    def test_dividend_adjustment(self):
+        """اختبار تعديل الأسعار بعد توزيع الأرباح"""
+        actions = CorporateActionsEngine.extract_actions(self.raw_data)
+        adjusted = CorporateActionsEngine.adjust_ohlcv(self.raw_data, actions)
+        
+        # توزيع 1.0 على سعر إغلاق سابق 50.0 يعطي عاملاً قدره 0.98
+        self.assertAlmostEqual(adjusted['adj_close'].iloc[4], 49.0)
+        self.assertAlmostEqual(adjusted['adj_close'].iloc[0], 49.0)
+        self.assertAlmostEqual(adjusted['adj_close'].iloc[5], 50.0)
+
+
 class TestSEPAEngine(unittest.TestCase):
     """اختبارات وحدة محرك قواعد SEPA"""
     